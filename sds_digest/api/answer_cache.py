@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from pydantic import BaseModel, Field
+
+from sds_digest.llms.cache import normalize_text
+
+
+SHINGLE_SIZE = 3
+
+# Words a rewording may add or drop without changing what is asked
+STOPWORDS = frozenset(
+    "a an the is are was were be been am do does did of for to in on at by with from about "
+    "this that these those it its what which who whom how s please me i we you can could should would "
+    "tell give show there any isn aren wasn weren don doesn didn couldn shouldn wouldn won".split()
+)
+# Kept as content words, and spelled one way, so "is it flammable" never matches "is it not flammable"
+NEGATIONS = {"not": "not", "no": "not", "never": "not", "none": "not", "nor": "not", "t": "not", "cannot": "not", "without": "not"}
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivial rewordings share a key."""
+    return normalize_text(re.sub(r"[^\w\s]", " ", question.lower()))
+
+
+def question_shingles(normalized_question: str, size: int = SHINGLE_SIZE) -> set[int]:
+    """Hashed character shingles of a normalized question."""
+    text = f" {normalized_question} "
+    grams = {text[i:i + size] for i in range(max(len(text) - size + 1, 1))}
+    return {int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "big") for gram in grams}
+
+
+def content_words(normalized_question: str) -> frozenset[str]:
+    """Words of a normalized question that carry its meaning: stopwords dropped, plurals and negations folded."""
+    words = set()
+    for word in normalized_question.split():
+        word = NEGATIONS.get(word, word)
+        if word in STOPWORDS:
+            continue
+        words.add(word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word)
+    return frozenset(words)
+
+
+def jaccard(a: set[int], b: set[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class CachedAnswer(BaseModel):
+    answer: str = Field(..., description="Previously generated answer")
+    question: str = Field(..., description="Question the answer was generated for")
+    similarity: float = Field(..., description="1.0 for an exact match, else the shingle Jaccard similarity")
+
+
+class AnswerCacheStats(BaseModel):
+    entries: int = Field(..., description="Number of cached answers")
+    exact_hits: int = Field(..., description="Questions answered from an identical cached question")
+    similar_hits: int = Field(..., description="Questions answered from a near-duplicate cached question")
+    misses: int = Field(..., description="Questions that required an LLM call")
+    invalidations: int = Field(..., description="Answers dropped because their SDS was reprocessed")
+    evictions: int = Field(..., description="Answers evicted to stay under max_entries")
+
+
+class AnswerCache:
+    """
+    Cache of /ask answers per SDS and QA model, stored in a local SQLite file.
+
+    Questions are matched exactly after normalization; otherwise, when
+    `similarity_threshold` is set, the most similar cached question of the same SDS
+    is used if the Jaccard similarity of their hashed character shingles reaches it
+    and both questions have the same content words, negations included. Shingles
+    alone score "is it flammable" and "is it not flammable" as near-duplicates.
+    Answers of an SDS are invalidated when it is reprocessed, and the least recently
+    used answers are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, db_path: Path, similarity_threshold: float | None = None, max_entries: int = 10_000):
+        self.db_path = Path(db_path)
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @staticmethod
+    def _question_key(normalized_question: str) -> str:
+        return hashlib.sha256(normalized_question.encode("utf-8")).hexdigest()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            if not self._initialized:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS answers (
+                        sds_id TEXT NOT NULL,
+                        model TEXT NOT NULL,
+                        question_key TEXT NOT NULL,
+                        question TEXT NOT NULL,
+                        shingles TEXT NOT NULL,
+                        answer TEXT NOT NULL,
+                        last_access REAL NOT NULL,
+                        PRIMARY KEY (sds_id, model, question_key)
+                    )
+                    """
+                )
+                self._initialized = True
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _touch(self, connection: sqlite3.Connection, sds_id: str, model: str, question_key: str) -> None:
+        connection.execute(
+            "UPDATE answers SET last_access = ? WHERE sds_id = ? AND model = ? AND question_key = ?",
+            (time.time(), sds_id, model, question_key),
+        )
+
+    def get(self, sds_id: str, question: str, model: str) -> CachedAnswer | None:
+        normalized = normalize_question(question)
+        question_key = self._question_key(normalized)
+        with self._lock, self._connect() as connection:
+            row = connection.execute(
+                "SELECT question, answer FROM answers WHERE sds_id = ? AND model = ? AND question_key = ?",
+                (sds_id, model, question_key),
+            ).fetchone()
+            if row is not None:
+                self._touch(connection, sds_id, model, question_key)
+                self.exact_hits += 1
+                return CachedAnswer(question=row[0], answer=row[1], similarity=1.0)
+
+            if self.similarity_threshold is not None:
+                shingles = question_shingles(normalized)
+                words = content_words(normalized)
+                best: tuple[float, str, str, str] | None = None
+                for candidate_key, candidate_question, candidate_shingles, answer in connection.execute(
+                    "SELECT question_key, question, shingles, answer FROM answers WHERE sds_id = ? AND model = ?",
+                    (sds_id, model),
+                ):
+                    if content_words(normalize_question(candidate_question)) != words:
+                        continue
+                    similarity = jaccard(shingles, set(json.loads(candidate_shingles)))
+                    if best is None or similarity > best[0]:
+                        best = (similarity, candidate_key, candidate_question, answer)
+                if best is not None and best[0] >= self.similarity_threshold:
+                    self._touch(connection, sds_id, model, best[1])
+                    self.similar_hits += 1
+                    return CachedAnswer(question=best[2], answer=best[3], similarity=best[0])
+
+            self.misses += 1
+            return None
+
+    def put(self, sds_id: str, question: str, model: str, answer: str) -> None:
+        normalized = normalize_question(question)
+        with self._lock, self._connect() as connection:
+            connection.execute(
+                """
+                INSERT OR REPLACE INTO answers (sds_id, model, question_key, question, shingles, answer, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    sds_id,
+                    model,
+                    self._question_key(normalized),
+                    question,
+                    json.dumps(sorted(question_shingles(normalized))),
+                    answer,
+                    time.time(),
+                ),
+            )
+            (entries,) = connection.execute("SELECT COUNT(*) FROM answers").fetchone()
+            overflow = entries - self.max_entries
+            if overflow > 0:
+                connection.execute(
+                    """
+                    DELETE FROM answers WHERE rowid IN (
+                        SELECT rowid FROM answers ORDER BY last_access ASC LIMIT ?
+                    )
+                    """,
+                    (overflow,),
+                )
+                self.evictions += overflow
+
+    def invalidate(self, sds_id: str) -> int:
+        with self._lock, self._connect() as connection:
+            cursor = connection.execute("DELETE FROM answers WHERE sds_id = ?", (sds_id,))
+            self.invalidations += cursor.rowcount
+            return cursor.rowcount
+
+    def stats(self) -> AnswerCacheStats:
+        with self._lock, self._connect() as connection:
+            (entries,) = connection.execute("SELECT COUNT(*) FROM answers").fetchone()
+        return AnswerCacheStats(
+            entries=entries,
+            exact_hits=self.exact_hits,
+            similar_hits=self.similar_hits,
+            misses=self.misses,
+            invalidations=self.invalidations,
+            evictions=self.evictions,
+        )
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Awaitable, Callable
+
+from pydantic import BaseModel, Field
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    EXTRACTING = "extracting"
+    SPLITTING = "splitting"
+    STRUCTURING = "structuring"
+    SUMMARIZING = "summarizing"
+    DONE = "done"
+    FAILED = "failed"
+
+    @property
+    def finished(self) -> bool:
+        return self in (JobStatus.DONE, JobStatus.FAILED)
+
+
+class Job(BaseModel):
+    job_id: str = Field(..., description="Unique identifier of the processing job")
+    sds_id: str = Field(..., description="SDS identifier the job produces")
+    filename: str = Field(..., description="Original filename of the uploaded PDF")
+    pdf_path: str = Field(..., description="Path of the stored PDF")
+    status: JobStatus = Field(JobStatus.QUEUED, description="Current processing state")
+    error: str | None = Field(None, description="Error message if the job failed")
+    cache_key: str | None = Field(None, description="Result cache key to store the processed SDS under")
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class JobQueueFull(Exception):
+    """Raised when the queue already holds `max_depth` pending jobs."""
+
+
+StatusReporter = Callable[[JobStatus], None]
+JobHandler = Callable[[Job, StatusReporter], Awaitable[None]]
+
+
+class JobQueue:
+    """
+    In-process, bounded queue of SDS processing jobs.
+
+    `submit` returns immediately; `concurrency` worker tasks pull jobs and run `handler`,
+    which reports intermediate states through the given reporter. The job ends as DONE
+    when the handler returns and as FAILED when it raises. Finished jobs are forgotten
+    `finished_ttl_seconds` after they end, oldest first beyond `max_finished`.
+    """
+
+    def __init__(
+        self,
+        handler: JobHandler,
+        max_depth: int = 100,
+        concurrency: int = 2,
+        finished_ttl_seconds: float | None = 3600.0,
+        max_finished: int = 1000,
+    ):
+        self.handler = handler
+        self.max_depth = max_depth
+        self.concurrency = concurrency
+        self.finished_ttl_seconds = finished_ttl_seconds
+        self.max_finished = max_finished
+        self._jobs: dict[str, Job] = {}
+        # Finished job ids by the monotonic time they ended, oldest first
+        self._finished: OrderedDict[str, float] = OrderedDict()
+        self._queue: asyncio.Queue[str] | None = None
+        self._workers: list[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return self._queue is not None
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def astart(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_depth)
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def aclose(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    def submit(self, sds_id: str, filename: str, pdf_path: str, cache_key: str | None = None) -> Job:
+        if not self.running:
+            raise RuntimeError("Job queue is not running")
+        job = Job(
+            job_id=str(uuid.uuid4()),
+            sds_id=sds_id,
+            filename=filename,
+            pdf_path=pdf_path,
+            cache_key=cache_key,
+        )
+        try:
+            self._queue.put_nowait(job.job_id)
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"Job queue is full ({self.max_depth} pending jobs)") from None
+        self._jobs[job.job_id] = job
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        self._evict_finished()
+        return self._jobs.get(job_id)
+
+    def _evict_finished(self) -> None:
+        now = time.monotonic()
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            expired = self.finished_ttl_seconds is not None and now - finished_at >= self.finished_ttl_seconds
+            if not expired and len(self._finished) <= self.max_finished:
+                return
+            del self._finished[job_id]
+            self._jobs.pop(job_id, None)
+
+    def set_status(self, job_id: str, status: JobStatus, error: str | None = None) -> None:
+        job = self._jobs[job_id]
+        job.status = status
+        job.error = error
+        job.updated_at = datetime.now(timezone.utc)
+        if status.finished:
+            self._finished[job_id] = time.monotonic()
+            self._evict_finished()
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            job = self._jobs[job_id]
+            try:
+                await self.handler(job, lambda status: self.set_status(job_id, status))
+            except asyncio.CancelledError:
+                self.set_status(job_id, JobStatus.FAILED, "Job cancelled during shutdown")
+                raise
+            except Exception as e:
+                print(f"Job {job_id} failed: {e}")
+                self.set_status(job_id, JobStatus.FAILED, str(e))
+            else:
+                self.set_status(job_id, JobStatus.DONE)
+            finally:
+                self._queue.task_done()
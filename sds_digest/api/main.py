@@ -1,29 +1,215 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, File, UploadFile, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+import time
 import uuid
-from typing import Dict
+from typing import AsyncIterator, NamedTuple
 
+from sds_digest.api.answer_cache import AnswerCache, AnswerCacheStats
+from sds_digest.api.jobs import Job, JobQueue, JobQueueFull, JobStatus, StatusReporter
 from sds_digest.api.models import (
     UploadResponse,
+    JobStatusResponse,
+    JobResultResponse,
     StructuredExtractResponse,
     SummaryResponse,
     QuestionRequest,
+    BatchQuestionRequest,
+    BatchAnswer,
+    BatchQuestionSummary,
     QuestionResponse,
+    QuestionStats,
+    StreamError,
+    StreamToken,
 )
-from sds_digest.api.persistence import PERSISTENCE
-from sds_digest.llms.qa_llm import QALLM
-from sds_digest.src.extraction.marker_extractor import MarkerExtractor
+from sds_digest.api.persistence import PERSISTENCE, UploadTooLarge
+from sds_digest.api.sse import sse_event, sse_response
+from sds_digest.api.result_cache import ResultCache, ResultCacheStats
+from sds_digest.api.single_flight import SingleFlight, SingleFlightStats
+from sds_digest.api.storage import SQLiteSDSStore
+from sds_digest.llms.cache import LLMResponseCache, LLMResponseCacheStats
+from sds_digest.llms.qa_llm import QAAnswer, QALLM, RenderedPromptCache, RenderedPromptCacheStats
+from sds_digest.llms.registry import LLMClientRegistry
+from sds_digest.llms.routing import TierStats
+from sds_digest.llms.scheduler import LLMPriority, LLMScheduler, LLMSchedulerMetrics, ModelBudget
+from sds_digest.src.extraction.pool import ExtractorPoolMetrics, MarkerExtractorPool
+from sds_digest.src.extraction.process_pool import ProcessPoolExtractor
 from sds_digest.src.processing.llm_processor import LLMSafetyDataSheetProcessor
-from sds_digest.src.processing.processor import ProcessedSafetyDataSheet
+from sds_digest.src.processing.processor import Section, StructuredSections
+from sds_digest.src.processing.section_router import QAContext, SectionRouter, SectionRouterStats
+from sds_digest.src.settings import SETTINGS
+from sds_digest.src.telemetry import STAGE_METRICS, TRACER, OpenTelemetrySpanHook, Stage
 
 
+def build_extractor_pool() -> MarkerExtractorPool | ProcessPoolExtractor:
+    if SETTINGS.extraction_backend == "process":
+        return ProcessPoolExtractor(
+            max_workers=SETTINGS.extractor_pool_size,
+            job_timeout=SETTINGS.extraction_job_timeout,
+            acquire_timeout=SETTINGS.extractor_acquire_timeout,
+        )
+    return MarkerExtractorPool(
+        size=SETTINGS.extractor_pool_size,
+        acquire_timeout=SETTINGS.extractor_acquire_timeout,
+    )
+
+
+EXTRACTOR_POOL = build_extractor_pool()
+
+SDS_STORE = SQLiteSDSStore(
+    PERSISTENCE.upload_base_dir.parent / "sds.sqlite3",
+    front_cache_size=SETTINGS.sds_store_cache_size,
+)
+
+RESULT_CACHE = ResultCache(
+    PERSISTENCE.upload_base_dir.parent / "result_cache",
+    max_size_bytes=SETTINGS.result_cache_max_bytes,
+)
+
+LLM_CACHE = LLMResponseCache(
+    PERSISTENCE.upload_base_dir.parent / "llm_cache.sqlite3",
+    ttl_seconds=SETTINGS.llm_cache_ttl_seconds,
+    max_entries=SETTINGS.llm_cache_max_entries,
+)
+
+# Shared by every LLM call in the process: uploads, summaries and /ask
+LLM_SCHEDULER = LLMScheduler(
+    max_concurrency=SETTINGS.llm_max_concurrency,
+    default_budget=ModelBudget(
+        requests_per_minute=SETTINGS.llm_requests_per_minute,
+        tokens_per_minute=SETTINGS.llm_tokens_per_minute,
+    ),
+    model_budgets=SETTINGS.llm_model_budgets,
+    max_retries=SETTINGS.llm_max_retries,
+)
+
+# Long-lived LLM clients with pooled HTTP connections, opened in the lifespan
+LLM_REGISTRY = LLMClientRegistry(
+    scheduler=LLM_SCHEDULER,
+    ollama_base_url=SETTINGS.ollama_base_url,
+    ollama_keep_alive=SETTINGS.ollama_keep_alive,
+    max_connections=SETTINGS.llm_http_max_connections,
+    max_keepalive_connections=SETTINGS.llm_http_max_keepalive_connections,
+    timeout=SETTINGS.llm_http_timeout,
+)
+
+SECTION_ROUTER = SectionRouter(max_sections=SETTINGS.qa_max_sections)
+
+QA_PROMPT_CACHE = RenderedPromptCache(max_entries=SETTINGS.qa_prompt_cache_size)
+
+ANSWER_CACHE = AnswerCache(
+    PERSISTENCE.upload_base_dir.parent / "answer_cache.sqlite3",
+    similarity_threshold=SETTINGS.answer_cache_similarity_threshold,
+    max_entries=SETTINGS.answer_cache_max_entries,
+)
+
+# Concurrent first requests for a lazily processed SDS's summary or structured content share one LLM run
+ARTIFACT_FLIGHTS = SingleFlight()
+
+# Stage spans always feed /metrics; exporting them as traces is opt-in
+if SETTINGS.telemetry_exporter == "opentelemetry":
+    TRACER.add_hook(OpenTelemetrySpanHook())
+
+
+def get_processor() -> LLMSafetyDataSheetProcessor:
+    return LLM_REGISTRY.processor(
+        model=SETTINGS.processor_model,
+        provider=SETTINGS.llm_provider,
+        llm_cache=LLM_CACHE if SETTINGS.llm_cache_enabled else None,
+        section_splitter=SETTINGS.section_splitter,
+        summary_mode=SETTINGS.summary_mode,
+        routing=SETTINGS.llm_routing,
+        section_batch_tokens=SETTINGS.section_batch_tokens,
+    )
+
+
+async def process_upload(job: Job, report_status: StatusReporter) -> None:
+    with TRACER.span(Stage.UPLOAD, sds_id=job.sds_id) as span:
+        # Time the job waited in the queue for a worker
+        span.add_queue_wait(max(0.0, span.start_time - job.created_at.timestamp()))
+        # 1. Extract text with a warm extractor, off the event loop
+        report_status(JobStatus.EXTRACTING)
+        with TRACER.span(Stage.EXTRACTION):
+            extracted_pdf = await EXTRACTOR_POOL.aextract_pdf(job.pdf_path)
+        _ = await PERSISTENCE.asave_extracted_markdown(job.sds_id, extracted_pdf.content)
+        # 2. Split, structure and summarize with the LLM processor; lazily only split,
+        # the rest is materialized when /summary or /structured first asks for it
+        processor = get_processor()
+        process = processor.asplit if SETTINGS.processing_mode == "lazy" else processor.aprocess
+        processed_sds = await process(
+            extracted_pdf,
+            on_stage=lambda stage: report_status(JobStatus(stage.value)),
+        )
+    # 3. Store in database/storage
+    SDS_STORE.put(job.sds_id, processed_sds)
+    SECTION_ROUTER.invalidate(job.sds_id)
+    QA_PROMPT_CACHE.invalidate(job.sds_id)
+    ANSWER_CACHE.invalidate(job.sds_id)
+    if job.cache_key is not None:
+        RESULT_CACHE.put(job.cache_key, job.sds_id, processed_sds)
+
+
+JOB_QUEUE = JobQueue(
+    handler=process_upload,
+    max_depth=SETTINGS.job_queue_max_depth,
+    concurrency=SETTINGS.job_workers,
+    finished_ttl_seconds=SETTINGS.job_finished_ttl_seconds,
+    max_finished=SETTINGS.job_max_finished,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the marker models once per process instead of once per upload
+    if SETTINGS.warm_extractor_pool:
+        await EXTRACTOR_POOL.astart()
+    await LLM_REGISTRY.astart()
+    await JOB_QUEUE.astart()
+    yield
+    await JOB_QUEUE.aclose()
+    await LLM_REGISTRY.aclose()
+    await EXTRACTOR_POOL.aclose()
+
 
 app = FastAPI(
     title="SDS Digest API",
     description="API for processing Safety Data Sheets (SDS)",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
+# Multipart boundaries and part headers sent on top of the file itself
+UPLOAD_MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejects an upload whose Content-Length is over `upload_max_bytes` before Starlette
+    spools its body. Uploads without a Content-Length, e.g. chunked ones, are still
+    limited while they are streamed to disk.
+    """
+
+    def __init__(self, app, path: str = "/api/upload"):
+        self.app = app
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] == self.path:
+            content_length = dict(scope["headers"]).get(b"content-length", b"")
+            if content_length.isdigit() and int(content_length) > SETTINGS.upload_max_bytes + UPLOAD_MULTIPART_OVERHEAD:
+                response = JSONResponse(
+                    status_code=413,
+                    content={"detail": f"Upload exceeds the maximum size of {SETTINGS.upload_max_bytes} bytes"},
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+app.add_middleware(UploadSizeLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -32,8 +218,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-sds_storage: Dict[str, ProcessedSafetyDataSheet] = {}
-
 
 @app.get("/")
 async def root():
@@ -47,36 +231,229 @@ async def health():
     return {"status": "healthy"}
 
 
-@app.post("/api/upload", response_model=UploadResponse)
-async def upload_sds(file: UploadFile = File(...)):
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Per-stage wall time and queue-wait histograms, token and cache-hit counters in the Prometheus text format"""
+    return PlainTextResponse(STAGE_METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/api/metrics/extractor-pool", response_model=ExtractorPoolMetrics)
+async def extractor_pool_metrics():
+    """Pool size, utilisation and wait-time metrics of the warm extractor pool"""
+    return EXTRACTOR_POOL.metrics()
+
+
+@app.get("/api/metrics/result-cache", response_model=ResultCacheStats)
+async def result_cache_metrics():
+    """Size and hit/miss counters of the processed SDS result cache"""
+    return RESULT_CACHE.stats()
+
+
+@app.get("/api/metrics/llm-cache", response_model=LLMResponseCacheStats)
+async def llm_cache_metrics():
+    """Hit rate of the section-level LLM response cache"""
+    return LLM_CACHE.stats()
+
+
+@app.get("/api/metrics/llm-scheduler", response_model=LLMSchedulerMetrics)
+async def llm_scheduler_metrics():
+    """In-flight and waiting LLM calls, rate-limit retries and per-model budget usage"""
+    return LLM_SCHEDULER.metrics()
+
+
+@app.get("/api/metrics/qa", response_model=SectionRouterStats)
+async def qa_metrics():
+    """How often questions were answered from selected sections and the context tokens saved"""
+    return SECTION_ROUTER.stats()
+
+
+@app.get("/api/metrics/qa-prompt-cache", response_model=RenderedPromptCacheStats)
+async def qa_prompt_cache_metrics():
+    """Reuse of pre-rendered QA prompts and the input tokens served from the provider's prompt cache"""
+    return QA_PROMPT_CACHE.stats()
+
+
+@app.get("/api/metrics/answer-cache", response_model=AnswerCacheStats)
+async def answer_cache_metrics():
+    """Exact and near-duplicate hit counts of the /ask answer cache"""
+    return ANSWER_CACHE.stats()
+
+
+@app.get("/api/metrics/artifacts", response_model=SingleFlightStats)
+async def artifact_metrics():
+    """Summaries and structured contents materialized on first access, and requests that shared a running one"""
+    return ARTIFACT_FLIGHTS.stats()
+
+
+@app.get("/api/metrics/model-tiers", response_model=list[TierStats])
+async def model_tier_metrics():
+    """Calls, parse failures, escalations, tokens, latency and estimated cost per model tier of SDS_DIGEST_LLM_ROUTING"""
+    return LLM_REGISTRY.tier_metrics.stats()
+
+
+@app.post("/api/upload", response_model=UploadResponse, status_code=202)
+async def upload_sds(response: Response, file: UploadFile = File(...)):
     """
-    Upload and process a Safety Data Sheet PDF.
+    Upload a Safety Data Sheet PDF and queue it for processing.
     
-    This endpoint accepts a PDF file, extracts text, and processes it.
-    Returns a unique SDS ID for subsequent operations.
+    This endpoint stores the PDF and returns immediately with the SDS ID and a job ID.
+    Poll `/api/jobs/{job_id}` to follow extraction and processing.
+    A PDF that was already processed by the same processor version and model is
+    answered from the result cache without a job. Uploads larger than
+    `upload_max_bytes` are rejected with 413, up front when the request states
+    its Content-Length and otherwise while streaming.
     """
     sds_id = str(uuid.uuid4())
     try:
-        # 1. Save uploaded file
-        pdf_path = PERSISTENCE.save_uploaded_file(sds_id, file)
-        # 2. Extract text using MarkerExtractor or similar
-        extractor = MarkerExtractor()
-        extracted_pdf = extractor.extract_pdf(str(pdf_path))
-        _ = PERSISTENCE.save_extracted_markdown(sds_id, extracted_pdf.content)
-        # 3. Process with StructureSDSLLM to get sections
-        processor = LLMSafetyDataSheetProcessor.from_openai()
-        processed_sds = await processor.aprocess(extracted_pdf)
-        # 4. Store in database/storage
-        sds_storage[sds_id] = processed_sds
-        
-        return UploadResponse(
+        # Streamed to disk and hashed in one pass, never held in memory as a whole
+        upload = await PERSISTENCE.asave_upload(sds_id, file, max_bytes=SETTINGS.upload_max_bytes)
+        cache_key = None
+        if SETTINGS.result_cache_enabled:
+            cache_key = RESULT_CACHE.make_key(
+                upload.content_hash,
+                LLMSafetyDataSheetProcessor.identifier(
+                    model=SETTINGS.processor_model,
+                    section_splitter=SETTINGS.section_splitter,
+                    summary_mode=SETTINGS.summary_mode,
+                    routing=SETTINGS.llm_routing,
+                    section_batch_tokens=SETTINGS.section_batch_tokens,
+                ),
+                SETTINGS.processing_mode,
+                SETTINGS.llm_provider,
+            )
+            cached = RESULT_CACHE.get(cache_key)
+            if cached is not None:
+                PERSISTENCE.discard(sds_id)
+                if cached.sds_id not in SDS_STORE:
+                    SDS_STORE.put(cached.sds_id, cached.processed_sds)
+                response.status_code = 200
+                return UploadResponse(
+                    sds_id=cached.sds_id,
+                    message=f"SDS already processed, served from cache: {upload.path.name}",
+                    status=JobStatus.DONE.value,
+                    cached=True,
+                )
+        job = JOB_QUEUE.submit(
             sds_id=sds_id,
-            message=f"SDS uploaded and processed successfully: {file.filename}",
-            status="success"
+            filename=upload.path.name,
+            pdf_path=str(upload.path),
+            cache_key=cache_key,
         )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except JobQueueFull as e:
+        PERSISTENCE.discard(sds_id)
+        raise HTTPException(status_code=503, detail=f"Too many SDS uploads in progress: {str(e)}")
     except Exception as e:
+        PERSISTENCE.discard(sds_id)
         raise HTTPException(status_code=500, detail=f"Error processing SDS: {str(e)}")
 
+    return UploadResponse(
+        sds_id=sds_id,
+        message=f"SDS uploaded and queued for processing: {upload.path.name}",
+        status=job.status.value,
+        job_id=job.job_id,
+    )
+
+
+def get_job_or_404(job_id: str) -> Job:
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job with ID {job_id} not found")
+    return job
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(job_id: str):
+    """
+    Get the current state of an upload processing job.
+    
+    States: queued, extracting, splitting, structuring, summarizing, done, failed.
+    """
+    job = get_job_or_404(job_id)
+    return JobStatusResponse(
+        job_id=job.job_id,
+        sds_id=job.sds_id,
+        status=job.status.value,
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+    )
+
+
+@app.get("/api/jobs/{job_id}/result", response_model=JobResultResponse)
+async def get_job_result(job_id: str):
+    """
+    Get the processed SDS produced by a finished job.
+    
+    Returns 409 while the job is still running and 500 if it failed.
+    """
+    job = get_job_or_404(job_id)
+    if job.status == JobStatus.FAILED:
+        raise HTTPException(status_code=500, detail=f"Error processing SDS: {job.error}")
+    if job.status != JobStatus.DONE:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is not finished yet: {job.status.value}")
+
+    if job.sds_id not in SDS_STORE:
+        raise HTTPException(status_code=404, detail=f"SDS with ID {job.sds_id} not found")
+    structured_sections = await materialize_structured_content_or_500(job.sds_id)
+    summary = await materialize_summary_or_500(job.sds_id)
+    return JobResultResponse(
+        job_id=job.job_id,
+        sds_id=job.sds_id,
+        summary=summary,
+        structured_content=structured_sections.model_dump(),
+    )
+
+
+async def materialize_structured_content(sds_id: str) -> StructuredSections:
+    """The structured content of an SDS, structuring its sections first if it was processed lazily."""
+    if (structured_sections := SDS_STORE.get_structured_content(sds_id)) is not None:
+        return structured_sections
+
+    async def structure() -> StructuredSections:
+        # Another flight may have stored it between the check above and this one starting
+        if (stored := SDS_STORE.get_structured_content(sds_id)) is not None:
+            return stored
+        structured = await get_processor().astructure_sections(SDS_STORE.get_sections(sds_id) or [])
+        SDS_STORE.set_structured_content(sds_id, structured)
+        return structured
+
+    return await ARTIFACT_FLIGHTS.run(("structured_content", sds_id), structure)
+
+
+async def materialize_summary(sds_id: str) -> str:
+    """The summary of an SDS, generating it first if it was processed lazily."""
+    if (summary := SDS_STORE.get_summary(sds_id)) is not None:
+        return summary
+
+    async def summarize() -> str:
+        if (stored := SDS_STORE.get_summary(sds_id)) is not None:
+            return stored
+        processor = get_processor()
+        structured_sections = None
+        if processor.summary_mode != "full_document":
+            structured_sections = await materialize_structured_content(sds_id)
+        generated = await processor.asummarize(SDS_STORE.get_markdown(sds_id), structured_sections)
+        SDS_STORE.set_summary(sds_id, generated)
+        return generated
+
+    return await ARTIFACT_FLIGHTS.run(("summary", sds_id), summarize)
+
+
+async def materialize_structured_content_or_500(sds_id: str) -> StructuredSections:
+    try:
+        return await materialize_structured_content(sds_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error structuring SDS: {str(e)}")
+
+
+async def materialize_summary_or_500(sds_id: str) -> str:
+    try:
+        return await materialize_summary(sds_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating summary: {str(e)}")
+
 
 @app.get("/api/sds/{sds_id}/structured", response_model=StructuredExtractResponse)
 async def get_structured_extract(sds_id: str):
@@ -84,12 +461,13 @@ async def get_structured_extract(sds_id: str):
     Get the structured JSON extract of a processed SDS.
     
     Returns the structured representation with sections and extracted fields.
+    Sections of a lazily processed SDS are structured on the first request.
     """
-    if sds_id not in sds_storage:
+    if sds_id not in SDS_STORE:
         raise HTTPException(status_code=404, detail=f"SDS with ID {sds_id} not found")
+    structured_sections = await materialize_structured_content_or_500(sds_id)
 
-    processed_sds = sds_storage[sds_id]
-    structured_content = processed_sds.structured_content.model_dump()
+    structured_content = structured_sections.model_dump()
     
     
     return StructuredExtractResponse(
@@ -104,13 +482,12 @@ async def get_summary(sds_id: str):
     """
     Get a concise summary of the chemical described in the SDS.
     
-    Returns a short summary generated using LLM.
+    Returns a short summary generated using LLM. The summary of a lazily processed
+    SDS is generated on the first request.
     """
-    if sds_id not in sds_storage:
+    if sds_id not in SDS_STORE:
         raise HTTPException(status_code=404, detail=f"SDS with ID {sds_id} not found")
-
-    processed_sds = sds_storage[sds_id]
-    summary = processed_sds.summary
+    summary = await materialize_summary_or_500(sds_id)
     
     return SummaryResponse(
         sds_id=sds_id,
@@ -118,22 +495,316 @@ async def get_summary(sds_id: str):
     )
 
 
+@app.get("/api/sds/{sds_id}/summary/stream")
+async def stream_summary(sds_id: str, regenerate: bool = False):
+    """
+    Stream the summary of the SDS as Server-Sent Events.
+    
+    Emits `token` events with pieces of the summary, then a `done` event with the
+    SummaryResponse, or an `error` event. A stored summary is sent as a single token;
+    with `regenerate=true` a new summary is generated on demand in the configured
+    summary mode and routing, streamed as the model writes it, and stored. The
+    summary of a lazily processed SDS is generated on the first request and sent once ready.
+    """
+    if not regenerate and sds_id in SDS_STORE:
+        async def stored_events():
+            try:
+                summary = await materialize_summary(sds_id)
+            except Exception as e:
+                yield sse_event("error", StreamError(detail=f"Error generating summary: {str(e)}"))
+                return
+            yield sse_event("token", StreamToken(token=summary))
+            yield sse_event("done", SummaryResponse(sds_id=sds_id, summary=summary))
+        return sse_response(stored_events())
+
+    markdown_content = SDS_STORE.get_markdown(sds_id)
+    if markdown_content is None:
+        raise HTTPException(status_code=404, detail=f"SDS with ID {sds_id} not found")
+    processor = get_processor()
+
+    async def generated_events():
+        tokens = []
+        try:
+            structured_sections = None
+            if processor.summary_mode != "full_document":
+                structured_sections = await materialize_structured_content(sds_id)
+            async for token in processor.astream_summary(
+                markdown_content, structured_sections, priority=LLMPriority.INTERACTIVE
+            ):
+                tokens.append(token)
+                yield sse_event("token", StreamToken(token=token))
+        except Exception as e:
+            yield sse_event("error", StreamError(detail=f"Error generating summary: {str(e)}"))
+            return
+        summary = "".join(tokens)
+        SDS_STORE.set_summary(sds_id, summary)
+        yield sse_event("done", SummaryResponse(sds_id=sds_id, summary=summary))
+
+    return sse_response(generated_events())
+
+
+def get_cached_answer(sds_id: str, question: str) -> QuestionResponse | None:
+    if not SETTINGS.answer_cache_enabled or sds_id not in SDS_STORE:
+        return None
+    cached = ANSWER_CACHE.get(sds_id, question, SETTINGS.qa_model)
+    if cached is None:
+        return None
+    return QuestionResponse(
+        sds_id=sds_id,
+        question=question,
+        answer=cached.answer,
+        cached=True,
+        matched_question=cached.question,
+    )
+
+
+def route_question_or_404(sds_id: str, question: str) -> QAContext:
+    markdown_content = SDS_STORE.get_markdown(sds_id)
+    if markdown_content is None:
+        raise HTTPException(status_code=404, detail=f"SDS with ID {sds_id} not found")
+
+    sections = SDS_STORE.get_sections(sds_id) if SETTINGS.qa_context == "sections" else []
+    return SECTION_ROUTER.route(sds_id, question, sections or [], markdown_content)
+
+
+def get_qa_llm() -> QALLM:
+    return LLM_REGISTRY.qa_llm(
+        model=SETTINGS.qa_model,
+        provider=SETTINGS.llm_provider,
+        prompt_cache=QA_PROMPT_CACHE,
+    )
+
+
+def question_stats(
+    context: QAContext,
+    started_at: float,
+    routed_at: float,
+    qa_answer: QAAnswer | None = None,
+    first_token_at: float | None = None,
+) -> QuestionStats:
+    return QuestionStats(
+        context_mode=context.mode,
+        sections=context.section_titles,
+        context_tokens=context.context_tokens,
+        document_tokens=context.document_tokens,
+        tokens_saved=context.tokens_saved,
+        prompt_tokens=qa_answer.prompt_tokens if qa_answer is not None else None,
+        cached_tokens=qa_answer.cached_tokens if qa_answer is not None else None,
+        routing_ms=(routed_at - started_at) * 1000,
+        first_token_ms=(first_token_at - started_at) * 1000 if first_token_at is not None else None,
+        latency_ms=(time.perf_counter() - started_at) * 1000,
+    )
+
+
 @app.post("/api/sds/{sds_id}/ask", response_model=QuestionResponse)
 async def ask_question(sds_id: str, request: QuestionRequest):
     """
     Ask a question about the chemical details in the SDS.
     
-    Uses LLM to answer questions based on the SDS content.
+    Uses LLM to answer questions based on the SDS content. Unless configured
+    otherwise, only the sections relevant to the question are sent to the model,
+    falling back to the full document when no section matches clearly.
     """
-    if sds_id not in sds_storage:
-        raise HTTPException(status_code=404, detail=f"SDS with ID {sds_id} not found")
+    started_at = time.perf_counter()
+    with TRACER.span(Stage.QA, sds_id=sds_id) as span:
+        cached = get_cached_answer(sds_id, request.question)
+        span.cache_hit = cached is not None
+        if cached is not None:
+            return cached
+
+        context = route_question_or_404(sds_id, request.question)
+        span.set_attribute("context_mode", context.mode)
+        routed_at = time.perf_counter()
 
-    qa_llm = QALLM.from_openai()
-    processed_sds = sds_storage[sds_id]
-    answer = await qa_llm.aanswer(request.question, processed_sds.markdown_content)
+        qa_answer = await get_qa_llm().aanswer_with_usage(request.question, context.text, sds_id, context.cache_key)
+    if SETTINGS.answer_cache_enabled:
+        ANSWER_CACHE.put(sds_id, request.question, SETTINGS.qa_model, qa_answer.answer)
     
     return QuestionResponse(
         sds_id=sds_id,
         question=request.question,
-        answer=answer,
+        answer=qa_answer.answer,
+        stats=question_stats(context, started_at, routed_at, qa_answer=qa_answer),
     )
+
+
+@app.post("/api/sds/{sds_id}/ask/stream")
+async def ask_question_stream(sds_id: str, request: QuestionRequest):
+    """
+    Ask a question about the SDS and stream the answer as Server-Sent Events.
+    
+    Emits `token` events as the model generates the answer, then a `done` event
+    with the full QuestionResponse, or an `error` event. Context selection and the
+    answer cache work as for `/ask`; a cached answer is sent as a single token.
+    """
+    started_at = time.perf_counter()
+    cached = get_cached_answer(sds_id, request.question)
+    if cached is not None:
+        async def cached_events():
+            yield sse_event("token", StreamToken(token=cached.answer))
+            yield sse_event("done", cached)
+        return sse_response(cached_events())
+
+    context = route_question_or_404(sds_id, request.question)
+    routed_at = time.perf_counter()
+    qa_llm = get_qa_llm()
+
+    async def answer_events():
+        tokens = []
+        first_token_at = None
+        try:
+            async for token in qa_llm.astream_answer(request.question, context.text, sds_id, context.cache_key):
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                tokens.append(token)
+                yield sse_event("token", StreamToken(token=token))
+        except Exception as e:
+            yield sse_event("error", StreamError(detail=f"Error answering question: {str(e)}"))
+            return
+        answer = "".join(tokens)
+        if SETTINGS.answer_cache_enabled:
+            ANSWER_CACHE.put(sds_id, request.question, SETTINGS.qa_model, answer)
+        yield sse_event("done", QuestionResponse(
+            sds_id=sds_id,
+            question=request.question,
+            answer=answer,
+            stats=question_stats(context, started_at, routed_at, first_token_at=first_token_at),
+        ))
+
+    return sse_response(answer_events())
+
+
+class BatchResult(NamedTuple):
+    index: int
+    answer: str | None
+    error: str | None
+
+
+async def iter_concurrent_answers(
+    sds_id: str,
+    questions: dict[int, str],
+    markdown_content: str,
+    sections: list[Section],
+    qa_llm: QALLM,
+) -> AsyncIterator[BatchResult]:
+    """Answer each question in its own LLM call, `qa_batch_concurrency` at a time, in completion order."""
+    semaphore = asyncio.Semaphore(SETTINGS.qa_batch_concurrency)
+
+    async def answer(index: int, question: str) -> BatchResult:
+        async with semaphore:
+            context = SECTION_ROUTER.route(sds_id, question, sections, markdown_content)
+            try:
+                with TRACER.span(Stage.QA, sds_id=sds_id, context_mode=context.mode):
+                    qa_answer = await qa_llm.aanswer_with_usage(question, context.text, sds_id, context.cache_key)
+            except Exception as e:
+                return BatchResult(index, None, f"Error answering question: {str(e)}")
+        return BatchResult(index, qa_answer.answer, None)
+
+    tasks = [asyncio.create_task(answer(index, question)) for index, question in questions.items()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # The client went away: do not keep spending tokens on the rest
+        for task in tasks:
+            task.cancel()
+
+
+async def iter_packed_answers(
+    sds_id: str,
+    questions: dict[int, str],
+    markdown_content: str,
+    qa_llm: QALLM,
+) -> AsyncIterator[BatchResult]:
+    """
+    Answer all questions in a single structured-output call, yielding answers as they complete.
+
+    The whole document is used as context: a batch covers most sections anyway, and the
+    system prompt is then the same cached prefix single full-document questions use.
+    """
+    indexes = list(questions)
+    answered: set[int] = set()
+    try:
+        async for position, answer in qa_llm.astream_batch_answers(
+            [questions[index] for index in indexes], markdown_content, sds_id
+        ):
+            answered.add(position)
+            yield BatchResult(indexes[position], answer, None)
+        error = "The model returned no answer for this question"
+    except Exception as e:
+        error = f"Error answering questions: {str(e)}"
+    for position, index in enumerate(indexes):
+        if position not in answered:
+            yield BatchResult(index, None, error)
+
+
+@app.post("/api/sds/{sds_id}/ask/batch")
+async def ask_questions_batch(sds_id: str, request: BatchQuestionRequest):
+    """
+    Ask many questions about the SDS in one request, streamed as Server-Sent Events.
+    
+    Cached answers are sent first; the remaining questions are answered concurrently
+    or packed into a single LLM call depending on `mode`. Each answer is sent as an
+    `answer` event (with the question's index) as soon as it is ready, in completion
+    order, followed by a `done` event summarizing the batch.
+    """
+    started_at = time.perf_counter()
+    if len(request.questions) > SETTINGS.qa_batch_max_questions:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Too many questions: {len(request.questions)} > {SETTINGS.qa_batch_max_questions}",
+        )
+    markdown_content = SDS_STORE.get_markdown(sds_id)
+    if markdown_content is None:
+        raise HTTPException(status_code=404, detail=f"SDS with ID {sds_id} not found")
+    sections = (SDS_STORE.get_sections(sds_id) or []) if SETTINGS.qa_context == "sections" else []
+    qa_llm = get_qa_llm()
+
+    def batch_answer(index: int, **fields) -> BatchAnswer:
+        return BatchAnswer(
+            index=index,
+            question=request.questions[index],
+            latency_ms=(time.perf_counter() - started_at) * 1000,
+            **fields,
+        )
+
+    async def batch_events():
+        cached_count = failed = 0
+        pending: dict[int, str] = {}
+        for index, question in enumerate(request.questions):
+            cached = get_cached_answer(sds_id, question)
+            if cached is None:
+                pending[index] = question
+                continue
+            cached_count += 1
+            yield sse_event("answer", batch_answer(
+                index, answer=cached.answer, cached=True, matched_question=cached.matched_question
+            ))
+
+        llm_calls = 0
+        if pending:
+            if request.mode == "packed":
+                llm_calls = 1
+                results = iter_packed_answers(sds_id, pending, markdown_content, qa_llm)
+            else:
+                llm_calls = len(pending)
+                results = iter_concurrent_answers(sds_id, pending, markdown_content, sections, qa_llm)
+            async for result in results:
+                if result.answer is None:
+                    failed += 1
+                elif SETTINGS.answer_cache_enabled:
+                    ANSWER_CACHE.put(sds_id, request.questions[result.index], SETTINGS.qa_model, result.answer)
+                yield sse_event("answer", batch_answer(result.index, answer=result.answer, error=result.error))
+
+        yield sse_event("done", BatchQuestionSummary(
+            sds_id=sds_id,
+            mode=request.mode,
+            questions=len(request.questions),
+            answered=len(request.questions) - failed,
+            cached=cached_count,
+            failed=failed,
+            llm_calls=llm_calls,
+            latency_ms=(time.perf_counter() - started_at) * 1000,
+        ))
+
+    return sse_response(batch_events())
@@ -1,11 +1,30 @@
+from datetime import datetime
 from pydantic import BaseModel, Field
-from typing import Any, Optional
+from typing import Any, Literal, Optional
 
 
 class UploadResponse(BaseModel):
     sds_id: str = Field(..., description="Unique identifier for the uploaded SDS")
     message: str = Field(..., description="Status message")
     status: str = Field(..., description="Upload status")
+    job_id: Optional[str] = Field(None, description="Identifier of the processing job to poll")
+    cached: bool = Field(False, description="True if the result was served from the result cache")
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str = Field(..., description="Processing job identifier")
+    sds_id: str = Field(..., description="SDS identifier the job produces")
+    status: str = Field(..., description="Current job state")
+    error: Optional[str] = Field(None, description="Error message if the job failed")
+    created_at: datetime = Field(..., description="When the job was queued")
+    updated_at: datetime = Field(..., description="When the job state last changed")
+
+
+class JobResultResponse(BaseModel):
+    job_id: str = Field(..., description="Processing job identifier")
+    sds_id: str = Field(..., description="SDS identifier")
+    summary: str = Field(..., description="Concise summary of the chemical")
+    structured_content: dict[str, Any] = Field(..., description="Structured JSON extract of the SDS")
 
 
 class StructuredExtractResponse(BaseModel):
@@ -23,7 +42,60 @@ class QuestionRequest(BaseModel):
     question: str = Field(..., description="Question about the SDS")
 
 
+class QuestionStats(BaseModel):
+    context_mode: str = Field(..., description="'sections' if only relevant sections were sent, else 'full_document'")
+    sections: list[str] = Field(default_factory=list, description="Titles of the sections used as context")
+    context_tokens: int = Field(..., description="Estimated tokens of the context sent to the model")
+    document_tokens: int = Field(..., description="Estimated tokens of the full SDS markdown")
+    tokens_saved: int = Field(..., description="document_tokens - context_tokens")
+    prompt_tokens: Optional[int] = Field(None, description="Input tokens reported by the provider")
+    cached_tokens: Optional[int] = Field(None, description="Input tokens served from the provider's prompt cache")
+    routing_ms: float = Field(..., description="Time spent selecting the context")
+    first_token_ms: Optional[float] = Field(None, description="Time until the first answer token was streamed")
+    latency_ms: float = Field(..., description="Total time to answer the question")
+
+
 class QuestionResponse(BaseModel):
     sds_id: str = Field(..., description="SDS identifier")
     question: str = Field(..., description="The asked question")
     answer: str = Field(..., description="Answer to the question")
+    stats: Optional[QuestionStats] = Field(None, description="Context size and latency of the answer")
+    cached: bool = Field(False, description="True if the answer was served from the answer cache")
+    matched_question: Optional[str] = Field(None, description="Cached question whose answer was reused")
+
+
+class BatchQuestionRequest(BaseModel):
+    questions: list[str] = Field(..., min_length=1, description="Questions about the SDS")
+    mode: Literal["concurrent", "packed"] = Field(
+        "concurrent",
+        description="'concurrent' answers each question in its own LLM call, a bounded number at a time; "
+                    "'packed' answers all of them in a single structured-output call",
+    )
+
+
+class BatchAnswer(BaseModel):
+    index: int = Field(..., description="Position of the question in the request")
+    question: str = Field(..., description="The asked question")
+    answer: Optional[str] = Field(None, description="Answer to the question, None if it failed")
+    error: Optional[str] = Field(None, description="Why the question could not be answered")
+    cached: bool = Field(False, description="True if the answer was served from the answer cache")
+    matched_question: Optional[str] = Field(None, description="Cached question whose answer was reused")
+    latency_ms: float = Field(..., description="Time from the start of the batch until this answer")
+
+
+class BatchQuestionSummary(BaseModel):
+    sds_id: str = Field(..., description="SDS identifier")
+    mode: str = Field(..., description="How uncached questions were sent to the model")
+    questions: int = Field(..., description="Number of questions in the batch")
+    answered: int = Field(..., description="Questions answered, including cached ones")
+    cached: int = Field(..., description="Questions answered from the answer cache")
+    failed: int = Field(..., description="Questions that could not be answered")
+    llm_calls: int = Field(..., description="LLM requests made for the batch")
+    latency_ms: float = Field(..., description="Total time to answer the batch")
+
+class StreamToken(BaseModel):
+    token: str = Field(..., description="Next piece of the generated text")
+
+
+class StreamError(BaseModel):
+    detail: str = Field(..., description="Why the stream ended before completing")
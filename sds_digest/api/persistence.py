@@ -1,9 +1,45 @@
+import hashlib
 import os
+import re
+import shutil
+import unicodedata
 from pathlib import Path
+from typing import NamedTuple
 
+import anyio
 from fastapi import UploadFile
 
 
+# Uploads are read and written in chunks, so memory stays flat however large or many they are
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Characters of extracted markdown written per chunk
+MARKDOWN_CHUNK_SIZE = 256 * 1024
+MAX_FILENAME_LENGTH = 120
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the maximum size; nothing of it is kept on disk."""
+
+
+class SavedUpload(NamedTuple):
+    path: Path
+    content_hash: str
+    size: int
+
+
+def sanitize_filename(filename: str | None, default: str = "upload.pdf") -> str:
+    """A safe file name from a client-supplied one: no directories, control characters or odd symbols."""
+    name = re.split(r"[\\/]", filename or "")[-1]
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    name = re.sub(r"[^A-Za-z0-9._-]+", "_", name).strip("._")
+    if not name:
+        return default
+    stem, dot, suffix = name.rpartition(".")
+    if dot and len(name) > MAX_FILENAME_LENGTH:
+        return stem[: MAX_FILENAME_LENGTH - len(suffix) - 1] + "." + suffix
+    return name[:MAX_FILENAME_LENGTH]
+
+
 class Persistence:
     UPLOAD_BASE_DIR = Path("data/uploads")
     UPLOAD_BASE_DIR.mkdir(parents=True, exist_ok=True)
@@ -11,18 +47,49 @@ class Persistence:
     def __init__(self):
         self.upload_base_dir = self.UPLOAD_BASE_DIR
 
-    def save_uploaded_file(self, sds_id: str, file: UploadFile):
-        file_path = self.upload_base_dir / sds_id / file.filename
+    async def asave_upload(self, sds_id: str, file: UploadFile, max_bytes: int | None = None) -> SavedUpload:
+        """
+        Stream an upload to disk chunk by chunk, hashing it in the same pass.
+
+        The file is written under a temporary name and renamed once complete, so a
+        partial or oversized upload never shows up; `UploadTooLarge` is raised as
+        soon as more than `max_bytes` were received.
+        """
+        file_path = self.upload_base_dir / sds_id / sanitize_filename(file.filename)
+        partial_path = file_path.with_name(file_path.name + ".part")
+        await anyio.Path(file_path.parent).mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async with await anyio.open_file(partial_path, "wb") as f:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise UploadTooLarge(f"Upload exceeds the maximum size of {max_bytes} bytes")
+                    digest.update(chunk)
+                    await f.write(chunk)
+            await anyio.Path(partial_path).replace(file_path)
+        except BaseException:
+            self.discard(sds_id)
+            raise
+        return SavedUpload(path=file_path, content_hash=digest.hexdigest(), size=size)
+
+    def discard(self, sds_id: str) -> None:
+        """Remove everything stored for an SDS, e.g. an upload answered from the result cache."""
+        shutil.rmtree(self.upload_base_dir / sds_id, ignore_errors=True)
+
+    def save_pdf(self, sds_id: str, pdf_path: Path):
+        file_path = self.upload_base_dir / sds_id / sanitize_filename(pdf_path.name)
         os.makedirs(file_path.parent, exist_ok=True)
-        with open(file_path, "wb") as f:
-            f.write(file.file.read())
+        shutil.copyfile(pdf_path, file_path)
         return file_path
 
-    def save_extracted_markdown(self, sds_id: str, markdown: str):
+    async def asave_extracted_markdown(self, sds_id: str, markdown: str) -> Path:
         markdown_path = self.upload_base_dir / sds_id / "extracted.md"
-        os.makedirs(markdown_path.parent, exist_ok=True)
-        with open(markdown_path, "w") as f:
-            f.write(markdown)
+        await anyio.Path(markdown_path.parent).mkdir(parents=True, exist_ok=True)
+        async with await anyio.open_file(markdown_path, "w", encoding="utf-8") as f:
+            for start in range(0, len(markdown), MARKDOWN_CHUNK_SIZE):
+                await f.write(markdown[start:start + MARKDOWN_CHUNK_SIZE])
         return markdown_path
 
 
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from pydantic import BaseModel, Field
+
+from sds_digest.src.processing.processor import ProcessedSafetyDataSheet, ProcessorIdentifier
+
+
+class CachedResult(BaseModel):
+    sds_id: str = Field(..., description="SDS identifier the result was first stored under")
+    processed_sds: ProcessedSafetyDataSheet = Field(..., description="The cached processing result")
+
+
+class ResultCacheStats(BaseModel):
+    entries: int = Field(..., description="Number of cached results")
+    size_bytes: int = Field(..., description="Total size of cached results")
+    max_size_bytes: int = Field(..., description="Size limit before least recently used results are evicted")
+    hits: int = Field(..., description="Lookups served from the cache")
+    misses: int = Field(..., description="Lookups not found in the cache")
+    evictions: int = Field(..., description="Results evicted to stay under the size limit")
+
+
+class ResultCache:
+    """
+    Content-addressed, on-disk cache of processed SDS results.
+
+    Results are keyed on the SHA-256 of the PDF bytes together with the processor
+    name, version and model, the processing mode and the LLM provider, so a changed
+    pipeline never serves stale results.
+    Entries live in a SQLite file and are evicted least-recently-used first once
+    their total size exceeds `max_size_bytes`.
+    """
+
+    def __init__(self, cache_dir: Path, max_size_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.db_path = self.cache_dir / "results.sqlite3"
+        self.max_size_bytes = max_size_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @staticmethod
+    def make_key(
+        content_hash: str,
+        processor_identifier: ProcessorIdentifier,
+        processing_mode: str,
+        provider: str,
+    ) -> str:
+        """
+        Key of a processing result; uploads and bulk ingestion both use it so they share results.
+
+        A lazy result holds only the sections, so the processing mode is part of the key,
+        and so is the provider, as the same model name may be served by different backends.
+        """
+        key_source = ":".join([
+            content_hash,
+            processor_identifier.processor_name,
+            processor_identifier.processor_version,
+            processor_identifier.model_name,
+            processing_mode,
+            provider,
+        ])
+        return hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            if not self._initialized:
+                self._create_schema(connection)
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _create_schema(self, connection: sqlite3.Connection) -> None:
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                sds_id TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._initialized = True
+
+    def get(self, key: str) -> CachedResult | None:
+        with self._lock:
+            with self._connect() as connection:
+                row = connection.execute("SELECT sds_id, payload FROM results WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                connection.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+        sds_id, payload = row
+        return CachedResult(
+            sds_id=sds_id,
+            processed_sds=ProcessedSafetyDataSheet.model_validate_json(payload),
+        )
+
+    def put(self, key: str, sds_id: str, processed_sds: ProcessedSafetyDataSheet) -> None:
+        payload = processed_sds.model_dump_json().encode("utf-8")
+        with self._lock:
+            with self._connect() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO results (key, sds_id, payload, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, sds_id, payload, len(payload), time.time()),
+                )
+                self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        (total_size,) = connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()
+        if total_size <= self.max_size_bytes:
+            return
+        for key, size in connection.execute("SELECT key, size FROM results ORDER BY last_access ASC").fetchall():
+            if total_size <= self.max_size_bytes:
+                break
+            connection.execute("DELETE FROM results WHERE key = ?", (key,))
+            total_size -= size
+            self.evictions += 1
+
+    def stats(self) -> ResultCacheStats:
+        with self._lock:
+            with self._connect() as connection:
+                entries, size = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return ResultCacheStats(
+            entries=entries,
+            size_bytes=size,
+            max_size_bytes=self.max_size_bytes,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+        )
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+from pydantic import BaseModel, Field
+
+
+T = TypeVar("T")
+
+
+class SingleFlightStats(BaseModel):
+    in_flight: int = Field(..., description="Computations currently running")
+    executions: int = Field(..., description="Computations started")
+    shared: int = Field(..., description="Calls that joined a computation already running for the same key")
+    failures: int = Field(..., description="Computations that raised")
+
+
+class SingleFlight:
+    """
+    Runs at most one computation per key at a time within the event loop.
+
+    Concurrent callers for the same key await the same task and get its result or
+    its exception. The key is released once the task finishes, so a failure is retried
+    by the next caller. A caller that is cancelled, e.g. because its client disconnected,
+    does not cancel the computation the other callers are waiting for.
+    """
+
+    def __init__(self):
+        self._tasks: dict[Hashable, asyncio.Task] = {}
+        self._executions = 0
+        self._shared = 0
+        self._failures = 0
+
+    def _release(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled() and task.exception() is not None:
+            self._failures += 1
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[T]]) -> T:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.create_task(compute())
+            task.add_done_callback(lambda finished: self._release(key, finished))
+            self._tasks[key] = task
+            self._executions += 1
+        else:
+            self._shared += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> SingleFlightStats:
+        return SingleFlightStats(
+            in_flight=len(self._tasks),
+            executions=self._executions,
+            shared=self._shared,
+            failures=self._failures,
+        )
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import json
+from typing import Any, AsyncIterator
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+
+# Keep proxies (nginx) from buffering the stream and clients from caching it
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def sse_event(event: str, data: BaseModel | dict[str, Any]) -> str:
+    """Format one Server-Sent Event with a JSON payload."""
+    payload = data.model_dump_json() if isinstance(data, BaseModel) else json.dumps(data)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
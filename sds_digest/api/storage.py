@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from sds_digest.src.processing.processor import ProcessedSafetyDataSheet, Section, StructuredSections
+
+
+@contextmanager
+def _immediate_transaction(connection: sqlite3.Connection) -> Iterator[None]:
+    """Take the write lock up front, so concurrent check-then-write sequences serialize."""
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
+
+
+class SDSStore(ABC):
+    """Storage backend for processed Safety Data Sheets, addressed by SDS ID."""
+
+    @abstractmethod
+    def put(self, sds_id: str, processed_sds: ProcessedSafetyDataSheet) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, sds_id: str) -> ProcessedSafetyDataSheet | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_markdown(self, sds_id: str) -> str | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_structured_content(self, sds_id: str) -> StructuredSections | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_summary(self, sds_id: str) -> str | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_sections(self, sds_id: str) -> list[Section] | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_summary(self, sds_id: str, summary: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_structured_content(self, sds_id: str, structured_content: StructuredSections) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def exists(self, sds_id: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, sds_id: str) -> bool:
+        raise NotImplementedError
+
+    def __contains__(self, sds_id: str) -> bool:
+        return self.exists(sds_id)
+
+
+class SQLiteSDSStore(SDSStore):
+    """
+    SDS store backed by a SQLite database in WAL mode.
+
+    Markdown, structured sections, summary and raw sections are kept in separate
+    columns, so `get_summary` and friends read only what they return. Recently used documents
+    are kept in a bounded in-process LRU; it is dropped whenever another connection
+    (another thread or uvicorn worker) commits, which keeps every process consistent.
+    """
+
+    def __init__(self, db_path: Path, front_cache_size: int = 128):
+        self.db_path = Path(db_path)
+        self.front_cache_size = front_cache_size
+        self._front_cache: OrderedDict[str, ProcessedSafetyDataSheet] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            # Other threads or processes (e.g. bulk ingestion) may open a fresh database at the same time
+            with _immediate_transaction(connection):
+                connection.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS sds (
+                        sds_id TEXT PRIMARY KEY,
+                        markdown_content TEXT NOT NULL,
+                        structured_content TEXT,
+                        summary TEXT,
+                        updated_at REAL NOT NULL
+                    )
+                    """
+                )
+                columns = {row[1] for row in connection.execute("PRAGMA table_info(sds)")}
+                if "sections" not in columns:
+                    # Databases created before raw sections were kept
+                    connection.execute("ALTER TABLE sds ADD COLUMN sections TEXT")
+            self._local.connection = connection
+            self._local.data_version = self._data_version(connection)
+        return connection
+
+    @staticmethod
+    def _data_version(connection: sqlite3.Connection) -> int:
+        return connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def _sync_front_cache(self, connection: sqlite3.Connection) -> None:
+        # data_version changes only when a *different* connection committed
+        data_version = self._data_version(connection)
+        if data_version != self._local.data_version:
+            self._local.data_version = data_version
+            with self._cache_lock:
+                self._front_cache.clear()
+
+    def _cache_get(self, sds_id: str) -> ProcessedSafetyDataSheet | None:
+        with self._cache_lock:
+            processed_sds = self._front_cache.get(sds_id)
+            if processed_sds is not None:
+                self._front_cache.move_to_end(sds_id)
+            return processed_sds
+
+    def _cache_put(self, sds_id: str, processed_sds: ProcessedSafetyDataSheet) -> None:
+        if self.front_cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._front_cache[sds_id] = processed_sds
+            self._front_cache.move_to_end(sds_id)
+            while len(self._front_cache) > self.front_cache_size:
+                self._front_cache.popitem(last=False)
+
+    def _cached(self, sds_id: str) -> ProcessedSafetyDataSheet | None:
+        self._sync_front_cache(self._connection())
+        return self._cache_get(sds_id)
+
+    def put(self, sds_id: str, processed_sds: ProcessedSafetyDataSheet) -> None:
+        connection = self._connection()
+        connection.execute(
+            """
+            INSERT OR REPLACE INTO sds (sds_id, markdown_content, structured_content, summary, sections, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (
+                sds_id,
+                processed_sds.markdown_content,
+                self._dump_structured_content(processed_sds.structured_content),
+                processed_sds.summary,
+                self._dump_sections(processed_sds.sections),
+                time.time(),
+            ),
+        )
+        self._cache_put(sds_id, processed_sds)
+
+    def get(self, sds_id: str) -> ProcessedSafetyDataSheet | None:
+        if (processed_sds := self._cached(sds_id)) is not None:
+            return processed_sds
+        row = self._connection().execute(
+            "SELECT markdown_content, structured_content, summary, sections FROM sds WHERE sds_id = ?",
+            (sds_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        markdown_content, structured_content, summary, sections = row
+        processed_sds = ProcessedSafetyDataSheet(
+            markdown_content=markdown_content,
+            structured_content=self._load_structured_content(structured_content),
+            summary=summary,
+            sections=self._load_sections(sections),
+        )
+        self._cache_put(sds_id, processed_sds)
+        return processed_sds
+
+    @staticmethod
+    def _dump_structured_content(structured_content: StructuredSections | None) -> str | None:
+        return structured_content.model_dump_json() if structured_content is not None else None
+
+    @staticmethod
+    def _load_structured_content(structured_content: str | None) -> StructuredSections | None:
+        # NULL until a lazily processed SDS has its sections structured
+        return StructuredSections.model_validate_json(structured_content) if structured_content else None
+
+    @staticmethod
+    def _dump_sections(sections: list[Section]) -> str:
+        return json.dumps([section.model_dump() for section in sections])
+
+    @staticmethod
+    def _load_sections(sections: str | None) -> list[Section]:
+        return [Section.model_validate(section) for section in json.loads(sections)] if sections else []
+
+    def _get_column(self, sds_id: str, column: str) -> str | None:
+        row = self._connection().execute(f"SELECT {column} FROM sds WHERE sds_id = ?", (sds_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    def get_markdown(self, sds_id: str) -> str | None:
+        if (processed_sds := self._cached(sds_id)) is not None:
+            return processed_sds.markdown_content
+        return self._get_column(sds_id, "markdown_content")
+
+    def get_structured_content(self, sds_id: str) -> StructuredSections | None:
+        if (processed_sds := self._cached(sds_id)) is not None:
+            return processed_sds.structured_content
+        return self._load_structured_content(self._get_column(sds_id, "structured_content"))
+
+    def get_summary(self, sds_id: str) -> str | None:
+        if (processed_sds := self._cached(sds_id)) is not None:
+            return processed_sds.summary
+        return self._get_column(sds_id, "summary")
+
+    def get_sections(self, sds_id: str) -> list[Section] | None:
+        if (processed_sds := self._cached(sds_id)) is not None:
+            return processed_sds.sections
+        row = self._connection().execute("SELECT sections FROM sds WHERE sds_id = ?", (sds_id,)).fetchone()
+        return self._load_sections(row[0]) if row is not None else None
+
+    def _update(self, sds_id: str, column: str, value: str, **fields) -> bool:
+        cursor = self._connection().execute(
+            f"UPDATE sds SET {column} = ?, updated_at = ? WHERE sds_id = ?",
+            (value, time.time(), sds_id),
+        )
+        with self._cache_lock:
+            processed_sds = self._front_cache.get(sds_id)
+            if processed_sds is not None:
+                self._front_cache[sds_id] = processed_sds.model_copy(update=fields)
+        return cursor.rowcount > 0
+
+    def set_summary(self, sds_id: str, summary: str) -> bool:
+        return self._update(sds_id, "summary", summary, summary=summary)
+
+    def set_structured_content(self, sds_id: str, structured_content: StructuredSections) -> bool:
+        return self._update(
+            sds_id,
+            "structured_content",
+            structured_content.model_dump_json(),
+            structured_content=structured_content,
+        )
+
+    def exists(self, sds_id: str) -> bool:
+        if self._cached(sds_id) is not None:
+            return True
+        return self._connection().execute("SELECT 1 FROM sds WHERE sds_id = ?", (sds_id,)).fetchone() is not None
+
+    def delete(self, sds_id: str) -> bool:
+        cursor = self._connection().execute("DELETE FROM sds WHERE sds_id = ?", (sds_id,))
+        with self._cache_lock:
+            self._front_cache.pop(sds_id, None)
+        return cursor.rowcount > 0
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
@@ -1,6 +1,8 @@
+import json
+import time
 import streamlit as st
 import requests
-from typing import Optional
+from typing import Iterator, Optional
 
 # API base URL
 API_BASE_URL = "http://localhost:8000"
@@ -46,23 +48,51 @@ def upload_page():
         st.info(f"Selected file: {uploaded_file.name}")
         
         if st.button("Upload and Process", type="primary"):
-            with st.spinner("Uploading and processing SDS..."):
-                try:
-                    files = {"file": (uploaded_file.name, uploaded_file.getvalue(), "application/pdf")}
-                    response = requests.post(f"{API_BASE_URL}/api/upload", files=files)
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        st.success(f"✅ {data['message']}")
-                        st.info(f"**SDS ID:** `{data['sds_id']}`")
-                        st.session_state["current_sds_id"] = data["sds_id"]
+            try:
+                files = {"file": (uploaded_file.name, uploaded_file.getvalue(), "application/pdf")}
+                response = requests.post(f"{API_BASE_URL}/api/upload", files=files)
+                
+                if response.status_code in (200, 202):
+                    data = response.json()
+                    st.info(f"**SDS ID:** `{data['sds_id']}`")
+                    st.session_state["current_sds_id"] = data["sds_id"]
+                    # Already processed PDFs are answered from the result cache without a job
+                    job = wait_for_job(data["job_id"]) if data.get("job_id") else {"status": "done"}
+                    if job["status"] == "done":
+                        st.success(f"✅ SDS processed successfully: {uploaded_file.name}")
                         st.session_state["sds_uploaded"] = True
                     else:
-                        st.error(f"Error: {response.json().get('detail', 'Unknown error')}")
-                except requests.exceptions.ConnectionError:
-                    st.error("❌ Cannot connect to API. Make sure the FastAPI server is running on http://localhost:8000")
-                except Exception as e:
-                    st.error(f"Error uploading file: {str(e)}")
+                        st.error(f"Error: {job.get('error') or 'Unknown error'}")
+                else:
+                    st.error(f"Error: {response.json().get('detail', 'Unknown error')}")
+            except requests.exceptions.ConnectionError:
+                st.error("❌ Cannot connect to API. Make sure the FastAPI server is running on http://localhost:8000")
+            except Exception as e:
+                st.error(f"Error uploading file: {str(e)}")
+
+
+def wait_for_job(job_id: str, poll_interval: float = 1.0, timeout: float = 600.0) -> dict:
+    """Poll a processing job, showing its current state, until it is done or failed or `timeout` seconds pass"""
+    deadline = time.monotonic() + timeout
+    with st.status("Processing SDS...", expanded=False) as status:
+        while True:
+            response = requests.get(f"{API_BASE_URL}/api/jobs/{job_id}")
+            if response.status_code == 404:
+                # Finished jobs are forgotten by the API after a while
+                status.update(label="Processing status unknown", state="error")
+                return {"status": "unknown", "error": "The job is no longer known to the API; try loading the SDS by its ID"}
+            job = response.json()
+            status.update(label=f"Processing SDS: {job['status']}...")
+            if job["status"] in ("done", "failed"):
+                status.update(
+                    label=f"Processing {job['status']}",
+                    state="complete" if job["status"] == "done" else "error",
+                )
+                return job
+            if time.monotonic() >= deadline:
+                status.update(label="Still processing", state="error")
+                return {"status": "timeout", "error": f"Still processing after {timeout:.0f}s; load the SDS by its ID later"}
+            time.sleep(poll_interval)
 
 
 def view_structured_page():
@@ -107,23 +137,31 @@ def view_summary_page():
     sds_id = get_sds_id()
     
     if sds_id:
+        regenerate = st.checkbox("Regenerate summary", help="Generate a new summary instead of loading the stored one")
         if st.button("Load Summary", type="primary"):
-            with st.spinner("Loading summary..."):
-                try:
-                    response = requests.get(f"{API_BASE_URL}/api/sds/{sds_id}/summary")
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        
-                        st.success("✅ Summary loaded")
-                        st.markdown("### Summary")
-                        st.markdown(data["summary"])
+            try:
+                with st.spinner("Loading summary..."):
+                    response = requests.get(
+                        f"{API_BASE_URL}/api/sds/{sds_id}/summary/stream",
+                        params={"regenerate": regenerate},
+                        stream=True,
+                    )
+                
+                if response.status_code == 200:
+                    st.markdown("### Summary")
+                    # Render the summary as it is generated
+                    result = {}
+                    st.write_stream(stream_tokens(response, result))
+                    if "error" in result:
+                        st.error(f"Error: {result['error']['detail']}")
                     else:
-                        st.error(f"Error: {response.json().get('detail', 'Unknown error')}")
-                except requests.exceptions.ConnectionError:
-                    st.error("❌ Cannot connect to API. Make sure the FastAPI server is running on http://localhost:8000")
-                except Exception as e:
-                    st.error(f"Error loading summary: {str(e)}")
+                        st.success("✅ Summary loaded")
+                else:
+                    st.error(f"Error: {response.json().get('detail', 'Unknown error')}")
+            except requests.exceptions.ConnectionError:
+                st.error("❌ Cannot connect to API. Make sure the FastAPI server is running on http://localhost:8000")
+            except Exception as e:
+                st.error(f"Error loading summary: {str(e)}")
 
 
 def ask_questions_page():
@@ -153,30 +191,62 @@ def ask_questions_page():
             
             # Get answer from API
             with st.chat_message("assistant"):
-                with st.spinner("Thinking..."):
-                    try:
+                try:
+                    with st.spinner("Thinking..."):
                         response = requests.post(
-                            f"{API_BASE_URL}/api/sds/{sds_id}/ask",
-                            json={"question": question}
+                            f"{API_BASE_URL}/api/sds/{sds_id}/ask/stream",
+                            json={"question": question},
+                            stream=True,
                         )
-                        
-                        if response.status_code == 200:
-                            data = response.json()
-                            answer = data["answer"]
-                            st.markdown(answer)
-                            st.session_state.messages.append({"role": "assistant", "content": answer})
-                        else:
-                            error_msg = f"Error: {response.json().get('detail', 'Unknown error')}"
+                    
+                    if response.status_code == 200:
+                        # Render the answer token by token as the model generates it
+                        result = {}
+                        answer = st.write_stream(stream_tokens(response, result))
+                        if "error" in result:
+                            error_msg = f"Error: {result['error']['detail']}"
                             st.error(error_msg)
                             st.session_state.messages.append({"role": "assistant", "content": error_msg})
-                    except requests.exceptions.ConnectionError:
-                        error_msg = "❌ Cannot connect to API. Make sure the FastAPI server is running on http://localhost:8000"
-                        st.error(error_msg)
-                        st.session_state.messages.append({"role": "assistant", "content": error_msg})
-                    except Exception as e:
-                        error_msg = f"Error: {str(e)}"
+                        else:
+                            data = result.get("done", {})
+                            if data.get("cached"):
+                                st.caption(f"Answered from cache (matched: \"{data['matched_question']}\")")
+                            st.session_state.messages.append({"role": "assistant", "content": answer})
+                    else:
+                        error_msg = f"Error: {response.json().get('detail', 'Unknown error')}"
                         st.error(error_msg)
                         st.session_state.messages.append({"role": "assistant", "content": error_msg})
+                except requests.exceptions.ConnectionError:
+                    error_msg = "❌ Cannot connect to API. Make sure the FastAPI server is running on http://localhost:8000"
+                    st.error(error_msg)
+                    st.session_state.messages.append({"role": "assistant", "content": error_msg})
+                except Exception as e:
+                    error_msg = f"Error: {str(e)}"
+                    st.error(error_msg)
+                    st.session_state.messages.append({"role": "assistant", "content": error_msg})
+
+
+def iter_sse_events(response: requests.Response) -> Iterator[tuple[str, dict]]:
+    """Parse a Server-Sent Events response into (event, data) pairs"""
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+
+def stream_tokens(response: requests.Response, result: dict) -> Iterator[str]:
+    """Yield streamed tokens for st.write_stream, keeping the final `done` or `error` payload in `result`"""
+    for event, data in iter_sse_events(response):
+        if event == "token":
+            yield data["token"]
+        else:
+            result[event] = data
 
 
 def get_sds_id() -> Optional[str]:
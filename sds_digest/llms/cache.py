@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from pydantic import BaseModel, Field
+
+
+def normalize_text(text: str) -> str:
+    """Normalize unicode forms and whitespace so cosmetic differences share a cache entry."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class LLMResponseCacheStats(BaseModel):
+    entries: int = Field(..., description="Number of cached responses")
+    hits: int = Field(..., description="Lookups served from the cache")
+    misses: int = Field(..., description="Lookups that required an LLM call")
+    hit_rate: float = Field(..., description="hits / (hits + misses)")
+    evictions: int = Field(..., description="Entries evicted to stay under max_entries")
+    expirations: int = Field(..., description="Entries dropped because they outlived the TTL")
+
+
+class LLMResponseCache:
+    """
+    Persistent cache of LLM responses stored in a local SQLite file.
+
+    Keys are derived from the normalized input text, the prompt template and the model,
+    so the same section sent to the same model with the same prompt costs no tokens.
+    Entries expire after `ttl_seconds`; beyond `max_entries` the least recently used
+    entries are evicted.
+    """
+
+    def __init__(self, db_path: Path, ttl_seconds: float | None = 30 * 24 * 3600, max_entries: int = 10_000):
+        self.db_path = Path(db_path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @staticmethod
+    def make_key(text: str, prompt_template: str, model: str) -> str:
+        digest = hashlib.sha256()
+        for part in (normalize_text(text), prompt_template, model):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            if not self._initialized:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS responses (
+                        key TEXT PRIMARY KEY,
+                        response TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_access REAL NOT NULL
+                    )
+                    """
+                )
+                self._initialized = True
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock, self._connect() as connection:
+            row = connection.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.expirations += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            connection.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        now = time.time()
+        with self._lock, self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            (entries,) = connection.execute("SELECT COUNT(*) FROM responses").fetchone()
+            overflow = entries - self.max_entries
+            if overflow > 0:
+                connection.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+
+    def stats(self) -> LLMResponseCacheStats:
+        with self._lock, self._connect() as connection:
+            (entries,) = connection.execute("SELECT COUNT(*) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return LLMResponseCacheStats(
+            entries=entries,
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hits / lookups if lookups else 0.0,
+            evictions=self.evictions,
+            expirations=self.expirations,
+        )
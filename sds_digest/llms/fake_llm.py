@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+import types
+import typing
+from typing import Any, AsyncGenerator, Literal, Sequence, Type, TypeVar
+
+from llama_index.core.base.llms.types import (
+    ChatMessage,
+    ChatResponse,
+    ChatResponseAsyncGen,
+    ChatResponseGen,
+    CompletionResponse,
+    CompletionResponseGen,
+    LLMMetadata,
+)
+from llama_index.core.llms.custom import CustomLLM
+from llama_index.core.prompts import BasePromptTemplate
+from pydantic import BaseModel, Field, PrivateAttr
+
+from sds_digest.llms.scheduler import CHARS_PER_TOKEN
+from sds_digest.src.processing.processor import Section, Sections
+
+
+Model = TypeVar("Model", bound=BaseModel)
+
+_WORDS = (
+    "acetone flammable liquid vapour eye irritation keep away from heat sparks open flames "
+    "wear protective gloves rinse cautiously with water store in a well ventilated place"
+).split()
+
+# Deltas per streamed chunk, so long outputs do not cost one event-loop turn per token
+STREAM_CHUNK_TOKENS = 4
+# Sections of a batched structuring prompt, answered with one JSON object per id
+_BATCH_SECTION_ID = re.compile(r'<section id="([^"]+)"')
+# GHS sections the fake splitter cuts a document into
+FAKE_SECTION_COUNT = 16
+
+
+class FakeLLMConfig(BaseModel):
+    first_token_latency_ms: float = Field(200.0, description="Median time until the first output token")
+    latency_distribution: Literal["constant", "uniform", "lognormal"] = Field(
+        "lognormal", description="Distribution of the first-token latency around its median"
+    )
+    latency_spread: float = Field(0.3, description="Relative spread: ±share for uniform, sigma for lognormal")
+    prompt_tokens_per_second: float = Field(5_000.0, description="Prompt processing rate")
+    output_tokens_per_second: float = Field(80.0, description="Generation rate")
+    output_tokens: int = Field(150, description="Tokens generated for free-text answers")
+    list_items: int = Field(3, description="Items generated for list fields of structured outputs")
+    error_rate: float = Field(0.0, description="Share of calls failing with a server error")
+    rate_limit_rate: float = Field(0.0, description="Share of calls failing with a 429 rate-limit error")
+    invalid_json_rate: float = Field(0.0, description="Share of free-text JSON answers returned truncated")
+    seed: int = Field(0, description="Seed making latencies, errors and outputs reproducible")
+
+
+class FakeLLMError(Exception):
+    """Injected provider error; carries `status_code` like the OpenAI and Ollama clients do."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _fake_text(rng: random.Random, tokens: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(max(tokens, 1)))
+
+
+def _fake_value(annotation: Any, name: str, position: int, rng: random.Random, config: FakeLLMConfig) -> Any:
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin in (typing.Union, types.UnionType):
+        return _fake_value(next(arg for arg in args if arg is not type(None)), name, position, rng, config)
+    if origin is list:
+        return [_fake_value(args[0] if args else str, name, i + 1, rng, config) for i in range(config.list_items)]
+    if origin is dict or annotation is dict:
+        return {f"{name}_{i}": _fake_text(rng, 3) for i in range(config.list_items)}
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return fake_model(annotation, rng, config, position)
+    if annotation is bool:
+        return rng.random() < 0.8
+    if annotation is int:
+        # List items are numbered, which is what numbered-answer outputs expect
+        return position
+    if annotation is float:
+        return round(rng.uniform(0, 100), 2)
+    return _fake_text(rng, 12)
+
+
+def fake_model(output_cls: Type[Model], rng: random.Random, config: FakeLLMConfig, position: int = 1) -> Model:
+    """A valid instance of any pydantic output model, filled with deterministic filler."""
+    values = {
+        name: _fake_value(field.annotation, name, position, rng, config)
+        for name, field in output_cls.model_fields.items()
+    }
+    return output_cls.model_validate(values)
+
+
+def fake_sections(text: str) -> Sections:
+    """The document cut into equal parts, standing in for an LLM-split SDS."""
+    size = max(len(text) // FAKE_SECTION_COUNT, 1)
+    chunks = [text[i:i + size] for i in range(0, len(text), size)][:FAKE_SECTION_COUNT] or [text]
+    return Sections(sections=[
+        Section(section_title=f"Section {number}", section_summary=chunk[:80], raw_content_of_section=chunk)
+        for number, chunk in enumerate(chunks, 1)
+    ])
+
+
+class FakeLLM(CustomLLM):
+    """
+    Deterministic stand-in for `OpenAI` / `Ollama` that costs nothing.
+
+    Supports plain, streamed and structured chat. Each call waits for a sampled
+    first-token latency plus the time to process the prompt and generate the output
+    at the configured token rates, and fails with the configured error and 429 rates.
+    Latencies, failures and outputs depend only on the seed and the request (and how
+    often it was sent), so runs are reproducible regardless of scheduling order.
+    Usage is reported Ollama-style (`prompt_eval_count` / `eval_count`).
+    """
+
+    model: str = Field("fake-llm", description="Model name reported to the scheduler and caches")
+    config: FakeLLMConfig = Field(default_factory=FakeLLMConfig)
+    _attempts: dict[str, int] = PrivateAttr(default_factory=dict)
+    _calls: int = PrivateAttr(default=0)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "fake_llm"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name=self.model, is_chat_model=True)
+
+    @property
+    def calls(self) -> int:
+        return self._calls
+
+    def _rng(self, messages: Sequence[ChatMessage]) -> random.Random:
+        content = "\x00".join(f"{message.role}:{message.content}" for message in messages)
+        key = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        attempt = self._attempts.get(key, 0)
+        self._attempts[key] = attempt + 1
+        self._calls += 1
+        return random.Random(f"{self.config.seed}:{key}:{attempt}")
+
+    def _first_token_seconds(self, rng: random.Random) -> float:
+        median = self.config.first_token_latency_ms / 1000
+        if self.config.latency_distribution == "uniform":
+            return median * rng.uniform(1 - self.config.latency_spread, 1 + self.config.latency_spread)
+        if self.config.latency_distribution == "lognormal":
+            return median * rng.lognormvariate(0, self.config.latency_spread)
+        return median
+
+    def _prompt_tokens(self, messages: Sequence[ChatMessage]) -> int:
+        return sum(len(str(message.content or "")) for message in messages) // CHARS_PER_TOKEN
+
+    def _maybe_fail(self, rng: random.Random) -> None:
+        roll = rng.random()
+        if roll < self.config.rate_limit_rate:
+            raise FakeLLMError(429, "Injected rate limit")
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            raise FakeLLMError(500, "Injected server error")
+
+    def _before_output_seconds(self, rng: random.Random, prompt_tokens: int) -> float:
+        return self._first_token_seconds(rng) + prompt_tokens / self.config.prompt_tokens_per_second
+
+    def _output_seconds(self, tokens: int) -> float:
+        return tokens / self.config.output_tokens_per_second
+
+    def _text(self, messages: Sequence[ChatMessage], rng: random.Random) -> str:
+        """Filler text, or a JSON object when the request asks for JSON, as section structuring does."""
+        if "json" not in str(messages[-1].content or "").lower():
+            return _fake_text(rng, self.config.output_tokens)
+
+        def fields() -> dict[str, str]:
+            return {f"field_{i}": _fake_text(rng, 8) for i in range(self.config.list_items)}
+
+        section_ids = _BATCH_SECTION_ID.findall(str(messages[0].content or ""))
+        text = json.dumps({section_id: fields() for section_id in section_ids} if section_ids else fields(), indent=4)
+        if rng.random() < self.config.invalid_json_rate:
+            return text[: len(text) // 2]
+        return text
+
+    def _response(self, text: str, prompt_tokens: int, delta: str | None = None) -> ChatResponse:
+        return ChatResponse(
+            message=ChatMessage(role="assistant", content=text),
+            delta=delta,
+            raw={"prompt_eval_count": prompt_tokens, "eval_count": len(text) // CHARS_PER_TOKEN},
+        )
+
+    # Free-text chat
+
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        rng = self._rng(messages)
+        prompt_tokens = self._prompt_tokens(messages)
+        await asyncio.sleep(self._before_output_seconds(rng, prompt_tokens))
+        self._maybe_fail(rng)
+        text = self._text(messages, rng)
+        await asyncio.sleep(self._output_seconds(len(text) // CHARS_PER_TOKEN))
+        return self._response(text, prompt_tokens)
+
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseAsyncGen:
+        rng = self._rng(messages)
+        prompt_tokens = self._prompt_tokens(messages)
+
+        async def gen() -> ChatResponseAsyncGen:
+            await asyncio.sleep(self._before_output_seconds(rng, prompt_tokens))
+            self._maybe_fail(rng)
+            words = self._text(messages, rng).split(" ")
+            text = ""
+            for start in range(0, len(words), STREAM_CHUNK_TOKENS):
+                delta = ("" if start == 0 else " ") + " ".join(words[start:start + STREAM_CHUNK_TOKENS])
+                await asyncio.sleep(self._output_seconds(STREAM_CHUNK_TOKENS))
+                text += delta
+                yield self._response(text, prompt_tokens, delta=delta)
+
+        return gen()
+
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        rng = self._rng(messages)
+        prompt_tokens = self._prompt_tokens(messages)
+        time.sleep(self._before_output_seconds(rng, prompt_tokens))
+        self._maybe_fail(rng)
+        text = self._text(messages, rng)
+        time.sleep(self._output_seconds(len(text) // CHARS_PER_TOKEN))
+        return self._response(text, prompt_tokens)
+
+    def stream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseGen:
+        response = self.chat(messages, **kwargs)
+        yield self._response(response.message.content, 0, delta=response.message.content)
+
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        response = self.chat([ChatMessage(role="user", content=prompt)])
+        return CompletionResponse(text=response.message.content, raw=response.raw)
+
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        yield self.complete(prompt, formatted=formatted, **kwargs)
+
+    # Structured output, used through `as_structured_llm`
+
+    @staticmethod
+    def _prompt_messages(prompt: BasePromptTemplate, prompt_args: dict[str, Any]) -> list[ChatMessage]:
+        templates = getattr(prompt, "message_templates", None)
+        if templates is not None and not prompt_args:
+            return list(templates)
+        return prompt.format_messages(**prompt_args)
+
+    def _structured_output(self, output_cls: Type[Model], messages: Sequence[ChatMessage], rng: random.Random) -> Model:
+        if output_cls is Sections:
+            return fake_sections(str(messages[-1].content or ""))
+        return fake_model(output_cls, rng, self.config)
+
+    def _output_tokens_of(self, output: Any) -> int:
+        text = output.model_dump_json() if isinstance(output, BaseModel) else json.dumps(output)
+        return len(text) // CHARS_PER_TOKEN
+
+    async def astructured_predict(
+        self,
+        output_cls: Type[Model],
+        prompt: BasePromptTemplate,
+        llm_kwargs: dict[str, Any] | None = None,
+        **prompt_args: Any,
+    ) -> Model:
+        messages = self._prompt_messages(prompt, prompt_args)
+        rng = self._rng(messages)
+        await asyncio.sleep(self._before_output_seconds(rng, self._prompt_tokens(messages)))
+        self._maybe_fail(rng)
+        output = self._structured_output(output_cls, messages, rng)
+        await asyncio.sleep(self._output_seconds(self._output_tokens_of(output)))
+        return output
+
+    async def astream_structured_predict(
+        self,
+        output_cls: Type[Model],
+        prompt: BasePromptTemplate,
+        llm_kwargs: dict[str, Any] | None = None,
+        **prompt_args: Any,
+    ) -> AsyncGenerator[Model, None]:
+        messages = self._prompt_messages(prompt, prompt_args)
+        rng = self._rng(messages)
+
+        async def gen() -> AsyncGenerator[Model, None]:
+            await asyncio.sleep(self._before_output_seconds(rng, self._prompt_tokens(messages)))
+            self._maybe_fail(rng)
+            output = self._structured_output(output_cls, messages, rng)
+            # Grow the first list field item by item, the way partial JSON arrives
+            list_field = next(
+                (name for name in output_cls.model_fields if isinstance(getattr(output, name), list)), None
+            )
+            if list_field is not None:
+                items = getattr(output, list_field)
+                for count in range(1, len(items)):
+                    await asyncio.sleep(self._output_seconds(self._output_tokens_of(items[count - 1])))
+                    yield output.model_copy(update={list_field: items[:count]})
+                if items:
+                    await asyncio.sleep(self._output_seconds(self._output_tokens_of(items[-1])))
+            else:
+                await asyncio.sleep(self._output_seconds(self._output_tokens_of(output)))
+            yield output
+
+        return gen()
+
+    def structured_predict(
+        self,
+        output_cls: Type[Model],
+        prompt: BasePromptTemplate,
+        llm_kwargs: dict[str, Any] | None = None,
+        **prompt_args: Any,
+    ) -> Model:
+        messages = self._prompt_messages(prompt, prompt_args)
+        rng = self._rng(messages)
+        time.sleep(self._before_output_seconds(rng, self._prompt_tokens(messages)))
+        self._maybe_fail(rng)
+        return self._structured_output(output_cls, messages, rng)
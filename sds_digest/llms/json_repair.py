@@ -0,0 +1,131 @@
+"""Lenient parsing of JSON produced by LLMs: code fences, surrounding prose, trailing commas and truncation."""
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, NamedTuple
+
+
+# A Markdown code fence around the whole answer; backticks inside JSON strings are left alone
+_FENCE = re.compile(r"\A\s*```[a-zA-Z]*[ \t]*\n(?P<body>.*?)\n?```\s*\Z", re.DOTALL)
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class ParsedJSON(NamedTuple):
+    value: Any
+    repaired: bool
+    # False when the text was cut off, so `value` lacks whatever followed its last complete value
+    complete: bool = True
+
+
+def _unfence(text: str) -> str:
+    match = _FENCE.match(text)
+    return match.group("body") if match else text
+
+
+def _drop_trailing_comma(out: list[str]) -> None:
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def _closed(out: list[str], closers: list[str]) -> str:
+    out = list(out)
+    _drop_trailing_comma(out)
+    return "".join(out) + "".join(reversed(closers))
+
+
+def repair_json(text: str) -> str:
+    """
+    Best-effort valid JSON for the first object or array in `text`, in a single pass.
+
+    A code fence and text around the JSON are dropped, trailing commas removed, and a truncated
+    document is closed after its last complete value. Partial strings, numbers and literals
+    are dropped, never closed. Does not validate the result; raises ValueError when `text`
+    contains no object or array.
+    """
+    return _repair(_unfence(text))[0]
+
+
+def _repair(text: str) -> tuple[str, bool]:
+    start = min((index for index in (text.find("{"), text.find("[")) if index != -1), default=-1)
+    if start == -1:
+        raise ValueError("No JSON object or array in the response")
+
+    out: list[str] = []
+    closers: list[str] = []
+    # Per open container, whether the next string is an object key
+    expecting_key: list[bool] = []
+    # Prefix of `out`, with its open containers, that is valid JSON once closed
+    safe_length, safe_closers = 0, []
+    in_string = escaped = in_literal = False
+    string_is_key = False
+
+    for char in text[start:]:
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+                if not string_is_key:
+                    safe_length, safe_closers = len(out), list(closers)
+            continue
+        if in_literal and (char in ",}]:" or char.isspace()):
+            in_literal = False
+            safe_length, safe_closers = len(out), list(closers)
+        if char == '"':
+            in_string = True
+            string_is_key = bool(expecting_key) and expecting_key[-1]
+            out.append(char)
+        elif char in _CLOSERS:
+            out.append(char)
+            closers.append(_CLOSERS[char])
+            expecting_key.append(char == "{")
+            safe_length, safe_closers = len(out), list(closers)
+        elif char in "}]":
+            if not closers:
+                break
+            _drop_trailing_comma(out)
+            out.append(closers.pop())
+            expecting_key.pop()
+            safe_length, safe_closers = len(out), list(closers)
+            if not closers:
+                # Complete document; anything after it is prose
+                break
+        elif char == ",":
+            if expecting_key and closers[-1] == "}":
+                expecting_key[-1] = True
+            out.append(char)
+        elif char == ":":
+            if expecting_key:
+                expecting_key[-1] = False
+            out.append(char)
+        elif char.isspace():
+            out.append(char)
+        else:
+            in_literal = True
+            out.append(char)
+
+    if not closers:
+        return "".join(out), True
+    # Truncated: cut back to the last complete value
+    return _closed(out[:safe_length], safe_closers), False
+
+
+def parse_json(text: str) -> ParsedJSON:
+    """
+    Parse `text` as JSON, repairing it when it is not valid as is; raises ValueError if that fails too.
+
+    Valid JSON in a code fence is not a repair. Check `complete` before trusting a repaired
+    value: a cut-off document parses, but without its end.
+    """
+    text = _unfence(text)
+    try:
+        return ParsedJSON(json.loads(text), repaired=False)
+    except ValueError:
+        repaired, complete = _repair(text)
+        return ParsedJSON(json.loads(repaired), repaired=True, complete=complete)
@@ -7,6 +7,7 @@ from llama_index.core.prompts import RichPromptTemplate
 from pydantic import BaseModel, Field
 
 from sds_digest.src.secrets import Secrets
+from sds_digest.llms.scheduler import LLMPriority, LLMScheduler, run_scheduled
 from sds_digest.llms.prompts import JUDGE_PROMPT
 from sds_digest.llms.utils import from_chat_response_to_model
 
@@ -17,25 +18,29 @@ class Judgment(BaseModel):
 
 
 class JudgeLLM:
+    priority = LLMPriority.BACKGROUND
+
     def __init__(
         self,
         llm: OpenAI | Ollama,
         system_prompt: RichPromptTemplate = JUDGE_PROMPT,
+        scheduler: LLMScheduler | None = None,
         **kwargs,
     ):
         self.llm = llm
         self.structured_llm = self.llm.as_structured_llm(Judgment)
         self.system_prompt = system_prompt
+        self.scheduler = scheduler
 
     @classmethod
-    def from_openai(cls, model: str = "gpt-4o", **kwargs) -> JudgeLLM:
+    def from_openai(cls, model: str = "gpt-4o", scheduler: LLMScheduler | None = None, **kwargs) -> JudgeLLM:
         llm = OpenAI(model=model, api_key=Secrets().openai_api_key, **kwargs)
-        return cls(llm=llm, **kwargs)
+        return cls(llm=llm, scheduler=scheduler, **kwargs)
 
     @classmethod
-    def from_ollama(cls, model: str = "gpt-oss:latest", **kwargs) -> JudgeLLM:
+    def from_ollama(cls, model: str = "gpt-oss:latest", scheduler: LLMScheduler | None = None, **kwargs) -> JudgeLLM:
         llm = Ollama(model=model, **kwargs)
-        return cls(llm=llm, **kwargs)
+        return cls(llm=llm, scheduler=scheduler, **kwargs)
 
     def _format_prompt(self, answer: str, acceptance_criteria: str) -> str:
         return self.system_prompt.format(answer=answer, acceptance_criteria=acceptance_criteria)
@@ -57,7 +62,9 @@ class JudgeLLM:
 
     async def ajudge(self, answer: str, acceptance_criteria: str) -> Judgment:
         messages = self._build_messages(answer, acceptance_criteria)
-        response: ChatResponse = await self.structured_llm.achat(messages=messages)
+        response: ChatResponse = await run_scheduled(
+            self.scheduler, self.llm.model, lambda: self.structured_llm.achat(messages=messages), messages, self.priority
+        )
         try:
             return from_chat_response_to_model(response, Judgment)
         except Exception as e:
@@ -0,0 +1,22 @@
+from pydantic import BaseModel, Field
+
+
+class ModelPrice(BaseModel):
+    """USD per million tokens."""
+    input: float = Field(..., description="Price of uncached input tokens")
+    cached_input: float = Field(..., description="Price of input tokens served from the prompt cache")
+    output: float = Field(..., description="Price of output tokens")
+
+    def cost(self, prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> float:
+        uncached = prompt_tokens - cached_tokens
+        return (uncached * self.input + cached_tokens * self.cached_input + completion_tokens * self.output) / 1_000_000
+
+
+# Models without a price (e.g. local Ollama models) are reported without a cost
+MODEL_PRICES: dict[str, ModelPrice] = {
+    "gpt-4o": ModelPrice(input=2.50, cached_input=1.25, output=10.00),
+    "gpt-4o-mini": ModelPrice(input=0.15, cached_input=0.075, output=0.60),
+    "gpt-4.1": ModelPrice(input=2.00, cached_input=0.50, output=8.00),
+    "gpt-4.1-mini": ModelPrice(input=0.40, cached_input=0.10, output=1.60),
+    "gpt-4.1-nano": ModelPrice(input=0.10, cached_input=0.025, output=0.40),
+}
@@ -1,14 +1,20 @@
 from sds_digest.llms.prompts.loading import (
+    BATCH_QA_PROMPT,
     FULL_SDS_SYSTEM_PROMPT,
     JUDGE_PROMPT,
+    SECTIONS_SUMMARY_PROMPT,
     STRUCTURED_SDS_SYSTEM_PROMPT,
     STRUCTURE_SECTION_PROMPT,
+    STRUCTURE_SECTIONS_BATCH_PROMPT,
 )
 
 
 __all__ = [
+    "BATCH_QA_PROMPT",
     "FULL_SDS_SYSTEM_PROMPT", 
     "JUDGE_PROMPT",
+    "SECTIONS_SUMMARY_PROMPT",
     "STRUCTURED_SDS_SYSTEM_PROMPT",
     "STRUCTURE_SECTION_PROMPT",
+    "STRUCTURE_SECTIONS_BATCH_PROMPT",
 ]
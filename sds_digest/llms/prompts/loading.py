@@ -8,7 +8,10 @@ def load_prompt(file_path: str) -> RichPromptTemplate:
     
 local_path = os.path.join(os.path.dirname(__file__), "templates")
 
+BATCH_QA_PROMPT = load_prompt(os.path.join(local_path, "BATCH_QA_PROMPT.md"))
 FULL_SDS_SYSTEM_PROMPT = load_prompt(os.path.join(local_path, "FULL_SDS_SYSTEM_PROMPT.md"))
 JUDGE_PROMPT = load_prompt(os.path.join(local_path, "JUDGE_PROMPT.md"))
+SECTIONS_SUMMARY_PROMPT = load_prompt(os.path.join(local_path, "SECTIONS_SUMMARY_PROMPT.md"))
 STRUCTURED_SDS_SYSTEM_PROMPT = load_prompt(os.path.join(local_path, "STRUCTURED_SDS_SYSTEM_PROMPT.md"))
 STRUCTURE_SECTION_PROMPT = load_prompt(os.path.join(local_path, "STRUCTURE_SECTION_PROMPT.md"))
+STRUCTURE_SECTIONS_BATCH_PROMPT = load_prompt(os.path.join(local_path, "STRUCTURE_SECTIONS_BATCH_PROMPT.md"))
@@ -1,39 +1,152 @@
 from __future__ import annotations
 
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable
+
 from llama_index.core.llms import ChatMessage, ChatResponse
 from llama_index.llms.ollama import Ollama
 from llama_index.llms.openai import OpenAI
 from llama_index.core.prompts import RichPromptTemplate
+from pydantic import BaseModel, Field
 
 from sds_digest.src.secrets import Secrets
-from sds_digest.llms.prompts import FULL_SDS_SYSTEM_PROMPT
+from sds_digest.llms.scheduler import LLMPriority, LLMScheduler, run_scheduled, stream_slot
+from sds_digest.llms.prompts import BATCH_QA_PROMPT, FULL_SDS_SYSTEM_PROMPT
+from sds_digest.llms.utils import (
+    PromptUsage,
+    as_dict,
+    from_chat_response_to_model,
+    partial_items,
+    prompt_usage,
+    stream_usage_kwargs,
+)
+from sds_digest.src.telemetry import record_usage
+
+
+class QAAnswer(BaseModel):
+    answer: str = Field(..., description="Answer to the question")
+    prompt_tokens: int | None = Field(None, description="Input tokens reported by the provider")
+    cached_tokens: int | None = Field(None, description="Input tokens served from the provider's prompt cache")
+    completion_tokens: int | None = Field(None, description="Output tokens generated for the answer")
+
+
+class NumberedAnswer(BaseModel):
+    number: int = Field(..., description="Number of the question being answered")
+    answer: str = Field(..., description="Answer to the question")
+
+
+class BatchAnswers(BaseModel):
+    answers: list[NumberedAnswer] = Field(..., description="One answer per question, in question order")
+
+
+class RenderedPromptCacheStats(BaseModel):
+    entries: int = Field(..., description="Rendered system prompts held in memory")
+    hits: int = Field(..., description="Questions that reused a rendered prompt")
+    misses: int = Field(..., description="Questions that had to render the prompt")
+    prompt_tokens: int = Field(..., description="Input tokens reported across all questions")
+    cached_tokens: int = Field(..., description="Input tokens the provider served from its prompt cache")
+
+
+class RenderedPromptCache:
+    """
+    QA system prompts rendered once per SDS context and reused byte for byte.
+
+    Entries are keyed by SDS ID and context (full document or a set of sections).
+    Reusing the exact same string keeps the SDS part of every request an identical
+    prefix, which is what OpenAI prompt caching and Ollama's KV cache match on.
+    """
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self._prompts: OrderedDict[tuple[str, str], str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, sds_id: str, context_key: str, render: Callable[[], str]) -> str:
+        key = (sds_id, context_key)
+        with self._lock:
+            prompt = self._prompts.get(key)
+            if prompt is not None:
+                self._prompts.move_to_end(key)
+                self.hits += 1
+                return prompt
+            self.misses += 1
+        prompt = render()
+        with self._lock:
+            self._prompts[key] = prompt
+            while len(self._prompts) > self.max_entries:
+                self._prompts.popitem(last=False)
+        return prompt
+
+    def invalidate(self, sds_id: str) -> None:
+        with self._lock:
+            for key in [key for key in self._prompts if key[0] == sds_id]:
+                del self._prompts[key]
+
+    def record_usage(self, usage: PromptUsage) -> None:
+        self.prompt_tokens += usage.prompt_tokens or 0
+        self.cached_tokens += usage.cached_tokens or 0
+
+    def stats(self) -> RenderedPromptCacheStats:
+        return RenderedPromptCacheStats(
+            entries=len(self._prompts),
+            hits=self.hits,
+            misses=self.misses,
+            prompt_tokens=self.prompt_tokens,
+            cached_tokens=self.cached_tokens,
+        )
 
 
 class QALLM:
+    priority = LLMPriority.INTERACTIVE
+
     def __init__(
         self,
         llm: OpenAI | Ollama,
         system_prompt: RichPromptTemplate = FULL_SDS_SYSTEM_PROMPT,
+        scheduler: LLMScheduler | None = None,
+        prompt_cache: RenderedPromptCache | None = None,
+        batch_prompt: RichPromptTemplate = BATCH_QA_PROMPT,
         **kwargs,
     ):
         self.llm = llm
         self.system_prompt = system_prompt
+        self.batch_prompt = batch_prompt
+        self.scheduler = scheduler
+        self.prompt_cache = prompt_cache
 
     @classmethod
-    def from_openai(cls, model: str = "gpt-4o", **kwargs) -> QALLM:
+    def from_openai(cls, model: str = "gpt-4o", scheduler: LLMScheduler | None = None, **kwargs) -> QALLM:
         llm = OpenAI(model=model, api_key=Secrets().openai_api_key, **kwargs)
-        return cls(llm=llm, **kwargs)
+        return cls(llm=llm, scheduler=scheduler, **kwargs)
 
     @classmethod
-    def from_ollama(cls, model: str = "gpt-oss:latest", **kwargs) -> QALLM:
+    def from_ollama(cls, model: str = "gpt-oss:latest", scheduler: LLMScheduler | None = None, **kwargs) -> QALLM:
         llm = Ollama(model=model, **kwargs)
-        return cls(llm=llm, **kwargs)
+        return cls(llm=llm, scheduler=scheduler, **kwargs)
 
     def _format_prompt(self, sds_info: str) -> str:
         return self.system_prompt.format(sds_info=sds_info)
 
-    def _build_messages(self, question: str, sds_info: str) -> list[ChatMessage]:
-        system_content = self._format_prompt(sds_info)
+    def _system_content(self, sds_info: str, sds_id: str | None, context_key: str) -> str:
+        if self.prompt_cache is None or sds_id is None:
+            return self._format_prompt(sds_info)
+        return self.prompt_cache.get_or_render(sds_id, context_key, lambda: self._format_prompt(sds_info))
+
+    def _build_messages(
+        self,
+        question: str,
+        sds_info: str,
+        sds_id: str | None = None,
+        context_key: str = "full_document",
+    ) -> list[ChatMessage]:
+        # Everything that depends on the SDS comes first and the question last, so the
+        # system message is a stable prefix shared by all questions on the same context
+        system_content = self._system_content(sds_info, sds_id, context_key)
         return [
             ChatMessage(role="system", content=system_content),
             ChatMessage(role="user", content=question),
@@ -44,8 +157,113 @@ class QALLM:
         response: ChatResponse = self.llm.chat(messages=messages)
         return response.message.content
 
+    def _prompt_cache_kwargs(self, sds_id: str | None) -> dict[str, Any]:
+        # Hint OpenAI to route all questions on one SDS to the same prompt-cache shard
+        if sds_id is None or not isinstance(self.llm, OpenAI):
+            return {}
+        return {"extra_body": {"prompt_cache_key": f"sds-{sds_id}"}}
+
     async def aanswer(self, question: str, sds_info: str) -> str:
-        messages = self._build_messages(question, sds_info)
-        response: ChatResponse = await self.llm.achat(messages=messages)
-        return response.message.content
+        return (await self.aanswer_with_usage(question, sds_info)).answer
+
+    async def aanswer_with_usage(
+        self,
+        question: str,
+        sds_info: str,
+        sds_id: str | None = None,
+        context_key: str = "full_document",
+    ) -> QAAnswer:
+        messages = self._build_messages(question, sds_info, sds_id, context_key)
+        llm_kwargs = self._prompt_cache_kwargs(sds_id)
+        response: ChatResponse = await run_scheduled(
+            self.scheduler,
+            self.llm.model,
+            lambda: self.llm.achat(messages=messages, **llm_kwargs),
+            messages,
+            self.priority,
+        )
+        usage = prompt_usage(response)
+        if self.prompt_cache is not None:
+            self.prompt_cache.record_usage(usage)
+        return QAAnswer(answer=response.message.content, **usage.model_dump())
+
+
+    async def astream_answer(
+        self,
+        question: str,
+        sds_info: str,
+        sds_id: str | None = None,
+        context_key: str = "full_document",
+    ) -> AsyncIterator[str]:
+        """Yield the answer piece by piece as the model generates it."""
+        messages = self._build_messages(question, sds_info, sds_id, context_key)
+        llm_kwargs = {**self._prompt_cache_kwargs(sds_id), **stream_usage_kwargs(self.llm)}
+        response: ChatResponse | None = None
+        async with stream_slot(self.scheduler, self.llm.model, messages, self.priority):
+            async for response in await self.llm.astream_chat(messages=messages, **llm_kwargs):
+                if response.delta:
+                    yield response.delta
+        if response is not None:
+            # The usage comes with the last chunk
+            usage = prompt_usage(response)
+            record_usage(usage)
+            if self.prompt_cache is not None:
+                self.prompt_cache.record_usage(usage)
+
+    def _build_batch_messages(
+        self,
+        questions: list[str],
+        sds_info: str,
+        sds_id: str | None = None,
+        context_key: str = "full_document",
+    ) -> list[ChatMessage]:
+        # Same system message as single questions, so batches share their cached prefix
+        system_content = self._system_content(sds_info, sds_id, context_key)
+        numbered = "\n".join(f"{number}. {question}" for number, question in enumerate(questions, 1))
+        return [
+            ChatMessage(role="system", content=system_content),
+            ChatMessage(role="user", content=self.batch_prompt.format(questions=numbered)),
+        ]
+
+    async def astream_batch_answers(
+        self,
+        questions: list[str],
+        sds_info: str,
+        sds_id: str | None = None,
+        context_key: str = "full_document",
+    ) -> AsyncIterator[tuple[int, str]]:
+        """
+        Answer all questions in one structured-output call.
+
+        Yields `(index, answer)` pairs as soon as each answer is complete in the streamed
+        output, i.e. once the model has moved on to the next one; the rest come from the
+        final response. Questions the model did not answer are not yielded.
+        """
+        messages = self._build_batch_messages(questions, sds_info, sds_id, context_key)
+        llm_kwargs = self._prompt_cache_kwargs(sds_id)
+        structured_llm = self.llm.as_structured_llm(BatchAnswers)
+        emitted: set[int] = set()
+
+        def numbered_answer(item: Any) -> tuple[int, str] | None:
+            try:
+                answer = NumberedAnswer.model_validate(as_dict(item))
+            except ValueError:
+                return None
+            index = answer.number - 1
+            if not 0 <= index < len(questions) or index in emitted:
+                return None
+            emitted.add(index)
+            return index, answer.answer
 
+        response: ChatResponse | None = None
+        async with stream_slot(self.scheduler, self.llm.model, messages, self.priority):
+            async for response in await structured_llm.astream_chat(messages=messages, **llm_kwargs):
+                # The last answer in a partial output may still be growing
+                for item in partial_items(response.raw, "answers")[:-1]:
+                    if (result := numbered_answer(item)) is not None:
+                        yield result
+        if response is None:
+            raise ValueError("LLM returned an empty stream")
+        for item in from_chat_response_to_model(response, BatchAnswers).answers:
+            if (result := numbered_answer(item)) is not None:
+                yield result
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+from typing import Literal
+
+import httpx
+from llama_index.llms.ollama import Ollama
+from llama_index.llms.openai import OpenAI
+from ollama import AsyncClient as OllamaAsyncClient
+
+from sds_digest.src.secrets import Secrets
+from sds_digest.llms.cache import LLMResponseCache
+from sds_digest.llms.judge_llm import JudgeLLM
+from sds_digest.llms.qa_llm import QALLM, RenderedPromptCache
+from sds_digest.llms.routing import RoutingPolicy, TierMetrics
+from sds_digest.llms.scheduler import LLMPriority, LLMScheduler
+from sds_digest.llms.summary_llm import SummaryLLM
+from sds_digest.src.processing.llm_processor import LLMSafetyDataSheetProcessor, SectionSplitterName, SummaryMode
+
+
+LLMProvider = Literal["openai", "ollama"]
+
+
+class LLMClientRegistry:
+    """
+    Application-scoped LLM clients keyed by provider and model.
+
+    One pooled `httpx.AsyncClient` per provider is shared by every model, so keep-alive
+    connections and TLS sessions survive across requests, and the OpenAI key is read once.
+    Wrapper classes (`QALLM`, `SummaryLLM`, `JudgeLLM`, the SDS processor) are cheap views
+    over the cached clients and all go through the shared scheduler.
+    """
+
+    def __init__(
+        self,
+        scheduler: LLMScheduler | None = None,
+        openai_api_key: str | None = None,
+        ollama_base_url: str = "http://localhost:11434",
+        ollama_keep_alive: str | None = "30m",
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        timeout: float = 60.0,
+    ):
+        self.scheduler = scheduler
+        self.openai_api_key = openai_api_key
+        self.ollama_base_url = ollama_base_url
+        # Keeps the model, and with it the KV cache of recent prompts, loaded between questions
+        self.ollama_keep_alive = ollama_keep_alive
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self.timeout = timeout
+        self._openai_http_client: httpx.AsyncClient | None = None
+        self._ollama_client: OllamaAsyncClient | None = None
+        self._llms: dict[tuple[LLMProvider, str], OpenAI | Ollama] = {}
+        # Shared by every routed processor, so the stats cover all of their calls
+        self.tier_metrics = TierMetrics()
+
+    async def astart(self) -> None:
+        self._openai_http_client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+        self._ollama_client = OllamaAsyncClient(host=self.ollama_base_url, limits=self.limits, timeout=self.timeout)
+
+    async def aclose(self) -> None:
+        self._llms.clear()
+        if self._openai_http_client is not None:
+            await self._openai_http_client.aclose()
+            self._openai_http_client = None
+        if self._ollama_client is not None:
+            await self._ollama_client.close()
+            self._ollama_client = None
+
+    @property
+    def running(self) -> bool:
+        return self._openai_http_client is not None
+
+    def _build_llm(self, provider: LLMProvider, model: str) -> OpenAI | Ollama:
+        if provider == "openai":
+            if self.openai_api_key is None:
+                self.openai_api_key = Secrets().openai_api_key
+            return OpenAI(
+                model=model,
+                api_key=self.openai_api_key,
+                timeout=self.timeout,
+                async_http_client=self._openai_http_client,
+                reuse_client=True,
+            )
+        if provider == "ollama":
+            return Ollama(
+                model=model,
+                base_url=self.ollama_base_url,
+                request_timeout=self.timeout,
+                keep_alive=self.ollama_keep_alive,
+                async_client=self._ollama_client,
+            )
+        raise ValueError(f"Unknown LLM provider: {provider}")
+
+    def llm(self, provider: LLMProvider, model: str) -> OpenAI | Ollama:
+        if not self.running:
+            raise RuntimeError("LLM client registry is not running")
+        key = (provider, model)
+        if key not in self._llms:
+            self._llms[key] = self._build_llm(provider, model)
+        return self._llms[key]
+
+    def qa_llm(
+        self,
+        model: str,
+        provider: LLMProvider = "openai",
+        prompt_cache: RenderedPromptCache | None = None,
+    ) -> QALLM:
+        return QALLM(llm=self.llm(provider, model), scheduler=self.scheduler, prompt_cache=prompt_cache)
+
+    def summary_llm(
+        self,
+        model: str,
+        provider: LLMProvider = "openai",
+        priority: LLMPriority | None = None,
+    ) -> SummaryLLM:
+        return SummaryLLM(llm=self.llm(provider, model), scheduler=self.scheduler, priority=priority)
+
+    def judge_llm(self, model: str, provider: LLMProvider = "openai") -> JudgeLLM:
+        return JudgeLLM(llm=self.llm(provider, model), scheduler=self.scheduler)
+
+    def processor(
+        self,
+        model: str,
+        provider: LLMProvider = "openai",
+        llm_cache: LLMResponseCache | None = None,
+        section_splitter: SectionSplitterName = "llm",
+        summary_mode: SummaryMode = "full_document",
+        routing: RoutingPolicy | None = None,
+        section_batch_tokens: int | None = None,
+    ) -> LLMSafetyDataSheetProcessor:
+        """With a routing policy, its tiers decide the models and `model` / `provider` are ignored."""
+        if routing is not None:
+            return LLMSafetyDataSheetProcessor.from_routing(
+                routing,
+                llm_for=lambda tier: self.llm(tier.provider, tier.model),
+                llm_cache=llm_cache,
+                section_splitter=section_splitter,
+                scheduler=self.scheduler,
+                summary_mode=summary_mode,
+                tier_metrics=self.tier_metrics,
+                section_batch_tokens=section_batch_tokens,
+            )
+        return LLMSafetyDataSheetProcessor.from_llm(
+            self.llm(provider, model),
+            llm_cache=llm_cache,
+            section_splitter=section_splitter,
+            scheduler=self.scheduler,
+            summary_mode=summary_mode,
+            section_batch_tokens=section_batch_tokens,
+        )
@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import math
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Iterator, Literal
+
+from pydantic import BaseModel, Field, model_validator
+
+from sds_digest.llms.pricing import MODEL_PRICES, ModelPrice
+from sds_digest.llms.structure_llm import SectionStructureLLM
+from sds_digest.llms.utils import PromptUsage
+from sds_digest.src.processing.processor import Section, StructuredSection
+from sds_digest.src.processing.splitter import ghs_section_number
+from sds_digest.src.telemetry import capture_cache_lookups, capture_usage, record_model_call
+
+
+RoutedStage = Literal["splitting", "section_structuring", "summary"]
+
+# Latencies kept per tier for the percentiles
+LATENCY_SAMPLES = 1000
+
+
+class ModelTier(BaseModel):
+    name: str = Field(..., description="Name the policy refers to the tier by, e.g. small or large")
+    provider: Literal["openai", "ollama"] = Field("openai", description="Provider serving the model")
+    model: str = Field(..., description="Model name")
+
+
+class RoutingPolicy(BaseModel):
+    """
+    Which model tier runs each pipeline stage and each GHS section.
+
+    Tiers are listed from cheapest to strongest. A section whose structured output
+    does not parse as JSON is retried on the next tier up, until one parses or the
+    strongest tier has tried.
+    """
+
+    tiers: list[ModelTier] = Field(..., min_length=1, description="Model tiers, cheapest first")
+    default_tier: str = Field(..., description="Tier for stages and sections without a rule")
+    stages: dict[RoutedStage, str] = Field(default_factory=dict, description="Tier per pipeline stage")
+    sections: dict[int, str] = Field(
+        default_factory=dict, description="Tier per GHS section number, overriding the section_structuring stage"
+    )
+    escalate_on_parse_failure: bool = Field(True, description="Retry unparseable sections on the next tier")
+
+    @model_validator(mode="after")
+    def _check_tier_names(self) -> RoutingPolicy:
+        names = [tier.name for tier in self.tiers]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Tier names must be unique: {names}")
+        referenced = {self.default_tier, *self.stages.values(), *self.sections.values()}
+        if unknown := referenced - set(names):
+            raise ValueError(f"Unknown tiers: {sorted(unknown)}")
+        return self
+
+    @classmethod
+    def single(cls, model: str, provider: Literal["openai", "ollama"] = "openai") -> RoutingPolicy:
+        """Every stage on one model, which is what the processor does without a policy."""
+        return cls(tiers=[ModelTier(name="default", provider=provider, model=model)], default_tier="default")
+
+    def tier(self, name: str) -> ModelTier:
+        return next(tier for tier in self.tiers if tier.name == name)
+
+    def tier_for_stage(self, stage: RoutedStage) -> ModelTier:
+        return self.tier(self.stages.get(stage, self.default_tier))
+
+    def tier_for_section(self, section: Section) -> ModelTier:
+        number = ghs_section_number(section.section_title)
+        if number is not None and number in self.sections:
+            return self.tier(self.sections[number])
+        return self.tier_for_stage("section_structuring")
+
+    def escalation(self, tier: ModelTier) -> ModelTier | None:
+        """The next stronger tier, None for the strongest."""
+        index = self.tiers.index(tier)
+        return self.tiers[index + 1] if index + 1 < len(self.tiers) else None
+
+    def fingerprint(self) -> str:
+        """Stable hash of the policy, so results of different routings are cached apart."""
+        return hashlib.sha256(self.model_dump_json().encode("utf-8")).hexdigest()[:12]
+
+
+class TierStats(BaseModel):
+    tier: str = Field(..., description="Tier name")
+    model: str = Field(..., description="Model of the tier")
+    calls: int = Field(..., description="Calls routed to the tier, including escalations to it")
+    errors: int = Field(..., description="Calls that raised")
+    cache_hits: int = Field(..., description="Lookups answered from the LLM response cache, one per section in a batch")
+    parse_failures: int = Field(..., description="Sections the tier did not structure as valid JSON")
+    escalations: int = Field(..., description="Sections retried on a stronger tier after a parse failure")
+    input_tokens: int = Field(..., description="Input tokens billed")
+    cached_tokens: int = Field(..., description="Input tokens served from the provider's prompt cache")
+    output_tokens: int = Field(..., description="Output tokens generated")
+    mean_latency_ms: float | None = Field(None, description="Mean call latency")
+    p95_latency_ms: float | None = Field(None, description="95th percentile call latency over the recent calls")
+    cost_usd: float | None = Field(None, description="Estimated cost, None if the model has no price")
+
+
+class _TierCounters:
+    def __init__(self, tier: ModelTier):
+        self.tier = tier
+        self.calls = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.parse_failures = 0
+        self.escalations = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.output_tokens = 0
+        self.total_seconds = 0.0
+        self.latencies: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+
+class TierCall:
+    """Outcome of one call on a tier, filled in by the caller while it is tracked; a batch counts per section."""
+
+    def __init__(self):
+        self.parse_failures = 0
+        self.escalations = 0
+
+
+class TierMetrics:
+    """Calls, tokens, latency and estimated cost per model tier, to tune a routing policy."""
+
+    def __init__(self, prices: dict[str, ModelPrice] = MODEL_PRICES):
+        self.prices = prices
+        self._tiers: dict[str, _TierCounters] = {}
+
+    @contextmanager
+    def track(self, tier: ModelTier) -> Iterator[TierCall]:
+        """Time the block and attribute the LLM usage and cache lookups recorded inside it to `tier`."""
+        call = TierCall()
+        started_at = time.perf_counter()
+        failed = True
+        with capture_usage() as usages, capture_cache_lookups() as cache_lookups:
+            try:
+                yield call
+                failed = False
+            finally:
+                self._record(tier, call, usages, cache_lookups, time.perf_counter() - started_at, failed)
+
+    def _record(
+        self,
+        tier: ModelTier,
+        call: TierCall,
+        usages: list[PromptUsage],
+        cache_lookups: list[bool],
+        elapsed: float,
+        failed: bool,
+    ) -> None:
+        counters = self._tiers.setdefault(tier.name, _TierCounters(tier))
+        counters.calls += 1
+        counters.errors += failed
+        counters.cache_hits += sum(cache_lookups)
+        counters.parse_failures += call.parse_failures
+        counters.escalations += call.escalations
+        for usage in usages:
+            counters.input_tokens += usage.prompt_tokens or 0
+            counters.cached_tokens += usage.cached_tokens or 0
+            counters.output_tokens += usage.completion_tokens or 0
+        counters.total_seconds += elapsed
+        counters.latencies.append(elapsed)
+        record_model_call(tier.name, tier.model)
+
+    def stats(self) -> list[TierStats]:
+        stats = []
+        for name, counters in self._tiers.items():
+            latencies = sorted(counters.latencies)
+            price = self.prices.get(counters.tier.model)
+            stats.append(TierStats(
+                tier=name,
+                model=counters.tier.model,
+                calls=counters.calls,
+                errors=counters.errors,
+                cache_hits=counters.cache_hits,
+                parse_failures=counters.parse_failures,
+                escalations=counters.escalations,
+                input_tokens=counters.input_tokens,
+                cached_tokens=counters.cached_tokens,
+                output_tokens=counters.output_tokens,
+                mean_latency_ms=counters.total_seconds / counters.calls * 1000 if counters.calls else None,
+                p95_latency_ms=latencies[max(math.ceil(0.95 * len(latencies)), 1) - 1] * 1000 if latencies else None,
+                cost_usd=price.cost(counters.input_tokens, counters.cached_tokens, counters.output_tokens)
+                if price is not None else None,
+            ))
+        return stats
+
+
+class RoutedSectionStructureLLM:
+    """
+    Structures each section on the tier its routing policy picks, escalating to a
+    stronger tier when the output does not parse as JSON.
+
+    Drop-in replacement for `SectionStructureLLM` in the processor.
+    """
+
+    def __init__(
+        self,
+        structurers: dict[str, SectionStructureLLM],
+        policy: RoutingPolicy,
+        metrics: TierMetrics | None = None,
+    ):
+        self.structurers = structurers
+        self.policy = policy
+        self.metrics = metrics or TierMetrics()
+
+    @property
+    def batch_token_budget(self) -> int | None:
+        budgets = [s.batch_token_budget for s in self.structurers.values() if s.batch_token_budget is not None]
+        return max(budgets) if budgets else None
+
+    def _next_tier(self, tier: ModelTier, failures: int, call: TierCall) -> ModelTier | None:
+        """Count `failures` unparseable sections on `call` and return the tier to retry them on, if any."""
+        call.parse_failures += failures
+        if not failures or not self.policy.escalate_on_parse_failure:
+            return None
+        next_tier = self.policy.escalation(tier)
+        if next_tier is not None:
+            call.escalations += failures
+        return next_tier
+
+    def structure_section(self, section: Section) -> StructuredSection:
+        tier = self.policy.tier_for_section(section)
+        while True:
+            structurer = self.structurers[tier.name]
+            with self.metrics.track(tier) as call:
+                response = structurer.structure_section_json(section)
+                next_tier = self._next_tier(tier, int(not isinstance(response, dict)), call)
+            if next_tier is None:
+                return structurer._maybe_json_to_structured_section(response, section)
+            print(f"Section {section.section_title!r} is not valid JSON from {tier.model}, retrying on {next_tier.model}")
+            tier = next_tier
+
+    async def astructure_section(self, section: Section) -> StructuredSection:
+        return await self._astructure_on(section, self.policy.tier_for_section(section))
+
+    async def _astructure_on(self, section: Section, tier: ModelTier) -> StructuredSection:
+        while True:
+            structurer = self.structurers[tier.name]
+            with self.metrics.track(tier) as call:
+                response = await structurer.astructure_section_json(section)
+                next_tier = self._next_tier(tier, int(not isinstance(response, dict)), call)
+            if next_tier is None:
+                return structurer._maybe_json_to_structured_section(response, section)
+            print(f"Section {section.section_title!r} is not valid JSON from {tier.model}, retrying on {next_tier.model}")
+            tier = next_tier
+
+    async def _astructure_group(self, sections: list[Section], tier: ModelTier) -> list[StructuredSection]:
+        structurer = self.structurers[tier.name]
+        with self.metrics.track(tier) as call:
+            responses = await structurer.astructure_sections_json(sections)
+            failures = sum(not isinstance(response, dict) for response in responses)
+            next_tier = self._next_tier(tier, failures, call)
+
+        async def finish(response: dict[str, Any] | str, section: Section) -> StructuredSection:
+            if isinstance(response, dict) or next_tier is None:
+                return structurer._maybe_json_to_structured_section(response, section)
+            print(f"Section {section.section_title!r} is not valid JSON from {tier.model}, retrying on {next_tier.model}")
+            return await self._astructure_on(section, next_tier)
+
+        return list(await asyncio.gather(*(finish(response, section) for response, section in zip(responses, sections))))
+
+    async def astructure_sections(self, sections: list[Section]) -> list[StructuredSection]:
+        """Batch the sections routed to each tier; a section that does not parse escalates on its own."""
+        groups: dict[str, list[int]] = {}
+        for index, section in enumerate(sections):
+            groups.setdefault(self.policy.tier_for_section(section).name, []).append(index)
+        group_results = await asyncio.gather(*(
+            self._astructure_group([sections[index] for index in indices], self.policy.tier(name))
+            for name, indices in groups.items()
+        ))
+        results: list[StructuredSection | None] = [None] * len(sections)
+        for indices, structured_sections in zip(groups.values(), group_results):
+            for index, structured_section in zip(indices, structured_sections):
+                results[index] = structured_section
+        return results
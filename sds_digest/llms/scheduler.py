@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager, nullcontext
+from enum import IntEnum
+from typing import Any, AsyncContextManager, AsyncIterator, Awaitable, Callable, TypeVar
+
+from llama_index.core.llms import ChatMessage
+from pydantic import BaseModel, Field
+
+from sds_digest.llms.utils import prompt_usage
+from sds_digest.src.telemetry import record_queue_wait, record_usage
+
+
+T = TypeVar("T")
+
+# Rough characters-per-token ratio used to budget a request before it is sent
+CHARS_PER_TOKEN = 4
+# Completion tokens reserved per request until the real usage is known
+OUTPUT_TOKENS_ESTIMATE = 1000
+
+
+class LLMPriority(IntEnum):
+    """Lower values are served first when calls wait for a free slot."""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class ModelBudget(BaseModel):
+    requests_per_minute: int | None = Field(None, description="Maximum requests started per minute, unlimited if None")
+    tokens_per_minute: int | None = Field(None, description="Maximum prompt + completion tokens per minute, unlimited if None")
+
+
+class ModelUsage(BaseModel):
+    requests_in_window: int = Field(..., description="Requests started in the current rate-limit window")
+    tokens_in_window: int = Field(..., description="Tokens used (or reserved) in the current rate-limit window")
+
+
+class LLMSchedulerMetrics(BaseModel):
+    max_concurrency: int = Field(..., description="Maximum number of in-flight LLM calls")
+    in_flight: int = Field(..., description="LLM calls currently running")
+    waiting_interactive: int = Field(..., description="Interactive calls waiting for a slot")
+    waiting_background: int = Field(..., description="Background calls waiting for a slot")
+    requests: int = Field(..., description="LLM calls started, including retries")
+    rate_limit_retries: int = Field(..., description="Calls retried after a rate-limit error")
+    throttled_seconds: float = Field(..., description="Total time calls waited for a model's budget")
+    models: dict[str, ModelUsage] = Field(default_factory=dict, description="Budget usage per model")
+
+
+def estimate_tokens(messages: list[ChatMessage], output_tokens: int = OUTPUT_TOKENS_ESTIMATE) -> int:
+    prompt_chars = sum(len(str(message.content or "")) for message in messages)
+    return prompt_chars // CHARS_PER_TOKEN + output_tokens
+
+
+def response_tokens(response: Any) -> int | None:
+    """Total tokens reported by the provider in a ChatResponse, if any."""
+    raw = getattr(response, "raw", None)
+    if raw is None:
+        return None
+    usage = raw.get("usage") if isinstance(raw, dict) else getattr(raw, "usage", None)
+    if usage is not None:
+        total = usage.get("total_tokens") if isinstance(usage, dict) else getattr(usage, "total_tokens", None)
+        return int(total) if total is not None else None
+    if isinstance(raw, dict) and "eval_count" in raw:
+        # Ollama reports prompt and completion counts separately
+        return int(raw.get("prompt_eval_count") or 0) + int(raw["eval_count"] or 0)
+    return None
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    return status_code == 429
+
+
+def _retry_after_seconds(error: BaseException) -> float | None:
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class _PrioritySlots:
+    """Counting semaphore that wakes the highest-priority (then oldest) waiter first."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.available = size
+        self._counter = itertools.count()
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+
+    def waiting(self, priority: LLMPriority) -> int:
+        return sum(1 for p, _, future in self._waiters if p == priority and not future.done())
+
+    async def acquire(self, priority: LLMPriority) -> None:
+        if self.available > 0 and not any(not future.done() for _, _, future in self._waiters):
+            self.available -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._counter), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before the cancellation
+                self.release()
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.available += 1
+
+
+class _Reservation:
+    def __init__(self, started_at: float, tokens: int):
+        self.started_at = started_at
+        self.tokens = tokens
+
+    def record(self, tokens: int | None) -> None:
+        if tokens is not None:
+            self.tokens = tokens
+
+
+class _ModelRateLimiter:
+    """Sliding-window request and token budget of a single model."""
+
+    def __init__(self, budget: ModelBudget, window_seconds: float):
+        self.budget = budget
+        self.window_seconds = window_seconds
+        self._reservations: deque[_Reservation] = deque()
+
+    def _prune(self, now: float) -> None:
+        while self._reservations and now - self._reservations[0].started_at >= self.window_seconds:
+            self._reservations.popleft()
+
+    def usage(self) -> ModelUsage:
+        self._prune(time.monotonic())
+        return ModelUsage(
+            requests_in_window=len(self._reservations),
+            tokens_in_window=sum(reservation.tokens for reservation in self._reservations),
+        )
+
+    def _fits(self, tokens: int) -> bool:
+        if not self._reservations:
+            # A single request larger than the budget must still go through eventually
+            return True
+        rpm, tpm = self.budget.requests_per_minute, self.budget.tokens_per_minute
+        if rpm is not None and len(self._reservations) >= rpm:
+            return False
+        used = sum(reservation.tokens for reservation in self._reservations)
+        return tpm is None or used + tokens <= tpm
+
+    async def reserve(self, tokens: int) -> tuple[_Reservation, float]:
+        throttled = 0.0
+        while True:
+            now = time.monotonic()
+            self._prune(now)
+            if self._fits(tokens):
+                reservation = _Reservation(now, tokens)
+                self._reservations.append(reservation)
+                return reservation, throttled
+            wait = self.window_seconds - (now - self._reservations[0].started_at)
+            throttled += wait
+            await asyncio.sleep(wait)
+
+    def restart(self, reservation: _Reservation) -> None:
+        """Count the reservation from now, when its call actually starts."""
+        self._reservations.remove(reservation)
+        reservation.started_at = time.monotonic()
+        self._reservations.append(reservation)
+
+    def cancel(self, reservation: _Reservation) -> None:
+        if reservation in self._reservations:
+            self._reservations.remove(reservation)
+
+
+class LLMScheduler:
+    """
+    Process-wide gate for every LLM call.
+
+    At most `max_concurrency` calls run at once; waiting interactive calls (`/ask`)
+    get a free slot before background processing. Each model has its own
+    requests-per-minute and tokens-per-minute budget over a sliding window, with
+    token usage reserved from an estimate and corrected from the reported usage.
+    Rate-limit (429) errors are retried up to `max_retries` times with full-jitter
+    exponential backoff, honouring Retry-After when the provider sends it.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        default_budget: ModelBudget | None = None,
+        model_budgets: dict[str, ModelBudget] | None = None,
+        max_retries: int = 5,
+        base_backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        window_seconds: float = 60.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.default_budget = default_budget or ModelBudget()
+        self.model_budgets = model_budgets or {}
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.window_seconds = window_seconds
+        self.requests = 0
+        self.rate_limit_retries = 0
+        self.throttled_seconds = 0.0
+        self._slots = _PrioritySlots(max_concurrency)
+        self._limiters: dict[str, _ModelRateLimiter] = {}
+
+    def _limiter(self, model: str) -> _ModelRateLimiter:
+        if model not in self._limiters:
+            budget = self.model_budgets.get(model, self.default_budget)
+            self._limiters[model] = _ModelRateLimiter(budget, self.window_seconds)
+        return self._limiters[model]
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        model: str,
+        estimated_tokens: int = 0,
+        priority: LLMPriority = LLMPriority.BACKGROUND,
+    ) -> AsyncIterator[_Reservation]:
+        """Hold a concurrency slot and a share of the model's budget for one call."""
+        started_at = time.monotonic()
+        limiter = self._limiter(model)
+        # Wait for the model's budget before taking a slot, so a throttled model never holds slots other models need
+        reservation, throttled = await limiter.reserve(estimated_tokens)
+        self.throttled_seconds += throttled
+        try:
+            await self._slots.acquire(priority)
+        except BaseException:
+            limiter.cancel(reservation)
+            raise
+        try:
+            limiter.restart(reservation)
+            self.requests += 1
+            record_queue_wait(time.monotonic() - started_at)
+            yield reservation
+        finally:
+            self._slots.release()
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        delay = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+        retry_after = _retry_after_seconds(error)
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    async def run(
+        self,
+        model: str,
+        call: Callable[[], Awaitable[T]],
+        estimated_tokens: int = 0,
+        priority: LLMPriority = LLMPriority.BACKGROUND,
+    ) -> T:
+        attempt = 0
+        while True:
+            async with self.slot(model, estimated_tokens, priority) as reservation:
+                try:
+                    result = await call()
+                except Exception as e:
+                    if not is_rate_limit_error(e) or attempt >= self.max_retries:
+                        raise
+                    self.rate_limit_retries += 1
+                    delay = self._backoff(attempt, e)
+                    print(f"Rate limited by {model}, retrying in {delay:.1f}s")
+                else:
+                    reservation.record(response_tokens(result))
+                    return result
+            # Back off without holding the slot so other calls keep flowing
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def metrics(self) -> LLMSchedulerMetrics:
+        return LLMSchedulerMetrics(
+            max_concurrency=self.max_concurrency,
+            in_flight=self._slots.size - self._slots.available,
+            waiting_interactive=self._slots.waiting(LLMPriority.INTERACTIVE),
+            waiting_background=self._slots.waiting(LLMPriority.BACKGROUND),
+            requests=self.requests,
+            rate_limit_retries=self.rate_limit_retries,
+            throttled_seconds=self.throttled_seconds,
+            models={model: limiter.usage() for model, limiter in self._limiters.items()},
+        )
+
+
+async def run_scheduled(
+    scheduler: LLMScheduler | None,
+    model: str,
+    call: Callable[[], Awaitable[T]],
+    messages: list[ChatMessage],
+    priority: LLMPriority = LLMPriority.BACKGROUND,
+) -> T:
+    """Run an async LLM call through `scheduler`, or directly when there is none."""
+    if scheduler is None:
+        result = await call()
+    else:
+        result = await scheduler.run(model, call, estimate_tokens(messages), priority)
+    record_usage(prompt_usage(result))
+    return result
+
+
+def stream_slot(
+    scheduler: LLMScheduler | None,
+    model: str,
+    messages: list[ChatMessage],
+    priority: LLMPriority = LLMPriority.BACKGROUND,
+) -> AsyncContextManager[Any]:
+    """Scheduler slot for a streamed LLM call, held until the last chunk; streams are not retried."""
+    if scheduler is None:
+        return nullcontext()
+    return scheduler.slot(model, estimate_tokens(messages), priority)
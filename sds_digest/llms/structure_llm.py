@@ -1,6 +1,8 @@
 from __future__ import annotations
+import asyncio
+import html
 import json
-from typing import Any
+from typing import Any, AsyncIterator
 
 from llama_index.core.llms import ChatMessage, ChatResponse
 from llama_index.llms.openai import OpenAI
@@ -8,8 +10,16 @@ from llama_index.llms.ollama import Ollama
 from llama_index.core.prompts import RichPromptTemplate
 
 from sds_digest.src.secrets import Secrets
-from sds_digest.llms.prompts import STRUCTURED_SDS_SYSTEM_PROMPT, STRUCTURE_SECTION_PROMPT
-from sds_digest.llms.utils import from_chat_response_to_model
+from sds_digest.llms.scheduler import CHARS_PER_TOKEN, LLMPriority, LLMScheduler, run_scheduled, stream_slot
+from sds_digest.llms.cache import LLMResponseCache
+from sds_digest.llms.json_repair import ParsedJSON, parse_json
+from sds_digest.llms.prompts import (
+    STRUCTURED_SDS_SYSTEM_PROMPT,
+    STRUCTURE_SECTION_PROMPT,
+    STRUCTURE_SECTIONS_BATCH_PROMPT,
+)
+from sds_digest.llms.utils import as_dict, from_chat_response_to_model, partial_items
+from sds_digest.src.telemetry import record_cache_hit, record_cache_lookups, record_json_parse
 from sds_digest.src.processing.processor import (
     Section,
     StructuredSection,
@@ -20,26 +30,46 @@ from sds_digest.src.processing.processor import (
 
 
 class SDSStructureLLM:
+    priority = LLMPriority.BACKGROUND
+
     def __init__(
         self,
         llm: OpenAI | Ollama,
         system_prompt: RichPromptTemplate = STRUCTURED_SDS_SYSTEM_PROMPT,
+        cache: LLMResponseCache | None = None,
+        scheduler: LLMScheduler | None = None,
         **kwargs,
     ):
         self.llm = llm
         self.structured_llm = self.llm.as_structured_llm(Sections)
         self.system_prompt = system_prompt
+        self.scheduler = scheduler
+        self.cache = cache
 
 
     @classmethod
-    def from_openai(cls, model: str = "gpt-4o", **kwargs) -> SDSStructureLLM:
+    def from_openai(cls, model: str = "gpt-4o", cache: LLMResponseCache | None = None, scheduler: LLMScheduler | None = None, **kwargs) -> SDSStructureLLM:
         llm = OpenAI(model=model, api_key=Secrets().openai_api_key, **kwargs)
-        return cls(llm=llm, **kwargs)
+        return cls(llm=llm, cache=cache, scheduler=scheduler, **kwargs)
 
     @classmethod
-    def from_ollama(cls, model: str = "gpt-oss:latest", **kwargs) -> SDSStructureLLM:
+    def from_ollama(cls, model: str = "gpt-oss:latest", cache: LLMResponseCache | None = None, scheduler: LLMScheduler | None = None, **kwargs) -> SDSStructureLLM:
         llm = Ollama(model=model, **kwargs)
-        return cls(llm=llm, **kwargs)
+        return cls(llm=llm, cache=cache, scheduler=scheduler, **kwargs)
+
+    def _cache_key(self, text: str) -> str:
+        return LLMResponseCache.make_key(text, self.system_prompt.template_str, self.llm.model)
+
+    def _cached_sections(self, key: str) -> Sections | None:
+        if self.cache is None:
+            return None
+        cached = self.cache.get(key)
+        record_cache_hit(cached is not None)
+        return Sections.model_validate_json(cached) if cached is not None else None
+
+    def _cache_sections(self, key: str, sections: Sections) -> None:
+        if self.cache is not None:
+            self.cache.put(key, sections.model_dump_json())
 
     def _build_messages(self, text: str) -> list[ChatMessage]:
         return [
@@ -48,45 +78,142 @@ class SDSStructureLLM:
         ]
 
     def extract_sections(self, text: str) -> Sections:
+        key = self._cache_key(text)
+        if (cached := self._cached_sections(key)) is not None:
+            return cached
         print(f"Extracting sections...")
         messages = self._build_messages(text)
         response: ChatResponse = self.structured_llm.chat(messages=messages)
         try:
-            return from_chat_response_to_model(response, Sections)
+            sections = from_chat_response_to_model(response, Sections)
         except Exception as e:
             print(f"Error converting chat response to model: {e}")
             raise e
+        self._cache_sections(key, sections)
+        return sections
 
     async def aextract_sections(self, text: str) -> Sections:
+        key = self._cache_key(text)
+        if (cached := self._cached_sections(key)) is not None:
+            return cached
         print(f"Extracting sections...")
         messages = self._build_messages(text)
-        response: ChatResponse = await self.structured_llm.achat(messages=messages)
+        response: ChatResponse = await run_scheduled(
+            self.scheduler, self.llm.model, lambda: self.structured_llm.achat(messages=messages), messages, self.priority
+        )
+        try:
+            sections = from_chat_response_to_model(response, Sections)
+        except Exception as e:
+            print(f"Error converting chat response to model: {e}")
+            raise e
+        self._cache_sections(key, sections)
+        return sections
+
+    async def astream_sections(self, text: str) -> AsyncIterator[Section]:
+        """
+        Yield sections while the LLM is still generating the rest of the document.
+
+        A section is complete as soon as the next one appears in the partial output;
+        the last one is taken from the final, fully validated response.
+        """
+        key = self._cache_key(text)
+        if (cached := self._cached_sections(key)) is not None:
+            for section in cached.sections:
+                yield section
+            return
+        print(f"Extracting sections (streaming)...")
+        messages = self._build_messages(text)
+        emitted = 0
+        streaming = True
+        response: ChatResponse | None = None
+        async with stream_slot(self.scheduler, self.llm.model, messages, self.priority):
+            async for response in await self.structured_llm.astream_chat(messages=messages):
+                partial_sections = partial_items(response.raw, "sections")
+                while streaming and emitted < len(partial_sections) - 1:
+                    try:
+                        section = Section.model_validate(as_dict(partial_sections[emitted]))
+                    except ValueError:
+                        # Leave the remaining sections to the final response
+                        streaming = False
+                        break
+                    emitted += 1
+                    yield section
+        if response is None:
+            raise ValueError("LLM returned an empty stream")
         try:
-            return from_chat_response_to_model(response, Sections)
+            sections = from_chat_response_to_model(response, Sections)
         except Exception as e:
             print(f"Error converting chat response to model: {e}")
             raise e
+        for section in sections.sections[emitted:]:
+            yield section
+        self._cache_sections(key, sections)
 
 
 class SectionStructureLLM:
+    """
+    Structures one section into free-form JSON.
+
+    With `json_mode` the provider is asked for a JSON object (OpenAI `response_format`,
+    Ollama `format=json`). Output that still does not parse, e.g. because it was cut off,
+    is repaired; if that fails too, only this section is asked again, up to
+    `max_parse_retries` times, before the raw text is kept.
+
+    With a `batch_token_budget`, `astructure_sections` packs consecutive sections up to
+    that many content tokens into one request answered with a JSON object keyed by
+    section. Sections missing from the answer are structured one by one.
+    """
+
+    priority = LLMPriority.BACKGROUND
+
     def __init__(
         self,
         llm: OpenAI | Ollama,
         system_prompt: RichPromptTemplate = STRUCTURE_SECTION_PROMPT,
+        cache: LLMResponseCache | None = None,
+        scheduler: LLMScheduler | None = None,
+        json_mode: bool = True,
+        max_parse_retries: int = 1,
+        batch_prompt: RichPromptTemplate = STRUCTURE_SECTIONS_BATCH_PROMPT,
+        batch_token_budget: int | None = None,
         **kwargs,
     ):
         self.llm = llm
         self.system_prompt = system_prompt
+        self.scheduler = scheduler
+        self.cache = cache
+        self.json_mode = json_mode
+        self.max_parse_retries = max_parse_retries
+        self.batch_prompt = batch_prompt
+        self.batch_token_budget = batch_token_budget
 
     @classmethod
-    def from_openai(cls, model: str = "gpt-4o", **kwargs) -> SectionStructureLLM:
+    def from_openai(cls, model: str = "gpt-4o", cache: LLMResponseCache | None = None, scheduler: LLMScheduler | None = None, batch_token_budget: int | None = None, **kwargs) -> SectionStructureLLM:
         llm = OpenAI(model=model, api_key=Secrets().openai_api_key, **kwargs)
-        return cls(llm=llm, **kwargs)
+        return cls(llm=llm, cache=cache, scheduler=scheduler, batch_token_budget=batch_token_budget, **kwargs)
 
     @classmethod
-    def from_ollama(cls, model: str = "gpt-oss:latest", **kwargs) -> SectionStructureLLM:
+    def from_ollama(cls, model: str = "gpt-oss:latest", cache: LLMResponseCache | None = None, scheduler: LLMScheduler | None = None, batch_token_budget: int | None = None, **kwargs) -> SectionStructureLLM:
         llm = Ollama(model=model, **kwargs)
-        return cls(llm=llm, **kwargs)
+        return cls(llm=llm, cache=cache, scheduler=scheduler, batch_token_budget=batch_token_budget, **kwargs)
+
+    def _cache_key(self, section: Section) -> str:
+        return LLMResponseCache.make_key(section.raw_content_of_section, self.system_prompt.template_str, self.llm.model)
+
+    def _lookup_json(self, key: str) -> dict[str, Any] | None:
+        cached = self.cache.get(key) if self.cache is not None else None
+        return json.loads(cached) if cached is not None else None
+
+    def _cached_json(self, key: str) -> dict[str, Any] | None:
+        cached = self._lookup_json(key)
+        if self.cache is not None:
+            record_cache_hit(cached is not None)
+        return cached
+
+    def _cache_json(self, key: str, response: dict[str, Any] | str) -> None:
+        # Only well-formed JSON is cached; a failed parse should be retried next time
+        if self.cache is not None and isinstance(response, dict):
+            self.cache.put(key, json.dumps(response))
 
     def _format_prompt(self, text: str) -> str:
         return self.system_prompt.format(section_content=text)
@@ -97,16 +224,54 @@ class SectionStructureLLM:
             ChatMessage(role="system", content=prompt),
             ChatMessage(role="user", content="Please structure the given section content into a valid JSON representation"),
         ]
-    
-    def _response_to_json(self, response: ChatResponse) -> dict[str, Any] | str:
+
+    def _chat_kwargs(self) -> dict[str, Any]:
+        if not self.json_mode:
+            return {}
+        if isinstance(self.llm, Ollama):
+            return {"format": "json"}
+        if isinstance(self.llm, OpenAI):
+            # The content is free-form, so JSON mode rather than a JSON schema
+            return {"response_format": {"type": "json_object"}}
+        return {}
+
+    def _retry_messages(self, messages: list[ChatMessage], response: ChatResponse) -> list[ChatMessage]:
+        # Same prefix as the first attempt, so the provider's prompt cache still applies
+        return [
+            *messages,
+            ChatMessage(role="assistant", content=response.message.content),
+            ChatMessage(role="user", content="That was not a valid JSON object. Reply with only the complete JSON object."),
+        ]
+
+    def _parse_json_object(self, content: str, allow_truncated: bool = False) -> ParsedJSON | None:
+        """The content as a JSON object, or None (counted as invalid) if it is unusable."""
         try:
-            # remove ```json\n and \n``` from the response
-            response_content = response.message.content.replace("```json\n", "").replace("\n```", "")
-            json_response = json.loads(response_content)
-            return json_response
-        except Exception as e:
+            parsed = parse_json(content)
+        except ValueError as e:
             print(f"Error converting chat response to JSON: {e}")
-            return response.message.content
+            record_json_parse("invalid")
+            return None
+        if not isinstance(parsed.value, dict):
+            print(f"Chat response is JSON but not an object: {type(parsed.value).__name__}")
+            record_json_parse("invalid")
+            return None
+        if not parsed.complete and not allow_truncated:
+            # Closing a cut-off answer would silently drop its end
+            print("Chat response is cut off JSON")
+            record_json_parse("invalid")
+            return None
+        if not parsed.value:
+            print("Chat response is an empty JSON object")
+            record_json_parse("invalid")
+            return None
+        record_json_parse("repaired" if parsed.repaired else "valid")
+        return parsed
+
+    def _accept_json(self, key: str, parsed: ParsedJSON) -> dict[str, Any]:
+        # Repaired output is used once but never cached, so the next run asks the model again
+        if not parsed.repaired:
+            self._cache_json(key, parsed.value)
+        return parsed.value
 
     def _maybe_json_to_structured_section(self, response: dict[str, Any] | str, section: Section) -> StructuredSection:
         match response:
@@ -120,20 +285,141 @@ class SectionStructureLLM:
             structured_content=structured_content,
         )
 
-    def structure_section(self, section: Section) -> StructuredSection:
+    def structure_section_json(self, section: Section) -> dict[str, Any] | str:
+        """The section as parsed JSON, or the raw model output if it did not parse."""
+        key = self._cache_key(section)
+        if (cached := self._cached_json(key)) is not None:
+            return cached
         print(f"Structuring section: {section.section_title}")
         messages = self._build_messages(section.raw_content_of_section)
-        response: ChatResponse = self.llm.chat(messages=messages)
-        return self._maybe_json_to_structured_section(
-            self._response_to_json(response),
-            section,
-        )
+        for attempt in range(self.max_parse_retries + 1):
+            if attempt:
+                print(f"Retrying section {section.section_title!r}, attempt {attempt + 1}")
+            response: ChatResponse = self.llm.chat(messages=messages, **self._chat_kwargs())
+            if (parsed := self._parse_json_object(response.message.content or "")) is not None:
+                return self._accept_json(key, parsed)
+            messages = self._retry_messages(messages, response)
+        return response.message.content or ""
 
-    async def astructure_section(self, section: Section) -> StructuredSection:
+    async def astructure_section_json(self, section: Section, skip_cache_lookup: bool = False) -> dict[str, Any] | str:
+        """
+        The section as parsed JSON, or the raw model output if it did not parse.
+
+        `skip_cache_lookup` is for callers that already missed the cache for this section.
+        """
+        key = self._cache_key(section)
+        if not skip_cache_lookup and (cached := self._cached_json(key)) is not None:
+            return cached
         print(f"Structuring section: {section.section_title}")
         messages = self._build_messages(section.raw_content_of_section)
-        response: ChatResponse = await self.llm.achat(messages=messages)
-        return self._maybe_json_to_structured_section(
-            self._response_to_json(response),
-            section,
+        for attempt in range(self.max_parse_retries + 1):
+            if attempt:
+                print(f"Retrying section {section.section_title!r}, attempt {attempt + 1}")
+            response: ChatResponse = await run_scheduled(
+                self.scheduler,
+                self.llm.model,
+                lambda: self.llm.achat(messages=messages, **self._chat_kwargs()),
+                messages,
+                self.priority,
+            )
+            if (parsed := self._parse_json_object(response.message.content or "")) is not None:
+                return self._accept_json(key, parsed)
+            messages = self._retry_messages(messages, response)
+        return response.message.content or ""
+
+    def structure_section(self, section: Section) -> StructuredSection:
+        return self._maybe_json_to_structured_section(self.structure_section_json(section), section)
+
+    async def astructure_section(self, section: Section) -> StructuredSection:
+        return self._maybe_json_to_structured_section(await self.astructure_section_json(section), section)
+
+    def batches(self, sections: list[Section]) -> list[list[Section]]:
+        """
+        Consecutive sections packed up to `batch_token_budget` estimated content tokens.
+
+        A section over the budget gets a batch of its own; without a budget every
+        section does.
+        """
+        if self.batch_token_budget is None:
+            return [[section] for section in sections]
+        batches: list[list[Section]] = []
+        current: list[Section] = []
+        current_tokens = 0
+        for section in sections:
+            tokens = len(section.raw_content_of_section) // CHARS_PER_TOKEN
+            if current and current_tokens + tokens > self.batch_token_budget:
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(section)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _build_batch_messages(self, sections: list[Section]) -> list[ChatMessage]:
+        rendered = "\n\n".join(
+            f'<section id="{_batch_id(index)}" title="{html.escape(section.section_title, quote=True)}">\n{section.raw_content_of_section}\n</section>'
+            for index, section in enumerate(sections)
+        )
+        return [
+            ChatMessage(role="system", content=self.batch_prompt.format(sections=rendered)),
+            ChatMessage(
+                role="user",
+                content="Please structure each given section into a valid JSON representation, in one JSON object keyed by section id",
+            ),
+        ]
+
+    async def _astructure_batch_json(self, sections: list[Section]) -> list[dict[str, Any] | str]:
+        if len(sections) == 1:
+            return [await self.astructure_section_json(sections[0], skip_cache_lookup=True)]
+        print(f"Structuring {len(sections)} sections in one call: {', '.join(s.section_title for s in sections)}")
+        messages = self._build_batch_messages(sections)
+        response: ChatResponse = await run_scheduled(
+            self.scheduler,
+            self.llm.model,
+            lambda: self.llm.achat(messages=messages, **self._chat_kwargs()),
+            messages,
+            self.priority,
         )
+        parsed = self._parse_json_object(response.message.content or "", allow_truncated=True)
+        keyed = parsed.value if parsed is not None else {}
+        if parsed is not None and not parsed.complete and keyed:
+            # A cut-off answer ends inside its last section, which is redone on its own
+            keyed.pop(next(reversed(keyed)))
+        present = [index for index in range(len(sections)) if isinstance(keyed.get(_batch_id(index)), dict) and keyed[_batch_id(index)]]
+        results: list[dict[str, Any] | str | None] = [None] * len(sections)
+        for index in present:
+            # Same key as single-section calls, so either path reuses the other's results
+            results[index] = self._accept_json(
+                self._cache_key(sections[index]), ParsedJSON(keyed[_batch_id(index)], repaired=parsed.repaired)
+            )
+        missing = [index for index in range(len(sections)) if results[index] is None]
+        if missing:
+            print(f"{len(missing)} of {len(sections)} batched sections were not structured, retrying them one by one")
+            fallbacks = await asyncio.gather(*(self.astructure_section_json(sections[index], skip_cache_lookup=True) for index in missing))
+            for index, fallback in zip(missing, fallbacks):
+                results[index] = fallback
+        return results
+
+    async def astructure_sections_json(self, sections: list[Section]) -> list[dict[str, Any] | str]:
+        """Like `astructure_section_json` for each section, batching the ones not in the cache."""
+        results: list[dict[str, Any] | str | None] = [self._lookup_json(self._cache_key(section)) for section in sections]
+        if self.cache is not None:
+            hits = sum(result is not None for result in results)
+            record_cache_lookups(hits, len(sections) - hits)
+        pending = [section for section, result in zip(sections, results) if result is None]
+        batch_results = await asyncio.gather(*(self._astructure_batch_json(batch) for batch in self.batches(pending)))
+        # Batches are consecutive runs of the pending sections, so their results line up in order
+        computed = iter(result for batch_result in batch_results for result in batch_result)
+        return [result if result is not None else next(computed) for result in results]
+
+    async def astructure_sections(self, sections: list[Section]) -> list[StructuredSection]:
+        responses = await self.astructure_sections_json(sections)
+        return [
+            self._maybe_json_to_structured_section(response, section)
+            for response, section in zip(responses, sections)
+        ]
+
+
+def _batch_id(index: int) -> str:
+    return f"section_{index + 1}"
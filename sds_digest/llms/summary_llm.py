@@ -1,33 +1,50 @@
 from __future__ import annotations
 
+from typing import AsyncIterator
+
 from llama_index.core.llms import ChatMessage, ChatResponse
 from llama_index.llms.ollama import Ollama
 from llama_index.llms.openai import OpenAI
 from llama_index.core.prompts import RichPromptTemplate
 
 from sds_digest.src.secrets import Secrets
-from sds_digest.llms.prompts import FULL_SDS_SYSTEM_PROMPT
+from sds_digest.llms.scheduler import LLMPriority, LLMScheduler, run_scheduled, stream_slot
+from sds_digest.llms.prompts import FULL_SDS_SYSTEM_PROMPT, SECTIONS_SUMMARY_PROMPT
+from sds_digest.llms.utils import prompt_usage, stream_usage_kwargs
+from sds_digest.src.processing.processor import StructuredSections
+from sds_digest.src.processing.summary_renderer import render_summary
+from sds_digest.src.telemetry import record_usage
 
 
 class SummaryLLM:
+    priority = LLMPriority.BACKGROUND
+
     def __init__(
         self,
         llm: OpenAI | Ollama,
         system_prompt: RichPromptTemplate = FULL_SDS_SYSTEM_PROMPT,
+        sections_prompt: RichPromptTemplate = SECTIONS_SUMMARY_PROMPT,
+        scheduler: LLMScheduler | None = None,
+        priority: LLMPriority | None = None,
         **kwargs,
     ):
         self.llm = llm
         self.system_prompt = system_prompt
+        self.sections_prompt = sections_prompt
+        self.scheduler = scheduler
+        if priority is not None:
+            # Summaries requested by a user waiting on them are served like /ask
+            self.priority = priority
 
     @classmethod
-    def from_openai(cls, model: str = "gpt-4o", **kwargs) -> SummaryLLM:
+    def from_openai(cls, model: str = "gpt-4o", scheduler: LLMScheduler | None = None, **kwargs) -> SummaryLLM:
         llm = OpenAI(model=model, api_key=Secrets().openai_api_key, **kwargs)
-        return cls(llm=llm, **kwargs)
+        return cls(llm=llm, scheduler=scheduler, **kwargs)
 
     @classmethod
-    def from_ollama(cls, model: str = "gpt-oss:latest", **kwargs) -> SummaryLLM:
+    def from_ollama(cls, model: str = "gpt-oss:latest", scheduler: LLMScheduler | None = None, **kwargs) -> SummaryLLM:
         llm = Ollama(model=model, **kwargs)
-        return cls(llm=llm, **kwargs)
+        return cls(llm=llm, scheduler=scheduler, **kwargs)
 
     def _format_prompt(self, sds_info: str) -> str:
         return self.system_prompt.format(sds_info=sds_info)
@@ -39,6 +56,14 @@ class SummaryLLM:
             ChatMessage(role="user", content=f"Please provide a summary of the chemical substance described in the given Safety Data Sheet"),
         ]
 
+    def _build_sections_messages(self, structured_sections: StructuredSections) -> list[ChatMessage]:
+        # Section summaries and key fields instead of the full markdown, a fraction of the input tokens
+        system_content = self.sections_prompt.format(sds_digest=render_summary(structured_sections))
+        return [
+            ChatMessage(role="system", content=system_content),
+            ChatMessage(role="user", content="Please provide a summary of the chemical substance described in the given Safety Data Sheet"),
+        ]
+
     def summarize(self, sds_info: str) -> str:
         messages = self._build_messages(sds_info)
         response: ChatResponse = self.llm.chat(messages=messages)
@@ -46,6 +71,43 @@ class SummaryLLM:
 
     async def asummarize(self, sds_info: str) -> str:
         messages = self._build_messages(sds_info)
-        response: ChatResponse = await self.llm.achat(messages=messages)
+        response: ChatResponse = await run_scheduled(
+            self.scheduler, self.llm.model, lambda: self.llm.achat(messages=messages), messages, self.priority
+        )
+        return response.message.content
+
+    def summarize_sections(self, structured_sections: StructuredSections) -> str:
+        messages = self._build_sections_messages(structured_sections)
+        response: ChatResponse = self.llm.chat(messages=messages)
+        return response.message.content
+
+    async def asummarize_sections(self, structured_sections: StructuredSections) -> str:
+        messages = self._build_sections_messages(structured_sections)
+        response: ChatResponse = await run_scheduled(
+            self.scheduler, self.llm.model, lambda: self.llm.achat(messages=messages), messages, self.priority
+        )
         return response.message.content
 
+    async def _astream(self, messages: list[ChatMessage], priority: LLMPriority | None) -> AsyncIterator[str]:
+        response: ChatResponse | None = None
+        async with stream_slot(self.scheduler, self.llm.model, messages, priority if priority is not None else self.priority):
+            async for response in await self.llm.astream_chat(messages=messages, **stream_usage_kwargs(self.llm)):
+                if response.delta:
+                    yield response.delta
+        if response is not None:
+            # The usage comes with the last chunk
+            record_usage(prompt_usage(response))
+
+    async def astream_summary(self, sds_info: str, priority: LLMPriority | None = None) -> AsyncIterator[str]:
+        """Yield the summary piece by piece as the model generates it."""
+        async for delta in self._astream(self._build_messages(sds_info), priority):
+            yield delta
+
+    async def astream_summary_sections(
+        self,
+        structured_sections: StructuredSections,
+        priority: LLMPriority | None = None,
+    ) -> AsyncIterator[str]:
+        """Like `astream_summary`, from the structured sections instead of the full document."""
+        async for delta in self._astream(self._build_sections_messages(structured_sections), priority):
+            yield delta
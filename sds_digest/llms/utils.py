@@ -1,5 +1,50 @@
-from pydantic import BaseModel
+from typing import Any
+
+from pydantic import BaseModel, Field
 from llama_index.core.llms import ChatResponse
+from llama_index.llms.openai import OpenAI
 
 def from_chat_response_to_model(chat_response: ChatResponse, model: BaseModel) -> BaseModel:
     return model.model_validate_json(chat_response.message.content)
+
+
+class PromptUsage(BaseModel):
+    prompt_tokens: int | None = Field(None, description="Input tokens billed for the request")
+    cached_tokens: int | None = Field(None, description="Input tokens served from the provider's prompt cache")
+    completion_tokens: int | None = Field(None, description="Output tokens generated for the request")
+
+
+def _get(value: Any, name: str) -> Any:
+    return value.get(name) if isinstance(value, dict) else getattr(value, name, None)
+
+
+def as_dict(value: Any) -> Any:
+    """A pydantic model as a dict; anything else as is."""
+    return value.model_dump() if hasattr(value, "model_dump") else value
+
+
+def partial_items(partial_output: Any, field: str) -> list[Any]:
+    """Items of the list `field` parsed so far from a partial structured output (a model or a plain dict)."""
+    return list(_get(partial_output, field) or [])
+
+
+def stream_usage_kwargs(llm: Any) -> dict[str, Any]:
+    """Chat kwargs that make OpenAI report usage in the last chunk of a stream; Ollama always does."""
+    return {"stream_options": {"include_usage": True}} if isinstance(llm, OpenAI) else {}
+
+
+def prompt_usage(chat_response: ChatResponse) -> PromptUsage:
+    """Token counts reported by OpenAI (`usage`) or Ollama (`prompt_eval_count`, `eval_count`)."""
+    raw = chat_response.raw
+    if raw is None:
+        return PromptUsage()
+    usage = _get(raw, "usage")
+    if usage is not None:
+        details = _get(usage, "prompt_tokens_details")
+        return PromptUsage(
+            prompt_tokens=_get(usage, "prompt_tokens"),
+            cached_tokens=_get(details, "cached_tokens") if details is not None else None,
+            completion_tokens=_get(usage, "completion_tokens"),
+        )
+    # Ollama only reports the prompt tokens it had to evaluate; KV-cache hits are not counted
+    return PromptUsage(prompt_tokens=_get(raw, "prompt_eval_count"), completion_tokens=_get(raw, "eval_count"))
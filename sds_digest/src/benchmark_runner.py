@@ -0,0 +1,286 @@
+"""Parallel, resumable benchmark of QA models against the benchmark questions."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import time
+from pathlib import Path
+
+from pydantic import BaseModel, Field
+
+from sds_digest.llms.pricing import MODEL_PRICES, ModelPrice
+from sds_digest.llms.qa_llm import RenderedPromptCache
+from sds_digest.llms.registry import LLMClientRegistry, LLMProvider
+from sds_digest.llms.scheduler import LLMScheduler, ModelBudget
+from sds_digest.src.benchmark_models import BenchmarkQuestion, BenchmarkQuestions
+from sds_digest.src.settings import SETTINGS
+
+
+DEFAULT_QUESTIONS_PATH = Path(__file__).parent / "benchmark_questions.json"
+
+
+class BenchmarkResult(BaseModel):
+    sds: str = Field(..., description="Name of the SDS document")
+    model: str = Field(..., description="QA model that answered")
+    question_id: int = Field(..., description="Benchmark question ID")
+    question: str = Field(..., description="The asked question")
+    answer: str | None = Field(None, description="Answer of the QA model")
+    correct: bool | None = Field(None, description="Judgment of the answer, None if it failed")
+    reason: str | None = Field(None, description="Reason given by the judge")
+    error: str | None = Field(None, description="Why the question could not be answered or judged")
+    latency_ms: float | None = Field(None, description="Time to answer the question")
+    judge_latency_ms: float | None = Field(None, description="Time to judge the answer")
+    prompt_tokens: int | None = Field(None, description="Input tokens of the answer")
+    cached_tokens: int | None = Field(None, description="Input tokens served from the prompt cache")
+    completion_tokens: int | None = Field(None, description="Output tokens of the answer")
+
+    @property
+    def key(self) -> tuple[str, str, int]:
+        return self.sds, self.model, self.question_id
+
+
+class ModelReport(BaseModel):
+    model: str = Field(..., description="QA model")
+    questions: int = Field(..., description="Questions asked across all SDS documents")
+    correct: int = Field(..., description="Answers judged correct")
+    errors: int = Field(..., description="Questions that failed to be answered or judged")
+    accuracy: float = Field(..., description="Share of judged answers that are correct")
+    p50_latency_ms: float | None = Field(None, description="Median time to answer")
+    p95_latency_ms: float | None = Field(None, description="95th percentile time to answer")
+    prompt_tokens: int = Field(..., description="Total input tokens")
+    cached_tokens: int = Field(..., description="Total input tokens served from the prompt cache")
+    completion_tokens: int = Field(..., description="Total output tokens")
+    cost_usd: float | None = Field(None, description="Estimated cost of the answers, None if the model has no price")
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    """Nearest-rank percentile, `q` in 0..100."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def load_checkpoint(path: Path) -> dict[tuple[str, str, int], BenchmarkResult]:
+    """Successful results already written to `path`; failed ones are run again."""
+    results: dict[tuple[str, str, int], BenchmarkResult] = {}
+    if not path.exists():
+        return results
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = BenchmarkResult.model_validate_json(line)
+            except ValueError:
+                # A line cut short by an interrupted run
+                continue
+            if result.error is None:
+                results[result.key] = result
+            else:
+                results.pop(result.key, None)
+    return results
+
+
+def build_report(results: list[BenchmarkResult], prices: dict[str, ModelPrice] = MODEL_PRICES) -> list[ModelReport]:
+    reports = []
+    for model in sorted({result.model for result in results}):
+        model_results = [result for result in results if result.model == model]
+        judged = [result for result in model_results if result.correct is not None]
+        correct = sum(1 for result in judged if result.correct)
+        latencies = [result.latency_ms for result in model_results if result.latency_ms is not None]
+        prompt_tokens = sum(result.prompt_tokens or 0 for result in model_results)
+        cached_tokens = sum(result.cached_tokens or 0 for result in model_results)
+        completion_tokens = sum(result.completion_tokens or 0 for result in model_results)
+        price = prices.get(model)
+        reports.append(ModelReport(
+            model=model,
+            questions=len(model_results),
+            correct=correct,
+            errors=sum(1 for result in model_results if result.error is not None),
+            accuracy=correct / len(judged) if judged else 0.0,
+            p50_latency_ms=percentile(latencies, 50),
+            p95_latency_ms=percentile(latencies, 95),
+            prompt_tokens=prompt_tokens,
+            cached_tokens=cached_tokens,
+            completion_tokens=completion_tokens,
+            cost_usd=price.cost(prompt_tokens, cached_tokens, completion_tokens) if price is not None else None,
+        ))
+    return reports
+
+
+def format_report(reports: list[ModelReport]) -> str:
+    def ms(value: float | None) -> str:
+        return f"{value:.0f}" if value is not None else "-"
+
+    lines = [
+        f"{'model':<24} {'accuracy':>8} {'correct':>9} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'prompt tok':>11} {'cached tok':>11} {'output tok':>11} {'cost $':>9}"
+    ]
+    for report in reports:
+        cost = f"{report.cost_usd:.4f}" if report.cost_usd is not None else "-"
+        lines.append(
+            f"{report.model:<24} {report.accuracy:>8.1%} {f'{report.correct}/{report.questions}':>9} {report.errors:>6} "
+            f"{ms(report.p50_latency_ms):>8} {ms(report.p95_latency_ms):>8} {report.prompt_tokens:>11} "
+            f"{report.cached_tokens:>11} {report.completion_tokens:>11} {cost:>9}"
+        )
+    return "\n".join(lines)
+
+
+class BenchmarkRunner:
+    """
+    Answers and judges every question for every SDS document and QA model.
+
+    Up to `concurrency` questions are in flight at once, each answered with `aanswer`
+    and then judged with `ajudge`. Every result is appended to the JSONL checkpoint as
+    soon as it is ready, and results already in the checkpoint are not run again.
+    """
+
+    def __init__(
+        self,
+        registry: LLMClientRegistry,
+        checkpoint_path: Path,
+        judge_model: str = "gpt-4o",
+        provider: LLMProvider = "openai",
+        concurrency: int = 8,
+    ):
+        self.registry = registry
+        self.checkpoint_path = Path(checkpoint_path)
+        self.judge_model = judge_model
+        self.provider = provider
+        self.concurrency = concurrency
+        # Renders each document's system prompt once for all models and questions
+        self.prompt_cache = RenderedPromptCache()
+
+    async def _run_one(self, sds: str, markdown: str, model: str, question: BenchmarkQuestion) -> BenchmarkResult:
+        result = BenchmarkResult(sds=sds, model=model, question_id=question.id, question=question.question)
+        qa_llm = self.registry.qa_llm(model=model, provider=self.provider, prompt_cache=self.prompt_cache)
+        judge_llm = self.registry.judge_llm(model=self.judge_model, provider=self.provider)
+        try:
+            started_at = time.perf_counter()
+            qa_answer = await qa_llm.aanswer_with_usage(question.question, markdown, sds_id=sds)
+            result.latency_ms = (time.perf_counter() - started_at) * 1000
+            result.answer = qa_answer.answer
+            result.prompt_tokens = qa_answer.prompt_tokens
+            result.cached_tokens = qa_answer.cached_tokens
+            result.completion_tokens = qa_answer.completion_tokens
+
+            started_at = time.perf_counter()
+            judgment = await judge_llm.ajudge(qa_answer.answer, question.description_of_correct_answer)
+            result.judge_latency_ms = (time.perf_counter() - started_at) * 1000
+            result.correct = judgment.correctness
+            result.reason = judgment.reason
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+        return result
+
+    async def arun(
+        self,
+        documents: dict[str, str],
+        models: list[str],
+        questions: BenchmarkQuestions,
+    ) -> list[BenchmarkResult]:
+        done = load_checkpoint(self.checkpoint_path)
+        pending = [
+            (sds, markdown, model, question)
+            for sds, markdown in documents.items()
+            for model in models
+            for question in questions.questions
+            if (sds, model, question.id) not in done
+        ]
+        print(f"{len(done)} results loaded from {self.checkpoint_path}, {len(pending)} to run")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_bounded(sds: str, markdown: str, model: str, question: BenchmarkQuestion) -> BenchmarkResult:
+            async with semaphore:
+                return await self._run_one(sds, markdown, model, question)
+
+        results = list(done.values())
+        tasks = [asyncio.create_task(run_bounded(*item)) for item in pending]
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with open(self.checkpoint_path, "a", encoding="utf-8") as checkpoint:
+                for finished, next_done in enumerate(asyncio.as_completed(tasks), 1):
+                    result = await next_done
+                    checkpoint.write(result.model_dump_json() + "\n")
+                    checkpoint.flush()
+                    results.append(result)
+                    status = result.error or ("correct" if result.correct else "wrong")
+                    print(f"[{finished}/{len(pending)}] {result.model} {result.sds} #{result.question_id}: {status}")
+        finally:
+            for task in tasks:
+                task.cancel()
+        return results
+
+
+def load_documents(paths: list[str]) -> dict[str, str]:
+    """SDS markdown keyed by file name; PDFs are extracted with marker first."""
+    documents = {}
+    for path in map(Path, paths):
+        if path.suffix.lower() == ".pdf":
+            # Imported lazily: loading the marker models is only worth it for PDFs
+            from sds_digest.src.extraction.marker_extractor import MarkerExtractor
+            documents[path.name] = MarkerExtractor().extract_pdf(str(path)).content
+        else:
+            documents[path.name] = path.read_text(encoding="utf-8")
+    return documents
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="sds-digest-bench",
+        description="Answer and judge the benchmark questions for SDS documents and QA models.",
+    )
+    parser.add_argument("sds", nargs="+", help="SDS documents: extracted markdown files or PDFs")
+    parser.add_argument("--models", nargs="+", default=[SETTINGS.qa_model], help="QA models to benchmark")
+    parser.add_argument("--judge-model", default="gpt-4o", help="Model judging the answers")
+    parser.add_argument("--provider", choices=["openai", "ollama"], default=SETTINGS.llm_provider)
+    parser.add_argument("--questions", default=str(DEFAULT_QUESTIONS_PATH), help="Benchmark questions JSON file")
+    parser.add_argument("--concurrency", type=int, default=8, help="Questions answered and judged at the same time")
+    parser.add_argument("--output", default="benchmark_results.jsonl", help="JSONL checkpoint, resumed if it exists")
+    return parser.parse_args(argv)
+
+
+async def amain(args: argparse.Namespace) -> list[ModelReport]:
+    questions = BenchmarkQuestions.from_json_file(args.questions)
+    documents = await asyncio.to_thread(load_documents, args.sds)
+    scheduler = LLMScheduler(
+        max_concurrency=args.concurrency * 2,
+        default_budget=ModelBudget(
+            requests_per_minute=SETTINGS.llm_requests_per_minute,
+            tokens_per_minute=SETTINGS.llm_tokens_per_minute,
+        ),
+        model_budgets=SETTINGS.llm_model_budgets,
+        max_retries=SETTINGS.llm_max_retries,
+    )
+    registry = LLMClientRegistry(
+        scheduler=scheduler,
+        ollama_base_url=SETTINGS.ollama_base_url,
+        ollama_keep_alive=SETTINGS.ollama_keep_alive,
+        timeout=SETTINGS.llm_http_timeout,
+    )
+    await registry.astart()
+    try:
+        runner = BenchmarkRunner(
+            registry,
+            checkpoint_path=Path(args.output),
+            judge_model=args.judge_model,
+            provider=args.provider,
+            concurrency=args.concurrency,
+        )
+        results = await runner.arun(documents, args.models, questions)
+    finally:
+        await registry.aclose()
+    selected = {(sds, model) for sds in documents for model in args.models}
+    return build_report([result for result in results if (result.sds, result.model) in selected])
+
+
+def main(argv: list[str] | None = None) -> None:
+    reports = asyncio.run(amain(parse_args(argv)))
+    print(format_report(reports))
+
+
+if __name__ == "__main__":
+    main()
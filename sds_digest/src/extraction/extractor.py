@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from pydantic import BaseModel, Field
 
@@ -11,3 +12,7 @@ class Extractor(ABC):
     @abstractmethod
     def extract_pdf(self, pdf_path: str) -> ExtractedPdf:
         raise NotImplementedError
+
+    async def aextract_pdf(self, pdf_path: str) -> ExtractedPdf:
+        # Default: keep the event loop free by running the blocking conversion in a thread
+        return await asyncio.to_thread(self.extract_pdf, pdf_path)
@@ -4,11 +4,11 @@ from marker.converters.pdf import PdfConverter
 from marker.models import create_model_dict
 from marker.output import text_from_rendered
 
-from sds_digest.src.extraction.extractor import ExtractedPdf
+from sds_digest.src.extraction.extractor import ExtractedPdf, Extractor
 
 
 
-class MarkerExtractor:
+class MarkerExtractor(Extractor):
 
     def __init__(self, artifact_dict: dict[str, Any] | None = None):
         self.converter = PdfConverter(
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+from marker.models import create_model_dict
+from pydantic import BaseModel, Field
+
+from sds_digest.src.extraction.extractor import ExtractedPdf
+from sds_digest.src.extraction.marker_extractor import MarkerExtractor
+from sds_digest.src.telemetry import record_queue_wait
+
+
+class ExtractorPoolTimeout(Exception):
+    """Raised when no extractor becomes available within the acquire timeout."""
+
+
+class ExtractorPoolMetrics(BaseModel):
+    size: int = Field(..., description="Number of extractors managed by the pool")
+    available: int = Field(..., description="Extractors currently idle")
+    in_use: int = Field(..., description="Extractors currently checked out")
+    waiting: int = Field(..., description="Requests currently waiting for an extractor")
+    acquisitions: int = Field(..., description="Total successful acquisitions")
+    timeouts: int = Field(..., description="Total acquisitions that timed out")
+    total_wait_seconds: float = Field(..., description="Accumulated time spent waiting for an extractor")
+    max_wait_seconds: float = Field(..., description="Longest single wait for an extractor")
+    avg_wait_seconds: float = Field(..., description="Average wait per successful acquisition")
+    job_timeouts: int = Field(0, description="Extraction jobs that exceeded the per-job timeout")
+    crashes: int = Field(0, description="Extraction jobs whose worker process died")
+    restarts: int = Field(0, description="Worker pool restarts after a timeout or crash")
+
+
+class MarkerExtractorPool:
+    """
+    Fixed-size pool of warm MarkerExtractor instances.
+
+    The marker models are loaded once via `create_model_dict()` and the resulting
+    `artifact_dict` is shared by all converters in the pool. Extractors are handed out
+    per request through `acquire()`, which waits at most `acquire_timeout` seconds.
+    """
+
+    def __init__(self, size: int = 2, acquire_timeout: float | None = 120.0):
+        if size < 1:
+            raise ValueError("Extractor pool size must be at least 1")
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self.artifact_dict: dict[str, Any] | None = None
+        self._available: asyncio.Queue[MarkerExtractor] | None = None
+        self._start_lock = asyncio.Lock()
+        self._waiting = 0
+        self._acquisitions = 0
+        self._timeouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    @property
+    def started(self) -> bool:
+        return self._available is not None
+
+    def _load(self) -> list[MarkerExtractor]:
+        self.artifact_dict = create_model_dict()
+        return [MarkerExtractor(artifact_dict=self.artifact_dict) for _ in range(self.size)]
+
+    async def astart(self) -> None:
+        """Load the models once and fill the pool. Safe to call repeatedly."""
+        async with self._start_lock:
+            if self.started:
+                return
+            print(f"Loading marker models for {self.size} extractors...")
+            extractors = await asyncio.to_thread(self._load)
+            available: asyncio.Queue[MarkerExtractor] = asyncio.Queue()
+            for extractor in extractors:
+                available.put_nowait(extractor)
+            self._available = available
+
+    async def aclose(self) -> None:
+        async with self._start_lock:
+            self._available = None
+            self.artifact_dict = None
+
+    @asynccontextmanager
+    async def acquire(self, timeout: float | None = None) -> AsyncIterator[MarkerExtractor]:
+        await self.astart()
+        timeout = self.acquire_timeout if timeout is None else timeout
+        available = self._available
+        started_at = time.perf_counter()
+        self._waiting += 1
+        try:
+            extractor = await asyncio.wait_for(available.get(), timeout)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            raise ExtractorPoolTimeout(f"No extractor available after {timeout} seconds") from None
+        finally:
+            self._waiting -= 1
+        self._record_wait(time.perf_counter() - started_at)
+        try:
+            yield extractor
+        finally:
+            available.put_nowait(extractor)
+
+    async def aextract_pdf(self, pdf_path: str) -> ExtractedPdf:
+        async with self.acquire() as extractor:
+            return await asyncio.to_thread(extractor.extract_pdf, pdf_path)
+
+    def _record_wait(self, wait: float) -> None:
+        record_queue_wait(wait)
+        self._acquisitions += 1
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+
+    def metrics(self) -> ExtractorPoolMetrics:
+        available = self._available.qsize() if self._available is not None else 0
+        return ExtractorPoolMetrics(
+            size=self.size,
+            available=available,
+            in_use=self.size - available if self.started else 0,
+            waiting=self._waiting,
+            acquisitions=self._acquisitions,
+            timeouts=self._timeouts,
+            total_wait_seconds=self._total_wait,
+            max_wait_seconds=self._max_wait,
+            avg_wait_seconds=self._total_wait / self._acquisitions if self._acquisitions else 0.0,
+        )
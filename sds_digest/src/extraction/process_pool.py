@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures import wait as wait_futures
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.queues import SimpleQueue
+from typing import Callable, Iterable
+
+from sds_digest.src.extraction.extractor import ExtractedPdf, Extractor
+from sds_digest.src.extraction.marker_extractor import MarkerExtractor
+from sds_digest.src.extraction.pool import ExtractorPoolMetrics, ExtractorPoolTimeout
+from sds_digest.src.telemetry import record_queue_wait
+
+
+class ExtractionTimeout(Exception):
+    """Raised when a single extraction job exceeds the per-job timeout."""
+
+
+class ExtractionWorkerCrashed(Exception):
+    """Raised when extraction workers keep dying while processing a job."""
+
+
+# Per-process extractor, created once by the pool initializer so every worker keeps warm models
+_WORKER_EXTRACTOR: Extractor | None = None
+
+
+def _init_worker(extractor_factory: Callable[[], Extractor], pids: SimpleQueue) -> None:
+    global _WORKER_EXTRACTOR
+    # Reported so a stuck worker can be terminated without reaching into the executor
+    pids.put(os.getpid())
+    _WORKER_EXTRACTOR = extractor_factory()
+
+
+def _ping_worker() -> None:
+    return None
+
+
+def _extract_in_worker(pdf_path: str) -> tuple[float, ExtractedPdf]:
+    started_at = time.time()
+    return started_at, _WORKER_EXTRACTOR.extract_pdf(pdf_path)
+
+
+def _terminate(pids: Iterable[int]) -> None:
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+
+def _reap(pids: set[int], others: set[Future], timeout: float | None) -> None:
+    # Jobs still running on a retired pool finish first, or hit their own timeout
+    wait_futures(others, timeout=timeout)
+    _terminate(pids)
+
+
+class ProcessPoolExtractor(Extractor):
+    """
+    Extractor backend that runs conversions on a pool of worker processes.
+
+    Each worker builds its own extractor (marker models included) once at startup, so
+    extraction is CPU-parallel across cores and never runs on the API event loop.
+    A job that exceeds `job_timeout` fails alone: new jobs go to a fresh pool while the
+    old one finishes its other jobs, then its workers, the stuck one included, are
+    terminated. A job whose worker dies is retried on a fresh pool up to `max_retries` times.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        job_timeout: float | None = 300.0,
+        acquire_timeout: float | None = 120.0,
+        max_retries: int = 1,
+        extractor_factory: Callable[[], Extractor] = MarkerExtractor,
+        mp_context: str = "spawn",
+    ):
+        if max_workers < 1:
+            raise ValueError("Extraction worker count must be at least 1")
+        self.max_workers = max_workers
+        self.job_timeout = job_timeout
+        self.acquire_timeout = acquire_timeout
+        self.max_retries = max_retries
+        self.extractor_factory = extractor_factory
+        self.mp_context = mp_context
+        self._executor: ProcessPoolExecutor | None = None
+        self._worker_pids: SimpleQueue | None = None
+        self._pids: set[int] = set()
+        # Jobs submitted to the current executor and not done yet; done callbacks run on executor threads
+        self._futures: set[Future] = set()
+        self._futures_lock = threading.Lock()
+        self._generation = 0
+        self._slots: asyncio.Semaphore | None = None
+        self._in_flight = 0
+        self._waiting = 0
+        self._jobs = 0
+        self._timeouts = 0
+        self._job_timeouts = 0
+        self._crashes = 0
+        self._restarts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+        context = multiprocessing.get_context(self.mp_context)
+        self._worker_pids = context.SimpleQueue()
+        self._pids = set()
+        self._futures = set()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.extractor_factory, self._worker_pids),
+        )
+        self._generation += 1
+
+    async def astart(self) -> None:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        if self.started:
+            return
+        self.start()
+        # Workers are spawned on demand; submitting one no-op per worker loads every model up front
+        await asyncio.gather(
+            *[asyncio.wrap_future(self._executor.submit(_ping_worker)) for _ in range(self.max_workers)]
+        )
+
+    def _collect_pids(self) -> set[int]:
+        while self._worker_pids is not None and not self._worker_pids.empty():
+            self._pids.add(self._worker_pids.get())
+        return set(self._pids)
+
+    def shutdown(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        # Running jobs cannot be cancelled, so stuck workers have to be terminated
+        _terminate(self._collect_pids())
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def aclose(self) -> None:
+        self.shutdown()
+        self._slots = None
+
+    def _restart(self, generation: int) -> None:
+        # Several failing jobs may observe the same broken pool; only restart it once
+        if generation != self._generation:
+            return
+        print(f"Restarting extraction worker pool (generation {generation})")
+        self._restarts += 1
+        self.shutdown()
+        self.start()
+
+    def _retire(self, generation: int, stuck: Future) -> None:
+        """Send new jobs to a fresh pool; the old one drains its other jobs before its workers are terminated."""
+        if generation != self._generation:
+            # Already retired because of another stuck job; its reaper waits for this one too
+            return
+        print(f"Retiring extraction worker pool (generation {generation}) after a job timeout")
+        self._restarts += 1
+        with self._futures_lock:
+            others = self._futures - {stuck}
+        executor, pids = self._executor, self._collect_pids()
+        self._executor = None
+        self.start()
+        executor.shutdown(wait=False)
+        threading.Thread(target=_reap, args=(pids, others, self.job_timeout), daemon=True).start()
+
+    def _submit(self, pdf_path: str) -> tuple[int, Future]:
+        self.start()
+        future = self._executor.submit(_extract_in_worker, pdf_path)
+        futures = self._futures
+        with self._futures_lock:
+            futures.add(future)
+
+        def forget(done: Future) -> None:
+            with self._futures_lock:
+                futures.discard(done)
+
+        future.add_done_callback(forget)
+        return self._generation, future
+
+    def _record_job(self, submitted_at: float, started_at: float) -> None:
+        wait = max(0.0, started_at - submitted_at)
+        record_queue_wait(wait)
+        self._jobs += 1
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+
+    def extract_pdf(self, pdf_path: str) -> ExtractedPdf:
+        for attempt in range(self.max_retries + 1):
+            submitted_at = time.time()
+            generation, future = self._submit(pdf_path)
+            try:
+                started_at, extracted_pdf = future.result(timeout=self.job_timeout)
+            except FutureTimeoutError:
+                self._job_timeouts += 1
+                self._retire(generation, future)
+                raise ExtractionTimeout(f"Extraction of {pdf_path} exceeded {self.job_timeout} seconds") from None
+            except BrokenProcessPool:
+                self._crashes += 1
+                self._restart(generation)
+                continue
+            self._record_job(submitted_at, started_at)
+            return extracted_pdf
+        raise ExtractionWorkerCrashed(f"Extraction worker crashed {self.max_retries + 1} times on {pdf_path}")
+
+    async def aextract_pdf(self, pdf_path: str) -> ExtractedPdf:
+        await self.astart()
+        slots = self._slots
+        self._waiting += 1
+        acquire_started_at = time.monotonic()
+        try:
+            await asyncio.wait_for(slots.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            raise ExtractorPoolTimeout(f"No extraction worker available after {self.acquire_timeout} seconds") from None
+        finally:
+            self._waiting -= 1
+        record_queue_wait(time.monotonic() - acquire_started_at)
+        self._in_flight += 1
+        try:
+            for attempt in range(self.max_retries + 1):
+                submitted_at = time.time()
+                generation, future = self._submit(pdf_path)
+                try:
+                    started_at, extracted_pdf = await asyncio.wait_for(asyncio.wrap_future(future), self.job_timeout)
+                except asyncio.TimeoutError:
+                    self._job_timeouts += 1
+                    self._retire(generation, future)
+                    raise ExtractionTimeout(f"Extraction of {pdf_path} exceeded {self.job_timeout} seconds") from None
+                except BrokenProcessPool:
+                    self._crashes += 1
+                    self._restart(generation)
+                    continue
+                self._record_job(submitted_at, started_at)
+                return extracted_pdf
+            raise ExtractionWorkerCrashed(f"Extraction worker crashed {self.max_retries + 1} times on {pdf_path}")
+        finally:
+            self._in_flight -= 1
+            slots.release()
+
+    def metrics(self) -> ExtractorPoolMetrics:
+        return ExtractorPoolMetrics(
+            size=self.max_workers,
+            available=self.max_workers - self._in_flight,
+            in_use=self._in_flight,
+            waiting=self._waiting,
+            acquisitions=self._jobs,
+            timeouts=self._timeouts,
+            total_wait_seconds=self._total_wait,
+            max_wait_seconds=self._max_wait,
+            avg_wait_seconds=self._total_wait / self._jobs if self._jobs else 0.0,
+            job_timeouts=self._job_timeouts,
+            crashes=self._crashes,
+            restarts=self._restarts,
+        )
@@ -0,0 +1,432 @@
+"""Bulk ingestion of SDS PDFs from directories and zip archives into the SDS store."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import shutil
+import tempfile
+import time
+import uuid
+import zipfile
+from pathlib import Path
+from typing import Literal, NamedTuple, Protocol
+
+from pydantic import BaseModel, Field
+
+from sds_digest.api.persistence import PERSISTENCE, Persistence
+from sds_digest.api.persistence import UPLOAD_CHUNK_SIZE
+from sds_digest.api.result_cache import ResultCache
+from sds_digest.api.storage import SDSStore, SQLiteSDSStore
+from sds_digest.llms.cache import LLMResponseCache
+from sds_digest.llms.registry import LLMClientRegistry
+from sds_digest.llms.scheduler import LLMScheduler, ModelBudget
+from sds_digest.src.extraction.extractor import ExtractedPdf
+from sds_digest.src.extraction.process_pool import ProcessPoolExtractor
+from sds_digest.src.processing.llm_processor import LLMSafetyDataSheetProcessor
+from sds_digest.src.processing.processor import ProcessedSafetyDataSheet
+from sds_digest.src.settings import SETTINGS
+from sds_digest.src.telemetry import TRACER, Stage
+
+
+IngestStage = Literal["extraction", "processing"]
+
+
+class AsyncExtractor(Protocol):
+    async def aextract_pdf(self, pdf_path: str) -> ExtractedPdf: ...
+
+
+class IngestFailure(BaseModel):
+    source: str = Field(..., description="PDF that could not be ingested")
+    content_hash: str = Field(..., description="SHA-256 of the PDF bytes, empty if they could not be read")
+    stage: IngestStage = Field(..., description="Stage that kept failing")
+    attempts: int = Field(..., description="Attempts made before quarantining the PDF")
+    error: str = Field(..., description="Last error")
+
+
+class IngestSummary(BaseModel):
+    total: int = Field(..., description="PDFs found in the sources")
+    processed: int = Field(..., description="PDFs extracted, processed and stored")
+    skipped: int = Field(..., description="PDFs already processed before, by content hash")
+    duplicates: int = Field(..., description="PDFs with the same content as another one in this batch")
+    failed: int = Field(..., description="PDFs quarantined after exhausting their retries")
+    seconds: float = Field(..., description="Wall time of the batch")
+    docs_per_second: float = Field(..., description="PDFs handled (processed, skipped or failed) per second")
+
+
+class _Extracted(NamedTuple):
+    source: Path
+    content_hash: str
+    extracted_pdf: ExtractedPdf
+
+
+def collect_pdfs(sources: list[Path], staging_dir: Path) -> list[Path]:
+    """PDFs in the given files, directories (recursively) and zip archives; archives are unpacked into `staging_dir`."""
+    pdfs: list[Path] = []
+    for source in sources:
+        if source.is_dir():
+            pdfs.extend(sorted(path for path in source.rglob("*") if path.is_file() and path.suffix.lower() == ".pdf"))
+        elif source.suffix.lower() == ".zip":
+            with zipfile.ZipFile(source) as archive:
+                members = [member for member in archive.infolist() if member.filename.lower().endswith(".pdf")]
+                for index, member in enumerate(members):
+                    # Never trust member paths from the archive; keep only the file name
+                    target = staging_dir / f"{source.stem}-{index:06d}-{Path(member.filename).name}"
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    with archive.open(member) as src, open(target, "wb") as dst:
+                        shutil.copyfileobj(src, dst, UPLOAD_CHUNK_SIZE)
+                    pdfs.append(target)
+        elif source.suffix.lower() == ".pdf":
+            pdfs.append(source)
+        else:
+            raise ValueError(f"Not a PDF, directory or zip archive: {source}")
+    return pdfs
+
+
+def sha256_of_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+class IngestProgress:
+    """Counts finished PDFs and prints throughput and ETA at most every `interval` seconds."""
+
+    def __init__(self, total: int, interval: float = 5.0):
+        self.total = total
+        self.interval = interval
+        self.processed = 0
+        self.skipped = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.started_at = time.monotonic()
+        self._reported_at = self.started_at
+
+    @property
+    def done(self) -> int:
+        return self.processed + self.skipped + self.duplicates + self.failed
+
+    def line(self) -> str:
+        elapsed = time.monotonic() - self.started_at
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = format_duration((self.total - self.done) / rate) if rate > 0 else "?"
+        return (
+            f"[{self.done}/{self.total}] {rate:.2f} docs/s, ETA {eta} - "
+            f"{self.processed} processed, {self.skipped + self.duplicates} skipped, {self.failed} failed"
+        )
+
+    def update(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if force or now - self._reported_at >= self.interval:
+            self._reported_at = now
+            print(self.line())
+
+    def summary(self) -> IngestSummary:
+        seconds = time.monotonic() - self.started_at
+        return IngestSummary(
+            total=self.total,
+            processed=self.processed,
+            skipped=self.skipped,
+            duplicates=self.duplicates,
+            failed=self.failed,
+            seconds=seconds,
+            docs_per_second=self.done / seconds if seconds > 0 else 0.0,
+        )
+
+
+class BulkIngestor:
+    """
+    Two-stage ingestion pipeline for large batches of SDS PDFs.
+
+    `extraction_concurrency` workers hash each PDF, skip content that was already
+    processed (by an ingest or an upload with the same processor, mode and `provider`,
+    which share result cache keys) and extract the rest; `llm_concurrency` workers run the LLM processor on the extracted markdown.
+    A bounded queue between the stages keeps extraction from racing ahead of the LLM.
+    Failing stages are retried with exponential backoff; a PDF that keeps failing is
+    copied to `quarantine_dir` and listed in its `failures.jsonl`, and the batch goes on.
+    With `lazy`, documents are only split; the API structures and summarizes them on first access.
+    """
+
+    def __init__(
+        self,
+        extractor: AsyncExtractor,
+        processor: LLMSafetyDataSheetProcessor,
+        sds_store: SDSStore,
+        result_cache: ResultCache,
+        quarantine_dir: Path,
+        persistence: Persistence = PERSISTENCE,
+        extraction_concurrency: int = 2,
+        llm_concurrency: int = 4,
+        max_retries: int = 2,
+        retry_backoff: float = 2.0,
+        skip_processed: bool = True,
+        progress_interval: float = 5.0,
+        lazy: bool = False,
+        provider: str = "openai",
+    ):
+        self.extractor = extractor
+        self.processor = processor
+        self.sds_store = sds_store
+        self.result_cache = result_cache
+        self.quarantine_dir = Path(quarantine_dir)
+        self.persistence = persistence
+        self.extraction_concurrency = extraction_concurrency
+        self.llm_concurrency = llm_concurrency
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.skip_processed = skip_processed
+        self.progress_interval = progress_interval
+        self.lazy = lazy
+        self.provider = provider
+
+    def _cache_key(self, content_hash: str) -> str:
+        return ResultCache.make_key(
+            content_hash,
+            self.processor.processor_identifier,
+            "lazy" if self.lazy else "eager",
+            self.provider,
+        )
+
+    async def _with_retries(self, stage: IngestStage, source: Path, call):
+        """Run `call`, retrying failures; returns (result, None) or (None, (attempts, last error))."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await call(), None
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                if attempt < self.max_retries:
+                    delay = self.retry_backoff * 2 ** attempt
+                    print(f"{stage.capitalize()} of {source.name} failed ({error}), retrying in {delay:.0f}s")
+                    await asyncio.sleep(delay)
+        return None, (self.max_retries + 1, error)
+
+    def _quarantine(self, failure: IngestFailure) -> None:
+        self.quarantine_dir.mkdir(parents=True, exist_ok=True)
+        source = Path(failure.source)
+        # Without a hash the PDF could not be read, so there is nothing to copy
+        if failure.content_hash and source.exists():
+            shutil.copyfile(source, self.quarantine_dir / f"{failure.content_hash[:12]}-{source.name}")
+        with open(self.quarantine_dir / "failures.jsonl", "a", encoding="utf-8") as f:
+            f.write(failure.model_dump_json() + "\n")
+        print(f"Quarantined {source.name} after {failure.attempts} failed {failure.stage} attempts: {failure.error}")
+
+    def _fail(
+        self,
+        source: Path,
+        content_hash: str,
+        stage: IngestStage,
+        failure: tuple[int, str],
+        progress: IngestProgress,
+    ) -> None:
+        attempts, error = failure
+        self._quarantine(IngestFailure(
+            source=str(source), content_hash=content_hash, stage=stage, attempts=attempts, error=error,
+        ))
+        progress.failed += 1
+        progress.update()
+
+    def _skip(self, content_hash: str) -> bool:
+        """Whether this content was processed before; re-registers the stored result if the store lost it."""
+        if not self.skip_processed:
+            return False
+        cached = self.result_cache.get(self._cache_key(content_hash))
+        if cached is None:
+            return False
+        if cached.sds_id not in self.sds_store:
+            self.sds_store.put(cached.sds_id, cached.processed_sds)
+        return True
+
+    async def _extraction_worker(
+        self,
+        sources: asyncio.Queue[Path],
+        extracted: asyncio.Queue[_Extracted | None],
+        seen_hashes: set[str],
+        progress: IngestProgress,
+    ) -> None:
+        while not sources.empty():
+            source = sources.get_nowait()
+            content_hash, failure = await self._with_retries(
+                "extraction", source, lambda: asyncio.to_thread(sha256_of_file, source),
+            )
+            if failure is not None:
+                self._fail(source, "", "extraction", failure, progress)
+                continue
+            if content_hash in seen_hashes:
+                progress.duplicates += 1
+                progress.update()
+                continue
+            # Claim the content before the next await so a concurrent copy counts as a duplicate
+            seen_hashes.add(content_hash)
+            skip, failure = await self._with_retries(
+                "extraction", source, lambda: asyncio.to_thread(self._skip, content_hash),
+            )
+            if failure is not None:
+                self._fail(source, content_hash, "extraction", failure, progress)
+                continue
+            if skip:
+                progress.skipped += 1
+                progress.update()
+                continue
+
+            async def extract() -> ExtractedPdf:
+                with TRACER.span(Stage.EXTRACTION, source=source.name):
+                    return await self.extractor.aextract_pdf(str(source))
+
+            extracted_pdf, failure = await self._with_retries("extraction", source, extract)
+            if failure is None:
+                await extracted.put(_Extracted(source, content_hash, extracted_pdf))
+            else:
+                self._fail(source, content_hash, "extraction", failure, progress)
+
+    async def _llm_worker(self, extracted: asyncio.Queue[_Extracted | None], progress: IngestProgress) -> None:
+        while (item := await extracted.get()) is not None:
+            # Fixed across retries, so a retry after a partial store overwrites it instead of leaving an orphan
+            sds_id = str(uuid.uuid4())
+
+            async def process_and_store() -> None:
+                process = self.processor.asplit if self.lazy else self.processor.aprocess
+                processed_sds = await process(item.extracted_pdf)
+                await self.persistence.asave_extracted_markdown(sds_id, item.extracted_pdf.content)
+                await asyncio.to_thread(self._store, sds_id, item, processed_sds)
+
+            _, failure = await self._with_retries("processing", item.source, process_and_store)
+            if failure is None:
+                progress.processed += 1
+                progress.update()
+            else:
+                self._fail(item.source, item.content_hash, "processing", failure, progress)
+
+    def _store(self, sds_id: str, item: _Extracted, processed_sds: ProcessedSafetyDataSheet) -> None:
+        self.persistence.save_pdf(sds_id, item.source)
+        self.sds_store.put(sds_id, processed_sds)
+        self.result_cache.put(self._cache_key(item.content_hash), sds_id, processed_sds)
+
+    async def arun(self, pdfs: list[Path]) -> IngestSummary:
+        progress = IngestProgress(len(pdfs), interval=self.progress_interval)
+        sources: asyncio.Queue[Path] = asyncio.Queue()
+        for pdf in pdfs:
+            sources.put_nowait(pdf)
+        extracted: asyncio.Queue[_Extracted | None] = asyncio.Queue(maxsize=self.llm_concurrency)
+        seen_hashes: set[str] = set()
+        llm_workers = [
+            asyncio.create_task(self._llm_worker(extracted, progress)) for _ in range(self.llm_concurrency)
+        ]
+        try:
+            await asyncio.gather(*(
+                self._extraction_worker(sources, extracted, seen_hashes, progress)
+                for _ in range(self.extraction_concurrency)
+            ))
+            for _ in llm_workers:
+                await extracted.put(None)
+            await asyncio.gather(*llm_workers)
+        finally:
+            for worker in llm_workers:
+                worker.cancel()
+        progress.update(force=True)
+        return progress.summary()
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="sds-digest-ingest",
+        description="Extract, process and store every SDS PDF in the given directories, zip archives or files.",
+    )
+    parser.add_argument("sources", nargs="+", help="Directories (searched recursively), zip archives or PDFs")
+    parser.add_argument(
+        "--extraction-workers", type=int, default=SETTINGS.extractor_pool_size,
+        help="Marker extraction worker processes",
+    )
+    parser.add_argument("--llm-concurrency", type=int, default=4, help="Documents in the LLM stages at the same time")
+    parser.add_argument("--retries", type=int, default=2, help="Retries of a failing stage before quarantining the PDF")
+    parser.add_argument("--quarantine-dir", default="data/quarantine", help="Where PDFs that keep failing are copied")
+    parser.add_argument("--provider", choices=["openai", "ollama"], default=SETTINGS.llm_provider)
+    parser.add_argument("--model", default=SETTINGS.processor_model, help="Model used by the processing pipeline")
+    parser.add_argument("--reprocess", action="store_true", help="Process PDFs again even if their content was seen before")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="Seconds between progress lines")
+    return parser.parse_args(argv)
+
+
+async def amain(args: argparse.Namespace) -> IngestSummary:
+    data_dir = PERSISTENCE.upload_base_dir.parent
+    scheduler = LLMScheduler(
+        max_concurrency=SETTINGS.llm_max_concurrency,
+        default_budget=ModelBudget(
+            requests_per_minute=SETTINGS.llm_requests_per_minute,
+            tokens_per_minute=SETTINGS.llm_tokens_per_minute,
+        ),
+        model_budgets=SETTINGS.llm_model_budgets,
+        max_retries=SETTINGS.llm_max_retries,
+    )
+    registry = LLMClientRegistry(
+        scheduler=scheduler,
+        ollama_base_url=SETTINGS.ollama_base_url,
+        ollama_keep_alive=SETTINGS.ollama_keep_alive,
+        timeout=SETTINGS.llm_http_timeout,
+    )
+    extractor = ProcessPoolExtractor(
+        max_workers=args.extraction_workers,
+        job_timeout=SETTINGS.extraction_job_timeout,
+        acquire_timeout=None,
+    )
+    # The same stores as the API, so ingested documents are served right away
+    sds_store = SQLiteSDSStore(data_dir / "sds.sqlite3")
+    result_cache = ResultCache(data_dir / "result_cache", max_size_bytes=SETTINGS.result_cache_max_bytes)
+    llm_cache = LLMResponseCache(
+        data_dir / "llm_cache.sqlite3",
+        ttl_seconds=SETTINGS.llm_cache_ttl_seconds,
+        max_entries=SETTINGS.llm_cache_max_entries,
+    )
+    with tempfile.TemporaryDirectory(prefix="sds-ingest-") as staging_dir:
+        pdfs = await asyncio.to_thread(collect_pdfs, [Path(source) for source in args.sources], Path(staging_dir))
+        print(f"Found {len(pdfs)} PDFs, starting {args.extraction_workers} extraction workers...")
+        await extractor.astart()
+        await registry.astart()
+        try:
+            ingestor = BulkIngestor(
+                extractor=extractor,
+                processor=registry.processor(
+                    model=args.model,
+                    provider=args.provider,
+                    llm_cache=llm_cache if SETTINGS.llm_cache_enabled else None,
+                    section_splitter=SETTINGS.section_splitter,
+                    summary_mode=SETTINGS.summary_mode,
+                    routing=SETTINGS.llm_routing,
+                    section_batch_tokens=SETTINGS.section_batch_tokens,
+                ),
+                sds_store=sds_store,
+                result_cache=result_cache,
+                quarantine_dir=Path(args.quarantine_dir),
+                extraction_concurrency=args.extraction_workers,
+                llm_concurrency=args.llm_concurrency,
+                max_retries=args.retries,
+                skip_processed=not args.reprocess,
+                progress_interval=args.progress_interval,
+                lazy=SETTINGS.processing_mode == "lazy",
+                provider=args.provider,
+            )
+            return await ingestor.arun(pdfs)
+        finally:
+            await registry.aclose()
+            await extractor.aclose()
+            sds_store.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    summary = asyncio.run(amain(parse_args(argv)))
+    print(
+        f"Ingested {summary.processed} of {summary.total} PDFs in {format_duration(summary.seconds)} "
+        f"({summary.docs_per_second:.2f} docs/s): {summary.skipped} already processed, "
+        f"{summary.duplicates} duplicates, {summary.failed} quarantined"
+    )
+
+
+if __name__ == "__main__":
+    main()
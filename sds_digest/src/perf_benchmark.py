@@ -0,0 +1,526 @@
+"""Offline throughput and latency benchmark of the processing pipeline and the API, on a fake LLM."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import resource
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Awaitable, Callable, Literal
+from unittest.mock import patch
+
+import httpx
+from pydantic import BaseModel, Field
+
+from sds_digest.llms.fake_llm import FakeLLM, FakeLLMConfig
+from sds_digest.llms.registry import LLMClientRegistry, LLMProvider
+from sds_digest.llms.scheduler import LLMScheduler
+from sds_digest.src.benchmark_runner import percentile
+from sds_digest.src.extraction.extractor import ExtractedPdf
+from sds_digest.src.processing.llm_processor import LLMSafetyDataSheetProcessor, SectionSplitterName, SummaryMode
+from sds_digest.src.processing.splitter import RuleBasedSectionSplitter
+from sds_digest.src.telemetry import TRACER, Span, Stage
+
+
+Scenario = Literal["process", "upload", "ask"]
+SCENARIOS: tuple[Scenario, ...] = ("process", "upload", "ask")
+SUMMARY_MODES: tuple[SummaryMode, ...] = ("full_document", "sections", "template")
+
+GHS_SECTION_TITLES = (
+    "Identification", "Hazard identification", "Composition/information on ingredients", "First-aid measures",
+    "Fire-fighting measures", "Accidental release measures", "Handling and storage",
+    "Exposure controls/personal protection", "Physical and chemical properties", "Stability and reactivity",
+    "Toxicological information", "Ecological information", "Disposal considerations", "Transport information",
+    "Regulatory information", "Other information",
+)
+
+QUESTIONS = (
+    "What is the flash point?",
+    "Which gloves should I wear?",
+    "What should I do if it is swallowed?",
+    "How should it be stored?",
+    "What is the UN number for transport?",
+    "Is it toxic to aquatic life?",
+)
+
+_FILLER = (
+    "Keep container tightly closed. Avoid contact with skin and eyes. Use only outdoors or in a "
+    "well-ventilated area. Flammable liquid and vapour. Causes serious eye irritation. "
+).split()
+
+
+def synthetic_sds_markdown(seed: int, section_chars: int = 800) -> str:
+    """A 16-section SDS in the layout the rule-based splitter recognises, unique per seed."""
+    rng = random.Random(seed)
+    parts = [f"# Safety Data Sheet\n\nProduct name: Test chemical {seed}\n"]
+    for number, title in enumerate(GHS_SECTION_TITLES, 1):
+        words: list[str] = []
+        while sum(len(word) + 1 for word in words) < section_chars:
+            words.append(rng.choice(_FILLER))
+        parts.append(f"## SECTION {number}: {title}\n\n{' '.join(words)}\n")
+    return "\n".join(parts)
+
+
+class FakeLLMClientRegistry(LLMClientRegistry):
+    """Registry handing out `FakeLLM`s for every provider and model."""
+
+    def __init__(self, llm_config: FakeLLMConfig, scheduler: LLMScheduler | None = None):
+        super().__init__(scheduler=scheduler)
+        self.llm_config = llm_config
+
+    def _build_llm(self, provider: LLMProvider, model: str) -> FakeLLM:
+        return FakeLLM(model=model, config=self.llm_config)
+
+    @property
+    def llm_calls(self) -> int:
+        return sum(llm.calls for llm in self._llms.values())
+
+
+class FakeExtractorPool:
+    """Stands in for the warm marker pool: blocks a worker thread, then returns a synthetic SDS."""
+
+    def __init__(self, extraction_ms: float = 0.0, section_chars: int = 800):
+        self.extraction_ms = extraction_ms
+        self.section_chars = section_chars
+
+    async def astart(self) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        pass
+
+    async def aextract_pdf(self, pdf_path: str) -> ExtractedPdf:
+        await asyncio.to_thread(time.sleep, self.extraction_ms / 1000)
+        seed = int.from_bytes(Path(pdf_path).read_bytes()[:8].ljust(8, b"\0"), "big")
+        return ExtractedPdf(content=synthetic_sds_markdown(seed, self.section_chars), source_file_path=pdf_path)
+
+
+class EventLoopLagMonitor:
+    """Measures how late a periodic timer fires, i.e. how long the event loop was blocked."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: list[float] = []
+        self._task: asyncio.Task | None = None
+
+    async def _run(self) -> None:
+        while True:
+            started_at = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(time.perf_counter() - started_at - self.interval, 0.0))
+
+    async def __aenter__(self) -> EventLoopLagMonitor:
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS, kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class PerfConfig(BaseModel):
+    operations: int = Field(20, description="Documents processed/uploaded, or questions asked")
+    concurrency: int = Field(8, description="Operations in flight at once")
+    llm_concurrency: int = Field(16, description="LLM calls in flight at once (scheduler slots)")
+    section_splitter: SectionSplitterName = Field("rules", description="Splitter used by the processor")
+    summary_mode: SummaryMode = Field("full_document", description="How the processor builds the summary")
+    section_batch_tokens: int | None = Field(None, description="Token budget for structuring sections in one call")
+    section_chars: int = Field(800, description="Characters per section of the synthetic SDS")
+    extraction_ms: float = Field(50.0, description="Time the fake extractor blocks a worker thread")
+    job_workers: int = Field(4, description="Upload jobs processed at once")
+    llm: FakeLLMConfig = Field(default_factory=FakeLLMConfig)
+
+
+class PerfReport(BaseModel):
+    scenario: str = Field(..., description="What was measured")
+    operations: int = Field(..., description="Operations run")
+    errors: int = Field(..., description="Operations that failed")
+    concurrency: int = Field(..., description="Operations in flight at once")
+    wall_seconds: float = Field(..., description="Time to run all operations")
+    throughput: float = Field(..., description="Successful operations per second (docs/sec or questions/sec)")
+    p50_ms: float | None = Field(None, description="Median operation latency")
+    p95_ms: float | None = Field(None, description="95th percentile operation latency")
+    p99_ms: float | None = Field(None, description="99th percentile operation latency")
+    loop_lag_p99_ms: float | None = Field(None, description="99th percentile event-loop lag")
+    loop_lag_max_ms: float | None = Field(None, description="Longest event-loop stall")
+    llm_calls: int = Field(..., description="Calls made to the fake LLM, including retries")
+    peak_rss_mb: float = Field(..., description="Peak resident memory of the process so far")
+
+
+class SummaryModeReport(BaseModel):
+    summary_mode: SummaryMode = Field(..., description="How the summary was built")
+    documents: int = Field(..., description="Documents processed")
+    errors: int = Field(..., description="Documents that failed")
+    document_p50_ms: float | None = Field(None, description="Median time to process a whole document")
+    summary_p50_ms: float | None = Field(None, description="Median time of the summary stage")
+    summary_p95_ms: float | None = Field(None, description="95th percentile time of the summary stage")
+    summary_input_tokens: float = Field(..., description="Mean input tokens of the summary stage per document")
+    summary_output_tokens: float = Field(..., description="Mean output tokens of the summary stage per document")
+    document_input_tokens: float = Field(..., description="Mean input tokens of all stages per document")
+    llm_calls: int = Field(..., description="Calls made to the fake LLM, including retries")
+
+
+class _SpanRecorder:
+    def __init__(self):
+        self.spans: list[Span] = []
+
+    def on_start(self, span: Span) -> None:
+        pass
+
+    def on_end(self, span: Span) -> None:
+        self.spans.append(span)
+
+
+async def _measure(
+    scenario: Scenario,
+    operations: int,
+    concurrency: int,
+    operation: Callable[[int], Awaitable[None]],
+    llm_calls: Callable[[], int],
+) -> PerfReport:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def run(index: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            started_at = time.perf_counter()
+            try:
+                await operation(index)
+            except Exception as e:
+                errors += 1
+                print(f"{scenario} #{index} failed: {type(e).__name__}: {e}")
+                return
+            latencies.append((time.perf_counter() - started_at) * 1000)
+
+    async with EventLoopLagMonitor() as monitor:
+        started_at = time.perf_counter()
+        await asyncio.gather(*(run(index) for index in range(operations)))
+        wall_seconds = time.perf_counter() - started_at
+    lags = [lag * 1000 for lag in monitor.samples]
+    return PerfReport(
+        scenario=scenario,
+        operations=operations,
+        errors=errors,
+        concurrency=concurrency,
+        wall_seconds=wall_seconds,
+        throughput=len(latencies) / wall_seconds if wall_seconds > 0 else 0.0,
+        p50_ms=percentile(latencies, 50),
+        p95_ms=percentile(latencies, 95),
+        p99_ms=percentile(latencies, 99),
+        loop_lag_p99_ms=percentile(lags, 99),
+        loop_lag_max_ms=max(lags, default=None),
+        llm_calls=llm_calls(),
+        peak_rss_mb=peak_rss_mb(),
+    )
+
+
+def _scheduler(config: PerfConfig) -> LLMScheduler:
+    # No rate-limit budget: the fake LLM's injected 429s exercise the retry path instead
+    return LLMScheduler(max_concurrency=config.llm_concurrency, base_backoff=0.05, max_backoff=1.0)
+
+
+async def bench_process(config: PerfConfig) -> PerfReport:
+    """`LLMSafetyDataSheetProcessor.aprocess` on synthetic documents, without the API."""
+    llm = FakeLLM(model="fake-processor", config=config.llm)
+    processor = LLMSafetyDataSheetProcessor.from_llm(
+        llm,
+        section_splitter=config.section_splitter,
+        scheduler=_scheduler(config),
+        summary_mode=config.summary_mode,
+        section_batch_tokens=config.section_batch_tokens,
+    )
+
+    async def process(index: int) -> None:
+        markdown = synthetic_sds_markdown(index, config.section_chars)
+        await processor.aprocess(ExtractedPdf(content=markdown, source_file_path=f"doc-{index}.pdf"))
+
+    return await _measure("process", config.operations, config.concurrency, process, lambda: llm.calls)
+
+
+async def bench_summary_modes(config: PerfConfig) -> list[SummaryModeReport]:
+    """The same documents processed once per summary mode, comparing the summary stage's latency and tokens."""
+    reports = []
+    for summary_mode in SUMMARY_MODES:
+        recorder = _SpanRecorder()
+        with patch.object(TRACER, "hooks", [*TRACER.hooks, recorder]):
+            process_report = await bench_process(config.model_copy(update={"summary_mode": summary_mode}))
+        summaries = [span for span in recorder.spans if span.name == Stage.SUMMARY and span.error is None]
+        documents = max(process_report.operations - process_report.errors, 1)
+        reports.append(SummaryModeReport(
+            summary_mode=summary_mode,
+            documents=process_report.operations,
+            errors=process_report.errors,
+            document_p50_ms=process_report.p50_ms,
+            summary_p50_ms=percentile([span.duration_seconds * 1000 for span in summaries], 50),
+            summary_p95_ms=percentile([span.duration_seconds * 1000 for span in summaries], 95),
+            summary_input_tokens=sum(span.input_tokens or 0 for span in summaries) / documents,
+            summary_output_tokens=sum(span.output_tokens or 0 for span in summaries) / documents,
+            document_input_tokens=sum(span.input_tokens or 0 for span in recorder.spans) / documents,
+            llm_calls=process_report.llm_calls,
+        ))
+    return reports
+
+
+def _patched_app(stack: ExitStack, config: PerfConfig, data_dir: Path) -> tuple[object, FakeLLMClientRegistry]:
+    """The API app wired to the fake LLM and extractor and to throwaway stores."""
+    from sds_digest.api import main
+    from sds_digest.api.answer_cache import AnswerCache
+    from sds_digest.api.jobs import JobQueue
+    from sds_digest.api.result_cache import ResultCache
+    from sds_digest.api.storage import SQLiteSDSStore
+    from sds_digest.llms.cache import LLMResponseCache
+
+    registry = FakeLLMClientRegistry(config.llm, scheduler=_scheduler(config))
+    sds_store = SQLiteSDSStore(data_dir / "sds.sqlite3")
+    stack.callback(sds_store.close)
+    replacements = {
+        "EXTRACTOR_POOL": FakeExtractorPool(config.extraction_ms, config.section_chars),
+        "LLM_REGISTRY": registry,
+        "SDS_STORE": sds_store,
+        "RESULT_CACHE": ResultCache(data_dir / "result_cache"),
+        "LLM_CACHE": LLMResponseCache(data_dir / "llm_cache.sqlite3"),
+        "ANSWER_CACHE": AnswerCache(data_dir / "answer_cache.sqlite3"),
+        "JOB_QUEUE": JobQueue(
+            handler=main.process_upload,
+            max_depth=max(config.operations, 1),
+            concurrency=config.job_workers,
+        ),
+    }
+    for name, value in replacements.items():
+        stack.enter_context(patch.object(main, name, value))
+    stack.enter_context(patch.object(main.PERSISTENCE, "upload_base_dir", data_dir / "uploads"))
+    stack.enter_context(patch.object(main.SETTINGS, "section_splitter", config.section_splitter))
+    stack.enter_context(patch.object(main.SETTINGS, "summary_mode", config.summary_mode))
+    stack.enter_context(patch.object(main.SETTINGS, "section_batch_tokens", config.section_batch_tokens))
+    # Every question should reach the model; repeated questions would measure the answer cache
+    stack.enter_context(patch.object(main.SETTINGS, "answer_cache_enabled", False))
+    return main.app, registry
+
+
+async def _wait_for_job(client: httpx.AsyncClient, job_id: str, poll_interval: float = 0.02) -> None:
+    while True:
+        job = (await client.get(f"/api/jobs/{job_id}")).json()
+        if job["status"] == "done":
+            return
+        if job["status"] == "failed":
+            raise RuntimeError(job["error"])
+        await asyncio.sleep(poll_interval)
+
+
+async def bench_api(scenario: Literal["upload", "ask"], config: PerfConfig) -> PerfReport:
+    """`/api/upload` until its job is done, or `/ask` on already processed documents, in-process."""
+    with tempfile.TemporaryDirectory() as data_dir, ExitStack() as stack:
+        app, registry = _patched_app(stack, config, Path(data_dir))
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app), httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+
+            async def upload(index: int) -> None:
+                pdf = index.to_bytes(8, "big") + b"%PDF-1.4 synthetic"
+                response = await client.post("/api/upload", files={"file": (f"doc-{index}.pdf", pdf, "application/pdf")})
+                response.raise_for_status()
+                await _wait_for_job(client, response.json()["job_id"])
+
+            if scenario == "upload":
+                return await _measure("upload", config.operations, config.concurrency, upload, lambda: registry.llm_calls)
+
+            from sds_digest.api import main
+            splitter = RuleBasedSectionSplitter()
+            documents = max(config.operations // len(QUESTIONS), 1)
+            for index in range(documents):
+                markdown = synthetic_sds_markdown(index, config.section_chars)
+                main.SDS_STORE.put(f"sds-{index}", _processed(markdown, splitter))
+            calls_before = registry.llm_calls
+
+            async def ask(index: int) -> None:
+                response = await client.post(
+                    f"/api/sds/sds-{index % documents}/ask",
+                    json={"question": QUESTIONS[index % len(QUESTIONS)]},
+                )
+                response.raise_for_status()
+
+            return await _measure(
+                "ask", config.operations, config.concurrency, ask, lambda: registry.llm_calls - calls_before
+            )
+
+
+def _processed(markdown: str, splitter: RuleBasedSectionSplitter):
+    from sds_digest.src.processing.processor import ProcessedSafetyDataSheet, StructuredSections
+
+    return ProcessedSafetyDataSheet(
+        markdown_content=markdown,
+        structured_content=StructuredSections(structured_sections=[]),
+        summary="Synthetic SDS",
+        sections=splitter.split(markdown).sections.sections,
+    )
+
+
+async def arun(scenarios: list[Scenario], config: PerfConfig) -> list[PerfReport]:
+    reports = []
+    for scenario in scenarios:
+        if scenario == "process":
+            reports.append(await bench_process(config))
+        else:
+            reports.append(await bench_api(scenario, config))
+    return reports
+
+
+def format_reports(reports: list[PerfReport]) -> str:
+    def ms(value: float | None) -> str:
+        return f"{value:.1f}" if value is not None else "-"
+
+    lines = [
+        f"{'scenario':<8} {'ops':>5} {'errors':>6} {'ops/sec':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+        f"{'lag p99':>8} {'lag max':>8} {'llm calls':>9} {'rss MB':>7}"
+    ]
+    for report in reports:
+        lines.append(
+            f"{report.scenario:<8} {report.operations:>5} {report.errors:>6} {report.throughput:>8.2f} "
+            f"{ms(report.p50_ms):>8} {ms(report.p95_ms):>8} {ms(report.p99_ms):>8} "
+            f"{ms(report.loop_lag_p99_ms):>8} {ms(report.loop_lag_max_ms):>8} {report.llm_calls:>9} "
+            f"{report.peak_rss_mb:>7.0f}"
+        )
+    return "\n".join(lines)
+
+
+def format_summary_mode_reports(reports: list[SummaryModeReport]) -> str:
+    """Summary modes side by side, with token savings relative to the full-document mode."""
+    def ms(value: float | None) -> str:
+        return f"{value:.1f}" if value is not None else "-"
+
+    baseline = next((report for report in reports if report.summary_mode == "full_document"), None)
+    lines = [
+        f"{'summary mode':<14} {'docs':>5} {'errors':>6} {'doc p50':>8} {'sum p50':>8} {'sum p95':>8} "
+        f"{'sum in tok':>10} {'sum out tok':>11} {'doc in tok':>10} {'vs full':>8}"
+    ]
+    for report in reports:
+        relative = "-"
+        if baseline is not None and baseline.document_input_tokens:
+            relative = f"{report.document_input_tokens / baseline.document_input_tokens - 1:+.0%}"
+        lines.append(
+            f"{report.summary_mode:<14} {report.documents:>5} {report.errors:>6} {ms(report.document_p50_ms):>8} "
+            f"{ms(report.summary_p50_ms):>8} {ms(report.summary_p95_ms):>8} {report.summary_input_tokens:>10.0f} "
+            f"{report.summary_output_tokens:>11.0f} {report.document_input_tokens:>10.0f} {relative:>8}"
+        )
+    return "\n".join(lines)
+
+
+def check_thresholds(
+    reports: list[PerfReport],
+    max_p95_ms: float | None = None,
+    min_throughput: float | None = None,
+    max_loop_lag_ms: float | None = None,
+) -> list[str]:
+    """Violated thresholds, for failing a CI job on an orchestration regression."""
+    failures = []
+    for report in reports:
+        if max_p95_ms is not None and (report.p95_ms is None or report.p95_ms > max_p95_ms):
+            failures.append(f"{report.scenario}: p95 {report.p95_ms} ms > {max_p95_ms} ms")
+        if min_throughput is not None and report.throughput < min_throughput:
+            failures.append(f"{report.scenario}: throughput {report.throughput:.2f}/s < {min_throughput}/s")
+        if max_loop_lag_ms is not None and (report.loop_lag_max_ms or 0.0) > max_loop_lag_ms:
+            failures.append(f"{report.scenario}: event-loop lag {report.loop_lag_max_ms:.1f} ms > {max_loop_lag_ms} ms")
+    return failures
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="sds-digest-perf",
+        description="Measure pipeline and API throughput offline, against a deterministic fake LLM.",
+    )
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--operations", type=int, default=20, help="Documents or questions per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Operations in flight at once")
+    parser.add_argument("--llm-concurrency", type=int, default=16, help="LLM calls in flight at once")
+    parser.add_argument("--section-splitter", choices=["llm", "rules"], default="rules")
+    parser.add_argument("--summary-mode", choices=SUMMARY_MODES, default="full_document")
+    parser.add_argument(
+        "--compare-summary-modes",
+        action="store_true",
+        help="Also process the documents once per summary mode and compare the summary stage's latency and tokens",
+    )
+    parser.add_argument(
+        "--section-batch-tokens",
+        type=int,
+        help="Structure sections in batches of up to this many content tokens, one LLM call per batch",
+    )
+    parser.add_argument("--section-chars", type=int, default=800, help="Characters per synthetic SDS section")
+    parser.add_argument("--extraction-ms", type=float, default=50.0, help="Fake PDF extraction time")
+    parser.add_argument("--job-workers", type=int, default=4, help="Upload jobs processed at once")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Median time to first token")
+    parser.add_argument("--latency-distribution", choices=["constant", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-spread", type=float, default=0.3)
+    parser.add_argument("--prompt-tps", type=float, default=5_000.0, help="Prompt tokens processed per second")
+    parser.add_argument("--output-tps", type=float, default=80.0, help="Output tokens generated per second")
+    parser.add_argument("--output-tokens", type=int, default=150, help="Tokens per free-text answer")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of LLM calls failing with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of LLM calls failing with a 429")
+    parser.add_argument("--invalid-json-rate", type=float, default=0.0, help="Share of JSON answers returned broken")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the reports to this JSON file")
+    parser.add_argument("--max-p95-ms", type=float, help="Fail if any scenario's p95 latency is higher")
+    parser.add_argument("--min-throughput", type=float, help="Fail if any scenario's throughput is lower")
+    parser.add_argument("--max-loop-lag-ms", type=float, help="Fail if the event loop stalls for longer")
+    return parser.parse_args(argv)
+
+
+def config_from_args(args: argparse.Namespace) -> PerfConfig:
+    return PerfConfig(
+        operations=args.operations,
+        concurrency=args.concurrency,
+        llm_concurrency=args.llm_concurrency,
+        section_splitter=args.section_splitter,
+        summary_mode=args.summary_mode,
+        section_batch_tokens=args.section_batch_tokens,
+        section_chars=args.section_chars,
+        extraction_ms=args.extraction_ms,
+        job_workers=args.job_workers,
+        llm=FakeLLMConfig(
+            first_token_latency_ms=args.latency_ms,
+            latency_distribution=args.latency_distribution,
+            latency_spread=args.latency_spread,
+            prompt_tokens_per_second=args.prompt_tps,
+            output_tokens_per_second=args.output_tps,
+            output_tokens=args.output_tokens,
+            error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate,
+            invalid_json_rate=args.invalid_json_rate,
+            seed=args.seed,
+        ),
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    config = config_from_args(args)
+    reports = asyncio.run(arun(args.scenarios, config))
+    print(format_reports(reports))
+    if args.compare_summary_modes:
+        print()
+        print(format_summary_mode_reports(asyncio.run(bench_summary_modes(config))))
+    if args.json:
+        Path(args.json).write_text(
+            "[" + ",\n".join(report.model_dump_json() for report in reports) + "]\n", encoding="utf-8"
+        )
+    failures = check_thresholds(reports, args.max_p95_ms, args.min_throughput, args.max_loop_lag_ms)
+    for failure in failures:
+        print(f"FAILED {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,50 @@
 from __future__ import annotations
 
 import asyncio
+import contextvars
+from contextlib import nullcontext
+from typing import AsyncIterator, Callable, ContextManager, Literal, NamedTuple
+
+from llama_index.llms.ollama import Ollama
+from llama_index.llms.openai import OpenAI
+
 from sds_digest.src.processing.processor import (
     SafetyDataSheetProcessor,
     ProcessorIdentifier,
     ProcessedSafetyDataSheet,
+    ProcessingStage,
+    StageCallback,
     StructuredSection,
     StructuredSections,
 )
 from sds_digest.src.extraction.extractor import ExtractedPdf
-from sds_digest.llms.structure_llm import SDSStructureLLM, SectionStructureLLM, Sections
+from sds_digest.llms.structure_llm import SDSStructureLLM, SectionStructureLLM, Section, Sections
 from sds_digest.llms.summary_llm import SummaryLLM
+from sds_digest.llms.cache import LLMResponseCache
+from sds_digest.llms.routing import ModelTier, RoutedSectionStructureLLM, RoutedStage, RoutingPolicy, TierMetrics
+from sds_digest.llms.scheduler import LLMPriority, LLMScheduler
+from sds_digest.src.processing.splitter import RuleBasedSectionSplitter
+from sds_digest.src.processing.summary_renderer import render_summary
+from sds_digest.src.secrets import Secrets
+from sds_digest.src.telemetry import TRACER, Stage
+
+
+# Bump whenever prompts or pipeline logic change so cached results are not reused
+PROCESSOR_VERSION = "0.1.0"
 
+SectionSplitterName = Literal["llm", "rules"]
+# full_document: an LLM pass over the whole markdown, alongside structuring
+# sections: a small LLM prompt over the section summaries and key structured fields
+# template: the section summaries and key fields rendered without an LLM call
+SummaryMode = Literal["full_document", "sections", "template"]
 
+# Sections structured concurrently per document
+SECTION_CONCURRENCY = 5
+
+
+class _SplittingFinished(NamedTuple):
+    section_count: int
+    error: BaseException | None
 
 
 class LLMSafetyDataSheetProcessor(SafetyDataSheetProcessor):
@@ -20,29 +52,193 @@ class LLMSafetyDataSheetProcessor(SafetyDataSheetProcessor):
     def __init__(
         self,
         sds_structure_llm: SDSStructureLLM,
-        section_structure_llm: SectionStructureLLM,
+        section_structure_llm: SectionStructureLLM | RoutedSectionStructureLLM,
         summary_llm: SummaryLLM,
+        section_splitter: RuleBasedSectionSplitter | None = None,
+        min_splitter_confidence: float = 0.75,
+        summary_mode: SummaryMode = "full_document",
+        routing: RoutingPolicy | None = None,
+        tier_metrics: TierMetrics | None = None,
     ) -> None:
         self.sds_structure_llm = sds_structure_llm
         self.section_structure_llm = section_structure_llm
         self.summary_llm = summary_llm
+        # Rule-based splitting runs first; the SDSStructureLLM round trip is only a fallback
+        self.section_splitter = section_splitter
+        self.min_splitter_confidence = min_splitter_confidence
+        self.summary_mode = summary_mode
+        self.routing = routing
+        self.tier_metrics = tier_metrics
+        self.processor_identifier = self.identifier(
+            model=sds_structure_llm.llm.model,
+            section_splitter="rules" if section_splitter is not None else "llm",
+            summary_mode=summary_mode,
+            routing=routing,
+            section_batch_tokens=section_structure_llm.batch_token_budget,
+        )
+
+    @classmethod
+    def identifier(
+        cls,
+        model: str,
+        section_splitter: SectionSplitterName = "llm",
+        summary_mode: SummaryMode = "full_document",
+        routing: RoutingPolicy | None = None,
+        section_batch_tokens: int | None = None,
+    ) -> ProcessorIdentifier:
+        # The default summary mode keeps the identifiers, and cached results, of earlier versions
+        summary_suffix = f"+{summary_mode}-summary" if summary_mode != "full_document" else ""
+        if section_batch_tokens is not None:
+            summary_suffix += f"+batched-{section_batch_tokens}"
+        if routing is not None:
+            # Stages run on the routed tiers, not on `model`
+            summary_suffix += f"+routed-{routing.fingerprint()}"
+            model = "+".join(dict.fromkeys(tier.model for tier in routing.tiers))
+        return ProcessorIdentifier(
+            processor_name=cls.__name__,
+            processor_version=f"{PROCESSOR_VERSION}+{section_splitter}{summary_suffix}",
+            model_name=model,
+        )
+
+    @staticmethod
+    def _make_splitter(section_splitter: SectionSplitterName) -> RuleBasedSectionSplitter | None:
+        return RuleBasedSectionSplitter() if section_splitter == "rules" else None
 
     @classmethod
-    def from_openai(cls, model: str = "gpt-4o", **kwargs) -> LLMSafetyDataSheetProcessor:
-        sds_structure_llm = SDSStructureLLM.from_openai(model=model, **kwargs)
-        section_structure_llm = SectionStructureLLM.from_openai(model=model, **kwargs)
-        summary_llm = SummaryLLM.from_openai(model=model, **kwargs)
-        return cls(sds_structure_llm=sds_structure_llm, section_structure_llm=section_structure_llm, summary_llm=summary_llm)
+    def from_llm(
+        cls,
+        llm: OpenAI | Ollama,
+        llm_cache: LLMResponseCache | None = None,
+        section_splitter: SectionSplitterName = "llm",
+        scheduler: LLMScheduler | None = None,
+        summary_mode: SummaryMode = "full_document",
+        section_batch_tokens: int | None = None,
+    ) -> LLMSafetyDataSheetProcessor:
+        """Build every stage on one already configured client, e.g. from the LLMClientRegistry."""
+        return cls(
+            sds_structure_llm=SDSStructureLLM(llm=llm, cache=llm_cache, scheduler=scheduler),
+            section_structure_llm=SectionStructureLLM(
+                llm=llm, cache=llm_cache, scheduler=scheduler, batch_token_budget=section_batch_tokens
+            ),
+            summary_llm=SummaryLLM(llm=llm, scheduler=scheduler),
+            section_splitter=cls._make_splitter(section_splitter),
+            summary_mode=summary_mode,
+        )
 
     @classmethod
-    def from_ollama(cls, model: str = "gpt-oss:latest", **kwargs) -> LLMSafetyDataSheetProcessor:
-        sds_structure_llm = SDSStructureLLM.from_ollama(model=model, **kwargs)
-        section_structure_llm = SectionStructureLLM.from_ollama(model=model, **kwargs)
-        summary_llm = SummaryLLM.from_ollama(model=model, **kwargs)
-        return cls(sds_structure_llm=sds_structure_llm, section_structure_llm=section_structure_llm, summary_llm=summary_llm)
+    def from_openai(
+        cls,
+        model: str = "gpt-4o",
+        llm_cache: LLMResponseCache | None = None,
+        section_splitter: SectionSplitterName = "llm",
+        scheduler: LLMScheduler | None = None,
+        summary_mode: SummaryMode = "full_document",
+        section_batch_tokens: int | None = None,
+        **kwargs,
+    ) -> LLMSafetyDataSheetProcessor:
+        sds_structure_llm = SDSStructureLLM.from_openai(model=model, cache=llm_cache, scheduler=scheduler, **kwargs)
+        section_structure_llm = SectionStructureLLM.from_openai(
+            model=model, cache=llm_cache, scheduler=scheduler, batch_token_budget=section_batch_tokens, **kwargs
+        )
+        summary_llm = SummaryLLM.from_openai(model=model, scheduler=scheduler, **kwargs)
+        return cls(
+            sds_structure_llm=sds_structure_llm,
+            section_structure_llm=section_structure_llm,
+            summary_llm=summary_llm,
+            section_splitter=cls._make_splitter(section_splitter),
+            summary_mode=summary_mode,
+        )
+
+    @classmethod
+    def from_ollama(
+        cls,
+        model: str = "gpt-oss:latest",
+        llm_cache: LLMResponseCache | None = None,
+        section_splitter: SectionSplitterName = "llm",
+        scheduler: LLMScheduler | None = None,
+        summary_mode: SummaryMode = "full_document",
+        section_batch_tokens: int | None = None,
+        **kwargs,
+    ) -> LLMSafetyDataSheetProcessor:
+        sds_structure_llm = SDSStructureLLM.from_ollama(model=model, cache=llm_cache, scheduler=scheduler, **kwargs)
+        section_structure_llm = SectionStructureLLM.from_ollama(
+            model=model, cache=llm_cache, scheduler=scheduler, batch_token_budget=section_batch_tokens, **kwargs
+        )
+        summary_llm = SummaryLLM.from_ollama(model=model, scheduler=scheduler, **kwargs)
+        return cls(
+            sds_structure_llm=sds_structure_llm,
+            section_structure_llm=section_structure_llm,
+            summary_llm=summary_llm,
+            section_splitter=cls._make_splitter(section_splitter),
+            summary_mode=summary_mode,
+        )
+
+    @classmethod
+    def from_routing(
+        cls,
+        policy: RoutingPolicy,
+        llm_for: Callable[[ModelTier], OpenAI | Ollama] | None = None,
+        llm_cache: LLMResponseCache | None = None,
+        section_splitter: SectionSplitterName = "llm",
+        scheduler: LLMScheduler | None = None,
+        summary_mode: SummaryMode = "full_document",
+        tier_metrics: TierMetrics | None = None,
+        section_batch_tokens: int | None = None,
+    ) -> LLMSafetyDataSheetProcessor:
+        """
+        Build every stage on the model tier the policy routes it to.
+
+        `llm_for` returns the client of a tier, e.g. from the LLMClientRegistry; by default
+        a new OpenAI or Ollama client is created per tier.
+        """
+        llm_for = llm_for or _build_tier_llm
+        tier_metrics = tier_metrics or TierMetrics()
+        llms = {tier.name: llm_for(tier) for tier in policy.tiers}
+        structurers = {
+            name: SectionStructureLLM(llm=llm, cache=llm_cache, scheduler=scheduler, batch_token_budget=section_batch_tokens)
+            for name, llm in llms.items()
+        }
+        return cls(
+            sds_structure_llm=SDSStructureLLM(
+                llm=llms[policy.tier_for_stage("splitting").name], cache=llm_cache, scheduler=scheduler
+            ),
+            section_structure_llm=RoutedSectionStructureLLM(structurers, policy, tier_metrics),
+            summary_llm=SummaryLLM(llm=llms[policy.tier_for_stage("summary").name], scheduler=scheduler),
+            section_splitter=cls._make_splitter(section_splitter),
+            summary_mode=summary_mode,
+            routing=policy,
+            tier_metrics=tier_metrics,
+        )
+
+    def _track_stage(self, stage: RoutedStage) -> ContextManager:
+        """Attribute the LLM calls of `stage` to its tier; only wrap code that calls the LLM."""
+        if self.routing is None or self.tier_metrics is None:
+            return nullcontext()
+        return self.tier_metrics.track(self.routing.tier_for_stage(stage))
+
+    def _rule_based_sections(self, text: str) -> Sections | None:
+        if self.section_splitter is None:
+            return None
+        split_result = self.section_splitter.split(text)
+        if split_result.confidence < self.min_splitter_confidence:
+            print(f"Rule-based splitter confidence {split_result.confidence:.2f} is too low, falling back to LLM")
+            return None
+        return split_result.sections
+
+    def split_sections(self, text: str) -> Sections:
+        if (sections := self._rule_based_sections(text)) is not None:
+            return sections
+        with self._track_stage("splitting"):
+            return self.sds_structure_llm.extract_sections(text)
+
+    async def asplit_sections(self, text: str) -> Sections:
+        if (sections := self._rule_based_sections(text)) is not None:
+            return sections
+        with self._track_stage("splitting"):
+            return await self.sds_structure_llm.aextract_sections(text)
 
     def process(self, extracted_pdf: ExtractedPdf) -> ProcessedSafetyDataSheet:
-        sds_sections: Sections = self.sds_structure_llm.extract_sections(extracted_pdf.content)
+        sds_sections: Sections = self.split_sections(extracted_pdf.content)
         print(f"Extracted {len(sds_sections.sections)} sections")
         
         structured_sections: list[StructuredSection] = []
@@ -51,37 +247,225 @@ class LLMSafetyDataSheetProcessor(SafetyDataSheetProcessor):
             structured_sections.append(structured_section)
         structured_sections = StructuredSections(structured_sections=structured_sections)
         
-        summary: str = self.summary_llm.summarize(extracted_pdf.content)
+        if self.summary_mode == "template":
+            summary: str = render_summary(structured_sections)
+        elif self.summary_mode == "sections":
+            summary = self.summary_llm.summarize_sections(structured_sections)
+        else:
+            summary = self.summary_llm.summarize(extracted_pdf.content)
         print("Summary generated")
         
         return ProcessedSafetyDataSheet(
             markdown_content=extracted_pdf.content,
             structured_content=structured_sections,
             summary=summary,
+            sections=sds_sections.sections,
         )
 
-    async def aprocess(self, extracted_pdf: ExtractedPdf) -> ProcessedSafetyDataSheet:
-        sds_sections: Sections = await self.sds_structure_llm.aextract_sections(extracted_pdf.content)
-        
-        # Schedule summary task to run concurrently
-        summary_task = asyncio.create_task(self.summary_llm.asummarize(extracted_pdf.content))
-        
-        semaphore = asyncio.Semaphore(5)
-        
-        async def process_section_with_semaphore(section):
-            async with semaphore:
+    async def astream_sections(self, text: str) -> AsyncIterator[Section]:
+        if (sections := self._rule_based_sections(text)) is not None:
+            for section in sections.sections:
+                yield section
+            return
+        with self._track_stage("splitting"):
+            async for section in self.sds_structure_llm.astream_sections(text):
+                yield section
+
+    async def _astructure_section(self, section: Section, semaphore: asyncio.Semaphore) -> StructuredSection:
+        async with semaphore:
+            with TRACER.span(Stage.SECTION_STRUCTURING, section=section.section_title):
                 return await self.section_structure_llm.astructure_section(section)
-        
-        structured_sections: list[StructuredSection] = await asyncio.gather(
-            *[process_section_with_semaphore(section) for section in sds_sections.sections]
+
+    async def astructure_sections(self, sections: list[Section]) -> StructuredSections:
+        """Structure already split sections, e.g. when structured content is first requested."""
+        if self.section_structure_llm.batch_token_budget is not None:
+            with TRACER.span(Stage.SECTION_STRUCTURING, sections=len(sections), batched=True):
+                structured_sections = await self.section_structure_llm.astructure_sections(sections)
+            return StructuredSections(structured_sections=structured_sections)
+        semaphore = asyncio.Semaphore(SECTION_CONCURRENCY)
+        structured_sections = await asyncio.gather(
+            *(self._astructure_section(section, semaphore) for section in sections)
         )
-        structured_sections = StructuredSections(structured_sections=structured_sections)
-        
-        # Await the summary task that was running concurrently
-        summary: str = await summary_task
+        return StructuredSections(structured_sections=list(structured_sections))
+
+    async def _aiter_indexed_structured_sections(
+        self,
+        text: str,
+    ) -> AsyncIterator[tuple[int, Section, StructuredSection]]:
+        """
+        Structure sections while they are still being split.
+
+        Each section is scheduled as soon as the splitter emits it; results are
+        yielded in completion order together with the section's position.
+        """
+        semaphore = asyncio.Semaphore(SECTION_CONCURRENCY)
+        finished: asyncio.Queue[asyncio.Task | _SplittingFinished] = asyncio.Queue()
+        tasks: list[asyncio.Task] = []
+
+        async def structure(index: int, section: Section) -> tuple[int, Section, StructuredSection]:
+            return index, section, await self._astructure_section(section, semaphore)
+
+        async def split() -> None:
+            error = None
+            # Structuring spans belong next to the splitting span, not inside it
+            outer_context = contextvars.copy_context()
+            try:
+                with TRACER.span(Stage.SPLITTING) as span:
+                    async for section in self.astream_sections(text):
+                        task = asyncio.create_task(structure(len(tasks), section), context=outer_context.copy())
+                        task.add_done_callback(finished.put_nowait)
+                        tasks.append(task)
+                    span.set_attribute("sections", len(tasks))
+            except Exception as e:
+                error = e
+            finished.put_nowait(_SplittingFinished(section_count=len(tasks), error=error))
+
+        splitter_task = asyncio.create_task(split())
+        try:
+            received = 0
+            section_count: int | None = None
+            while section_count is None or received < section_count:
+                item = await finished.get()
+                if isinstance(item, _SplittingFinished):
+                    if item.error is not None:
+                        raise item.error
+                    section_count = item.section_count
+                    continue
+                received += 1
+                yield item.result()
+        finally:
+            splitter_task.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(splitter_task, *tasks, return_exceptions=True)
+
+    async def aiter_structured_sections(self, extracted_pdf: ExtractedPdf) -> AsyncIterator[StructuredSection]:
+        """Yield each structured section as soon as it is ready, in completion order."""
+        async for _, _, structured_section in self._aiter_indexed_structured_sections(extracted_pdf.content):
+            yield structured_section
+
+    async def _asummarize(self, text: str) -> str:
+        with TRACER.span(Stage.SUMMARY, mode="full_document"), self._track_stage("summary"):
+            return await self.summary_llm.asummarize(text)
+
+    async def _asummarize_sections(self, structured_sections: StructuredSections) -> str:
+        with TRACER.span(Stage.SUMMARY, mode=self.summary_mode):
+            if self.summary_mode == "template":
+                return render_summary(structured_sections)
+            with self._track_stage("summary"):
+                return await self.summary_llm.asummarize_sections(structured_sections)
+
+    async def asummarize(self, markdown_content: str, structured_sections: StructuredSections | None = None) -> str:
+        """The summary of a document in this processor's summary mode; only `full_document` works without structured sections."""
+        if self.summary_mode == "full_document":
+            return await self._asummarize(markdown_content)
+        if structured_sections is None:
+            raise ValueError(f"The {self.summary_mode} summary mode needs the structured sections")
+        return await self._asummarize_sections(structured_sections)
+
+    async def astream_summary(
+        self,
+        markdown_content: str,
+        structured_sections: StructuredSections | None = None,
+        priority: LLMPriority | None = None,
+    ) -> AsyncIterator[str]:
+        """Like `asummarize`, yielding the summary as the model writes it; a template summary comes in one piece."""
+        if self.summary_mode != "full_document" and structured_sections is None:
+            raise ValueError(f"The {self.summary_mode} summary mode needs the structured sections")
+        with TRACER.span(Stage.SUMMARY, mode=self.summary_mode, streamed=True):
+            if self.summary_mode == "template":
+                yield render_summary(structured_sections)
+                return
+            with self._track_stage("summary"):
+                if self.summary_mode == "sections":
+                    stream = self.summary_llm.astream_summary_sections(structured_sections, priority=priority)
+                else:
+                    stream = self.summary_llm.astream_summary(markdown_content, priority=priority)
+                async for delta in stream:
+                    yield delta
+
+    async def asplit(
+        self,
+        extracted_pdf: ExtractedPdf,
+        on_stage: StageCallback | None = None,
+    ) -> ProcessedSafetyDataSheet:
+        """
+        Split the document into sections only.
+
+        Structured content and summary are left empty, to be produced with
+        `astructure_sections` and `asummarize` when they are first needed.
+        """
+        (on_stage or (lambda stage: None))(ProcessingStage.SPLITTING)
+        with TRACER.span(Stage.SPLITTING) as span:
+            sections = await self.asplit_sections(extracted_pdf.content)
+            span.set_attribute("sections", len(sections.sections))
+        print(f"Split {len(sections.sections)} sections")
+        return ProcessedSafetyDataSheet(
+            markdown_content=extracted_pdf.content,
+            sections=sections.sections,
+        )
+
+    async def _asplit_then_structure_batched(
+        self,
+        text: str,
+        report_stage: StageCallback,
+    ) -> list[tuple[Section, StructuredSection]]:
+        # Packing needs every section, so structuring starts once splitting is done
+        with TRACER.span(Stage.SPLITTING) as span:
+            sections = (await self.asplit_sections(text)).sections
+            span.set_attribute("sections", len(sections))
+        report_stage(ProcessingStage.STRUCTURING)
+        structured_sections = await self.astructure_sections(sections)
+        return list(zip(sections, structured_sections.structured_sections))
+
+    async def aprocess(
+        self,
+        extracted_pdf: ExtractedPdf,
+        on_stage: StageCallback | None = None,
+    ) -> ProcessedSafetyDataSheet:
+        report_stage = on_stage or (lambda stage: None)
+        report_stage(ProcessingStage.SPLITTING)
+        # A full-document summary only needs the markdown, so it runs alongside splitting and structuring
+        summary_task = (
+            asyncio.create_task(self._asummarize(extracted_pdf.content))
+            if self.summary_mode == "full_document"
+            else None
+        )
+        try:
+            if self.section_structure_llm.batch_token_budget is not None:
+                ordered = await self._asplit_then_structure_batched(extracted_pdf.content, report_stage)
+            else:
+                results: dict[int, tuple[Section, StructuredSection]] = {}
+                async for index, section, structured_section in self._aiter_indexed_structured_sections(extracted_pdf.content):
+                    if not results:
+                        report_stage(ProcessingStage.STRUCTURING)
+                    results[index] = (section, structured_section)
+                ordered = [results[index] for index in sorted(results)]
+        except BaseException:
+            if summary_task is not None:
+                summary_task.cancel()
+            raise
+        print(f"Structured {len(ordered)} sections")
+        structured_sections = StructuredSections(
+            structured_sections=[structured_section for _, structured_section in ordered]
+        )
+
+        report_stage(ProcessingStage.SUMMARIZING)
+        if summary_task is not None:
+            # Await the summary task that was running concurrently
+            summary: str = await summary_task
+        else:
+            summary = await self._asummarize_sections(structured_sections)
         print("Summary generated")
         return ProcessedSafetyDataSheet(
             markdown_content=extracted_pdf.content,
             structured_content=structured_sections,
             summary=summary,
+            sections=[section for section, _ in ordered],
         )
+
+
+def _build_tier_llm(tier: ModelTier) -> OpenAI | Ollama:
+    if tier.provider == "ollama":
+        return Ollama(model=tier.model)
+    return OpenAI(model=tier.model, api_key=Secrets().openai_api_key)
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from enum import Enum
+from typing import Any, Callable
 from pydantic import BaseModel, Field
 
 from sds_digest.src.extraction.extractor import ExtractedPdf
@@ -26,15 +27,28 @@ class StructuredSections(BaseModel):
     structured_sections: list[StructuredSection] = Field(..., description="List of sections in structured format")
 
 
+class ProcessingStage(str, Enum):
+    SPLITTING = "splitting"
+    STRUCTURING = "structuring"
+    SUMMARIZING = "summarizing"
+
+
+StageCallback = Callable[[ProcessingStage], None]
+
+
 class ProcessorIdentifier(BaseModel):
     processor_name: str
     processor_version: str
+    model_name: str
 
 
 class ProcessedSafetyDataSheet(BaseModel):
     markdown_content: str = Field(..., description="The markdown content of the Safety Data Sheet")
-    structured_content: StructuredSections = Field(..., description="The structured content of the Safety Data Sheet")
-    summary: str = Field(..., description="The summary of the Safety Data Sheet in markdown format")
+    structured_content: StructuredSections | None = Field(
+        None, description="The structured content of the Safety Data Sheet, None until it is materialized"
+    )
+    summary: str | None = Field(None, description="The summary of the Safety Data Sheet in markdown format, None until it is materialized")
+    sections: list[Section] = Field(default_factory=list, description="Raw sections as split, used to route questions to the relevant part")
         
 
 class SafetyDataSheetProcessor(ABC):
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+from sds_digest.llms.scheduler import CHARS_PER_TOKEN
+from sds_digest.src.processing.processor import Section
+
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Words users ask about mapped to the vocabulary SDS sections actually use
+QUERY_EXPANSIONS: dict[str, tuple[str, ...]] = {
+    "ppe": ("personal", "protective", "equipment", "gloves", "respiratory", "exposure", "controls"),
+    "gloves": ("hand", "protection", "personal", "protective"),
+    "mask": ("respiratory", "protection"),
+    "respirator": ("respiratory", "protection"),
+    "flash": ("flammable", "flammability", "fire"),
+    "boiling": ("physical", "properties"),
+    "melting": ("physical", "properties"),
+    "density": ("physical", "properties"),
+    "ph": ("physical", "properties"),
+    "odor": ("physical", "properties", "appearance"),
+    "odour": ("physical", "properties", "appearance"),
+    "cas": ("composition", "ingredients", "identification"),
+    "ingredients": ("composition",),
+    "swallowed": ("ingestion", "first", "aid"),
+    "ingested": ("ingestion", "first", "aid"),
+    "inhaled": ("inhalation", "first", "aid"),
+    "eyes": ("eye", "contact", "first", "aid"),
+    "skin": ("contact", "first", "aid", "protection"),
+    "spill": ("accidental", "release", "containment", "cleaning"),
+    "leak": ("accidental", "release"),
+    "extinguish": ("extinguishing", "media", "fire", "fighting"),
+    "store": ("storage", "handling"),
+    "toxic": ("toxicological", "toxicity", "acute"),
+    "ld50": ("toxicological", "acute", "toxicity", "oral"),
+    "environment": ("ecological", "ecotoxicity", "aquatic"),
+    "dispose": ("disposal", "waste"),
+    "shipping": ("transport", "un"),
+    "un": ("transport",),
+    "regulations": ("regulatory",),
+    "pictogram": ("hazard", "identification", "classification"),
+    "signal": ("hazard", "identification", "classification"),
+    "dangerous": ("hazard", "identification"),
+}
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it its me my of on or should "
+    "the this to use used what when where which who why will with you your".split()
+)
+
+
+def estimate_text_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def expand_query(question: str) -> list[str]:
+    terms = tokenize(question)
+    return terms + [expansion for term in terms for expansion in QUERY_EXPANSIONS.get(term, ())]
+
+
+class SectionIndex:
+    """
+    Okapi BM25 index over the sections of one SDS.
+
+    Section titles are indexed twice so that a question naming a topic ("first aid",
+    "transport") prefers the section dedicated to it over passing mentions elsewhere.
+    """
+
+    def __init__(self, sections: list[Section], k1: float = 1.5, b: float = 0.75):
+        self.sections = sections
+        self.k1 = k1
+        self.b = b
+        self._term_frequencies: list[Counter[str]] = []
+        for section in sections:
+            terms = tokenize(section.section_title) * 2 + tokenize(section.raw_content_of_section)
+            self._term_frequencies.append(Counter(terms))
+        self._lengths = [sum(frequencies.values()) for frequencies in self._term_frequencies]
+        self._avg_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        document_frequencies: Counter[str] = Counter()
+        for frequencies in self._term_frequencies:
+            document_frequencies.update(frequencies.keys())
+        count = len(sections)
+        self._idf = {
+            term: math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequencies.items()
+        }
+
+    def scores(self, terms: list[str]) -> list[float]:
+        scores = []
+        for frequencies, length in zip(self._term_frequencies, self._lengths):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / self._avg_length) if self._avg_length else self.k1
+            for term in terms:
+                frequency = frequencies.get(term, 0)
+                if frequency:
+                    score += self._idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+            scores.append(score)
+        return scores
+
+
+class QAContext(BaseModel):
+    text: str = Field(..., description="Context sent to the QA model")
+    mode: Literal["sections", "full_document"] = Field(..., description="Whether the context was narrowed to sections")
+    section_titles: list[str] = Field(default_factory=list, description="Titles of the sections used as context")
+    context_tokens: int = Field(..., description="Estimated tokens of the context sent")
+    document_tokens: int = Field(..., description="Estimated tokens of the full document")
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.document_tokens - self.context_tokens
+
+    @property
+    def cache_key(self) -> str:
+        """Identifies this context among all contexts of the same SDS."""
+        if self.mode == "full_document":
+            return self.mode
+        return "sections:" + "|".join(self.section_titles)
+
+
+class SectionRouterStats(BaseModel):
+    questions: int = Field(..., description="Questions routed")
+    routed_to_sections: int = Field(..., description="Questions answered from selected sections")
+    full_document_fallbacks: int = Field(..., description="Questions that fell back to the full document")
+    tokens_saved: int = Field(..., description="Estimated context tokens saved across all questions")
+    indexes: int = Field(..., description="Section indexes held in memory")
+
+
+class SectionRouter:
+    """
+    Picks the SDS sections relevant to a question.
+
+    Up to `max_sections` sections scoring at least `min_score` and `relative_score`
+    times the best score are used, in document order. The full document is used when
+    the SDS has no stored sections, nothing matches well enough, or the selection
+    would cover more than `max_coverage` of the document anyway. Indexes are kept
+    per SDS in a bounded LRU.
+    """
+
+    def __init__(
+        self,
+        max_sections: int = 3,
+        min_score: float = 1.0,
+        relative_score: float = 0.5,
+        max_coverage: float = 0.8,
+        max_indexes: int = 256,
+    ):
+        self.max_sections = max_sections
+        self.min_score = min_score
+        self.relative_score = relative_score
+        self.max_coverage = max_coverage
+        self.max_indexes = max_indexes
+        self.questions = 0
+        self.routed_to_sections = 0
+        self.full_document_fallbacks = 0
+        self.tokens_saved = 0
+        self._indexes: OrderedDict[str, SectionIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def index(self, sds_id: str, sections: list[Section]) -> SectionIndex:
+        """Index of the SDS's sections, built on first use; call `invalidate` when it is reprocessed."""
+        with self._lock:
+            index = self._indexes.get(sds_id)
+            if index is not None:
+                self._indexes.move_to_end(sds_id)
+                return index
+        index = SectionIndex(sections)
+        with self._lock:
+            self._indexes[sds_id] = index
+            self._indexes.move_to_end(sds_id)
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+        return index
+
+    def invalidate(self, sds_id: str) -> None:
+        with self._lock:
+            self._indexes.pop(sds_id, None)
+
+    def _select(self, index: SectionIndex, question: str) -> list[int]:
+        scores = index.scores(expand_query(question))
+        if not scores:
+            return []
+        best = max(scores)
+        if best < self.min_score:
+            return []
+        ranked = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+        selected = [i for i in ranked[:self.max_sections] if scores[i] >= self.relative_score * best]
+        return sorted(selected)
+
+    def route(self, sds_id: str, question: str, sections: list[Section], markdown: str) -> QAContext:
+        document_tokens = estimate_text_tokens(markdown)
+        if sections:
+            index = self.index(sds_id, sections)
+            sections = index.sections
+            selected = self._select(index, question)
+        else:
+            selected = []
+        text = "\n\n".join(sections[i].raw_content_of_section for i in selected)
+        if not selected or len(text) > self.max_coverage * len(markdown):
+            context = QAContext(
+                text=markdown,
+                mode="full_document",
+                context_tokens=document_tokens,
+                document_tokens=document_tokens,
+            )
+            self.full_document_fallbacks += 1
+        else:
+            context = QAContext(
+                text=text,
+                mode="sections",
+                section_titles=[sections[i].section_title for i in selected],
+                context_tokens=estimate_text_tokens(text),
+                document_tokens=document_tokens,
+            )
+            self.routed_to_sections += 1
+        self.questions += 1
+        self.tokens_saved += context.tokens_saved
+        return context
+
+    def stats(self) -> SectionRouterStats:
+        return SectionRouterStats(
+            questions=self.questions,
+            routed_to_sections=self.routed_to_sections,
+            full_document_fallbacks=self.full_document_fallbacks,
+            tokens_saved=self.tokens_saved,
+            indexes=len(self._indexes),
+        )
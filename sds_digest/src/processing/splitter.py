@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import re
+
+from pydantic import BaseModel, Field
+
+from sds_digest.src.processing.processor import Section, Sections
+
+
+GHS_SECTION_COUNT = 16
+
+# Distinctive words of each of the 16 GHS section titles, used to validate numbered headings
+GHS_SECTION_KEYWORDS: dict[int, tuple[str, ...]] = {
+    1: ("identification", "product and company"),
+    2: ("hazard",),
+    3: ("composition", "ingredient"),
+    4: ("first aid", "first-aid"),
+    5: ("fire",),
+    6: ("accidental", "release"),
+    7: ("handling", "storage"),
+    8: ("exposure", "protection"),
+    9: ("physical", "chemical properties"),
+    10: ("stability", "reactivity"),
+    11: ("toxicolog",),
+    12: ("ecolog",),
+    13: ("disposal",),
+    14: ("transport",),
+    15: ("regulatory",),
+    16: ("other",),
+}
+
+_MARKUP = re.compile(r"^[#\s*_]+|[\s*_]+$")
+_SECTION_KEYWORD = re.compile(r"^section\s*(?P<number>\d{1,2})\b[\s:.)\-–—]*(?P<title>.*)$", re.IGNORECASE)
+_NUMBERED_TITLE = re.compile(r"^(?P<number>\d{1,2})\s*[:.)\-–—]\s*(?P<title>\D.*)$")
+_TITLE_NUMBER = re.compile(r"^\W*(?:section\s*)?(?P<number>\d{1,2})\b", re.IGNORECASE)
+MAX_PLAIN_HEADING_CHARS = 100
+MIN_SECTION_CONTENT_CHARS = 20
+SUMMARY_MAX_CHARS = 200
+
+
+def ghs_section_number(section_title: str) -> int | None:
+    """The GHS number of a section from its title, e.g. 2 for "SECTION 2: Hazard identification"."""
+    if (match := _TITLE_NUMBER.match(section_title)) and 1 <= int(match.group("number")) <= GHS_SECTION_COUNT:
+        return int(match.group("number"))
+    title = section_title.lower()
+    # "Hazard identification" also contains the keyword of section 1, so section 1 is tried last
+    for number in [*range(2, GHS_SECTION_COUNT + 1), 1]:
+        if any(keyword in title for keyword in GHS_SECTION_KEYWORDS[number]):
+            return number
+    return None
+
+
+class SplitResult(BaseModel):
+    sections: Sections = Field(..., description="Sections found in the document")
+    confidence: float = Field(..., description="0..1 estimate of how well the document matched the GHS layout")
+    section_numbers: list[int] = Field(default_factory=list, description="GHS numbers of the sections found")
+
+
+class RuleBasedSectionSplitter:
+    """
+    Splits SDS markdown into the 16 GHS sections without calling an LLM.
+
+    A line starts a section when, stripped of markdown markup, it reads
+    "SECTION n ..." or is a heading (`#` or bold) of the form "n. <title>" whose
+    title contains a keyword of GHS section n. Section numbers must increase, which
+    ignores repeated page headers. Confidence is the share of the 16 sections found
+    with non-trivial content, so tables of contents or unusual layouts score low.
+    """
+
+    def _match_heading(self, line: str) -> tuple[int, str] | None:
+        stripped = line.strip()
+        is_heading = stripped.startswith("#") or stripped.startswith("**") or stripped.startswith("__")
+        text = _MARKUP.sub("", stripped)
+        if not text:
+            return None
+        if (match := _SECTION_KEYWORD.match(text)) and (is_heading or len(text) <= MAX_PLAIN_HEADING_CHARS):
+            number = int(match.group("number"))
+            return number, text
+        if is_heading and (match := _NUMBERED_TITLE.match(text)):
+            number = int(match.group("number"))
+            title = match.group("title").lower()
+            if any(keyword in title for keyword in GHS_SECTION_KEYWORDS.get(number, ())):
+                return number, text
+        return None
+
+    @staticmethod
+    def _summarize(content_lines: list[str]) -> str:
+        for line in content_lines:
+            text = _MARKUP.sub("", line.strip())
+            if text:
+                return text[:SUMMARY_MAX_CHARS]
+        return ""
+
+    def split(self, text: str) -> SplitResult:
+        preamble: list[str] = []
+        found: list[tuple[int, str, list[str]]] = []
+        for line in text.splitlines():
+            heading = self._match_heading(line)
+            last_number = found[-1][0] if found else 0
+            if heading is not None and last_number < heading[0] <= GHS_SECTION_COUNT:
+                found.append((heading[0], heading[1], [line]))
+            elif found:
+                found[-1][2].append(line)
+            else:
+                preamble.append(line)
+
+        sections: list[Section] = []
+        substantial = 0
+        for index, (number, title, lines) in enumerate(found):
+            if index == 0:
+                # Document header (product name, revision date...) belongs to the identification part
+                lines = preamble + lines
+            content = "\n".join(lines).strip()
+            body = lines[len(preamble) + 1:] if index == 0 else lines[1:]
+            if len("".join(body).strip()) >= MIN_SECTION_CONTENT_CHARS:
+                substantial += 1
+            sections.append(Section(
+                section_title=title,
+                section_summary=self._summarize(body),
+                raw_content_of_section=content,
+            ))
+
+        return SplitResult(
+            sections=Sections(sections=sections),
+            confidence=substantial / GHS_SECTION_COUNT,
+            section_numbers=[number for number, _, _ in found],
+        )
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from typing import Any
+
+from sds_digest.src.processing.processor import StructuredSection, StructuredSections
+from sds_digest.src.processing.splitter import ghs_section_number
+
+
+# GHS sections whose structured fields make it into the summary, with the heading used for them
+KEY_SECTIONS: dict[int, str] = {
+    1: "Identification",
+    2: "Hazards",
+    8: "Personal protection",
+}
+MAX_KEY_FIELDS = 8
+MAX_VALUE_CHARS = 200
+
+
+def _shorten(value: str) -> str:
+    value = " ".join(value.split())
+    return value if len(value) <= MAX_VALUE_CHARS else value[: MAX_VALUE_CHARS - 1].rstrip() + "…"
+
+
+def flatten_fields(content: Any, prefix: str = "") -> list[tuple[str, str]]:
+    """Leaf values of structured content as ("Parent / Child", "value") pairs, in document order."""
+    if isinstance(content, dict):
+        fields = []
+        for key, value in content.items():
+            fields += flatten_fields(value, f"{prefix} / {key}" if prefix else str(key))
+        return fields
+    if isinstance(content, list):
+        if all(not isinstance(item, (dict, list)) for item in content):
+            return [(prefix, _shorten("; ".join(str(item) for item in content)))] if content else []
+        return [field for item in content for field in flatten_fields(item, prefix)]
+    if content is None or str(content).strip() == "":
+        return []
+    return [(prefix, _shorten(str(content)))]
+
+
+def _key_section_lines(heading: str, section: StructuredSection) -> list[str]:
+    lines = [f"## {heading}"]
+    if section.section_summary:
+        lines.append(section.section_summary.strip())
+    fields = flatten_fields(section.structured_content)
+    lines += [f"- **{key}**: {value}" for key, value in fields[:MAX_KEY_FIELDS]]
+    return lines
+
+
+def render_summary(structured_sections: StructuredSections) -> str:
+    """
+    A markdown summary built from already structured sections, without an LLM call.
+
+    Identification, hazards and personal protection get their summaries and key fields;
+    every other section is listed with its one-line summary.
+    """
+    key_sections: dict[int, StructuredSection] = {}
+    other_sections: list[StructuredSection] = []
+    for section in structured_sections.structured_sections:
+        number = ghs_section_number(section.section_title)
+        if number in KEY_SECTIONS and number not in key_sections:
+            key_sections[number] = section
+        else:
+            other_sections.append(section)
+
+    blocks = [
+        "\n".join(_key_section_lines(heading, key_sections[number]))
+        for number, heading in KEY_SECTIONS.items()
+        if number in key_sections
+    ]
+    other_lines = [
+        f"- **{section.section_title}**: {section.section_summary.strip()}"
+        for section in other_sections
+        if section.section_summary.strip()
+    ]
+    if other_lines:
+        blocks.append("\n".join(["## Other sections", *other_lines]))
+    return "\n\n".join(blocks)
@@ -0,0 +1,61 @@
+from typing import Literal
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from sds_digest.llms.routing import RoutingPolicy
+from sds_digest.llms.scheduler import ModelBudget
+
+
+class Settings(BaseSettings):
+    extraction_backend: Literal["thread", "process"] = "thread"
+    extractor_pool_size: int = 2
+    extractor_acquire_timeout: float = 120.0
+    extraction_job_timeout: float = 300.0
+    warm_extractor_pool: bool = True
+    job_queue_max_depth: int = 100
+    job_workers: int = 2
+    job_finished_ttl_seconds: float | None = 3600.0
+    job_max_finished: int = 1000
+    upload_max_bytes: int = 50 * 1024 * 1024
+    llm_provider: Literal["openai", "ollama"] = "openai"
+    processor_model: str = "gpt-4o"
+    qa_model: str = "gpt-4o"
+    qa_context: Literal["sections", "full_document"] = "sections"
+    qa_max_sections: int = 3
+    ollama_base_url: str = "http://localhost:11434"
+    ollama_keep_alive: str = "30m"
+    qa_prompt_cache_size: int = 128
+    qa_batch_concurrency: int = 8
+    qa_batch_max_questions: int = 100
+    answer_cache_enabled: bool = True
+    answer_cache_similarity_threshold: float | None = None
+    answer_cache_max_entries: int = 10_000
+    llm_http_max_connections: int = 100
+    llm_http_max_keepalive_connections: int = 20
+    llm_http_timeout: float = 60.0
+    section_splitter: Literal["llm", "rules"] = "rules"
+    summary_mode: Literal["full_document", "sections", "template"] = "full_document"
+    processing_mode: Literal["eager", "lazy"] = "eager"
+    llm_routing: RoutingPolicy | None = None
+    section_batch_tokens: int | None = None
+    result_cache_enabled: bool = True
+    result_cache_max_bytes: int = 512 * 1024 * 1024
+    sds_store_cache_size: int = 128
+    llm_cache_enabled: bool = True
+    llm_cache_ttl_seconds: float = 30 * 24 * 3600
+    llm_cache_max_entries: int = 10_000
+    llm_max_concurrency: int = 16
+    llm_requests_per_minute: int | None = 500
+    llm_tokens_per_minute: int | None = 200_000
+    llm_model_budgets: dict[str, ModelBudget] = {}
+    llm_max_retries: int = 5
+    telemetry_exporter: Literal["none", "opentelemetry"] = "none"
+    model_config = SettingsConfigDict(
+        env_prefix="SDS_DIGEST_",
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+    )
+
+
+SETTINGS = Settings()
@@ -0,0 +1,367 @@
+"""Per-stage spans of the processing pipeline, exported to OpenTelemetry and as Prometheus histograms."""
+from __future__ import annotations
+
+import bisect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Protocol
+
+from sds_digest.llms.utils import PromptUsage
+
+
+class Stage:
+    """Span names of the pipeline stages."""
+    UPLOAD = "upload"
+    EXTRACTION = "extraction"
+    SPLITTING = "splitting"
+    SECTION_STRUCTURING = "section_structuring"
+    SUMMARY = "summary"
+    QA = "qa"
+
+
+class Span:
+    """
+    One timed stage. Code running inside it (the LLM scheduler, the extractor pool,
+    the caches) adds queue wait, token usage and cache hits through `current_span()`.
+    """
+
+    def __init__(self, name: str, attributes: dict[str, Any] | None = None, parent: Span | None = None):
+        self.name = name
+        self.attributes: dict[str, Any] = dict(attributes or {})
+        self.parent = parent
+        self.start_time = time.time()
+        self.end_time: float | None = None
+        self._started_at = time.perf_counter()
+        self.duration_seconds: float | None = None
+        self.queue_wait_seconds = 0.0
+        self.input_tokens: int | None = None
+        self.output_tokens: int | None = None
+        self.cached_tokens: int | None = None
+        # True only if every cache lookup of the span hit; the counts cover spans with several lookups
+        self.cache_hit: bool | None = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Outcomes of parsing LLM output as JSON, e.g. {"valid": 1, "invalid": 1}
+        self.json_parses: dict[str, int] = {}
+        # LLM calls per (model tier, model); concurrent calls on different tiers add up instead of overwriting
+        self.model_calls: dict[tuple[str, str], int] = {}
+        self.error: str | None = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def add_queue_wait(self, seconds: float) -> None:
+        self.queue_wait_seconds += seconds
+
+    def add_usage(self, usage: PromptUsage) -> None:
+        # A stage can span several LLM calls, so usage adds up
+        if usage.prompt_tokens is not None:
+            self.input_tokens = (self.input_tokens or 0) + usage.prompt_tokens
+        if usage.completion_tokens is not None:
+            self.output_tokens = (self.output_tokens or 0) + usage.completion_tokens
+        if usage.cached_tokens is not None:
+            self.cached_tokens = (self.cached_tokens or 0) + usage.cached_tokens
+
+    def add_cache_lookups(self, hits: int, misses: int) -> None:
+        self.cache_hits += hits
+        self.cache_misses += misses
+        self.cache_hit = self.cache_misses == 0
+
+    def add_json_parse(self, outcome: str) -> None:
+        self.json_parses[outcome] = self.json_parses.get(outcome, 0) + 1
+
+    def add_model_call(self, tier: str, model: str) -> None:
+        self.model_calls[(tier, model)] = self.model_calls.get((tier, model), 0) + 1
+
+    def end(self) -> None:
+        self.end_time = time.time()
+        self.duration_seconds = time.perf_counter() - self._started_at
+
+
+class SpanHook(Protocol):
+    """Receives every span as it starts and ends, e.g. to export it to a tracing backend."""
+
+    def on_start(self, span: Span) -> None: ...
+
+    def on_end(self, span: Span) -> None: ...
+
+
+class NoOpSpanHook:
+    def on_start(self, span: Span) -> None:
+        pass
+
+    def on_end(self, span: Span) -> None:
+        pass
+
+
+class OpenTelemetrySpanHook:
+    """
+    Mirrors spans to an OpenTelemetry tracer.
+
+    Needs `opentelemetry-api` (and an SDK with an exporter to send spans anywhere);
+    without a configured tracer provider the spans are dropped by OpenTelemetry itself.
+    """
+
+    def __init__(self, tracer: Any = None):
+        from opentelemetry import trace
+
+        self._trace = trace
+        self.tracer = tracer or trace.get_tracer("sds_digest")
+        self._spans: dict[int, Any] = {}
+
+    def on_start(self, span: Span) -> None:
+        parent = self._spans.get(id(span.parent)) if span.parent is not None else None
+        context = self._trace.set_span_in_context(parent) if parent is not None else None
+        self._spans[id(span)] = self.tracer.start_span(
+            span.name,
+            context=context,
+            attributes=span.attributes,
+            start_time=int(span.start_time * 1e9),
+        )
+
+    def on_end(self, span: Span) -> None:
+        otel_span = self._spans.pop(id(span), None)
+        if otel_span is None:
+            return
+        otel_span.set_attributes(span.attributes)
+        otel_span.set_attribute("sds_digest.queue_wait_ms", span.queue_wait_seconds * 1000)
+        if span.input_tokens is not None:
+            otel_span.set_attribute("gen_ai.usage.input_tokens", span.input_tokens)
+        if span.output_tokens is not None:
+            otel_span.set_attribute("gen_ai.usage.output_tokens", span.output_tokens)
+        if span.cached_tokens is not None:
+            otel_span.set_attribute("sds_digest.cached_tokens", span.cached_tokens)
+        if span.cache_hit is not None:
+            otel_span.set_attribute("sds_digest.cache_hit", span.cache_hit)
+        if span.cache_hits or span.cache_misses:
+            otel_span.set_attribute("sds_digest.cache_hits", span.cache_hits)
+            otel_span.set_attribute("sds_digest.cache_misses", span.cache_misses)
+        for outcome, count in span.json_parses.items():
+            otel_span.set_attribute(f"sds_digest.json_parses.{outcome}", count)
+        for (tier, model), count in span.model_calls.items():
+            otel_span.set_attribute(f"sds_digest.model_calls.{tier}.{model}", count)
+        if span.error is not None:
+            otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, span.error))
+        otel_span.end(end_time=int(span.end_time * 1e9))
+
+
+# Seconds; covers cached lookups up to multi-minute extractions and uploads
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class _Histogram:
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+class StageMetrics:
+    """Span hook aggregating per-stage histograms and counters in the Prometheus text format."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.durations: dict[str, _Histogram] = {}
+        self.queue_waits: dict[str, _Histogram] = {}
+        self.spans: dict[tuple[str, str], int] = {}
+        self.tokens: dict[tuple[str, str], int] = {}
+        self.cache_hits: dict[str, int] = {}
+        self.json_parses: dict[tuple[str, str], int] = {}
+        self.model_calls: dict[tuple[str, str, str], int] = {}
+
+    def on_start(self, span: Span) -> None:
+        pass
+
+    def on_end(self, span: Span) -> None:
+        stage = span.name
+        self.durations.setdefault(stage, _Histogram(self.buckets)).observe(span.duration_seconds)
+        self.queue_waits.setdefault(stage, _Histogram(self.buckets)).observe(span.queue_wait_seconds)
+        status = "error" if span.error is not None else "ok"
+        self.spans[(stage, status)] = self.spans.get((stage, status), 0) + 1
+        for kind, tokens in (("input", span.input_tokens), ("output", span.output_tokens), ("cached", span.cached_tokens)):
+            if tokens:
+                self.tokens[(stage, kind)] = self.tokens.get((stage, kind), 0) + tokens
+        if span.cache_hit:
+            self.cache_hits[stage] = self.cache_hits.get(stage, 0) + 1
+        for outcome, count in span.json_parses.items():
+            self.json_parses[(stage, outcome)] = self.json_parses.get((stage, outcome), 0) + count
+        for (tier, model), count in span.model_calls.items():
+            self.model_calls[(stage, tier, model)] = self.model_calls.get((stage, tier, model), 0) + count
+
+    def _histogram_lines(self, name: str, help_text: str, histograms: dict[str, _Histogram]) -> list[str]:
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for stage, histogram in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(stage=stage, le=repr(bound))} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(stage=stage, le='+Inf')} {histogram.count}")
+            lines.append(f"{name}_sum{_labels(stage=stage)} {histogram.sum}")
+            lines.append(f"{name}_count{_labels(stage=stage)} {histogram.count}")
+        return lines
+
+    def render(self) -> str:
+        lines = self._histogram_lines(
+            "sds_digest_stage_duration_seconds", "Wall time of each pipeline stage.", self.durations
+        )
+        lines += self._histogram_lines(
+            "sds_digest_stage_queue_wait_seconds",
+            "Time each stage waited for an extractor or an LLM slot.",
+            self.queue_waits,
+        )
+        lines += ["# HELP sds_digest_stage_spans_total Finished stage spans.", "# TYPE sds_digest_stage_spans_total counter"]
+        lines += [
+            f"sds_digest_stage_spans_total{_labels(stage=stage, status=status)} {count}"
+            for (stage, status), count in sorted(self.spans.items())
+        ]
+        lines += ["# HELP sds_digest_stage_tokens_total LLM tokens used per stage.", "# TYPE sds_digest_stage_tokens_total counter"]
+        lines += [
+            f"sds_digest_stage_tokens_total{_labels(stage=stage, kind=kind)} {count}"
+            for (stage, kind), count in sorted(self.tokens.items())
+        ]
+        lines += [
+            "# HELP sds_digest_stage_cache_hits_total Stage results served from a cache.",
+            "# TYPE sds_digest_stage_cache_hits_total counter",
+        ]
+        lines += [
+            f"sds_digest_stage_cache_hits_total{_labels(stage=stage)} {count}"
+            for stage, count in sorted(self.cache_hits.items())
+        ]
+        lines += [
+            "# HELP sds_digest_stage_json_parses_total LLM outputs parsed as JSON per stage: valid, repaired or invalid.",
+            "# TYPE sds_digest_stage_json_parses_total counter",
+        ]
+        lines += [
+            f"sds_digest_stage_json_parses_total{_labels(stage=stage, outcome=outcome)} {count}"
+            for (stage, outcome), count in sorted(self.json_parses.items())
+        ]
+        lines += [
+            "# HELP sds_digest_stage_model_calls_total LLM calls per stage on each model tier.",
+            "# TYPE sds_digest_stage_model_calls_total counter",
+        ]
+        lines += [
+            f"sds_digest_stage_model_calls_total{_labels(stage=stage, tier=tier, model=model)} {count}"
+            for (stage, tier, model), count in sorted(self.model_calls.items())
+        ]
+        return "\n".join(lines) + "\n"
+
+
+_CURRENT_SPAN: ContextVar[Span | None] = ContextVar("sds_digest_current_span", default=None)
+_CAPTURED_USAGE: ContextVar[list[PromptUsage] | None] = ContextVar("sds_digest_captured_usage", default=None)
+_CAPTURED_CACHE_LOOKUPS: ContextVar[list[bool] | None] = ContextVar("sds_digest_captured_cache_lookups", default=None)
+
+
+def current_span() -> Span | None:
+    return _CURRENT_SPAN.get()
+
+
+def record_queue_wait(seconds: float) -> None:
+    if (span := current_span()) is not None:
+        span.add_queue_wait(seconds)
+
+
+def record_usage(usage: PromptUsage) -> None:
+    if (span := current_span()) is not None:
+        span.add_usage(usage)
+    if (captured := _CAPTURED_USAGE.get()) is not None:
+        captured.append(usage)
+
+
+@contextmanager
+def capture_usage() -> Iterator[list[PromptUsage]]:
+    """Collect the usage of the LLM calls made inside the block, e.g. to attribute it to one model."""
+    captured: list[PromptUsage] = []
+    token = _CAPTURED_USAGE.set(captured)
+    try:
+        yield captured
+    finally:
+        _CAPTURED_USAGE.reset(token)
+
+
+@contextmanager
+def capture_cache_lookups() -> Iterator[list[bool]]:
+    """Collect whether each cache lookup made inside the block was a hit."""
+    captured: list[bool] = []
+    token = _CAPTURED_CACHE_LOOKUPS.set(captured)
+    try:
+        yield captured
+    finally:
+        _CAPTURED_CACHE_LOOKUPS.reset(token)
+
+
+def record_cache_lookups(hits: int, misses: int) -> None:
+    """Record the outcome of several cache lookups at once, e.g. for the sections of a batch."""
+    if (span := current_span()) is not None:
+        span.add_cache_lookups(hits, misses)
+    if (captured := _CAPTURED_CACHE_LOOKUPS.get()) is not None:
+        captured.extend([True] * hits + [False] * misses)
+
+
+def record_cache_hit(hit: bool = True) -> None:
+    record_cache_lookups(int(hit), int(not hit))
+
+
+def record_json_parse(outcome: str) -> None:
+    if (span := current_span()) is not None:
+        span.add_json_parse(outcome)
+
+
+def record_model_call(tier: str, model: str) -> None:
+    if (span := current_span()) is not None:
+        span.add_model_call(tier, model)
+
+
+class Tracer:
+    """Opens spans and hands them to the registered hooks; spans nest through a context variable."""
+
+    def __init__(self, hooks: list[SpanHook] | None = None):
+        self.hooks: list[SpanHook] = list(hooks or [])
+
+    def add_hook(self, hook: SpanHook) -> None:
+        self.hooks.append(hook)
+
+    def _notify(self, method: str, span: Span) -> None:
+        for hook in self.hooks:
+            try:
+                getattr(hook, method)(span)
+            except Exception as e:
+                # Telemetry must never fail the pipeline
+                print(f"Span hook {type(hook).__name__}.{method} failed: {e}")
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        span = Span(name, attributes, parent=current_span())
+        token = _CURRENT_SPAN.set(span)
+        self._notify("on_start", span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end()
+            _CURRENT_SPAN.reset(token)
+            self._notify("on_end", span)
+
+
+STAGE_METRICS = StageMetrics()
+
+# Process-wide, like OpenTelemetry's global tracer provider; the API adds an exporter hook at startup
+TRACER = Tracer(hooks=[NoOpSpanHook(), STAGE_METRICS])
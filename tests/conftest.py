@@ -3,10 +3,13 @@ import pytest
 import tempfile
 import shutil
 from pathlib import Path
-from unittest.mock import Mock, AsyncMock
+from unittest.mock import Mock, AsyncMock, patch
 from fastapi.testclient import TestClient
 
+from sds_digest.api.answer_cache import AnswerCache
 from sds_digest.api.main import app
+from sds_digest.api.result_cache import ResultCache
+from sds_digest.api.storage import SQLiteSDSStore
 from sds_digest.src.extraction.extractor import ExtractedPdf
 from sds_digest.src.processing.processor import (
     ProcessedSafetyDataSheet,
@@ -23,6 +26,39 @@ def temp_dir():
     shutil.rmtree(temp_path)
 
 
+@pytest.fixture(autouse=True)
+def result_cache(temp_dir):
+    """Point the API result cache at a temporary directory."""
+    cache = ResultCache(temp_dir / "result_cache")
+    with patch('sds_digest.api.main.RESULT_CACHE', cache):
+        yield cache
+
+
+@pytest.fixture(autouse=True)
+def sds_store(temp_dir):
+    """Point the API SDS store at a temporary database."""
+    store = SQLiteSDSStore(temp_dir / "sds.sqlite3")
+    with patch('sds_digest.api.main.SDS_STORE', store):
+        yield store
+    store.close()
+
+
+@pytest.fixture(autouse=True)
+def answer_cache(temp_dir):
+    """Point the API answer cache at a temporary database."""
+    cache = AnswerCache(temp_dir / "answer_cache.sqlite3")
+    with patch('sds_digest.api.main.ANSWER_CACHE', cache):
+        yield cache
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(temp_dir):
+    """Point the API upload directory at a temporary directory."""
+    uploads = temp_dir / "uploads"
+    with patch('sds_digest.api.main.PERSISTENCE.upload_base_dir', uploads):
+        yield uploads
+
+
 @pytest.fixture
 def sample_pdf_path(temp_dir):
     """Create a sample PDF file path (mock)."""
@@ -68,3 +104,11 @@ def sample_processed_sds(sample_extracted_pdf, sample_structured_sections):
 def client():
     """Create a test client for the FastAPI app."""
     return TestClient(app)
+
+
+@pytest.fixture
+def running_client():
+    """Create a test client with the app lifespan running (job queue workers started)."""
+    with patch('sds_digest.api.main.EXTRACTOR_POOL', new_callable=AsyncMock):
+        with TestClient(app) as test_client:
+            yield test_client
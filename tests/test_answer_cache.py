@@ -0,0 +1,132 @@
+"""Tests for the /ask answer cache."""
+import time
+import pytest
+
+from sds_digest.api.answer_cache import AnswerCache, content_words, jaccard, normalize_question, question_shingles
+
+
+@pytest.fixture
+def cache(temp_dir):
+    """Create an answer cache in a temporary directory."""
+    return AnswerCache(temp_dir / "answers.sqlite3", similarity_threshold=0.7)
+
+
+class TestQuestionMatching:
+    """Tests for question normalization and shingle similarity."""
+
+    def test_normalize_question(self):
+        """Test case, punctuation and spacing do not matter."""
+        assert normalize_question("  What is the FLASH point?? ") == "what is the flash point"
+
+    def test_similarity(self):
+        """Test near-duplicates score higher than unrelated questions."""
+        base = question_shingles(normalize_question("What is the flash point?"))
+        near = question_shingles(normalize_question("what's the flash point"))
+        other = question_shingles(normalize_question("Which gloves should I wear?"))
+
+        assert jaccard(base, near) > 0.7
+        assert jaccard(base, other) < 0.3
+
+    def test_content_words(self):
+        """Test stopwords and plurals are ignored while negations are kept."""
+        assert content_words(normalize_question("What's the flash point?")) == {"flash", "point"}
+        assert content_words(normalize_question("Which gloves?")) == content_words(normalize_question("which glove"))
+        assert content_words(normalize_question("Isn't it flammable?")) == {"not", "flammable"}
+
+
+class TestAnswerCache:
+    """Tests for AnswerCache."""
+
+    def test_exact_match(self, cache):
+        """Test a normalized repeat of a question is an exact hit."""
+        cache.put("sds-1", "What is the flash point?", "gpt-4o", "12 °C")
+
+        hit = cache.get("sds-1", "what is the flash point", "gpt-4o")
+
+        assert hit.answer == "12 °C"
+        assert hit.similarity == 1.0
+        assert cache.stats().exact_hits == 1
+
+    def test_near_duplicate_match(self, cache):
+        """Test a reworded question reuses the closest cached answer."""
+        cache.put("sds-1", "What is the flash point?", "gpt-4o", "12 °C")
+        cache.put("sds-1", "Which gloves should I wear?", "gpt-4o", "Nitrile")
+
+        hit = cache.get("sds-1", "what's the flash point", "gpt-4o")
+
+        assert hit.answer == "12 °C"
+        assert hit.question == "What is the flash point?"
+        assert 0.7 <= hit.similarity < 1.0
+        assert cache.stats().similar_hits == 1
+
+    @pytest.mark.parametrize(
+        "cached, asked",
+        [
+            ("Is this product flammable?", "Is this product not flammable?"),
+            ("Is this product flammable?", "Isn't this product flammable?"),
+            ("UN number for transport by sea", "UN number for transport by air"),
+        ],
+    )
+    def test_similar_question_with_other_meaning_is_a_miss(self, cache, cached, asked):
+        """Test near-duplicates that differ in a negation or a content word do not share an answer."""
+        cache.put("sds-1", cached, "gpt-4o", "answer")
+
+        assert jaccard(question_shingles(normalize_question(cached)), question_shingles(normalize_question(asked))) > 0.7
+        assert cache.get("sds-1", asked, "gpt-4o") is None
+        assert cache.stats().misses == 1
+
+    def test_exact_matches_only_by_default(self, temp_dir):
+        """Test near-duplicate matching is off unless a threshold is configured."""
+        cache = AnswerCache(temp_dir / "default.sqlite3")
+        cache.put("sds-1", "What is the flash point?", "gpt-4o", "12 °C")
+
+        assert cache.get("sds-1", "what's the flash point", "gpt-4o") is None
+        assert cache.get("sds-1", "what is the flash point", "gpt-4o").answer == "12 °C"
+
+    def test_scoped_to_sds_and_model(self, cache):
+        """Test answers are not shared across documents or models."""
+        cache.put("sds-1", "What is the flash point?", "gpt-4o", "12 °C")
+
+        assert cache.get("sds-2", "What is the flash point?", "gpt-4o") is None
+        assert cache.get("sds-1", "What is the flash point?", "gpt-4o-mini") is None
+        assert cache.stats().misses == 2
+
+    def test_threshold_none_disables_near_duplicates(self, temp_dir):
+        """Test only exact matches are served without a similarity threshold."""
+        cache = AnswerCache(temp_dir / "exact.sqlite3", similarity_threshold=None)
+        cache.put("sds-1", "What is the flash point?", "gpt-4o", "12 °C")
+
+        assert cache.get("sds-1", "what's the flash point", "gpt-4o") is None
+
+    def test_invalidate(self, cache):
+        """Test reprocessing an SDS drops all of its answers."""
+        cache.put("sds-1", "What is the flash point?", "gpt-4o", "12 °C")
+        cache.put("sds-2", "What is the flash point?", "gpt-4o", "30 °C")
+
+        assert cache.invalidate("sds-1") == 1
+        assert cache.get("sds-1", "What is the flash point?", "gpt-4o") is None
+        assert cache.get("sds-2", "What is the flash point?", "gpt-4o").answer == "30 °C"
+
+    def test_evicts_least_recently_used(self, temp_dir):
+        """Test the oldest answers are evicted beyond max_entries."""
+        cache = AnswerCache(temp_dir / "small.sqlite3", max_entries=2)
+        cache.put("sds-1", "q one", "gpt-4o", "1")
+        cache.put("sds-1", "q two", "gpt-4o", "2")
+        cache.get("sds-1", "q one", "gpt-4o")
+        cache.put("sds-1", "q three", "gpt-4o", "3")
+
+        assert cache.stats().entries == 2
+        assert cache.stats().evictions == 1
+        assert cache.get("sds-1", "q one", "gpt-4o") is not None
+
+    def test_hit_is_fast(self, cache):
+        """Test a cache hit among many answers takes well under 10 ms."""
+        for i in range(200):
+            cache.put("sds-1", f"Question number {i} about the product?", "gpt-4o", f"answer {i}")
+
+        started = time.perf_counter()
+        hit = cache.get("sds-1", "question number 150 about the product", "gpt-4o")
+        elapsed = time.perf_counter() - started
+
+        assert hit.answer == "answer 150"
+        assert elapsed < 0.01
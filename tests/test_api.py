@@ -1,19 +1,18 @@
 """Tests for API endpoints."""
+import asyncio
+import json
+import time
+import httpx
 import pytest
 from unittest.mock import patch, AsyncMock, MagicMock
 from fastapi import UploadFile
 from io import BytesIO
 
-from sds_digest.api.main import app, sds_storage
-from sds_digest.src.processing.processor import ProcessedSafetyDataSheet, StructuredSections, StructuredSection
-
-
-@pytest.fixture(autouse=True)
-def clear_storage():
-    """Clear storage before each test."""
-    sds_storage.clear()
-    yield
-    sds_storage.clear()
+from sds_digest.api.main import app
+from sds_digest.api.jobs import Job, JobQueueFull, JobStatus
+from sds_digest.llms.qa_llm import QAAnswer
+from sds_digest.llms.scheduler import LLMPriority
+from sds_digest.src.processing.processor import ProcessedSafetyDataSheet, Section, StructuredSections, StructuredSection
 
 
 class TestRootEndpoint:
@@ -36,84 +35,278 @@ class TestHealthEndpoint:
         assert response.json() == {"status": "healthy"}
 
 
+def wait_for_job(client, job_id, timeout=5.0):
+    """Poll a job until it reaches a final state."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        data = client.get(f"/api/jobs/{job_id}").json()
+        if data["status"] in ("done", "failed"):
+            return data
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish in {timeout} seconds")
+
+
 class TestUploadEndpoint:
     """Tests for upload endpoint."""
     
-    @patch('sds_digest.api.main.PERSISTENCE')
-    @patch('sds_digest.api.main.MarkerExtractor')
-    @patch('sds_digest.api.main.LLMSafetyDataSheetProcessor')
+    @patch('sds_digest.api.main.LLM_REGISTRY.processor')
     def test_upload_success(
         self, 
-        mock_processor_class, 
-        mock_extractor_class, 
-        mock_persistence,
-        client,
+        mock_registry_processor, 
+        running_client,
+        upload_dir,
+        sds_store,
         sample_processed_sds
     ):
         """Test successful SDS upload."""
         # Setup mocks
-        mock_extractor = MagicMock()
-        mock_extractor.extract_pdf.return_value = MagicMock(
+        from sds_digest.api.main import EXTRACTOR_POOL
+        EXTRACTOR_POOL.aextract_pdf.return_value = MagicMock(
             content="# Test SDS Content"
         )
-        mock_extractor_class.return_value = mock_extractor
         
         mock_processor = AsyncMock()
         mock_processor.aprocess = AsyncMock(return_value=sample_processed_sds)
-        mock_processor_class.from_openai.return_value = mock_processor
-        
-        mock_persistence.save_uploaded_file.return_value = "/path/to/file.pdf"
-        mock_persistence.save_extracted_markdown.return_value = "/path/to/extracted.md"
+        mock_registry_processor.return_value = mock_processor
         
         # Create test file
         file_content = b"PDF content"
         files = {"file": ("test_sds.pdf", BytesIO(file_content), "application/pdf")}
         
         # Make request
-        response = client.post("/api/upload", files=files)
+        response = running_client.post("/api/upload", files=files)
         
         # Assertions
-        assert response.status_code == 200
+        assert response.status_code == 202
         data = response.json()
         assert "sds_id" in data
-        assert data["status"] == "success"
+        assert data["status"] == "queued"
         assert "test_sds.pdf" in data["message"]
         
+        job = wait_for_job(running_client, data["job_id"])
+        assert job["status"] == "done"
+        assert job["sds_id"] == data["sds_id"]
+        
         # Verify storage
-        assert data["sds_id"] in sds_storage
-        assert sds_storage[data["sds_id"]] == sample_processed_sds
+        assert data["sds_id"] in sds_store
+        assert sds_store.get(data["sds_id"]) == sample_processed_sds
+        
+        # Verify result endpoint
+        result = running_client.get(f"/api/jobs/{data['job_id']}/result")
+        assert result.status_code == 200
+        assert result.json()["summary"] == sample_processed_sds.summary
+
+        # Verify the upload and its markdown were streamed to disk
+        assert (upload_dir / data["sds_id"] / "test_sds.pdf").read_bytes() == file_content
+        assert (upload_dir / data["sds_id"] / "extracted.md").read_text() == "# Test SDS Content"
     
-    @patch('sds_digest.api.main.PERSISTENCE')
-    @patch('sds_digest.api.main.MarkerExtractor')
-    def test_upload_extraction_error(self, mock_extractor_class, mock_persistence, client):
+    def test_upload_extraction_error(self, running_client):
         """Test upload with extraction error."""
         # Setup mocks to raise error
-        mock_extractor = MagicMock()
-        mock_extractor.extract_pdf.side_effect = Exception("Extraction failed")
-        mock_extractor_class.return_value = mock_extractor
-        
-        mock_persistence.save_uploaded_file.return_value = "/path/to/file.pdf"
+        from sds_digest.api.main import EXTRACTOR_POOL
+        EXTRACTOR_POOL.aextract_pdf.side_effect = Exception("Extraction failed")
         
         # Create test file
         file_content = b"PDF content"
         files = {"file": ("test_sds.pdf", BytesIO(file_content), "application/pdf")}
         
         # Make request
-        response = client.post("/api/upload", files=files)
+        response = running_client.post("/api/upload", files=files)
         
         # Assertions
-        assert response.status_code == 500
-        assert "Error processing SDS" in response.json()["detail"]
+        assert response.status_code == 202
+        job = wait_for_job(running_client, response.json()["job_id"])
+        assert job["status"] == "failed"
+        assert "Extraction failed" in job["error"]
+        
+        result = running_client.get(f"/api/jobs/{job['job_id']}/result")
+        assert result.status_code == 500
+        assert "Error processing SDS" in result.json()["detail"]
+
+    @patch('sds_digest.api.main.LLM_REGISTRY.processor')
+    def test_duplicate_upload_served_from_cache(
+        self,
+        mock_registry_processor,
+        running_client,
+        upload_dir,
+        result_cache,
+        sds_store,
+        sample_processed_sds
+    ):
+        """Test re-uploading the same PDF skips the pipeline."""
+        from sds_digest.api.main import EXTRACTOR_POOL
+        EXTRACTOR_POOL.aextract_pdf.return_value = MagicMock(content="# Test SDS Content")
+        mock_processor = AsyncMock()
+        mock_processor.aprocess = AsyncMock(return_value=sample_processed_sds)
+        mock_registry_processor.return_value = mock_processor
+
+        first = running_client.post("/api/upload", files={"file": ("a.pdf", BytesIO(b"same bytes"), "application/pdf")})
+        wait_for_job(running_client, first.json()["job_id"])
+        sds_store.delete(first.json()["sds_id"])
+        second = running_client.post("/api/upload", files={"file": ("b.pdf", BytesIO(b"same bytes"), "application/pdf")})
+
+        assert second.status_code == 200
+        data = second.json()
+        assert data["cached"] is True
+        assert data["job_id"] is None
+        assert data["sds_id"] == first.json()["sds_id"]
+        assert sds_store.get(data["sds_id"]) == sample_processed_sds
+        mock_processor.aprocess.assert_called_once()
+        assert result_cache.stats().hits == 1
+        # The duplicate's bytes are not kept around
+        assert [path.name for path in upload_dir.iterdir()] == [first.json()["sds_id"]]
+
+    @patch('sds_digest.api.main.LLM_REGISTRY.processor')
+    def test_lazy_result_not_served_to_eager_upload(
+        self, mock_registry_processor, running_client, result_cache, sample_processed_sds
+    ):
+        """Test a split-only result cached in lazy mode is not reused once processing is eager."""
+        from sds_digest.api.main import EXTRACTOR_POOL
+        EXTRACTOR_POOL.aextract_pdf.return_value = MagicMock(content="# Test SDS Content")
+        mock_processor = AsyncMock()
+        mock_processor.asplit = AsyncMock(return_value=sample_processed_sds)
+        mock_processor.aprocess = AsyncMock(return_value=sample_processed_sds)
+        mock_registry_processor.return_value = mock_processor
+
+        with patch('sds_digest.api.main.SETTINGS.processing_mode', "lazy"):
+            lazy = running_client.post("/api/upload", files={"file": ("a.pdf", BytesIO(b"same bytes"), "application/pdf")})
+            wait_for_job(running_client, lazy.json()["job_id"])
+        eager = running_client.post("/api/upload", files={"file": ("a.pdf", BytesIO(b"same bytes"), "application/pdf")})
+        wait_for_job(running_client, eager.json()["job_id"])
+
+        assert eager.status_code == 202
+        assert eager.json()["cached"] is False
+        mock_processor.aprocess.assert_called_once()
+        assert result_cache.stats().hits == 0
+
+    @patch('sds_digest.api.main.JOB_QUEUE')
+    def test_upload_queue_full(self, mock_job_queue, client, upload_dir):
+        """Test upload is rejected when the job queue is full."""
+        mock_job_queue.submit.side_effect = JobQueueFull("full")
+
+        files = {"file": ("test_sds.pdf", BytesIO(b"PDF content"), "application/pdf")}
+        response = client.post("/api/upload", files=files)
+
+        assert response.status_code == 503
+        assert "Too many SDS uploads" in response.json()["detail"]
+        assert list(upload_dir.iterdir()) == []
+
+    @patch('sds_digest.api.main.JOB_QUEUE')
+    def test_upload_too_large(self, mock_job_queue, client, upload_dir):
+        """Test an upload over the size limit is rejected and not kept on disk."""
+        with patch('sds_digest.api.main.SETTINGS.upload_max_bytes', 4):
+            files = {"file": ("test_sds.pdf", BytesIO(b"PDF content"), "application/pdf")}
+            response = client.post("/api/upload", files=files)
+
+        assert response.status_code == 413
+        mock_job_queue.submit.assert_not_called()
+        assert list(upload_dir.iterdir()) == []
+
+    @patch('sds_digest.api.main.PERSISTENCE')
+    def test_upload_rejected_by_content_length(self, mock_persistence, client):
+        """Test an upload whose Content-Length is over the limit is rejected before its body is read."""
+        with patch('sds_digest.api.main.SETTINGS.upload_max_bytes', 4):
+            files = {"file": ("test_sds.pdf", BytesIO(b"x" * (128 * 1024)), "application/pdf")}
+            response = client.post("/api/upload", files=files)
+
+        assert response.status_code == 413
+        assert "maximum size" in response.json()["detail"]
+        mock_persistence.asave_upload.assert_not_called()
+
+    @patch('sds_digest.api.main.JOB_QUEUE')
+    def test_upload_filename_is_sanitized(self, mock_job_queue, client, upload_dir):
+        """Test a client-supplied path cannot escape the upload directory."""
+        mock_job_queue.submit.return_value = MagicMock(job_id="job-1", status=JobStatus.QUEUED)
+        files = {"file": ("../../etc/passwd.pdf", BytesIO(b"PDF content"), "application/pdf")}
+        response = client.post("/api/upload", files=files)
+
+        assert response.status_code == 202
+        pdf_path = mock_job_queue.submit.call_args.kwargs["pdf_path"]
+        assert pdf_path == str(upload_dir / mock_job_queue.submit.call_args.kwargs["sds_id"] / "passwd.pdf")
+
+
+class TestJobEndpoints:
+    """Tests for job status and result endpoints."""
+
+    def test_get_job_not_found(self, client):
+        """Test status of non-existent job."""
+        response = client.get("/api/jobs/non-existent-id")
+
+        assert response.status_code == 404
+        assert "not found" in response.json()["detail"].lower()
+
+    @patch('sds_digest.api.main.JOB_QUEUE')
+    def test_get_result_of_running_job(self, mock_job_queue, client):
+        """Test result of a job that has not finished yet."""
+        mock_job_queue.get.return_value = Job(
+            job_id="job-1",
+            sds_id="sds-1",
+            filename="test_sds.pdf",
+            pdf_path="/path/to/file.pdf",
+            status=JobStatus.STRUCTURING,
+        )
+
+        response = client.get("/api/jobs/job-1/result")
+
+        assert response.status_code == 409
+        assert "structuring" in response.json()["detail"]
+
+
+class TestExtractorPoolMetricsEndpoint:
+    """Tests for extractor pool metrics endpoint."""
+
+    def test_extractor_pool_metrics(self, client):
+        """Test metrics are reported for the configured pool."""
+        response = client.get("/api/metrics/extractor-pool")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["size"] >= 1
+        assert "avg_wait_seconds" in data
+
+
+class TestLLMSchedulerMetricsEndpoint:
+    """Tests for LLM scheduler metrics endpoint."""
+
+    def test_llm_scheduler_metrics(self, client):
+        """Test the shared scheduler reports its limits and counters."""
+        response = client.get("/api/metrics/llm-scheduler")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["max_concurrency"] >= 1
+        assert data["in_flight"] == 0
+        assert "rate_limit_retries" in data
+
+
+class TestPrometheusMetricsEndpoint:
+    """Tests for the Prometheus /metrics endpoint."""
+
+    @patch('sds_digest.api.main.LLM_REGISTRY.qa_llm')
+    def test_stage_histograms(self, mock_registry_qa_llm, client, sample_processed_sds, sds_store):
+        """Test a QA request shows up in the stage histograms."""
+        mock_qa_llm = AsyncMock()
+        mock_qa_llm.aanswer_with_usage = AsyncMock(return_value=QAAnswer(answer="Acetone"))
+        mock_registry_qa_llm.return_value = mock_qa_llm
+        sds_store.put("sds-1", sample_processed_sds)
+        client.post("/api/sds/sds-1/ask", json={"question": "What is the product?"})
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "# TYPE sds_digest_stage_duration_seconds histogram" in response.text
+        assert 'sds_digest_stage_duration_seconds_count{stage="qa"}' in response.text
 
 
 class TestStructuredExtractEndpoint:
     """Tests for structured extract endpoint."""
     
-    def test_get_structured_extract_success(self, client, sample_processed_sds):
+    def test_get_structured_extract_success(self, client, sample_processed_sds, sds_store):
         """Test successful retrieval of structured extract."""
         # Add to storage
         sds_id = "test-sds-id"
-        sds_storage[sds_id] = sample_processed_sds
+        sds_store.put(sds_id, sample_processed_sds)
         
         # Make request
         response = client.get(f"/api/sds/{sds_id}/structured")
@@ -136,11 +329,11 @@ class TestStructuredExtractEndpoint:
 class TestSummaryEndpoint:
     """Tests for summary endpoint."""
     
-    def test_get_summary_success(self, client, sample_processed_sds):
+    def test_get_summary_success(self, client, sample_processed_sds, sds_store):
         """Test successful retrieval of summary."""
         # Add to storage
         sds_id = "test-sds-id"
-        sds_storage[sds_id] = sample_processed_sds
+        sds_store.put(sds_id, sample_processed_sds)
         
         # Make request
         response = client.get(f"/api/sds/{sds_id}/summary")
@@ -159,20 +352,309 @@ class TestSummaryEndpoint:
         assert "not found" in response.json()["detail"].lower()
 
 
+
+@pytest.fixture
+def lazy_sds(sds_store, sample_processed_sds):
+    """Store an SDS that was only split, as lazy processing leaves it."""
+    section = Section(section_title="1. Identification", section_summary="Test", raw_content_of_section="Name: Test")
+    sds_store.put("lazy-sds", sample_processed_sds.model_copy(
+        update={"structured_content": None, "summary": None, "sections": [section]}
+    ))
+    return "lazy-sds"
+
+
+@pytest.fixture
+def lazy_processor():
+    """Patch the processor used to materialize lazy artifacts."""
+    processor = MagicMock()
+    processor.summary_mode = "full_document"
+    with patch('sds_digest.api.main.LLM_REGISTRY.processor', return_value=processor):
+        yield processor
+
+
+class TestLazyArtifacts:
+    """Tests for summaries and structured content materialized on first access."""
+
+    @patch('sds_digest.api.main.SETTINGS.processing_mode', "lazy")
+    def test_lazy_upload_only_splits(self, running_client, lazy_processor, sds_store, sample_processed_sds):
+        """Test a lazy upload job extracts and splits without structuring or summarizing."""
+        from sds_digest.api.main import EXTRACTOR_POOL
+        EXTRACTOR_POOL.aextract_pdf.return_value = MagicMock(content="# Test SDS Content")
+        lazy_processor.asplit = AsyncMock(return_value=sample_processed_sds.model_copy(
+            update={"structured_content": None, "summary": None}
+        ))
+        lazy_processor.aprocess = AsyncMock()
+
+        response = running_client.post("/api/upload", files={"file": ("a.pdf", BytesIO(b"PDF"), "application/pdf")})
+        job = wait_for_job(running_client, response.json()["job_id"])
+
+        assert job["status"] == "done"
+        lazy_processor.aprocess.assert_not_called()
+        assert sds_store.get_summary(job["sds_id"]) is None
+
+    @pytest.mark.asyncio
+    async def test_concurrent_first_requests_share_one_llm_call(self, lazy_sds, lazy_processor, sds_store):
+        """Test concurrent first /summary requests trigger a single summary generation."""
+        async def asummarize(markdown_content, structured_sections=None):
+            await asyncio.sleep(0.05)
+            return "Lazy summary"
+
+        lazy_processor.asummarize = AsyncMock(side_effect=asummarize)
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            responses = await asyncio.gather(*(client.get(f"/api/sds/{lazy_sds}/summary") for _ in range(3)))
+
+        assert [response.json()["summary"] for response in responses] == ["Lazy summary"] * 3
+        lazy_processor.asummarize.assert_awaited_once()
+        assert sds_store.get_summary(lazy_sds) == "Lazy summary"
+
+    def test_structured_content_materialized_once(self, client, lazy_sds, lazy_processor, sds_store, sample_structured_sections):
+        """Test the first /structured request structures the stored sections and later ones read the store."""
+        lazy_processor.astructure_sections = AsyncMock(return_value=sample_structured_sections)
+
+        first = client.get(f"/api/sds/{lazy_sds}/structured")
+        second = client.get(f"/api/sds/{lazy_sds}/structured")
+
+        assert first.status_code == second.status_code == 200
+        assert first.json()["structured_content"] == sample_structured_sections.model_dump()
+        lazy_processor.astructure_sections.assert_awaited_once()
+        assert lazy_processor.astructure_sections.call_args.args[0] == sds_store.get_sections(lazy_sds)
+
+    def test_sections_summary_mode_structures_first(self, client, lazy_sds, lazy_processor, sample_structured_sections):
+        """Test a summary built from the structured sections materializes them too."""
+        lazy_processor.summary_mode = "template"
+        lazy_processor.astructure_sections = AsyncMock(return_value=sample_structured_sections)
+        lazy_processor.asummarize = AsyncMock(return_value="Template summary")
+
+        response = client.get(f"/api/sds/{lazy_sds}/summary")
+
+        assert response.json()["summary"] == "Template summary"
+        assert lazy_processor.asummarize.call_args.args[1] == sample_structured_sections
+
+    def test_materialization_error(self, client, lazy_sds, lazy_processor):
+        """Test a failing summary generation is reported and retried on the next request."""
+        lazy_processor.asummarize = AsyncMock(side_effect=[TimeoutError("LLM timeout"), "Summary"])
+
+        failed = client.get(f"/api/sds/{lazy_sds}/summary")
+        retried = client.get(f"/api/sds/{lazy_sds}/summary")
+
+        assert failed.status_code == 500
+        assert "LLM timeout" in failed.json()["detail"]
+        assert retried.json()["summary"] == "Summary"
+
+
+def read_sse_events(response) -> list[tuple[str, dict]]:
+    """Parse a Server-Sent Events body into (event, data) pairs."""
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def mock_token_stream(*tokens):
+    """Create a side effect streaming the given tokens."""
+    async def stream(*args, **kwargs):
+        for token in tokens:
+            yield token
+    return stream
+
+
+class TestSummaryStreamEndpoint:
+    """Tests for the streaming summary endpoint."""
+
+    def test_stored_summary_streamed(self, client, sample_processed_sds, sds_store):
+        """Test a stored summary is sent without calling the LLM."""
+        sds_store.put("sds-1", sample_processed_sds)
+
+        response = client.get("/api/sds/sds-1/summary/stream")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert read_sse_events(response) == [
+            ("token", {"token": sample_processed_sds.summary}),
+            ("done", {"sds_id": "sds-1", "summary": sample_processed_sds.summary}),
+        ]
+
+    @patch('sds_digest.api.main.LLM_REGISTRY.processor')
+    def test_regenerated_summary_streamed_and_stored(self, mock_registry_processor, client, sample_processed_sds, sds_store):
+        """Test a regenerated summary is streamed token by token through the processor and replaces the stored one."""
+        mock_processor = MagicMock(summary_mode="full_document")
+        mock_processor.astream_summary = MagicMock(side_effect=mock_token_stream("Flammable", " liquid."))
+        mock_registry_processor.return_value = mock_processor
+        sds_store.put("sds-1", sample_processed_sds)
+
+        response = client.get("/api/sds/sds-1/summary/stream", params={"regenerate": True})
+
+        events = read_sse_events(response)
+        assert [data["token"] for event, data in events if event == "token"] == ["Flammable", " liquid."]
+        assert events[-1] == ("done", {"sds_id": "sds-1", "summary": "Flammable liquid."})
+        assert sds_store.get_summary("sds-1") == "Flammable liquid."
+        assert mock_processor.astream_summary.call_args.kwargs["priority"] == LLMPriority.INTERACTIVE
+
+    @patch('sds_digest.api.main.LLM_REGISTRY.processor')
+    def test_regenerated_summary_uses_summary_mode(self, mock_registry_processor, client, sample_processed_sds, sds_store):
+        """Test regenerating in a sections summary mode passes the stored structured content to the processor."""
+        mock_processor = MagicMock(summary_mode="sections")
+        mock_processor.astream_summary = MagicMock(side_effect=mock_token_stream("From sections."))
+        mock_registry_processor.return_value = mock_processor
+        sds_store.put("sds-1", sample_processed_sds)
+
+        response = client.get("/api/sds/sds-1/summary/stream", params={"regenerate": True})
+
+        assert read_sse_events(response)[-1] == ("done", {"sds_id": "sds-1", "summary": "From sections."})
+        assert mock_processor.astream_summary.call_args.args[1] == sds_store.get_structured_content("sds-1")
+
+    def test_stream_summary_not_found(self, client):
+        """Test streaming the summary of a non-existent SDS."""
+        response = client.get("/api/sds/non-existent-id/summary/stream")
+
+        assert response.status_code == 404
+
+
+class TestAskStreamEndpoint:
+    """Tests for the streaming ask endpoint."""
+
+    @patch('sds_digest.api.main.LLM_REGISTRY.qa_llm')
+    def test_answer_streamed(self, mock_registry_qa_llm, client, sample_processed_sds, sds_store, answer_cache):
+        """Test answer tokens are streamed, followed by the full response, and the answer is cached."""
+        mock_qa_llm = MagicMock()
+        mock_qa_llm.astream_answer = MagicMock(side_effect=mock_token_stream("Test", " Chemical"))
+        mock_registry_qa_llm.return_value = mock_qa_llm
+        sds_store.put("sds-1", sample_processed_sds)
+
+        response = client.post("/api/sds/sds-1/ask/stream", json={"question": "What is the chemical name?"})
+
+        assert response.status_code == 200
+        events = read_sse_events(response)
+        assert events[:2] == [("token", {"token": "Test"}), ("token", {"token": " Chemical"})]
+        event, data = events[2]
+        assert event == "done"
+        assert data["answer"] == "Test Chemical"
+        assert data["stats"]["first_token_ms"] <= data["stats"]["latency_ms"]
+        assert answer_cache.get("sds-1", "What is the chemical name?", "gpt-4o").answer == "Test Chemical"
+
+    @patch('sds_digest.api.main.LLM_REGISTRY.qa_llm')
+    def test_cached_answer_streamed(self, mock_registry_qa_llm, client, sample_processed_sds, sds_store, answer_cache):
+        """Test a cached answer is sent as a single token without calling the LLM."""
+        sds_store.put("sds-1", sample_processed_sds)
+        answer_cache.put("sds-1", "What is the flash point?", "gpt-4o", "12 °C")
+
+        response = client.post("/api/sds/sds-1/ask/stream", json={"question": "What is the flash point?"})
+
+        events = read_sse_events(response)
+        assert events[0] == ("token", {"token": "12 °C"})
+        assert events[1][1]["cached"] is True
+        mock_registry_qa_llm.assert_not_called()
+
+    @patch('sds_digest.api.main.LLM_REGISTRY.qa_llm')
+    def test_llm_error_ends_stream(self, mock_registry_qa_llm, client, sample_processed_sds, sds_store):
+        """Test an LLM failure mid-stream is reported as an error event."""
+        async def failing_stream(*args, **kwargs):
+            yield "Partial"
+            raise RuntimeError("connection reset")
+
+        mock_qa_llm = MagicMock()
+        mock_qa_llm.astream_answer = MagicMock(side_effect=failing_stream)
+        mock_registry_qa_llm.return_value = mock_qa_llm
+        sds_store.put("sds-1", sample_processed_sds)
+
+        response = client.post("/api/sds/sds-1/ask/stream", json={"question": "What is the chemical name?"})
+
+        events = read_sse_events(response)
+        assert events[-1][0] == "error"
+        assert "connection reset" in events[-1][1]["detail"]
+
+    def test_ask_stream_not_found(self, client):
+        """Test streaming an answer for a non-existent SDS."""
+        response = client.post("/api/sds/non-existent-id/ask/stream", json={"question": "What is the chemical name?"})
+
+        assert response.status_code == 404
+
+class TestAskBatchEndpoint:
+    """Tests for the batch ask endpoint."""
+
+    @patch('sds_digest.api.main.LLM_REGISTRY.qa_llm')
+    def test_concurrent_mode(self, mock_registry_qa_llm, client, sample_processed_sds, sds_store, answer_cache):
+        """Test every question gets its own call and answers stream back with their index."""
+        async def answer(question, *args):
+            return QAAnswer(answer=f"Answer to {question}")
+
+        mock_qa_llm = MagicMock()
+        mock_qa_llm.aanswer_with_usage = AsyncMock(side_effect=answer)
+        mock_registry_qa_llm.return_value = mock_qa_llm
+        sds_store.put("sds-1", sample_processed_sds)
+        answer_cache.put("sds-1", "What is the CAS number?", "gpt-4o", "123-45-6")
+        questions = ["What is the CAS number?", "What is the flash point?", "Which gloves?"]
+
+        response = client.post("/api/sds/sds-1/ask/batch", json={"questions": questions})
+
+        assert response.status_code == 200
+        events = read_sse_events(response)
+        answers = {data["index"]: data for event, data in events if event == "answer"}
+        assert answers[0]["cached"] is True
+        assert answers[1]["answer"] == "Answer to What is the flash point?"
+        assert answers[2]["answer"] == "Answer to Which gloves?"
+        assert mock_qa_llm.aanswer_with_usage.call_count == 2
+        assert events[-1][1] | {"latency_ms": 0} == {
+            "sds_id": "sds-1", "mode": "concurrent", "questions": 3, "answered": 3,
+            "cached": 1, "failed": 0, "llm_calls": 2, "latency_ms": 0,
+        }
+        assert answer_cache.get("sds-1", "Which gloves?", "gpt-4o").answer == "Answer to Which gloves?"
+
+    @patch('sds_digest.api.main.LLM_REGISTRY.qa_llm')
+    def test_packed_mode(self, mock_registry_qa_llm, client, sample_processed_sds, sds_store):
+        """Test all questions go to one call and questions the model skipped are reported as failed."""
+        async def batch_answers(questions, *args):
+            yield 1, "12 °C"
+
+        mock_qa_llm = MagicMock()
+        mock_qa_llm.astream_batch_answers = MagicMock(side_effect=batch_answers)
+        mock_registry_qa_llm.return_value = mock_qa_llm
+        sds_store.put("sds-1", sample_processed_sds)
+
+        response = client.post(
+            "/api/sds/sds-1/ask/batch",
+            json={"questions": ["What is the CAS number?", "What is the flash point?"], "mode": "packed"},
+        )
+
+        events = read_sse_events(response)
+        assert [(data["index"], data["answer"]) for event, data in events if event == "answer"] == [(1, "12 °C"), (0, None)]
+        assert events[1][1]["error"] is not None
+        assert events[-1][1]["llm_calls"] == 1
+        assert events[-1][1]["failed"] == 1
+        mock_qa_llm.astream_batch_answers.assert_called_once()
+        assert mock_qa_llm.astream_batch_answers.call_args.args[0] == ["What is the CAS number?", "What is the flash point?"]
+
+    def test_too_many_questions(self, client, sample_processed_sds, sds_store):
+        """Test batches over the configured limit are rejected."""
+        sds_store.put("sds-1", sample_processed_sds)
+
+        with patch('sds_digest.api.main.SETTINGS.qa_batch_max_questions', 2):
+            response = client.post("/api/sds/sds-1/ask/batch", json={"questions": ["a", "b", "c"]})
+
+        assert response.status_code == 422
+
+    def test_ask_batch_not_found(self, client):
+        """Test a batch for a non-existent SDS."""
+        response = client.post("/api/sds/non-existent-id/ask/batch", json={"questions": ["What is it?"]})
+
+        assert response.status_code == 404
+
 class TestAskEndpoint:
     """Tests for ask question endpoint."""
     
-    @patch('sds_digest.api.main.QALLM')
-    def test_ask_question_success(self, mock_qa_llm_class, client, sample_processed_sds):
+    @patch('sds_digest.api.main.LLM_REGISTRY.qa_llm')
+    def test_ask_question_success(self, mock_registry_qa_llm, client, sample_processed_sds, sds_store):
         """Test successful question answering."""
         # Setup mocks
         mock_qa_llm = AsyncMock()
-        mock_qa_llm.aanswer = AsyncMock(return_value="This is a test answer.")
-        mock_qa_llm_class.from_openai.return_value = mock_qa_llm
+        mock_qa_llm.aanswer_with_usage = AsyncMock(return_value=QAAnswer(answer="This is a test answer."))
+        mock_registry_qa_llm.return_value = mock_qa_llm
         
         # Add to storage
         sds_id = "test-sds-id"
-        sds_storage[sds_id] = sample_processed_sds
+        sds_store.put(sds_id, sample_processed_sds)
         
         # Make request
         response = client.post(
@@ -188,7 +670,56 @@ class TestAskEndpoint:
         assert data["answer"] == "This is a test answer."
         
         # Verify LLM was called
-        mock_qa_llm.aanswer.assert_called_once()
+        mock_qa_llm.aanswer_with_usage.assert_called_once()
+        assert data["stats"]["context_mode"] == "full_document"
+        assert data["stats"]["latency_ms"] >= 0
+
+    @patch('sds_digest.api.main.LLM_REGISTRY.qa_llm')
+    def test_repeated_question_served_from_answer_cache(
+        self, mock_registry_qa_llm, client, sample_processed_sds, sds_store, answer_cache
+    ):
+        """Test asking the same question again skips the LLM."""
+        mock_qa_llm = AsyncMock()
+        mock_qa_llm.aanswer_with_usage = AsyncMock(return_value=QAAnswer(answer="Flash point is 12 °C."))
+        mock_registry_qa_llm.return_value = mock_qa_llm
+        sds_store.put("sds-1", sample_processed_sds)
+
+        first = client.post("/api/sds/sds-1/ask", json={"question": "What is the flash point?"})
+        second = client.post("/api/sds/sds-1/ask", json={"question": "what is the flash point"})
+
+        assert first.json()["cached"] is False
+        data = second.json()
+        assert data["cached"] is True
+        assert data["answer"] == "Flash point is 12 °C."
+        assert data["matched_question"] == "What is the flash point?"
+        mock_qa_llm.aanswer_with_usage.assert_called_once()
+        assert answer_cache.stats().exact_hits == 1
+
+    @patch('sds_digest.api.main.LLM_REGISTRY.qa_llm')
+    def test_ask_question_uses_relevant_sections(self, mock_registry_qa_llm, client, sample_processed_sds, sds_store):
+        """Test only the matching section is sent to the model."""
+        mock_qa_llm = AsyncMock()
+        mock_qa_llm.aanswer_with_usage = AsyncMock(return_value=QAAnswer(answer="Wear nitrile gloves."))
+        mock_registry_qa_llm.return_value = mock_qa_llm
+        sections = [
+            Section(section_title="1. Identification", section_summary="", raw_content_of_section="Product name: Test Chemical"),
+            Section(section_title="8. Exposure controls/personal protection", section_summary="",
+                    raw_content_of_section="Hand protection: nitrile gloves. Eye protection: goggles."),
+            Section(section_title="14. Transport information", section_summary="", raw_content_of_section="UN1090, class 3"),
+        ]
+        markdown = "\n\n".join(section.raw_content_of_section for section in sections) + "\n" + "Other text. " * 50
+        sds_store.put("sds-sections", sample_processed_sds.model_copy(
+            update={"markdown_content": markdown, "sections": sections}
+        ))
+
+        response = client.post("/api/sds/sds-sections/ask", json={"question": "Which gloves should I wear?"})
+
+        assert response.status_code == 200
+        stats = response.json()["stats"]
+        assert stats["context_mode"] == "sections"
+        assert stats["sections"] == ["8. Exposure controls/personal protection"]
+        assert stats["tokens_saved"] > 0
+        assert mock_qa_llm.aanswer_with_usage.call_args.args[1] == sections[1].raw_content_of_section
     
     def test_ask_question_not_found(self, client):
         """Test asking question for non-existent SDS."""
@@ -200,10 +731,10 @@ class TestAskEndpoint:
         assert response.status_code == 404
         assert "not found" in response.json()["detail"].lower()
     
-    def test_ask_question_invalid_request(self, client, sample_processed_sds):
+    def test_ask_question_invalid_request(self, client, sample_processed_sds, sds_store):
         """Test asking question with invalid request body."""
         sds_id = "test-sds-id"
-        sds_storage[sds_id] = sample_processed_sds
+        sds_store.put(sds_id, sample_processed_sds)
         
         response = client.post(
             f"/api/sds/{sds_id}/ask",
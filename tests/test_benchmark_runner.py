@@ -0,0 +1,128 @@
+"""Tests for the parallel, resumable benchmark runner."""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from sds_digest.llms.judge_llm import Judgment
+from sds_digest.llms.qa_llm import QAAnswer
+from sds_digest.src.benchmark_models import BenchmarkQuestion, BenchmarkQuestions
+from sds_digest.src.benchmark_runner import (
+    BenchmarkResult,
+    BenchmarkRunner,
+    ModelPrice,
+    build_report,
+    load_checkpoint,
+    percentile,
+)
+
+
+def make_question(question_id: int) -> BenchmarkQuestion:
+    """Create a benchmark question."""
+    return BenchmarkQuestion(
+        id=question_id,
+        section="1. Identification",
+        reference="Product name: Acetone",
+        reason="Basic identification",
+        question=f"Question {question_id}?",
+        example_of_correct_answer="Acetone",
+        description_of_correct_answer="Must name Acetone",
+    )
+
+
+@pytest.fixture
+def questions():
+    """Create a small benchmark."""
+    return BenchmarkQuestions(questions=[make_question(1), make_question(2)])
+
+
+@pytest.fixture
+def registry():
+    """Create a registry whose QA model answers and whose judge accepts everything."""
+    qa_llm = MagicMock()
+    qa_llm.aanswer_with_usage = AsyncMock(
+        return_value=QAAnswer(answer="Acetone", prompt_tokens=1000, cached_tokens=500, completion_tokens=10)
+    )
+    judge_llm = MagicMock()
+    judge_llm.ajudge = AsyncMock(return_value=Judgment(reason="Names acetone", correctness=True))
+    registry = MagicMock()
+    registry.qa_llm.return_value = qa_llm
+    registry.judge_llm.return_value = judge_llm
+    return registry
+
+
+class TestBenchmarkRunner:
+    """Tests for BenchmarkRunner."""
+
+    @pytest.mark.asyncio
+    async def test_runs_every_document_model_and_question(self, temp_dir, registry, questions):
+        """Test all combinations are answered, judged and checkpointed."""
+        runner = BenchmarkRunner(registry, checkpoint_path=temp_dir / "results.jsonl", concurrency=2)
+
+        results = await runner.arun({"a.md": "SDS A", "b.md": "SDS B"}, ["gpt-4o", "gpt-4o-mini"], questions)
+
+        assert len(results) == 8
+        assert all(result.correct for result in results)
+        assert all(result.latency_ms is not None for result in results)
+        assert len(load_checkpoint(temp_dir / "results.jsonl")) == 8
+        assert registry.qa_llm.return_value.aanswer_with_usage.await_count == 8
+
+    @pytest.mark.asyncio
+    async def test_resumes_from_checkpoint(self, temp_dir, registry, questions):
+        """Test finished questions are skipped and failed ones are run again."""
+        checkpoint = temp_dir / "results.jsonl"
+        done = BenchmarkResult(sds="a.md", model="gpt-4o", question_id=1, question="Question 1?", correct=True)
+        failed = BenchmarkResult(sds="a.md", model="gpt-4o", question_id=2, question="Question 2?", error="Timeout")
+        checkpoint.write_text(done.model_dump_json() + "\n" + failed.model_dump_json() + "\n" + '{"sds": "a.m')
+        runner = BenchmarkRunner(registry, checkpoint_path=checkpoint)
+
+        results = await runner.arun({"a.md": "SDS A"}, ["gpt-4o"], questions)
+
+        qa_llm = registry.qa_llm.return_value
+        qa_llm.aanswer_with_usage.assert_awaited_once()
+        assert qa_llm.aanswer_with_usage.call_args.args[0] == "Question 2?"
+        assert sorted(result.question_id for result in results) == [1, 2]
+        assert all(result.error is None for result in load_checkpoint(checkpoint).values())
+
+    @pytest.mark.asyncio
+    async def test_errors_are_recorded(self, temp_dir, registry, questions):
+        """Test a failing answer is recorded instead of aborting the run."""
+        registry.qa_llm.return_value.aanswer_with_usage = AsyncMock(side_effect=RuntimeError("rate limited"))
+        runner = BenchmarkRunner(registry, checkpoint_path=temp_dir / "results.jsonl")
+
+        results = await runner.arun({"a.md": "SDS A"}, ["gpt-4o"], questions)
+
+        assert [result.error for result in results] == ["RuntimeError: rate limited"] * 2
+        assert load_checkpoint(temp_dir / "results.jsonl") == {}
+
+
+class TestReport:
+    """Tests for the benchmark report."""
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles."""
+        values = [float(value) for value in range(1, 101)]
+
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 95) == 95.0
+        assert percentile([], 50) is None
+
+    def test_report_per_model(self):
+        """Test accuracy, latency, tokens and cost are aggregated per model."""
+        results = [
+            BenchmarkResult(sds="a.md", model="gpt-4o", question_id=1, question="q", correct=True, latency_ms=100,
+                            prompt_tokens=1_000_000, cached_tokens=500_000, completion_tokens=100_000),
+            BenchmarkResult(sds="a.md", model="gpt-4o", question_id=2, question="q", correct=False, latency_ms=300),
+            BenchmarkResult(sds="a.md", model="gpt-4o", question_id=3, question="q", error="Timeout"),
+            BenchmarkResult(sds="a.md", model="llama3", question_id=1, question="q", correct=True, latency_ms=50),
+        ]
+
+        reports = build_report(results, prices={"gpt-4o": ModelPrice(input=2.0, cached_input=1.0, output=10.0)})
+
+        gpt, llama = reports
+        assert gpt.model == "gpt-4o"
+        assert gpt.accuracy == 0.5
+        assert gpt.errors == 1
+        assert gpt.p50_latency_ms == 100
+        assert gpt.p95_latency_ms == 300
+        assert gpt.cost_usd == pytest.approx(1.0 + 0.5 + 1.0)
+        assert llama.accuracy == 1.0
+        assert llama.cost_usd is None
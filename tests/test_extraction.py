@@ -0,0 +1,162 @@
+"""Tests for the extraction backends."""
+import asyncio
+import multiprocessing
+import os
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+
+from sds_digest.src.extraction.extractor import ExtractedPdf, Extractor
+from sds_digest.src.extraction.pool import MarkerExtractorPool, ExtractorPoolTimeout
+from sds_digest.src.extraction.process_pool import (
+    ExtractionTimeout,
+    ExtractionWorkerCrashed,
+    ProcessPoolExtractor,
+)
+
+
+@pytest.fixture
+def mock_marker():
+    """Patch marker model loading and converter construction."""
+    with patch('sds_digest.src.extraction.pool.create_model_dict') as mock_create_model_dict, \
+            patch('sds_digest.src.extraction.pool.MarkerExtractor') as mock_extractor_class:
+        mock_create_model_dict.return_value = {"layout_model": object()}
+        mock_extractor_class.side_effect = lambda artifact_dict: MagicMock(
+            artifact_dict=artifact_dict,
+            extract_pdf=MagicMock(return_value=ExtractedPdf(content="# SDS", source_file_path="a.pdf")),
+        )
+        yield mock_create_model_dict, mock_extractor_class
+
+
+class TestMarkerExtractorPool:
+    """Tests for MarkerExtractorPool."""
+
+    @pytest.mark.asyncio
+    async def test_models_loaded_once_and_shared(self, mock_marker):
+        """Test that models are loaded once and shared by every extractor."""
+        mock_create_model_dict, mock_extractor_class = mock_marker
+        pool = MarkerExtractorPool(size=3)
+
+        await pool.astart()
+        await pool.astart()
+
+        mock_create_model_dict.assert_called_once()
+        assert mock_extractor_class.call_count == 3
+        artifact_dicts = {id(call.kwargs["artifact_dict"]) for call in mock_extractor_class.call_args_list}
+        assert artifact_dicts == {id(pool.artifact_dict)}
+
+    @pytest.mark.asyncio
+    async def test_extract_returns_extractor_to_pool(self, mock_marker):
+        """Test extraction through the pool releases the extractor afterwards."""
+        pool = MarkerExtractorPool(size=1)
+
+        extracted = await pool.aextract_pdf("a.pdf")
+        extracted_again = await pool.aextract_pdf("a.pdf")
+
+        assert extracted.content == "# SDS"
+        assert extracted_again.content == "# SDS"
+        metrics = pool.metrics()
+        assert metrics.acquisitions == 2
+        assert metrics.available == 1
+        assert metrics.in_use == 0
+
+    @pytest.mark.asyncio
+    async def test_acquire_times_out_when_exhausted(self, mock_marker):
+        """Test bounded waiting when every extractor is checked out."""
+        pool = MarkerExtractorPool(size=1, acquire_timeout=0.01)
+
+        async with pool.acquire():
+            with pytest.raises(ExtractorPoolTimeout):
+                async with pool.acquire():
+                    pass
+
+        metrics = pool.metrics()
+        assert metrics.timeouts == 1
+        assert metrics.acquisitions == 1
+        assert metrics.waiting == 0
+
+
+class FakeExtractor(Extractor):
+    """Extractor used inside worker processes; misbehaves on purpose for some paths."""
+
+    def extract_pdf(self, pdf_path: str) -> ExtractedPdf:
+        if pdf_path == "crash.pdf":
+            os._exit(1)
+        if pdf_path == "slow.pdf":
+            time.sleep(30)
+        if pdf_path == "medium.pdf":
+            time.sleep(0.8)
+        return ExtractedPdf(content=f"# {pdf_path}", source_file_path=pdf_path)
+
+
+@pytest.fixture
+def process_extractor():
+    """Create a forked process pool extractor backed by FakeExtractor."""
+    extractor = ProcessPoolExtractor(
+        max_workers=2,
+        job_timeout=1.0,
+        extractor_factory=FakeExtractor,
+        mp_context="fork",
+    )
+    yield extractor
+    extractor.shutdown()
+
+
+class TestProcessPoolExtractor:
+    """Tests for ProcessPoolExtractor."""
+
+    @pytest.mark.asyncio
+    async def test_extracts_concurrently(self, process_extractor):
+        """Test several documents are extracted through the worker pool."""
+        results = await asyncio.gather(*[process_extractor.aextract_pdf(f"{i}.pdf") for i in range(4)])
+
+        assert [result.content for result in results] == [f"# {i}.pdf" for i in range(4)]
+        assert process_extractor.metrics().acquisitions == 4
+
+    @pytest.mark.asyncio
+    async def test_recovers_from_worker_crash(self, process_extractor):
+        """Test a crashing job fails and the pool keeps serving afterwards."""
+        with pytest.raises(ExtractionWorkerCrashed):
+            await process_extractor.aextract_pdf("crash.pdf")
+
+        result = await process_extractor.aextract_pdf("ok.pdf")
+
+        assert result.content == "# ok.pdf"
+        metrics = process_extractor.metrics()
+        assert metrics.crashes == 2
+        assert metrics.restarts == 2
+
+    @pytest.mark.asyncio
+    async def test_job_timeout_restarts_pool(self, process_extractor):
+        """Test a stuck job times out and does not block later jobs."""
+        with pytest.raises(ExtractionTimeout):
+            await process_extractor.aextract_pdf("slow.pdf")
+
+        result = await process_extractor.aextract_pdf("ok.pdf")
+
+        assert result.content == "# ok.pdf"
+        assert process_extractor.metrics().job_timeouts == 1
+
+    @pytest.mark.asyncio
+    async def test_job_timeout_fails_only_that_job(self, process_extractor):
+        """Test a job running next to a stuck one finishes, and the stuck worker is terminated afterwards."""
+        slow = asyncio.create_task(process_extractor.aextract_pdf("slow.pdf"))
+        await asyncio.sleep(0.5)
+
+        medium = await process_extractor.aextract_pdf("medium.pdf")
+        with pytest.raises(ExtractionTimeout):
+            await slow
+
+        assert medium.content == "# medium.pdf"
+        metrics = process_extractor.metrics()
+        assert (metrics.job_timeouts, metrics.crashes, metrics.acquisitions) == (1, 0, 1)
+        deadline = time.monotonic() + 5
+        while len(multiprocessing.active_children()) > process_extractor.max_workers and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        assert len(multiprocessing.active_children()) <= process_extractor.max_workers
+
+    def test_sync_extract(self, process_extractor):
+        """Test the blocking Extractor interface."""
+        result = process_extractor.extract_pdf("sync.pdf")
+
+        assert result.content == "# sync.pdf"
@@ -0,0 +1,163 @@
+"""Tests for the deterministic fake LLM and the offline performance benchmark."""
+import json
+
+import pytest
+from llama_index.core.llms import ChatMessage
+from pydantic import BaseModel
+
+from sds_digest.llms.fake_llm import FakeLLM, FakeLLMConfig, FakeLLMError
+from sds_digest.llms.utils import prompt_usage
+from sds_digest.src.perf_benchmark import (
+    PerfConfig,
+    PerfReport,
+    bench_process,
+    bench_summary_modes,
+    check_thresholds,
+    synthetic_sds_markdown,
+)
+from sds_digest.src.processing.splitter import RuleBasedSectionSplitter
+
+
+FAST = FakeLLMConfig(first_token_latency_ms=0, prompt_tokens_per_second=1e9, output_tokens_per_second=1e9)
+
+
+class Answer(BaseModel):
+    text: str
+    items: list[str]
+
+
+def user(content: str) -> list[ChatMessage]:
+    return [ChatMessage(role="user", content=content)]
+
+
+class TestFakeLLM:
+    """Tests for FakeLLM."""
+
+    @pytest.mark.asyncio
+    async def test_same_seed_same_output(self):
+        """Test outputs are reproducible for a seed and differ between seeds."""
+        first = await FakeLLM(config=FAST).achat(user("Hello"))
+        second = await FakeLLM(config=FAST).achat(user("Hello"))
+        other = await FakeLLM(config=FAST.model_copy(update={"seed": 1})).achat(user("Hello"))
+
+        assert first.message.content == second.message.content
+        assert first.message.content != other.message.content
+
+    @pytest.mark.asyncio
+    async def test_reports_usage(self):
+        """Test responses carry token counts the way Ollama reports them."""
+        llm = FakeLLM(config=FAST)
+
+        response = await llm.achat(user("x" * 400))
+
+        usage = prompt_usage(response)
+        assert usage.prompt_tokens == 100
+        assert usage.completion_tokens > 0
+        assert llm.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_injects_errors(self):
+        """Test injected failures carry a status code, so the scheduler can retry rate limits."""
+        rate_limited = FakeLLM(config=FAST.model_copy(update={"rate_limit_rate": 1.0}))
+        failing = FakeLLM(config=FAST.model_copy(update={"error_rate": 1.0}))
+
+        with pytest.raises(FakeLLMError) as rate_limit:
+            await rate_limited.achat(user("Hello"))
+        with pytest.raises(FakeLLMError) as error:
+            await failing.achat(user("Hello"))
+
+        assert rate_limit.value.status_code == 429
+        assert error.value.status_code == 500
+
+    @pytest.mark.asyncio
+    async def test_retry_rolls_again(self):
+        """Test a retried request is not doomed to fail the same way."""
+        llm = FakeLLM(config=FAST.model_copy(update={"error_rate": 0.5}))
+
+        outcomes = []
+        for _ in range(20):
+            try:
+                await llm.achat(user("Hello"))
+                outcomes.append(True)
+            except FakeLLMError:
+                outcomes.append(False)
+
+        assert True in outcomes and False in outcomes
+
+    @pytest.mark.asyncio
+    async def test_answers_json_when_asked(self):
+        """Test requests mentioning JSON get a parseable object, or a truncated one when injected."""
+        valid = await FakeLLM(config=FAST).achat(user("Return JSON"))
+        broken = await FakeLLM(config=FAST.model_copy(update={"invalid_json_rate": 1.0})).achat(user("Return JSON"))
+
+        assert isinstance(json.loads(valid.message.content), dict)
+        with pytest.raises(json.JSONDecodeError):
+            json.loads(broken.message.content)
+
+    @pytest.mark.asyncio
+    async def test_streams_chat(self):
+        """Test streamed deltas add up to the full message."""
+        stream = await FakeLLM(config=FAST).astream_chat(user("Hello"))
+
+        responses = [response async for response in stream]
+
+        assert len(responses) > 1
+        assert "".join(response.delta for response in responses) == responses[-1].message.content
+
+    @pytest.mark.asyncio
+    async def test_structured_output(self):
+        """Test structured calls fill in the output model, streaming list items one by one."""
+        llm = FakeLLM(config=FAST)
+
+        answer = await llm.as_structured_llm(Answer).achat(user("Hello"))
+        stream = await llm.as_structured_llm(Answer).astream_chat(user("Hello"))
+        partials = [response.raw async for response in stream]
+
+        assert isinstance(answer.raw, Answer)
+        assert len(answer.raw.items) == FAST.list_items
+        assert [len(partial.items) for partial in partials] == [1, 2, 3]
+
+
+class TestPerfBenchmark:
+    """Tests for the offline performance benchmark."""
+
+    def test_synthetic_sds_splits_into_sixteen_sections(self):
+        """Test the synthetic document is recognised by the rule-based splitter."""
+        result = RuleBasedSectionSplitter().split(synthetic_sds_markdown(seed=3))
+
+        assert len(result.sections.sections) == 16
+
+    @pytest.mark.asyncio
+    async def test_process_scenario(self):
+        """Test the process scenario reports throughput, latency and LLM calls."""
+        config = PerfConfig(operations=3, concurrency=2, llm=FAST)
+
+        report = await bench_process(config)
+
+        assert report.operations == 3
+        assert report.errors == 0
+        assert report.throughput > 0
+        assert report.p95_ms is not None
+        assert report.llm_calls > 0
+
+    @pytest.mark.asyncio
+    async def test_summary_modes_are_compared(self):
+        """Test the cheaper summary modes report fewer summary tokens than the full-document pass."""
+        reports = await bench_summary_modes(PerfConfig(operations=2, concurrency=2, llm=FAST))
+
+        by_mode = {report.summary_mode: report for report in reports}
+        assert list(by_mode) == ["full_document", "sections", "template"]
+        assert all(report.errors == 0 for report in reports)
+        assert 0 < by_mode["sections"].summary_input_tokens < by_mode["full_document"].summary_input_tokens
+        assert by_mode["template"].summary_input_tokens == 0
+        assert by_mode["template"].document_input_tokens < by_mode["full_document"].document_input_tokens
+
+    def test_thresholds(self):
+        """Test threshold violations are reported for CI."""
+        report = PerfReport(
+            scenario="process", operations=10, errors=0, concurrency=2, wall_seconds=5.0,
+            throughput=2.0, p95_ms=800.0, loop_lag_max_ms=5.0, llm_calls=10, peak_rss_mb=100.0,
+        )
+
+        assert check_thresholds([report], max_p95_ms=1000, min_throughput=1, max_loop_lag_ms=50) == []
+        assert len(check_thresholds([report], max_p95_ms=500, min_throughput=5, max_loop_lag_ms=1)) == 3
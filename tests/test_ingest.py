@@ -0,0 +1,237 @@
+"""Tests for bulk SDS ingestion."""
+import json
+import zipfile
+from io import BytesIO
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from sds_digest.api.persistence import Persistence
+from sds_digest.src.extraction.extractor import ExtractedPdf
+from sds_digest.src.ingest import BulkIngestor, IngestProgress, collect_pdfs
+from sds_digest.src.processing.llm_processor import LLMSafetyDataSheetProcessor
+
+
+class FakeExtractor:
+    """Extract a PDF to its own bytes, failing for the configured file names."""
+
+    def __init__(self, failing: set[str] | None = None):
+        self.failing = failing or set()
+        self.calls: list[str] = []
+
+    async def aextract_pdf(self, pdf_path: str) -> ExtractedPdf:
+        self.calls.append(pdf_path)
+        if any(pdf_path.endswith(name) for name in self.failing):
+            raise RuntimeError("marker crashed")
+        with open(pdf_path, encoding="utf-8") as f:
+            return ExtractedPdf(content=f.read(), source_file_path=pdf_path)
+
+
+@pytest.fixture
+def pdf_dir(temp_dir):
+    """Create a catalog of three PDFs, two of them with the same content."""
+    catalog = temp_dir / "catalog"
+    (catalog / "nested").mkdir(parents=True)
+    (catalog / "a.pdf").write_text("SDS A")
+    (catalog / "nested" / "b.PDF").write_text("SDS B")
+    (catalog / "copy-of-a.pdf").write_text("SDS A")
+    (catalog / "notes.txt").write_text("not a PDF")
+    return catalog
+
+
+@pytest.fixture
+def processor(sample_processed_sds):
+    """Create a processor returning the sample SDS."""
+    processor = MagicMock()
+    processor.aprocess = AsyncMock(return_value=sample_processed_sds)
+    processor.processor_identifier = LLMSafetyDataSheetProcessor.identifier(model="gpt-4o", section_splitter="rules")
+    return processor
+
+
+@pytest.fixture
+def make_ingestor(temp_dir, processor, sds_store, result_cache):
+    """Build an ingestor writing into the temporary stores."""
+    persistence = Persistence()
+    persistence.upload_base_dir = temp_dir / "uploads"
+
+    def make(extractor, **kwargs):
+        return BulkIngestor(
+            extractor=extractor,
+            processor=processor,
+            sds_store=sds_store,
+            result_cache=result_cache,
+            quarantine_dir=temp_dir / "quarantine",
+            persistence=persistence,
+            retry_backoff=0,
+            **kwargs,
+        )
+
+    return make
+
+
+class TestCollectPdfs:
+    """Tests for collect_pdfs."""
+
+    def test_directories_and_archives(self, temp_dir, pdf_dir):
+        """Test PDFs are found recursively and unpacked from zips without their archive paths."""
+        archive = temp_dir / "supplier.zip"
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("../../escape/c.pdf", "SDS C")
+            zf.writestr("readme.md", "skip me")
+
+        pdfs = collect_pdfs([pdf_dir, archive], temp_dir / "staging")
+
+        assert sorted(pdf.name for pdf in pdfs) == ["a.pdf", "b.PDF", "copy-of-a.pdf", "supplier-000000-c.pdf"]
+        assert pdfs[-1].parent == temp_dir / "staging"
+        assert pdfs[-1].read_text() == "SDS C"
+
+
+class TestBulkIngestor:
+    """Tests for BulkIngestor."""
+
+    @pytest.mark.asyncio
+    async def test_ingests_catalog(self, temp_dir, pdf_dir, make_ingestor, processor, sds_store):
+        """Test every distinct PDF is processed and stored once."""
+        ingestor = make_ingestor(FakeExtractor(), extraction_concurrency=2, llm_concurrency=2)
+
+        summary = await ingestor.arun(collect_pdfs([pdf_dir], temp_dir / "staging"))
+
+        assert summary.total == 3
+        assert summary.processed == 2
+        assert summary.duplicates == 1
+        assert summary.failed == 0
+        assert processor.aprocess.await_count == 2
+        stored = list((temp_dir / "uploads").iterdir())
+        assert len(stored) == 2
+        assert all(sds_id.name in sds_store for sds_id in stored)
+
+    @pytest.mark.asyncio
+    async def test_skips_processed_content(self, temp_dir, pdf_dir, make_ingestor, processor):
+        """Test a second run skips PDFs whose content was already processed."""
+        pdfs = collect_pdfs([pdf_dir], temp_dir / "staging")
+        await make_ingestor(FakeExtractor()).arun(pdfs)
+        extractor = FakeExtractor()
+
+        summary = await make_ingestor(extractor).arun(pdfs)
+
+        assert summary.skipped == 2
+        assert summary.processed == 0
+        assert extractor.calls == []
+        assert processor.aprocess.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_quarantines_failing_pdf(self, temp_dir, pdf_dir, make_ingestor):
+        """Test a PDF that keeps failing is retried, quarantined, and does not stop the batch."""
+        extractor = FakeExtractor(failing={"b.PDF"})
+        ingestor = make_ingestor(extractor, max_retries=2)
+
+        summary = await ingestor.arun(collect_pdfs([pdf_dir], temp_dir / "staging"))
+
+        assert summary.processed == 1
+        assert summary.failed == 1
+        assert sum(call.endswith("b.PDF") for call in extractor.calls) == 3
+        failure = json.loads((temp_dir / "quarantine" / "failures.jsonl").read_text())
+        assert failure["stage"] == "extraction"
+        assert failure["attempts"] == 3
+        assert failure["error"] == "RuntimeError: marker crashed"
+        assert any(path.name.endswith("b.PDF") for path in (temp_dir / "quarantine").iterdir())
+
+    @pytest.mark.asyncio
+    async def test_retries_transient_processing_error(self, temp_dir, pdf_dir, make_ingestor, processor, sample_processed_sds):
+        """Test a processing error that goes away on retry still ingests the PDF."""
+        processor.aprocess = AsyncMock(side_effect=[TimeoutError("LLM timeout"), sample_processed_sds, sample_processed_sds])
+
+        summary = await make_ingestor(FakeExtractor(), llm_concurrency=1).arun(
+            collect_pdfs([pdf_dir], temp_dir / "staging")
+        )
+
+        assert summary.processed == 2
+        assert summary.failed == 0
+        assert not (temp_dir / "quarantine").exists()
+
+    @pytest.mark.asyncio
+    async def test_quarantines_unreadable_pdf(self, temp_dir, pdf_dir, make_ingestor):
+        """Test a PDF that vanishes before it is hashed is quarantined without stopping the batch."""
+        pdfs = collect_pdfs([pdf_dir], temp_dir / "staging")
+        (pdf_dir / "nested" / "b.PDF").unlink()
+
+        summary = await make_ingestor(FakeExtractor(), max_retries=1).arun(pdfs)
+
+        assert summary.processed == 1
+        assert summary.failed == 1
+        failure = json.loads((temp_dir / "quarantine" / "failures.jsonl").read_text())
+        assert failure["stage"] == "extraction"
+        assert failure["attempts"] == 2
+        assert failure["content_hash"] == ""
+
+    @pytest.mark.asyncio
+    async def test_retry_after_partial_store_keeps_sds_id(self, temp_dir, pdf_dir, make_ingestor, result_cache, sds_store):
+        """Test a store that fails halfway is retried under the same SDS ID, leaving no orphan record."""
+        put = result_cache.put
+
+        def put_failing_once(*args):
+            if result_cache.put.call_count == 1:
+                raise OSError("disk full")
+            put(*args)
+
+        result_cache.put = MagicMock(side_effect=put_failing_once)
+
+        summary = await make_ingestor(FakeExtractor()).arun([pdf_dir / "a.pdf"])
+
+        assert summary.processed == 1
+        stored = list((temp_dir / "uploads").iterdir())
+        assert len(stored) == 1
+        assert stored[0].name in sds_store
+        first, second = result_cache.put.call_args_list
+        assert first.args[1] == second.args[1] == stored[0].name
+
+
+    @pytest.mark.asyncio
+    async def test_lazy_ingestion_only_splits(self, temp_dir, pdf_dir, make_ingestor, processor, sample_processed_sds):
+        """Test lazy ingestion stores split documents without running the LLM stages."""
+        processor.asplit = AsyncMock(return_value=sample_processed_sds.model_copy(update={"summary": None}))
+
+        summary = await make_ingestor(FakeExtractor(), lazy=True).arun(collect_pdfs([pdf_dir], temp_dir / "staging"))
+
+        assert summary.processed == 2
+        assert processor.asplit.await_count == 2
+        processor.aprocess.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_upload_reuses_ingested_result(self, temp_dir, pdf_dir, make_ingestor, client):
+        """Test uploading a PDF that was ingested before is answered from the result cache."""
+        await make_ingestor(FakeExtractor()).arun(collect_pdfs([pdf_dir], temp_dir / "staging"))
+
+        response = client.post("/api/upload", files={"file": ("a.pdf", BytesIO(b"SDS A"), "application/pdf")})
+
+        assert response.status_code == 200
+        assert response.json()["cached"] is True
+
+    @pytest.mark.asyncio
+    async def test_eager_ingestion_ignores_lazy_results(self, temp_dir, pdf_dir, make_ingestor, processor, sample_processed_sds):
+        """Test split-only results of a lazy ingest are not skipped over by an eager one."""
+        processor.asplit = AsyncMock(return_value=sample_processed_sds.model_copy(update={"summary": None}))
+        pdfs = collect_pdfs([pdf_dir], temp_dir / "staging")
+        await make_ingestor(FakeExtractor(), lazy=True).arun(pdfs)
+
+        summary = await make_ingestor(FakeExtractor()).arun(pdfs)
+
+        assert summary.skipped == 0
+        assert summary.processed == 2
+        assert processor.aprocess.await_count == 2
+
+
+class TestIngestProgress:
+    """Tests for IngestProgress."""
+
+    def test_progress_line(self):
+        """Test the progress line reports counts, throughput and an ETA."""
+        progress = IngestProgress(total=10)
+        progress.started_at -= 4.0
+        progress.processed = 3
+        progress.skipped = 1
+
+        line = progress.line()
+
+        assert line.startswith("[4/10] 1.00 docs/s, ETA 0:00:06")
+        assert "3 processed, 1 skipped, 0 failed" in line
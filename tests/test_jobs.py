@@ -0,0 +1,103 @@
+"""Tests for the upload job queue."""
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from sds_digest.api.jobs import JobQueue, JobQueueFull, JobStatus
+
+
+class TestJobQueue:
+    """Tests for JobQueue."""
+
+    @pytest.mark.asyncio
+    async def test_job_moves_through_reported_states(self):
+        """Test reported states are recorded and the job ends as done."""
+        seen = []
+
+        async def handler(job, report_status):
+            for status in (JobStatus.EXTRACTING, JobStatus.SPLITTING, JobStatus.STRUCTURING):
+                report_status(status)
+                seen.append(queue.get(job.job_id).status)
+
+        queue = JobQueue(handler=handler, concurrency=1)
+        await queue.astart()
+        job = queue.submit(sds_id="sds-1", filename="a.pdf", pdf_path="/tmp/a.pdf")
+        assert job.status == JobStatus.QUEUED
+
+        while not queue.get(job.job_id).status.finished:
+            await asyncio.sleep(0)
+        await queue.aclose()
+
+        assert seen == [JobStatus.EXTRACTING, JobStatus.SPLITTING, JobStatus.STRUCTURING]
+        assert queue.get(job.job_id).status == JobStatus.DONE
+
+    @pytest.mark.asyncio
+    async def test_failed_job_records_error(self):
+        """Test handler errors mark the job as failed."""
+        async def handler(job, report_status):
+            raise ValueError("broken pdf")
+
+        queue = JobQueue(handler=handler)
+        await queue.astart()
+        job = queue.submit(sds_id="sds-1", filename="a.pdf", pdf_path="/tmp/a.pdf")
+
+        while not queue.get(job.job_id).status.finished:
+            await asyncio.sleep(0)
+        await queue.aclose()
+
+        assert queue.get(job.job_id).status == JobStatus.FAILED
+        assert queue.get(job.job_id).error == "broken pdf"
+
+    @pytest.mark.asyncio
+    async def test_bounded_depth(self):
+        """Test submissions beyond the queue depth are rejected."""
+        release = asyncio.Event()
+
+        async def handler(job, report_status):
+            await release.wait()
+
+        queue = JobQueue(handler=handler, max_depth=1, concurrency=1)
+        await queue.astart()
+        queue.submit(sds_id="sds-1", filename="a.pdf", pdf_path="/tmp/a.pdf")
+        await asyncio.sleep(0)  # let the worker pick up the first job
+        queue.submit(sds_id="sds-2", filename="b.pdf", pdf_path="/tmp/b.pdf")
+
+        with pytest.raises(JobQueueFull):
+            queue.submit(sds_id="sds-3", filename="c.pdf", pdf_path="/tmp/c.pdf")
+
+        release.set()
+        await queue.aclose()
+
+    def test_submit_requires_running_queue(self):
+        """Test submitting before start fails loudly."""
+        async def handler(job, report_status):
+            pass
+
+        with pytest.raises(RuntimeError):
+            JobQueue(handler=handler).submit(sds_id="sds-1", filename="a.pdf", pdf_path="/tmp/a.pdf")
+
+    @pytest.mark.asyncio
+    async def test_finished_jobs_are_evicted(self):
+        """Test finished jobs are forgotten after their TTL and beyond the cap, while running ones are kept."""
+        release = asyncio.Event()
+
+        async def handler(job, report_status):
+            if job.sds_id == "slow":
+                await release.wait()
+
+        queue = JobQueue(handler=handler, concurrency=2, finished_ttl_seconds=60, max_finished=2)
+        await queue.astart()
+        slow = queue.submit(sds_id="slow", filename="s.pdf", pdf_path="/tmp/s.pdf")
+        done = [queue.submit(sds_id=f"sds-{i}", filename="a.pdf", pdf_path="/tmp/a.pdf") for i in range(3)]
+        while not all(queue.get(job.job_id) is None or queue.get(job.job_id).status.finished for job in done):
+            await asyncio.sleep(0)
+
+        assert queue.get(done[0].job_id) is None
+        assert [queue.get(job.job_id).status for job in done[1:]] == [JobStatus.DONE, JobStatus.DONE]
+        assert not queue.get(slow.job_id).status.finished
+
+        with patch("sds_digest.api.jobs.time.monotonic", return_value=10**9):
+            assert queue.get(done[2].job_id) is None
+            assert queue.get(slow.job_id) is not None
+        release.set()
+        await queue.aclose()
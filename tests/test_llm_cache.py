@@ -0,0 +1,101 @@
+"""Tests for the section-level LLM response cache."""
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from llama_index.core.llms import ChatMessage, ChatResponse
+
+from sds_digest.llms.cache import LLMResponseCache
+from sds_digest.llms.structure_llm import SectionStructureLLM
+from sds_digest.src.processing.processor import Section
+
+
+@pytest.fixture
+def cache(temp_dir):
+    """Create an LLM response cache in a temporary directory."""
+    return LLMResponseCache(temp_dir / "llm_cache.sqlite3")
+
+
+@pytest.fixture
+def disposal_section():
+    """Create a boilerplate section shared by many SDSs."""
+    return Section(
+        section_title="Disposal considerations",
+        section_summary="How to dispose of the product",
+        raw_content_of_section="Dispose of contents/container in accordance with local regulations.",
+    )
+
+
+class TestLLMResponseCache:
+    """Tests for LLMResponseCache."""
+
+    def test_key_ignores_whitespace_differences(self):
+        """Test cosmetic whitespace differences map to the same key."""
+        key_a = LLMResponseCache.make_key("Dispose of  contents\n\nproperly ", "prompt", "gpt-4o")
+        key_b = LLMResponseCache.make_key("Dispose of contents properly", "prompt", "gpt-4o")
+
+        assert key_a == key_b
+        assert key_a != LLMResponseCache.make_key("Dispose of contents properly", "prompt", "gpt-4o-mini")
+
+    def test_entries_expire_after_ttl(self, temp_dir):
+        """Test expired entries are treated as misses."""
+        cache = LLMResponseCache(temp_dir / "llm_cache.sqlite3", ttl_seconds=10)
+        with patch('sds_digest.llms.cache.time.time', return_value=1000.0):
+            cache.put("key", "value")
+        with patch('sds_digest.llms.cache.time.time', return_value=1005.0):
+            assert cache.get("key") == "value"
+        with patch('sds_digest.llms.cache.time.time', return_value=1011.0):
+            assert cache.get("key") is None
+
+        assert cache.stats().expirations == 1
+
+    def test_least_recently_used_entries_are_evicted(self, temp_dir):
+        """Test the cache keeps at most max_entries."""
+        cache = LLMResponseCache(temp_dir / "llm_cache.sqlite3", ttl_seconds=None, max_entries=2)
+        with patch('sds_digest.llms.cache.time.time', side_effect=[1.0, 2.0, 3.0, 4.0]):
+            cache.put("a", "1")
+            cache.put("b", "2")
+            cache.get("a")
+            cache.put("c", "3")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+        stats = cache.stats()
+        assert stats.entries == 2
+        assert stats.evictions == 1
+
+
+class TestSectionStructureLLMCache:
+    """Tests for SectionStructureLLM with a response cache."""
+
+    @pytest.mark.asyncio
+    async def test_repeated_section_skips_llm(self, cache, disposal_section):
+        """Test the second identical section is served from the cache."""
+        llm = MagicMock(model="gpt-4o")
+        llm.achat = AsyncMock(return_value=ChatResponse(
+            message=ChatMessage(role="assistant", content='{"Disposal": "Follow local regulations"}')
+        ))
+        section_llm = SectionStructureLLM(llm=llm, cache=cache)
+
+        first = await section_llm.astructure_section(disposal_section)
+        second = await section_llm.astructure_section(disposal_section)
+
+        assert first == second
+        assert second.structured_content == {"Disposal": "Follow local regulations"}
+        llm.achat.assert_called_once()
+        assert cache.stats().hit_rate == 0.5
+
+    @pytest.mark.asyncio
+    async def test_unparseable_response_is_not_cached(self, cache, disposal_section):
+        """Test raw-text fallbacks are retried instead of cached."""
+        llm = MagicMock(model="gpt-4o")
+        llm.achat = AsyncMock(return_value=ChatResponse(
+            message=ChatMessage(role="assistant", content="not json")
+        ))
+        section_llm = SectionStructureLLM(llm=llm, cache=cache)
+
+        await section_llm.astructure_section(disposal_section)
+        await section_llm.astructure_section(disposal_section)
+
+        # Each call also retries the section once
+        assert llm.achat.call_count == 4
+        assert cache.stats().entries == 0
@@ -0,0 +1,81 @@
+"""Tests for upload persistence."""
+import hashlib
+from io import BytesIO
+
+import pytest
+from fastapi import UploadFile
+
+from sds_digest.api import persistence as persistence_module
+from sds_digest.api.persistence import Persistence, UploadTooLarge, sanitize_filename
+
+
+@pytest.fixture
+def persistence(temp_dir):
+    """Create a persistence writing into a temporary directory."""
+    persistence = Persistence()
+    persistence.upload_base_dir = temp_dir / "uploads"
+    return persistence
+
+
+class TestSanitizeFilename:
+    """Tests for sanitize_filename."""
+
+    @pytest.mark.parametrize(
+        "filename, expected",
+        [
+            ("test_sds.pdf", "test_sds.pdf"),
+            ("../../etc/passwd.pdf", "passwd.pdf"),
+            ("C:\\Users\\me\\Acetone SDS.pdf", "Acetone_SDS.pdf"),
+            ("Éthanol\x00.pdf", "Ethanol_.pdf"),
+            ("..", "upload.pdf"),
+            (None, "upload.pdf"),
+        ],
+    )
+    def test_sanitize(self, filename, expected):
+        """Test directories and unsafe characters are dropped."""
+        assert sanitize_filename(filename) == expected
+
+    def test_long_name_keeps_suffix(self):
+        """Test a long name is truncated without losing its extension."""
+        name = sanitize_filename("a" * 300 + ".pdf")
+
+        assert len(name) == persistence_module.MAX_FILENAME_LENGTH
+        assert name.endswith(".pdf")
+
+
+class TestPersistence:
+    """Tests for Persistence."""
+
+    @pytest.mark.asyncio
+    async def test_asave_upload_streams_and_hashes(self, persistence, monkeypatch):
+        """Test an upload is written in chunks and hashed in the same pass."""
+        monkeypatch.setattr(persistence_module, "UPLOAD_CHUNK_SIZE", 4)
+        content = b"%PDF-1.7 some bytes"
+
+        saved = await persistence.asave_upload("sds-1", UploadFile(BytesIO(content), filename="a.pdf"))
+
+        assert saved.path == persistence.upload_base_dir / "sds-1" / "a.pdf"
+        assert saved.path.read_bytes() == content
+        assert saved.content_hash == hashlib.sha256(content).hexdigest()
+        assert saved.size == len(content)
+        assert not saved.path.with_name("a.pdf.part").exists()
+
+    @pytest.mark.asyncio
+    async def test_asave_upload_too_large(self, persistence, monkeypatch):
+        """Test an oversized upload is rejected without leaving a partial file."""
+        monkeypatch.setattr(persistence_module, "UPLOAD_CHUNK_SIZE", 4)
+
+        with pytest.raises(UploadTooLarge):
+            await persistence.asave_upload("sds-1", UploadFile(BytesIO(b"0123456789"), filename="a.pdf"), max_bytes=8)
+
+        assert not (persistence.upload_base_dir / "sds-1").exists()
+
+    @pytest.mark.asyncio
+    async def test_asave_extracted_markdown(self, persistence, monkeypatch):
+        """Test markdown is written in chunks without changing it."""
+        monkeypatch.setattr(persistence_module, "MARKDOWN_CHUNK_SIZE", 3)
+        markdown = "# SDS\n\nÄtzend – corrosive\n"
+
+        path = await persistence.asave_extracted_markdown("sds-1", markdown)
+
+        assert path.read_text(encoding="utf-8") == markdown
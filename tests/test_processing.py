@@ -0,0 +1,378 @@
+"""Tests for the streaming section pipeline."""
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from llama_index.core.llms import ChatMessage, ChatResponse
+
+from sds_digest.llms.fake_llm import FakeLLM, FakeLLMConfig
+from sds_digest.llms.structure_llm import SDSStructureLLM
+from sds_digest.src.extraction.extractor import ExtractedPdf
+from sds_digest.src.perf_benchmark import synthetic_sds_markdown
+from sds_digest.src.processing.llm_processor import LLMSafetyDataSheetProcessor
+from sds_digest.src.processing.processor import (
+    ProcessingStage,
+    Section,
+    Sections,
+    StructuredSection,
+    StructuredSections,
+)
+from sds_digest.src.processing.splitter import ghs_section_number
+from sds_digest.src.processing.summary_renderer import flatten_fields, render_summary
+
+
+def make_section(number: int) -> Section:
+    """Create a section with predictable content."""
+    return Section(
+        section_title=f"Section {number}",
+        section_summary=f"Summary {number}",
+        raw_content_of_section=f"Content {number}",
+    )
+
+
+def structure(section: Section) -> StructuredSection:
+    """Structure a section the way the mocked LLM does."""
+    return StructuredSection(
+        section_title=section.section_title,
+        section_summary=section.section_summary,
+        structured_content={"content": section.raw_content_of_section},
+    )
+
+
+def make_processor(astream_sections, astructure_section=None, summary_mode="full_document") -> LLMSafetyDataSheetProcessor:
+    """Create a processor whose splitter streams from the given async generator function."""
+    sds_structure_llm = MagicMock()
+    sds_structure_llm.llm.model = "gpt-4o"
+    sds_structure_llm.astream_sections = MagicMock(side_effect=astream_sections)
+    section_structure_llm = MagicMock()
+    section_structure_llm.batch_token_budget = None
+    section_structure_llm.astructure_section = AsyncMock(side_effect=astructure_section or structure)
+    summary_llm = MagicMock()
+    summary_llm.asummarize = AsyncMock(return_value="summary")
+    summary_llm.asummarize_sections = AsyncMock(return_value="sections summary")
+    return LLMSafetyDataSheetProcessor(
+        sds_structure_llm=sds_structure_llm,
+        section_structure_llm=section_structure_llm,
+        summary_llm=summary_llm,
+        summary_mode=summary_mode,
+    )
+
+
+class TestStreamingPipeline:
+    """Tests for overlapping splitting and structuring."""
+
+    @pytest.mark.asyncio
+    async def test_structuring_starts_before_splitting_finishes(self):
+        """Test the first section is structured while the splitter is still running."""
+        first_structured = asyncio.Event()
+
+        async def astream_sections(text):
+            yield make_section(1)
+            await asyncio.wait_for(first_structured.wait(), timeout=5)
+            yield make_section(2)
+
+        async def astructure_section(section):
+            first_structured.set()
+            return structure(section)
+
+        processor = make_processor(astream_sections, astructure_section)
+        extracted_pdf = ExtractedPdf(content="text", source_file_path="a.pdf")
+
+        titles = [s.section_title async for s in processor.aiter_structured_sections(extracted_pdf)]
+
+        assert titles == ["Section 1", "Section 2"]
+
+    @pytest.mark.asyncio
+    async def test_aprocess_keeps_document_order(self):
+        """Test sections finishing out of order are stored in document order."""
+        async def astream_sections(text):
+            for number in range(1, 4):
+                yield make_section(number)
+
+        async def astructure_section(section):
+            # Later sections finish first
+            await asyncio.sleep(0.03 - 0.01 * int(section.section_title[-1]))
+            return structure(section)
+
+        stages = []
+        processor = make_processor(astream_sections, astructure_section)
+        extracted_pdf = ExtractedPdf(content="text", source_file_path="a.pdf")
+
+        completion_order = [s.section_title async for s in processor.aiter_structured_sections(extracted_pdf)]
+        processed_sds = await processor.aprocess(extracted_pdf, on_stage=stages.append)
+
+        assert completion_order == ["Section 3", "Section 2", "Section 1"]
+        assert [s.section_title for s in processed_sds.structured_content.structured_sections] == [
+            "Section 1", "Section 2", "Section 3",
+        ]
+        assert processed_sds.summary == "summary"
+        assert [s.section_title for s in processed_sds.sections] == ["Section 1", "Section 2", "Section 3"]
+        assert stages == [ProcessingStage.SPLITTING, ProcessingStage.STRUCTURING, ProcessingStage.SUMMARIZING]
+
+    @pytest.mark.asyncio
+    async def test_splitter_error_propagates(self):
+        """Test a failing splitter fails processing after emitted sections were scheduled."""
+        async def astream_sections(text):
+            yield make_section(1)
+            raise ValueError("bad LLM output")
+
+        processor = make_processor(astream_sections)
+        extracted_pdf = ExtractedPdf(content="text", source_file_path="a.pdf")
+
+        with pytest.raises(ValueError, match="bad LLM output"):
+            await processor.aprocess(extracted_pdf)
+
+
+async def token_stream(*tokens):
+    for token in tokens:
+        yield token
+
+
+async def three_sections(text):
+    for number in range(1, 4):
+        yield make_section(number)
+
+
+class TestLazyProcessing:
+    """Tests for splitting now and structuring or summarizing later."""
+
+    @pytest.mark.asyncio
+    async def test_asplit_only_splits(self):
+        """Test lazy processing keeps the sections and leaves the LLM stages for later."""
+        processor = make_processor(three_sections)
+        processor.asplit_sections = AsyncMock(return_value=Sections(sections=[make_section(1), make_section(2)]))
+        stages = []
+
+        processed_sds = await processor.asplit(ExtractedPdf(content="text", source_file_path="a.pdf"), on_stage=stages.append)
+
+        assert [s.section_title for s in processed_sds.sections] == ["Section 1", "Section 2"]
+        assert processed_sds.structured_content is None
+        assert processed_sds.summary is None
+        assert stages == [ProcessingStage.SPLITTING]
+        processor.section_structure_llm.astructure_section.assert_not_called()
+        processor.summary_llm.asummarize.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_astructure_sections_keeps_order(self):
+        """Test stored sections are structured concurrently and returned in document order."""
+        async def astructure_section(section):
+            await asyncio.sleep(0.03 - 0.01 * int(section.section_title[-1]))
+            return structure(section)
+
+        processor = make_processor(three_sections, astructure_section)
+
+        structured = await processor.astructure_sections([make_section(number) for number in range(1, 4)])
+
+        assert [s.section_title for s in structured.structured_sections] == ["Section 1", "Section 2", "Section 3"]
+
+    @pytest.mark.asyncio
+    async def test_asummarize_needs_structured_sections_outside_full_document_mode(self):
+        """Test the sections mode cannot summarize from the markdown alone."""
+        processor = make_processor(three_sections, summary_mode="sections")
+
+        with pytest.raises(ValueError):
+            await processor.asummarize("text")
+
+
+class TestBatchedStructuring:
+    """Tests for processing with section-batched structuring."""
+
+    @pytest.mark.asyncio
+    async def test_aprocess_batches_sections(self):
+        """Test a document is structured in a few calls instead of one per section."""
+        llm = FakeLLM(config=FakeLLMConfig(first_token_latency_ms=0, prompt_tokens_per_second=1e9, output_tokens_per_second=1e9))
+        processor = LLMSafetyDataSheetProcessor.from_llm(llm, section_splitter="rules", section_batch_tokens=1000)
+        stages = []
+
+        processed_sds = await processor.aprocess(
+            ExtractedPdf(content=synthetic_sds_markdown(0, section_chars=800), source_file_path="a.pdf"),
+            on_stage=stages.append,
+        )
+
+        structured_sections = processed_sds.structured_content.structured_sections
+        assert len(structured_sections) == 16
+        assert all("field_0" in s.structured_content for s in structured_sections)
+        assert [s.section_title for s in structured_sections] == [s.section_title for s in processed_sds.sections]
+        # 16 sections of 200 tokens in batches of 5, plus the summary
+        assert llm.calls == 4 + 1
+        assert stages == [ProcessingStage.SPLITTING, ProcessingStage.STRUCTURING, ProcessingStage.SUMMARIZING]
+        assert "+batched-1000" in processor.processor_identifier.processor_version
+
+
+class TestSummaryModes:
+    """Tests for building the summary from the structured sections."""
+
+    @pytest.mark.asyncio
+    async def test_sections_mode_skips_full_document_pass(self):
+        """Test the sections mode prompts with the structured sections instead of the markdown."""
+        processor = make_processor(three_sections, summary_mode="sections")
+
+        processed_sds = await processor.aprocess(ExtractedPdf(content="text", source_file_path="a.pdf"))
+
+        assert processed_sds.summary == "sections summary"
+        processor.summary_llm.asummarize.assert_not_called()
+        structured_sections = processor.summary_llm.asummarize_sections.call_args.args[0]
+        assert [s.section_title for s in structured_sections.structured_sections] == [
+            "Section 1", "Section 2", "Section 3",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_template_mode_makes_no_llm_call(self):
+        """Test the template mode renders the summary from the section summaries."""
+        processor = make_processor(three_sections, summary_mode="template")
+
+        processed_sds = await processor.aprocess(ExtractedPdf(content="text", source_file_path="a.pdf"))
+
+        assert "## Hazards\nSummary 2" in processed_sds.summary
+        assert "- **Section 3**: Summary 3" in processed_sds.summary
+        processor.summary_llm.asummarize.assert_not_called()
+        processor.summary_llm.asummarize_sections.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_streamed_summary_follows_summary_mode(self):
+        """Test the streamed summary uses the same source as the summary mode."""
+        processor = make_processor(three_sections, summary_mode="sections")
+        processor.summary_llm.astream_summary_sections = MagicMock(side_effect=lambda *args, **kwargs: token_stream("a", "b"))
+        structured_sections = StructuredSections(structured_sections=[structure(make_section(1))])
+
+        tokens = [token async for token in processor.astream_summary("text", structured_sections)]
+
+        assert tokens == ["a", "b"]
+        processor.summary_llm.astream_summary.assert_not_called()
+        processor.summary_llm.astream_summary_sections.assert_called_once_with(structured_sections, priority=None)
+
+    @pytest.mark.asyncio
+    async def test_streamed_template_summary_makes_no_llm_call(self):
+        """Test the template mode streams the rendered summary in one piece."""
+        processor = make_processor(three_sections, summary_mode="template")
+        structured_sections = StructuredSections(structured_sections=[structure(make_section(1))])
+
+        tokens = [token async for token in processor.astream_summary("text", structured_sections)]
+
+        assert len(tokens) == 1 and "Summary 1" in tokens[0]
+        processor.summary_llm.astream_summary.assert_not_called()
+
+    def test_identifier_depends_on_summary_mode(self):
+        """Test results of different summary modes are cached apart, and the default keeps its identifier."""
+        default = LLMSafetyDataSheetProcessor.identifier(model="gpt-4o", section_splitter="rules")
+        template = LLMSafetyDataSheetProcessor.identifier(
+            model="gpt-4o", section_splitter="rules", summary_mode="template"
+        )
+
+        assert default.processor_version.endswith("+rules")
+        assert template.processor_version.endswith("+rules+template-summary")
+
+
+class TestSummaryRenderer:
+    """Tests for the template summary renderer."""
+
+    @pytest.mark.parametrize(
+        "title, number",
+        [
+            ("SECTION 2: Hazard identification", 2),
+            ("8. Exposure controls/personal protection", 8),
+            ("Hazard identification", 2),
+            ("Product and company identification", 1),
+            ("Appendix", None),
+        ],
+    )
+    def test_ghs_section_number(self, title, number):
+        """Test sections are recognised by number or by title keywords."""
+        assert ghs_section_number(title) == number
+
+    def test_flatten_fields(self):
+        """Test nested structured content becomes labelled leaf values."""
+        content = {"Pictograms": ["GHS02", "GHS07"], "Signal word": "Danger", "Hazards": {"H225": "Flammable", "Note": ""}}
+
+        assert flatten_fields(content) == [
+            ("Pictograms", "GHS02; GHS07"),
+            ("Signal word", "Danger"),
+            ("Hazards / H225", "Flammable"),
+        ]
+
+    def test_render_summary(self):
+        """Test key sections get their fields and the others a one-line summary."""
+        structured_sections = StructuredSections(structured_sections=[
+            StructuredSection(
+                section_title="SECTION 1: Identification",
+                section_summary="Acetone, a solvent.",
+                structured_content={"Product name": "Acetone", "CAS": "67-64-1"},
+            ),
+            StructuredSection(
+                section_title="SECTION 2: Hazard identification",
+                section_summary="Highly flammable.",
+                structured_content={"Signal word": "Danger"},
+            ),
+            StructuredSection(
+                section_title="SECTION 4: First-aid measures",
+                section_summary="Rinse eyes with water.",
+                structured_content={"Eyes": "Rinse"},
+            ),
+        ])
+
+        summary = render_summary(structured_sections)
+
+        assert summary == (
+            "## Identification\nAcetone, a solvent.\n- **Product name**: Acetone\n- **CAS**: 67-64-1\n\n"
+            "## Hazards\nHighly flammable.\n- **Signal word**: Danger\n\n"
+            "## Other sections\n- **SECTION 4: First-aid measures**: Rinse eyes with water."
+        )
+
+
+class TestSDSStructureLLMStreaming:
+    """Tests for SDSStructureLLM.astream_sections."""
+
+    def make_llm(self, partial_outputs, final_sections, cache=None, consumed=None):
+        """Create an SDSStructureLLM whose structured LLM streams the given partial outputs."""
+        consumed = consumed if consumed is not None else []
+
+        async def stream():
+            for partial in partial_outputs:
+                consumed.append(partial)
+                yield ChatResponse(message=ChatMessage(role="assistant", content="{}"), raw=partial)
+            yield ChatResponse(
+                message=ChatMessage(role="assistant", content=final_sections.model_dump_json()),
+                raw=final_sections,
+            )
+
+        llm = MagicMock()
+        llm.model = "gpt-4o"
+        sds_structure_llm = SDSStructureLLM(llm=llm, cache=cache)
+        sds_structure_llm.structured_llm = MagicMock()
+        sds_structure_llm.structured_llm.astream_chat = AsyncMock(side_effect=lambda **kwargs: stream())
+        return sds_structure_llm
+
+    @pytest.mark.asyncio
+    async def test_emits_sections_once_followed_by_another(self):
+        """Test a section is emitted as soon as the next one starts, and the last at the end."""
+        first, second = make_section(1), make_section(2)
+        partial_outputs = [
+            SimpleNamespace(sections=[{"section_title": "Sec"}]),
+            SimpleNamespace(sections=[first.model_dump(), {"section_title": "Section 2"}]),
+            {"sections": [first.model_dump(), {"section_title": "Section 2", "section_summary": "Sum"}]},
+        ]
+        consumed = []
+        sds_structure_llm = self.make_llm(partial_outputs, Sections(sections=[first, second]), consumed=consumed)
+
+        seen = []
+        async for section in sds_structure_llm.astream_sections("text"):
+            seen.append((section, len(consumed)))
+
+        # The first section arrives while the stream is still at its second chunk
+        assert seen == [(first, 2), (second, 3)]
+
+    @pytest.mark.asyncio
+    async def test_uses_and_fills_cache(self, temp_dir):
+        """Test streamed sections are cached and replayed without calling the LLM."""
+        from sds_digest.llms.cache import LLMResponseCache
+
+        cache = LLMResponseCache(temp_dir / "llm_cache.sqlite3")
+        sections = Sections(sections=[make_section(1), make_section(2)])
+        sds_structure_llm = self.make_llm([], sections, cache=cache)
+
+        first_run = [s async for s in sds_structure_llm.astream_sections("text")]
+        second_run = [s async for s in sds_structure_llm.astream_sections("text")]
+
+        assert first_run == second_run == sections.sections
+        assert sds_structure_llm.structured_llm.astream_chat.await_count == 1
@@ -0,0 +1,188 @@
+"""Tests for QALLM prompt-prefix reuse and usage reporting."""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from llama_index.core.llms import ChatMessage, ChatResponse
+from llama_index.llms.openai import OpenAI
+
+from sds_digest.llms.qa_llm import BatchAnswers, NumberedAnswer, QALLM, RenderedPromptCache
+from sds_digest.llms.summary_llm import SummaryLLM
+from sds_digest.llms.utils import as_dict, partial_items, prompt_usage
+from sds_digest.src.telemetry import Stage, Tracer
+
+
+def make_response(prompt_tokens=1200, cached_tokens=1024) -> ChatResponse:
+    """Create an OpenAI-style response with prompt cache usage."""
+    usage = SimpleNamespace(
+        prompt_tokens=prompt_tokens,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=cached_tokens),
+    )
+    return ChatResponse(message=ChatMessage(role="assistant", content="answer"), raw=SimpleNamespace(usage=usage))
+
+
+@pytest.fixture
+def llm():
+    """Create a mocked chat model."""
+    llm = MagicMock()
+    llm.model = "gpt-4o"
+    llm.achat = AsyncMock(return_value=make_response())
+    return llm
+
+
+class TestRenderedPromptCache:
+    """Tests for RenderedPromptCache."""
+
+    @pytest.mark.asyncio
+    async def test_prompt_rendered_once_per_context(self, llm):
+        """Test repeated questions reuse the identical rendered system prompt."""
+        cache = RenderedPromptCache()
+        qa_llm = QALLM(llm=llm, prompt_cache=cache)
+
+        with patch.object(qa_llm, "_format_prompt", wraps=qa_llm._format_prompt) as format_prompt:
+            await qa_llm.aanswer_with_usage("What PPE?", "SDS text", sds_id="sds-1")
+            await qa_llm.aanswer_with_usage("Flash point?", "SDS text", sds_id="sds-1")
+
+        format_prompt.assert_called_once()
+        first, second = (call.kwargs["messages"] for call in llm.achat.call_args_list)
+        assert first[0].content is second[0].content
+        assert [first[1].content, second[1].content] == ["What PPE?", "Flash point?"]
+        assert cache.stats().hits == 1
+        assert cache.stats().misses == 1
+
+    def test_contexts_and_invalidation(self):
+        """Test each context of an SDS has its own entry and reprocessing drops them all."""
+        cache = RenderedPromptCache(max_entries=2)
+        cache.get_or_render("sds-1", "full_document", lambda: "full")
+        cache.get_or_render("sds-1", "sections:8", lambda: "ppe")
+        cache.get_or_render("sds-2", "full_document", lambda: "other")
+
+        assert cache.stats().entries == 2
+
+        cache.invalidate("sds-1")
+
+        assert cache.stats().entries == 1
+        assert cache.get_or_render("sds-2", "full_document", lambda: "rerendered") == "other"
+
+    @pytest.mark.asyncio
+    async def test_reports_cached_tokens(self, llm):
+        """Test cached prompt tokens from the usage are returned and totalled."""
+        cache = RenderedPromptCache()
+        qa_llm = QALLM(llm=llm, prompt_cache=cache)
+
+        result = await qa_llm.aanswer_with_usage("What PPE?", "SDS text", sds_id="sds-1")
+
+        assert result.answer == "answer"
+        assert result.prompt_tokens == 1200
+        assert result.cached_tokens == 1024
+        assert cache.stats().cached_tokens == 1024
+
+    @pytest.mark.asyncio
+    async def test_openai_gets_prompt_cache_key(self):
+        """Test OpenAI requests carry a per-SDS prompt cache key."""
+        llm = OpenAI(model="gpt-4o", api_key="sk-test")
+        qa_llm = QALLM(llm=llm)
+
+        with patch.object(OpenAI, "achat", new=AsyncMock(return_value=make_response())) as achat:
+            await qa_llm.aanswer_with_usage("What PPE?", "SDS text", sds_id="sds-1")
+
+        assert achat.call_args.kwargs["extra_body"] == {"prompt_cache_key": "sds-sds-1"}
+
+
+    @pytest.mark.asyncio
+    async def test_streams_answer(self, llm):
+        """Test the answer is streamed delta by delta and the final usage is recorded."""
+        async def stream():
+            yield ChatResponse(message=ChatMessage(role="assistant", content="Wear"), delta="Wear")
+            yield ChatResponse(message=ChatMessage(role="assistant", content="Wear gloves"), delta=" gloves")
+            yield make_response()
+
+        llm.astream_chat = AsyncMock(return_value=stream())
+        cache = RenderedPromptCache()
+        qa_llm = QALLM(llm=llm, prompt_cache=cache)
+
+        tokens = [token async for token in qa_llm.astream_answer("What PPE?", "SDS text", sds_id="sds-1")]
+
+        assert tokens == ["Wear", " gloves"]
+        assert llm.astream_chat.call_args.kwargs["messages"][1].content == "What PPE?"
+        assert cache.stats().cached_tokens == 1024
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("stream_with", ["answer", "summary"])
+    async def test_openai_stream_reports_usage(self, stream_with):
+        """Test streamed OpenAI answers and summaries ask for usage and record it on the span."""
+        async def stream():
+            yield ChatResponse(message=ChatMessage(role="assistant", content="Wear"), delta="Wear")
+            # OpenAI sends the usage in a last chunk without content
+            yield make_response()
+
+        llm = OpenAI(model="gpt-4o", api_key="sk-test")
+        tracer = Tracer()
+
+        with patch.object(OpenAI, "astream_chat", new=AsyncMock(return_value=stream())) as astream_chat:
+            with tracer.span(Stage.QA) as span:
+                if stream_with == "answer":
+                    tokens = [token async for token in QALLM(llm=llm).astream_answer("What PPE?", "SDS text")]
+                else:
+                    tokens = [token async for token in SummaryLLM(llm=llm).astream_summary("SDS text")]
+
+        assert tokens == ["Wear"]
+        assert astream_chat.call_args.kwargs["stream_options"] == {"include_usage": True}
+        assert (span.input_tokens, span.cached_tokens) == (1200, 1024)
+
+    @pytest.mark.asyncio
+    async def test_streams_packed_batch_answers(self, llm):
+        """Test packed answers are yielded once complete and the final response fills in the rest."""
+        async def stream():
+            yield ChatResponse(message=ChatMessage(role="assistant", content=""), raw={"answers": [{"number": 2, "answer": "12"}]})
+            yield ChatResponse(message=ChatMessage(role="assistant", content=""), raw={"answers": [
+                {"number": 2, "answer": "12 °C"}, {"number": 1, "answer": "123"},
+            ]})
+            final = BatchAnswers(answers=[
+                NumberedAnswer(number=2, answer="12 °C"),
+                NumberedAnswer(number=1, answer="123-45-6"),
+                NumberedAnswer(number=9, answer="out of range"),
+            ])
+            yield ChatResponse(message=ChatMessage(role="assistant", content=final.model_dump_json()), raw=final)
+
+        structured_llm = MagicMock()
+        structured_llm.astream_chat = AsyncMock(return_value=stream())
+        llm.as_structured_llm = MagicMock(return_value=structured_llm)
+        qa_llm = QALLM(llm=llm)
+
+        answers = [answer async for answer in qa_llm.astream_batch_answers(["CAS?", "Flash point?"], "SDS text")]
+
+        assert answers == [(1, "12 °C"), (0, "123-45-6")]
+        prompt = structured_llm.astream_chat.call_args.kwargs["messages"][1].content
+        assert "1. CAS?\n2. Flash point?" in prompt
+
+class TestPromptUsage:
+    """Tests for prompt_usage."""
+
+    def test_ollama_usage(self):
+        """Test Ollama responses report evaluated prompt tokens without a cache count."""
+        response = ChatResponse(message=ChatMessage(role="assistant", content=""), raw={"prompt_eval_count": 30, "eval_count": 12})
+
+        usage = prompt_usage(response)
+
+        assert usage.prompt_tokens == 30
+        assert usage.cached_tokens is None
+        assert usage.completion_tokens == 12
+
+    def test_missing_usage(self):
+        """Test responses without raw data report nothing."""
+        response = ChatResponse(message=ChatMessage(role="assistant", content=""))
+
+        assert prompt_usage(response).prompt_tokens is None
+
+
+class TestPartialItems:
+    """Tests for the partial structured output helpers shared by the streaming LLMs."""
+
+    def test_models_and_dicts(self):
+        """Test items are read from a partial model or a plain dict, and models become dicts."""
+        partial = BatchAnswers.model_validate({"answers": [{"number": 1, "answer": "12 °C"}]})
+
+        assert [as_dict(item) for item in partial_items(partial, "answers")] == [{"number": 1, "answer": "12 °C"}]
+        assert partial_items({"answers": None}, "answers") == []
+        assert partial_items({}, "sections") == []
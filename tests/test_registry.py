@@ -0,0 +1,74 @@
+"""Tests for the application-scoped LLM client registry."""
+import pytest
+import pytest_asyncio
+from unittest.mock import MagicMock, patch
+
+from sds_digest.llms.registry import LLMClientRegistry
+from sds_digest.llms.scheduler import LLMScheduler
+
+
+@pytest_asyncio.fixture
+async def registry():
+    """Create a started registry with a fake OpenAI key."""
+    registry = LLMClientRegistry(scheduler=LLMScheduler(), openai_api_key="sk-test")
+    await registry.astart()
+    yield registry
+    await registry.aclose()
+
+
+class TestLLMClientRegistry:
+    """Tests for LLMClientRegistry."""
+
+    def test_requires_start(self):
+        """Test clients are only handed out while the registry is running."""
+        registry = LLMClientRegistry(openai_api_key="sk-test")
+
+        with pytest.raises(RuntimeError):
+            registry.llm("openai", "gpt-4o")
+
+    @pytest.mark.asyncio
+    async def test_clients_are_reused_per_provider_and_model(self, registry):
+        """Test the same client is returned for a provider/model pair and connections are pooled."""
+        gpt_4o = registry.llm("openai", "gpt-4o")
+
+        assert registry.llm("openai", "gpt-4o") is gpt_4o
+        assert registry.llm("openai", "gpt-4o-mini") is not gpt_4o
+        assert registry.llm("ollama", "gpt-4o") is not gpt_4o
+        assert gpt_4o._async_http_client is registry.llm("openai", "gpt-4o-mini")._async_http_client
+
+    @pytest.mark.asyncio
+    async def test_reads_secrets_once(self):
+        """Test the OpenAI key is loaded once, not per client."""
+        registry = LLMClientRegistry()
+        await registry.astart()
+        with patch("sds_digest.llms.registry.Secrets") as mock_secrets:
+            mock_secrets.return_value = MagicMock(openai_api_key="sk-test")
+            registry.llm("openai", "gpt-4o")
+            registry.llm("openai", "gpt-4o-mini")
+        await registry.aclose()
+
+        mock_secrets.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_wrappers_share_client_and_scheduler(self, registry):
+        """Test wrappers and the processor are built over the cached client."""
+        qa_llm = registry.qa_llm("gpt-4o")
+        processor = registry.processor("gpt-4o", section_splitter="rules")
+
+        assert qa_llm.llm is registry.llm("openai", "gpt-4o")
+        assert qa_llm.scheduler is registry.scheduler
+        assert processor.section_structure_llm.llm is qa_llm.llm
+        assert processor.summary_llm.scheduler is registry.scheduler
+        assert processor.processor_identifier.processor_version.endswith("+rules")
+
+    @pytest.mark.asyncio
+    async def test_aclose_closes_http_clients(self):
+        """Test shutdown releases pooled connections."""
+        registry = LLMClientRegistry(openai_api_key="sk-test")
+        await registry.astart()
+        http_client = registry._openai_http_client
+
+        await registry.aclose()
+
+        assert http_client.is_closed
+        assert not registry.running
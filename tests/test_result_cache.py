@@ -0,0 +1,57 @@
+"""Tests for the content-addressed result cache."""
+import pytest
+
+from sds_digest.api.result_cache import ResultCache
+from sds_digest.src.processing.llm_processor import LLMSafetyDataSheetProcessor
+
+
+@pytest.fixture
+def cache(temp_dir):
+    """Create a result cache in a temporary directory."""
+    return ResultCache(temp_dir / "result_cache")
+
+
+class TestResultCache:
+    """Tests for ResultCache."""
+
+    def test_put_and_get(self, cache, sample_processed_sds):
+        """Test a stored result is returned with its SDS ID."""
+        key = cache.make_key("abc", LLMSafetyDataSheetProcessor.identifier(model="gpt-4o"), "eager", "openai")
+
+        assert cache.get(key) is None
+        cache.put(key, "sds-1", sample_processed_sds)
+        cached = cache.get(key)
+
+        assert cached.sds_id == "sds-1"
+        assert cached.processed_sds == sample_processed_sds
+        stats = cache.stats()
+        assert (stats.hits, stats.misses, stats.entries) == (1, 1, 1)
+
+    def test_key_depends_on_model(self):
+        """Test results of different models never share a key."""
+        key_a = ResultCache.make_key("abc", LLMSafetyDataSheetProcessor.identifier(model="gpt-4o"), "eager", "openai")
+        key_b = ResultCache.make_key("abc", LLMSafetyDataSheetProcessor.identifier(model="gpt-4o-mini"), "eager", "openai")
+
+        assert key_a != key_b
+
+    def test_key_depends_on_mode_and_provider(self):
+        """Test the processing mode and provider are part of the key."""
+        identifier = LLMSafetyDataSheetProcessor.identifier(model="gpt-4o")
+
+        assert ResultCache.make_key("abc", identifier, "lazy", "openai") != ResultCache.make_key("abc", identifier, "eager", "openai")
+        assert ResultCache.make_key("abc", identifier, "eager", "openai") != ResultCache.make_key("abc", identifier, "eager", "ollama")
+
+    def test_evicts_least_recently_used(self, temp_dir, sample_processed_sds):
+        """Test the oldest accessed entry is evicted once the size limit is exceeded."""
+        entry_size = len(sample_processed_sds.model_dump_json().encode("utf-8"))
+        cache = ResultCache(temp_dir / "result_cache", max_size_bytes=2 * entry_size)
+
+        cache.put("first", "sds-1", sample_processed_sds)
+        cache.put("second", "sds-2", sample_processed_sds)
+        cache.get("first")
+        cache.put("third", "sds-3", sample_processed_sds)
+
+        assert cache.get("second") is None
+        assert cache.get("first") is not None
+        assert cache.get("third") is not None
+        assert cache.stats().evictions == 1
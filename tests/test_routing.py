@@ -0,0 +1,284 @@
+"""Tests for routing processor stages and sections to model tiers."""
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pydantic import ValidationError
+
+from sds_digest.api import main
+from sds_digest.llms.fake_llm import FakeLLM, FakeLLMConfig
+from sds_digest.llms.routing import ModelTier, RoutedSectionStructureLLM, RoutingPolicy, TierMetrics
+from sds_digest.llms.utils import PromptUsage
+from sds_digest.src.processing.llm_processor import LLMSafetyDataSheetProcessor
+from sds_digest.src.processing.processor import Section
+from sds_digest.src.telemetry import Stage, Tracer, record_cache_hit, record_usage
+
+
+SMALL = ModelTier(name="small", provider="openai", model="gpt-4o-mini")
+LARGE = ModelTier(name="large", provider="openai", model="gpt-4o")
+
+
+@pytest.fixture
+def policy():
+    """Sections 9-16 on the small tier, everything else on the large one."""
+    return RoutingPolicy(
+        tiers=[SMALL, LARGE],
+        default_tier="large",
+        sections={number: "small" for number in range(9, 17)},
+    )
+
+
+def section(title: str) -> Section:
+    return Section(section_title=title, section_summary="summary", raw_content_of_section="content")
+
+
+def structurer(*responses, batch_responses=()):
+    mock = MagicMock()
+    mock.astructure_section_json = AsyncMock(side_effect=list(responses))
+    mock.astructure_sections_json = AsyncMock(side_effect=list(batch_responses))
+    mock._maybe_json_to_structured_section.side_effect = lambda response, sec: {"content": response}
+    return mock
+
+
+class TestRoutingPolicy:
+    """Tests for RoutingPolicy."""
+
+    def test_routes_sections_by_ghs_number(self, policy):
+        """Test section rules win over the stage tier and unmatched sections use the default."""
+        assert policy.tier_for_section(section("SECTION 11: Toxicological information")) == SMALL
+        assert policy.tier_for_section(section("2. Hazards identification")) == LARGE
+        assert policy.tier_for_section(section("Appendix")) == LARGE
+        assert policy.tier_for_stage("summary") == LARGE
+
+    def test_escalation_goes_to_the_next_tier(self, policy):
+        """Test tiers escalate from cheapest to strongest."""
+        assert policy.escalation(SMALL) == LARGE
+        assert policy.escalation(LARGE) is None
+
+    def test_unknown_tier_is_rejected(self):
+        """Test rules must name a configured tier."""
+        with pytest.raises(ValidationError, match="Unknown tiers"):
+            RoutingPolicy(tiers=[SMALL], default_tier="small", stages={"summary": "large"})
+
+    def test_fingerprint_changes_with_the_policy(self, policy):
+        """Test the fingerprint is stable for a policy and differs between policies."""
+        same = RoutingPolicy.model_validate_json(policy.model_dump_json())
+
+        assert same.fingerprint() == policy.fingerprint()
+        assert RoutingPolicy.single("gpt-4o").fingerprint() != policy.fingerprint()
+
+
+class TestTierMetrics:
+    """Tests for TierMetrics."""
+
+    def test_records_usage_and_cost(self):
+        """Test usage reported inside a tracked call is attributed to the tier."""
+        metrics = TierMetrics()
+
+        with metrics.track(SMALL):
+            record_usage(PromptUsage(prompt_tokens=1_000_000, cached_tokens=0, completion_tokens=1_000_000))
+        with metrics.track(SMALL):
+            record_cache_hit()
+
+        [stats] = metrics.stats()
+        assert (stats.tier, stats.calls, stats.cache_hits) == ("small", 2, 1)
+        assert (stats.input_tokens, stats.output_tokens) == (1_000_000, 1_000_000)
+        assert stats.cost_usd == pytest.approx(0.75)
+        assert stats.p95_latency_ms is not None
+
+    def test_counts_failed_calls(self):
+        """Test a call that raises is still counted, as an error, with the usage it reported."""
+        metrics = TierMetrics()
+
+        with pytest.raises(RuntimeError), metrics.track(SMALL):
+            record_usage(PromptUsage(prompt_tokens=10, completion_tokens=0))
+            raise RuntimeError("rate limited")
+
+        [stats] = metrics.stats()
+        assert (stats.calls, stats.errors, stats.input_tokens) == (1, 1, 10)
+
+    def test_calls_without_usage_are_not_cache_hits(self):
+        """Test only recorded cache lookups count as cache hits."""
+        metrics = TierMetrics()
+
+        with metrics.track(SMALL):
+            record_cache_hit(False)
+        with metrics.track(SMALL):
+            pass
+
+        [stats] = metrics.stats()
+        assert (stats.calls, stats.cache_hits) == (2, 0)
+
+
+class TestRoutedSectionStructureLLM:
+    """Tests for RoutedSectionStructureLLM."""
+
+    @pytest.mark.asyncio
+    async def test_escalates_on_unparseable_output(self, policy):
+        """Test a section that is not valid JSON on the small tier is retried on the large one."""
+        small = structurer("not json")
+        large = structurer({"toxicity": "low"})
+        routed = RoutedSectionStructureLLM({"small": small, "large": large}, policy)
+
+        result = await routed.astructure_section(section("SECTION 11: Toxicological information"))
+
+        assert result == {"content": {"toxicity": "low"}}
+        stats = {stats.tier: stats for stats in routed.metrics.stats()}
+        assert (stats["small"].parse_failures, stats["small"].escalations) == (1, 1)
+        assert (stats["large"].calls, stats["large"].parse_failures) == (1, 0)
+
+    @pytest.mark.asyncio
+    async def test_strongest_tier_keeps_raw_output(self, policy):
+        """Test the raw output is kept when no stronger tier is left."""
+        large = structurer("still not json")
+        routed = RoutedSectionStructureLLM({"small": structurer(), "large": large}, policy)
+
+        result = await routed.astructure_section(section("SECTION 3: Composition"))
+
+        assert result == {"content": "still not json"}
+        [stats] = routed.metrics.stats()
+        assert (stats.tier, stats.parse_failures, stats.escalations) == ("large", 1, 0)
+
+    @pytest.mark.asyncio
+    async def test_escalation_can_be_disabled(self, policy):
+        """Test parse failures are only counted when escalation is off."""
+        policy = policy.model_copy(update={"escalate_on_parse_failure": False})
+        small = structurer("not json")
+        large = structurer()
+        routed = RoutedSectionStructureLLM({"small": small, "large": large}, policy)
+
+        await routed.astructure_section(section("SECTION 9: Physical and chemical properties"))
+
+        large.astructure_section_json.assert_not_called()
+
+
+class TestRoutedBatching:
+    """Tests for batched structuring across tiers."""
+
+    @pytest.mark.asyncio
+    async def test_batches_per_tier_and_escalates_failures_alone(self, policy):
+        """Test each tier gets its sections in one batch and only the unparseable one escalates."""
+        small = structurer(batch_responses=[[{"stability": "stable"}, "not json"]])
+        large = structurer({"toxicity": "low"}, batch_responses=[[{"hazards": "none"}]])
+        routed = RoutedSectionStructureLLM({"small": small, "large": large}, policy)
+        sections = [section("SECTION 2: Hazards"), section("SECTION 10: Stability"), section("SECTION 11: Toxicology")]
+
+        results = await routed.astructure_sections(sections)
+
+        assert results == [{"content": {"hazards": "none"}}, {"content": {"stability": "stable"}}, {"content": {"toxicity": "low"}}]
+        small.astructure_sections_json.assert_called_once_with(sections[1:])
+        large.astructure_section_json.assert_called_once_with(sections[2])
+        stats = {stats.tier: stats for stats in routed.metrics.stats()}
+        assert (stats["small"].calls, stats["small"].escalations) == (1, 1)
+        assert stats["large"].calls == 2
+
+    @pytest.mark.asyncio
+    async def test_counts_failures_per_section(self, policy):
+        """Test every unparseable section of a batch counts as a parse failure and an escalation."""
+        small = structurer(batch_responses=[["not json", {"stability": "stable"}, "not json"]])
+        large = structurer({"toxicity": "low"}, {"ecology": "none"})
+        routed = RoutedSectionStructureLLM({"small": small, "large": large}, policy)
+        sections = [section("SECTION 9: Properties"), section("SECTION 10: Stability"), section("SECTION 11: Toxicology")]
+
+        await routed.astructure_sections(sections)
+
+        stats = {stats.tier: stats for stats in routed.metrics.stats()}
+        assert (stats["small"].calls, stats["small"].parse_failures, stats["small"].escalations) == (1, 2, 2)
+        assert stats["large"].calls == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_tiers_are_counted_on_the_span(self, policy):
+        """Test tier groups structured concurrently under one span each count their calls instead of overwriting each other."""
+        small = structurer(batch_responses=[["not json"]])
+        large = structurer({"stability": "stable"}, batch_responses=[[{"hazards": "none"}]])
+        routed = RoutedSectionStructureLLM({"small": small, "large": large}, policy)
+
+        with Tracer().span(Stage.SECTION_STRUCTURING) as span:
+            await routed.astructure_sections([section("SECTION 2: Hazards"), section("SECTION 10: Stability")])
+
+        assert span.model_calls == {("small", "gpt-4o-mini"): 1, ("large", "gpt-4o"): 2}
+        assert "model_tier" not in span.attributes
+
+
+class TestRoutedProcessor:
+    """Tests for a processor built from a routing policy."""
+
+    def test_from_routing_builds_each_stage_on_its_tier(self, policy):
+        """Test stages get the client of their tier and the identifier depends on the policy."""
+        llms = {}
+
+        def llm_for(tier):
+            llms[tier.name] = FakeLLM(model=tier.model, config=FakeLLMConfig(first_token_latency_ms=0))
+            return llms[tier.name]
+
+        policy = policy.model_copy(update={"stages": {"summary": "small"}})
+        processor = LLMSafetyDataSheetProcessor.from_routing(policy, llm_for=llm_for, section_splitter="rules")
+
+        assert processor.sds_structure_llm.llm is llms["large"]
+        assert processor.summary_llm.llm is llms["small"]
+        assert processor.section_structure_llm.structurers["small"].llm is llms["small"]
+        assert processor.processor_identifier.model_name == "gpt-4o-mini+gpt-4o"
+        assert processor.processor_identifier == LLMSafetyDataSheetProcessor.identifier(
+            model="ignored", section_splitter="rules", routing=policy
+        )
+        assert "routed" not in LLMSafetyDataSheetProcessor.identifier(model="gpt-4o").processor_version
+
+    @staticmethod
+    def processor(policy, section_splitter=None):
+        async def astream_sections(text):
+            record_usage(PromptUsage(prompt_tokens=100, completion_tokens=10))
+            yield section("SECTION 1: Identification")
+
+        sds_structure_llm = MagicMock()
+        sds_structure_llm.llm.model = "gpt-4o"
+        sds_structure_llm.astream_sections = astream_sections
+        section_structure_llm = MagicMock()
+        section_structure_llm.batch_token_budget = None
+        return LLMSafetyDataSheetProcessor(
+            sds_structure_llm=sds_structure_llm,
+            section_structure_llm=section_structure_llm,
+            summary_llm=MagicMock(),
+            section_splitter=section_splitter,
+            routing=policy,
+            tier_metrics=TierMetrics(),
+        )
+
+    @pytest.mark.asyncio
+    async def test_streaming_split_is_tracked(self, policy):
+        """Test the LLM splitter's calls are attributed to the splitting tier when sections are streamed."""
+        processor = self.processor(policy)
+
+        sections = [s async for s in processor.astream_sections("text")]
+
+        assert len(sections) == 1
+        [stats] = processor.tier_metrics.stats()
+        assert (stats.tier, stats.calls, stats.input_tokens) == ("large", 1, 100)
+
+    @pytest.mark.asyncio
+    async def test_rule_based_split_is_not_tracked(self, policy):
+        """Test a confident rule-based split makes no LLM call and records no tier call."""
+        splitter = MagicMock()
+        splitter.split.return_value = MagicMock(confidence=1.0, sections=MagicMock(sections=[section("SECTION 1: Identification")]))
+        processor = self.processor(policy, section_splitter=splitter)
+
+        await processor.asplit_sections("text")
+        sections = [s async for s in processor.astream_sections("text")]
+
+        assert len(sections) == 1
+        assert processor.tier_metrics.stats() == []
+
+
+class TestModelTierMetricsEndpoint:
+    """Tests for the model tier metrics endpoint."""
+
+    def test_reports_registry_tier_metrics(self, client, monkeypatch):
+        """Test the endpoint returns the stats of the registry's tier metrics."""
+        metrics = TierMetrics()
+        with metrics.track(LARGE):
+            record_usage(PromptUsage(prompt_tokens=100, completion_tokens=10))
+        monkeypatch.setattr(main.LLM_REGISTRY, "tier_metrics", metrics)
+
+        response = client.get("/api/metrics/model-tiers")
+
+        assert response.status_code == 200
+        [stats] = response.json()
+        assert (stats["tier"], stats["model"], stats["calls"], stats["input_tokens"]) == ("large", "gpt-4o", 1, 100)
@@ -0,0 +1,204 @@
+"""Tests for the process-wide LLM scheduler."""
+import asyncio
+import time
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from llama_index.core.llms import ChatMessage, ChatResponse
+
+from sds_digest.llms.qa_llm import QALLM
+from sds_digest.llms.scheduler import (
+    LLMPriority,
+    LLMScheduler,
+    ModelBudget,
+    estimate_tokens,
+    is_rate_limit_error,
+    response_tokens,
+    run_scheduled,
+)
+
+
+class RateLimitError(Exception):
+    """Mimics the openai SDK's 429 error."""
+    status_code = 429
+
+
+def make_response(total_tokens=None) -> ChatResponse:
+    """Create a chat response with optional reported usage."""
+    raw = {"usage": {"total_tokens": total_tokens}} if total_tokens is not None else None
+    return ChatResponse(message=ChatMessage(role="assistant", content="ok"), raw=raw)
+
+
+class TestLLMScheduler:
+    """Tests for LLMScheduler."""
+
+    @pytest.mark.asyncio
+    async def test_interactive_calls_jump_the_queue(self):
+        """Test a waiting /ask call gets the next free slot before background work."""
+        scheduler = LLMScheduler(max_concurrency=1)
+        release = asyncio.Event()
+        order = []
+
+        async def blocker():
+            await release.wait()
+            return make_response()
+
+        def record(name):
+            async def call():
+                order.append(name)
+                return make_response()
+            return call
+
+        running = asyncio.create_task(scheduler.run("gpt-4o", blocker))
+        await asyncio.sleep(0)
+        background = asyncio.create_task(scheduler.run("gpt-4o", record("background"), priority=LLMPriority.BACKGROUND))
+        interactive = asyncio.create_task(scheduler.run("gpt-4o", record("interactive"), priority=LLMPriority.INTERACTIVE))
+        await asyncio.sleep(0)
+
+        metrics = scheduler.metrics()
+        assert metrics.in_flight == 1
+        assert metrics.waiting_interactive == 1
+        assert metrics.waiting_background == 1
+
+        release.set()
+        await asyncio.gather(running, background, interactive)
+
+        assert order == ["interactive", "background"]
+        assert scheduler.metrics().in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_requests_per_minute_budget(self):
+        """Test calls beyond the request budget wait for the window to slide."""
+        scheduler = LLMScheduler(
+            default_budget=ModelBudget(requests_per_minute=2),
+            window_seconds=0.2,
+        )
+        call = AsyncMock(return_value=make_response())
+
+        started = time.monotonic()
+        await asyncio.gather(*[scheduler.run("gpt-4o", call) for _ in range(3)])
+
+        assert time.monotonic() - started >= 0.15
+        assert call.await_count == 3
+        assert scheduler.metrics().throttled_seconds > 0
+
+    @pytest.mark.asyncio
+    async def test_throttled_model_does_not_hold_a_slot(self):
+        """Test a background call waiting for its model's budget does not delay an interactive call on another model."""
+        scheduler = LLMScheduler(
+            max_concurrency=1,
+            model_budgets={"gpt-4o": ModelBudget(requests_per_minute=1)},
+            window_seconds=0.5,
+        )
+        await scheduler.run("gpt-4o", AsyncMock(return_value=make_response()))
+        throttled = asyncio.create_task(scheduler.run("gpt-4o", AsyncMock(return_value=make_response())))
+        await asyncio.sleep(0.01)
+
+        started = time.monotonic()
+        await scheduler.run("gpt-4o-mini", AsyncMock(return_value=make_response()), priority=LLMPriority.INTERACTIVE)
+
+        assert time.monotonic() - started < 0.1
+        assert not throttled.done()
+        await throttled
+        assert scheduler.metrics().throttled_seconds > 0
+
+    @pytest.mark.asyncio
+    async def test_token_budget_uses_reported_usage(self):
+        """Test reservations are corrected from the usage the provider reports."""
+        scheduler = LLMScheduler(model_budgets={"gpt-4o": ModelBudget(tokens_per_minute=10_000)})
+
+        await scheduler.run("gpt-4o", AsyncMock(return_value=make_response(total_tokens=120)), estimated_tokens=5_000)
+
+        usage = scheduler.metrics().models["gpt-4o"]
+        assert usage.requests_in_window == 1
+        assert usage.tokens_in_window == 120
+
+    @pytest.mark.asyncio
+    async def test_retries_rate_limit_errors(self):
+        """Test 429 errors are retried with backoff until the call succeeds."""
+        scheduler = LLMScheduler(max_retries=3, base_backoff=0.001)
+        call = AsyncMock(side_effect=[RateLimitError(), RateLimitError(), make_response()])
+
+        response = await scheduler.run("gpt-4o", call)
+
+        assert response.message.content == "ok"
+        assert call.await_count == 3
+        assert scheduler.metrics().rate_limit_retries == 2
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_retries(self):
+        """Test the rate-limit error surfaces once retries are exhausted."""
+        scheduler = LLMScheduler(max_retries=1, base_backoff=0.001)
+        call = AsyncMock(side_effect=RateLimitError())
+
+        with pytest.raises(RateLimitError):
+            await scheduler.run("gpt-4o", call)
+        assert call.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_other_errors_are_not_retried(self):
+        """Test non rate-limit errors fail immediately."""
+        scheduler = LLMScheduler(base_backoff=0.001)
+        call = AsyncMock(side_effect=ValueError("bad request"))
+
+        with pytest.raises(ValueError):
+            await scheduler.run("gpt-4o", call)
+        assert call.await_count == 1
+        assert scheduler.metrics().in_flight == 0
+
+
+class TestSchedulerHelpers:
+    """Tests for token accounting and error classification helpers."""
+
+    def test_estimate_tokens(self):
+        """Test the estimate covers the prompt plus an output allowance."""
+        messages = [ChatMessage(role="user", content="x" * 400)]
+        assert estimate_tokens(messages, output_tokens=50) == 150
+
+    def test_response_tokens(self):
+        """Test usage is read from OpenAI and Ollama raw responses."""
+        assert response_tokens(make_response(total_tokens=42)) == 42
+        ollama = ChatResponse(message=ChatMessage(role="assistant", content=""), raw={"prompt_eval_count": 10, "eval_count": 5})
+        assert response_tokens(ollama) == 15
+        assert response_tokens(make_response()) is None
+
+    def test_is_rate_limit_error(self):
+        """Test 429s are recognised on the error or on its HTTP response."""
+        assert is_rate_limit_error(RateLimitError())
+        assert is_rate_limit_error(Exception()) is False
+        error = Exception()
+        error.response = SimpleNamespace(status_code=429, headers={})
+        assert is_rate_limit_error(error)
+
+
+class TestScheduledWrappers:
+    """Tests for LLM wrappers going through the scheduler."""
+
+    @pytest.mark.asyncio
+    async def test_run_scheduled_without_scheduler(self):
+        """Test calls go straight to the LLM when no scheduler is configured."""
+        call = AsyncMock(return_value=make_response())
+
+        await run_scheduled(None, "gpt-4o", call, [])
+
+        call.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_qa_llm_is_interactive(self):
+        """Test QALLM calls are scheduled with interactive priority."""
+        llm = MagicMock()
+        llm.model = "gpt-4o"
+        llm.achat = AsyncMock(return_value=make_response())
+        async def run(model, call, estimated_tokens, priority):
+            return await call()
+
+        scheduler = LLMScheduler()
+        scheduler.run = AsyncMock(side_effect=run)
+        qa_llm = QALLM(llm=llm, scheduler=scheduler)
+
+        answer = await qa_llm.aanswer("What is it?", "SDS text")
+
+        assert answer == "ok"
+        assert scheduler.run.call_args.args[0] == "gpt-4o"
+        assert scheduler.run.call_args.args[3] == LLMPriority.INTERACTIVE
@@ -0,0 +1,104 @@
+"""Tests for routing questions to the relevant SDS sections."""
+import pytest
+
+from sds_digest.src.processing.processor import Section
+from sds_digest.src.processing.section_router import SectionIndex, SectionRouter, expand_query
+
+
+SECTION_CONTENT = {
+    "1. Identification": "Product name: ACME Solvent. Supplier: ACME Corp. Emergency phone: 555-0100.",
+    "4. First-aid measures": "Inhalation: move to fresh air. Eye contact: rinse cautiously with water for several minutes.",
+    "5. Fire-fighting measures": "Suitable extinguishing media: dry chemical, CO2, alcohol-resistant foam.",
+    "8. Exposure controls/personal protection": "Hand protection: nitrile rubber gloves. Respiratory protection: type A filter.",
+    "9. Physical and chemical properties": "Appearance: clear liquid. Flash point: 12 °C. Boiling point: 56 °C.",
+    "14. Transport information": "UN number: UN1090. Proper shipping name: ACETONE. Class 3.",
+}
+
+
+@pytest.fixture
+def sections():
+    """Create a handful of typical SDS sections."""
+    return [
+        Section(section_title=title, section_summary="", raw_content_of_section=f"{title}\n{content}")
+        for title, content in SECTION_CONTENT.items()
+    ]
+
+
+@pytest.fixture
+def markdown(sections):
+    """Join the sections into the full document."""
+    return "\n\n".join(section.raw_content_of_section for section in sections)
+
+
+class TestSectionIndex:
+    """Tests for the BM25 section index."""
+
+    def test_query_expansion(self):
+        """Test colloquial terms are expanded to SDS vocabulary."""
+        terms = expand_query("What PPE do I need?")
+
+        assert "ppe" in terms
+        assert "protective" in terms
+        assert "what" not in terms
+
+    def test_best_section_ranks_first(self, sections):
+        """Test the section dedicated to the topic gets the highest score."""
+        index = SectionIndex(sections)
+
+        scores = index.scores(expand_query("Which gloves should I wear?"))
+
+        assert max(range(len(scores)), key=scores.__getitem__) == 3
+
+
+class TestSectionRouter:
+    """Tests for SectionRouter."""
+
+    @pytest.mark.parametrize("question, expected_title", [
+        ("What PPE is required?", "8. Exposure controls/personal protection"),
+        ("What is the flash point?", "9. Physical and chemical properties"),
+        ("What should I do if it gets in my eyes?", "4. First-aid measures"),
+        ("What is the UN number for shipping?", "14. Transport information"),
+    ])
+    def test_routes_to_relevant_sections(self, sections, markdown, question, expected_title):
+        """Test common questions are answered from the matching section only."""
+        router = SectionRouter()
+
+        context = router.route("sds-1", question, sections, markdown)
+
+        assert context.mode == "sections"
+        assert expected_title in context.section_titles
+        assert len(context.section_titles) <= router.max_sections
+        assert context.context_tokens < context.document_tokens
+        assert SECTION_CONTENT[expected_title] in context.text
+
+    def test_falls_back_to_full_document(self, sections, markdown):
+        """Test questions matching no section use the whole document."""
+        router = SectionRouter()
+
+        context = router.route("sds-1", "Tell me a joke", sections, markdown)
+
+        assert context.mode == "full_document"
+        assert context.text == markdown
+        assert context.tokens_saved == 0
+
+    def test_no_sections_uses_full_document(self, markdown):
+        """Test SDSs stored without raw sections still get answered."""
+        context = SectionRouter().route("sds-1", "What PPE is required?", [], markdown)
+
+        assert context.mode == "full_document"
+
+    def test_stats_and_invalidation(self, sections, markdown):
+        """Test counters track routing outcomes and indexes can be dropped."""
+        router = SectionRouter()
+        router.route("sds-1", "What PPE is required?", sections, markdown)
+        router.route("sds-1", "Tell me a joke", sections, markdown)
+
+        stats = router.stats()
+        assert stats.questions == 2
+        assert stats.routed_to_sections == 1
+        assert stats.full_document_fallbacks == 1
+        assert stats.tokens_saved > 0
+        assert stats.indexes == 1
+
+        router.invalidate("sds-1")
+        assert router.stats().indexes == 0
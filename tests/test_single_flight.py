@@ -0,0 +1,68 @@
+"""Tests for single-flight deduplication of concurrent computations."""
+import asyncio
+
+import pytest
+
+from sds_digest.api.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """Tests for SingleFlight."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_computation(self):
+        """Test callers for the same key get the result of a single run."""
+        flights = SingleFlight()
+        runs = []
+
+        async def compute():
+            runs.append(1)
+            await asyncio.sleep(0.01)
+            return "summary"
+
+        results = await asyncio.gather(*(flights.run("sds-1", compute) for _ in range(5)))
+
+        assert results == ["summary"] * 5
+        assert len(runs) == 1
+        stats = flights.stats()
+        assert (stats.executions, stats.shared, stats.in_flight) == (1, 4, 0)
+
+    @pytest.mark.asyncio
+    async def test_failure_is_shared_and_retried(self):
+        """Test waiters share an error and the next call runs again."""
+        flights = SingleFlight()
+        attempts = []
+
+        async def compute():
+            attempts.append(1)
+            await asyncio.sleep(0.01)
+            if len(attempts) == 1:
+                raise TimeoutError("LLM timeout")
+            return "summary"
+
+        results = await asyncio.gather(*(flights.run("sds-1", compute) for _ in range(2)), return_exceptions=True)
+        retried = await flights.run("sds-1", compute)
+
+        assert all(isinstance(result, TimeoutError) for result in results)
+        assert retried == "summary"
+        assert flights.stats().failures == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_the_computation(self):
+        """Test a disconnecting client leaves the shared run to the other callers."""
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def compute():
+            await release.wait()
+            return "summary"
+
+        first = asyncio.create_task(flights.run("sds-1", compute))
+        second = asyncio.create_task(flights.run("sds-1", compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+
+        assert await second == "summary"
+        with pytest.raises(asyncio.CancelledError):
+            await first
@@ -0,0 +1,133 @@
+"""Tests for the rule-based section splitter."""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from sds_digest.src.extraction.extractor import ExtractedPdf
+from sds_digest.src.processing.llm_processor import LLMSafetyDataSheetProcessor
+from sds_digest.src.processing.processor import Section, StructuredSection
+from sds_digest.src.processing.splitter import RuleBasedSectionSplitter
+
+
+GHS_TITLES = [
+    "Identification", "Hazard(s) identification", "Composition/information on ingredients",
+    "First-aid measures", "Fire-fighting measures", "Accidental release measures",
+    "Handling and storage", "Exposure controls/personal protection", "Physical and chemical properties",
+    "Stability and reactivity", "Toxicological information", "Ecological information",
+    "Disposal considerations", "Transport information", "Regulatory information", "Other information",
+]
+
+
+def make_sds_markdown(heading_format: str) -> str:
+    """Build a 16-section SDS in the given heading format."""
+    parts = ["# ACME Solvent\n\nRevision date: 2024-01-01\n"]
+    for number, title in enumerate(GHS_TITLES, 1):
+        parts.append(heading_format.format(number=number, title=title))
+        parts.append(f"Details for {title.lower()} of the product, section {number}.\n")
+        if number == 4:
+            parts.append("**1. Move to fresh air**\n")  # numbered list item, not a heading
+    return "\n".join(parts)
+
+
+@pytest.fixture
+def splitter():
+    """Create a rule-based splitter."""
+    return RuleBasedSectionSplitter()
+
+
+class TestRuleBasedSectionSplitter:
+    """Tests for RuleBasedSectionSplitter."""
+
+    @pytest.mark.parametrize("heading_format", [
+        "## SECTION {number}: {title}\n",
+        "**Section {number}. {title}**\n",
+        "### {number}. {title}\n",
+        "SECTION {number} - {title}\n",
+    ])
+    def test_splits_ghs_layouts(self, splitter, heading_format):
+        """Test common heading styles yield all 16 sections with full confidence."""
+        result = splitter.split(make_sds_markdown(heading_format))
+
+        assert result.section_numbers == list(range(1, 17))
+        assert result.confidence == 1.0
+        first = result.sections.sections[0]
+        assert "Identification" in first.section_title
+        assert "ACME Solvent" in first.raw_content_of_section
+        assert "Move to fresh air" in result.sections.sections[3].raw_content_of_section
+        assert result.sections.sections[15].section_summary.startswith("Details for other information")
+
+    def test_ignores_repeated_page_headers(self, splitter):
+        """Test a repeated earlier section header does not start a new section."""
+        markdown = make_sds_markdown("## SECTION {number}: {title}\n").replace(
+            "## SECTION 9:", "SECTION 2: Hazard(s) identification (continued)\n\n## SECTION 9:"
+        )
+
+        result = splitter.split(markdown)
+
+        assert result.section_numbers == list(range(1, 17))
+
+    def test_table_of_contents_has_low_confidence(self, splitter):
+        """Test a table of contents without section bodies is not trusted."""
+        markdown = "\n".join(f"SECTION {number}: {title}" for number, title in enumerate(GHS_TITLES, 1))
+
+        result = splitter.split(markdown)
+
+        assert result.confidence == 0.0
+
+    def test_unstructured_text_finds_nothing(self, splitter):
+        """Test text without GHS headings yields no sections."""
+        result = splitter.split("Just some text\n\n1. A numbered list\n2. Another item")
+
+        assert result.sections.sections == []
+        assert result.confidence == 0.0
+
+
+class TestProcessorSectionSplitter:
+    """Tests for splitter selection on LLMSafetyDataSheetProcessor."""
+
+    def make_processor(self, section_splitter):
+        """Create a processor with mocked LLM components."""
+        sds_structure_llm = MagicMock()
+        sds_structure_llm.llm.model = "gpt-4o"
+
+        async def astream_sections(text):
+            yield Section(section_title="LLM section", section_summary="", raw_content_of_section="text")
+
+        sds_structure_llm.astream_sections = MagicMock(side_effect=astream_sections)
+        section_structure_llm = MagicMock()
+        section_structure_llm.batch_token_budget = None
+        section_structure_llm.astructure_section = AsyncMock(side_effect=lambda section: StructuredSection(
+            section_title=section.section_title,
+            section_summary=section.section_summary,
+            structured_content={},
+        ))
+        summary_llm = MagicMock()
+        summary_llm.asummarize = AsyncMock(return_value="summary")
+        return LLMSafetyDataSheetProcessor(
+            sds_structure_llm=sds_structure_llm,
+            section_structure_llm=section_structure_llm,
+            summary_llm=summary_llm,
+            section_splitter=section_splitter,
+        )
+
+    @pytest.mark.asyncio
+    async def test_rule_based_split_skips_llm(self, splitter):
+        """Test a confidently split document never calls SDSStructureLLM."""
+        processor = self.make_processor(splitter)
+        extracted_pdf = ExtractedPdf(content=make_sds_markdown("## SECTION {number}: {title}\n"), source_file_path="a.pdf")
+
+        processed_sds = await processor.aprocess(extracted_pdf)
+
+        assert len(processed_sds.structured_content.structured_sections) == 16
+        processor.sds_structure_llm.astream_sections.assert_not_called()
+        assert processor.processor_identifier.processor_version.endswith("+rules")
+
+    @pytest.mark.asyncio
+    async def test_low_confidence_falls_back_to_llm(self, splitter):
+        """Test documents the rules cannot split go through SDSStructureLLM."""
+        processor = self.make_processor(splitter)
+        extracted_pdf = ExtractedPdf(content="Unstructured SDS text", source_file_path="a.pdf")
+
+        processed_sds = await processor.aprocess(extracted_pdf)
+
+        assert processed_sds.structured_content.structured_sections[0].section_title == "LLM section"
+        processor.sds_structure_llm.astream_sections.assert_called_once()
@@ -0,0 +1,129 @@
+"""Tests for the SQLite SDS store."""
+import sqlite3
+import pytest
+
+from sds_digest.api.storage import SQLiteSDSStore
+from sds_digest.src.processing.processor import Section
+
+
+@pytest.fixture
+def store(temp_dir):
+    """Create a store in a temporary directory."""
+    store = SQLiteSDSStore(temp_dir / "sds.sqlite3", front_cache_size=2)
+    yield store
+    store.close()
+
+
+class TestSQLiteSDSStore:
+    """Tests for SQLiteSDSStore."""
+
+    def test_put_and_get(self, store, sample_processed_sds):
+        """Test a stored SDS round-trips through every accessor."""
+        store.put("sds-1", sample_processed_sds)
+
+        assert "sds-1" in store
+        assert store.get("sds-1") == sample_processed_sds
+        assert store.get_summary("sds-1") == sample_processed_sds.summary
+        assert store.get_markdown("sds-1") == sample_processed_sds.markdown_content
+        assert store.get_structured_content("sds-1") == sample_processed_sds.structured_content
+
+    def test_missing_sds(self, store):
+        """Test lookups of unknown IDs return None."""
+        assert "missing" not in store
+        assert store.get("missing") is None
+        assert store.get_summary("missing") is None
+        assert store.get_structured_content("missing") is None
+
+    def test_survives_restart(self, temp_dir, store, sample_processed_sds):
+        """Test data is read back from disk by a new store instance."""
+        store.put("sds-1", sample_processed_sds)
+
+        reopened = SQLiteSDSStore(temp_dir / "sds.sqlite3")
+
+        assert reopened.get_summary("sds-1") == sample_processed_sds.summary
+        reopened.close()
+
+    def test_front_cache_is_bounded(self, store, sample_processed_sds):
+        """Test the in-process LRU keeps at most front_cache_size documents."""
+        for sds_id in ("sds-1", "sds-2", "sds-3"):
+            store.put(sds_id, sample_processed_sds)
+
+        assert list(store._front_cache) == ["sds-2", "sds-3"]
+        assert store.get("sds-1") == sample_processed_sds
+
+    def test_writes_from_other_connections_are_visible(self, temp_dir, store, sample_processed_sds):
+        """Test another process' update is not hidden by the front cache."""
+        other = SQLiteSDSStore(temp_dir / "sds.sqlite3")
+        store.put("sds-1", sample_processed_sds)
+        assert store.get_summary("sds-1") == sample_processed_sds.summary
+
+        other.put("sds-1", sample_processed_sds.model_copy(update={"summary": "Updated summary"}))
+
+        assert store.get_summary("sds-1") == "Updated summary"
+        other.close()
+
+    def test_delete(self, store, sample_processed_sds):
+        """Test deleted documents are gone from disk and front cache."""
+        store.put("sds-1", sample_processed_sds)
+
+        assert store.delete("sds-1") is True
+        assert "sds-1" not in store
+        assert store.delete("sds-1") is False
+
+    def test_set_summary(self, temp_dir, store, sample_processed_sds):
+        """Test replacing the summary updates the front cache and the database."""
+        store.put("sds-1", sample_processed_sds)
+
+        assert store.set_summary("sds-1", "New summary") is True
+        assert store.get_summary("sds-1") == "New summary"
+        reopened = SQLiteSDSStore(temp_dir / "sds.sqlite3")
+        assert reopened.get("sds-1").summary == "New summary"
+        assert store.set_summary("missing", "Summary") is False
+        reopened.close()
+
+    def test_lazy_artifacts_round_trip(self, temp_dir, store, sample_processed_sds):
+        """Test an SDS stored before structuring and summarizing gets both filled in later."""
+        lazy = sample_processed_sds.model_copy(update={"structured_content": None, "summary": None})
+        store.put("sds-1", lazy)
+
+        assert store.get_structured_content("sds-1") is None
+        assert store.get_summary("sds-1") is None
+        assert store.set_structured_content("sds-1", sample_processed_sds.structured_content) is True
+        assert store.get("sds-1").structured_content == sample_processed_sds.structured_content
+        reopened = SQLiteSDSStore(temp_dir / "sds.sqlite3")
+        assert reopened.get_structured_content("sds-1") == sample_processed_sds.structured_content
+        assert reopened.get("sds-1").summary is None
+        reopened.close()
+
+    def test_sections_round_trip(self, temp_dir, store, sample_processed_sds):
+        """Test raw sections are stored and read back without the rest of the document."""
+        section = Section(section_title="1. Identification", section_summary="", raw_content_of_section="Name: X")
+        store.put("sds-1", sample_processed_sds.model_copy(update={"sections": [section]}))
+
+        reopened = SQLiteSDSStore(temp_dir / "sds.sqlite3")
+
+        assert reopened.get_sections("sds-1") == [section]
+        assert reopened.get("sds-1").sections == [section]
+        assert reopened.get_sections("missing") is None
+        reopened.close()
+
+    def test_adds_sections_column_to_existing_database(self, temp_dir, sample_processed_sds):
+        """Test databases created before sections were stored are migrated."""
+        db_path = temp_dir / "old.sqlite3"
+        connection = sqlite3.connect(db_path)
+        connection.execute(
+            "CREATE TABLE sds (sds_id TEXT PRIMARY KEY, markdown_content TEXT NOT NULL, "
+            "structured_content TEXT, summary TEXT, updated_at REAL NOT NULL)"
+        )
+        connection.execute(
+            "INSERT INTO sds VALUES (?, ?, ?, ?, 0)",
+            ("sds-1", "# Old", sample_processed_sds.structured_content.model_dump_json(), "Old summary"),
+        )
+        connection.commit()
+        connection.close()
+
+        store = SQLiteSDSStore(db_path)
+
+        assert store.get_sections("sds-1") == []
+        assert store.get("sds-1").summary == "Old summary"
+        store.close()
@@ -0,0 +1,273 @@
+"""Tests for JSON repair, guaranteed-JSON and batched section structuring."""
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from llama_index.core.llms import ChatMessage, ChatResponse
+from llama_index.llms.ollama import Ollama
+from llama_index.llms.openai import OpenAI
+
+from sds_digest.llms.json_repair import parse_json, repair_json
+from sds_digest.llms.structure_llm import SectionStructureLLM
+from sds_digest.src.processing.processor import Section
+from sds_digest.src.telemetry import Stage, Tracer
+
+
+def reply(content: str) -> ChatResponse:
+    return ChatResponse(message=ChatMessage(role="assistant", content=content))
+
+
+def short_section(number: int, chars: int = 40) -> Section:
+    return Section(
+        section_title=f"SECTION {number}: Title {number}",
+        section_summary=f"Summary {number}",
+        raw_content_of_section=f"Content of section {number}. ".ljust(chars, "x"),
+    )
+
+
+@pytest.fixture
+def section():
+    """A section to structure."""
+    return Section(
+        section_title="SECTION 13: Disposal considerations",
+        section_summary="Disposal",
+        raw_content_of_section="Dispose of contents in accordance with local regulations.",
+    )
+
+
+class TestRepairJson:
+    """Tests for repair_json and parse_json."""
+
+    @pytest.mark.parametrize(
+        "text, expected",
+        [
+            ('```json\n{"a": 1,}\n```', {"a": 1}),
+            ('Here is the JSON:\n{"a": [1, 2,],}\nHope this helps!', {"a": [1, 2]}),
+            ('{"a": "brace } and \\" quote"} trailing', {"a": 'brace } and " quote'}),
+            ('{"a": "```py code```", }', {"a": "```py code```"}),
+        ],
+    )
+    def test_repairs(self, text, expected):
+        """Test fences, prose and trailing commas are repaired."""
+        parsed = parse_json(text)
+
+        assert parsed.value == expected
+        assert parsed.repaired
+        assert parsed.complete
+
+    @pytest.mark.parametrize(
+        "text, expected",
+        [
+            ('{"a"', {}),
+            ('{"a": tru', {}),
+            ('{"a": nul', {}),
+            ('{"a": -', {}),
+            ('{"a": "hel', {}),
+            ('{"a": {"b": "cut o', {"a": {}}),
+            ('{"a": 1, "b":', {"a": 1}),
+            ('{"a": 1, "unfinished_ke', {"a": 1}),
+            ('{"a": [1, 2', {"a": [1]}),
+            ('[{"a": 1}, {"b": [', [{"a": 1}, {"b": []}]),
+        ],
+    )
+    def test_truncation_is_cut_back_and_flagged(self, text, expected):
+        """Test partial strings, numbers and literals are dropped, never closed, and the result is marked incomplete."""
+        parsed = parse_json(text)
+
+        assert parsed.value == expected
+        assert parsed.repaired
+        assert not parsed.complete
+
+    def test_valid_json_is_not_repaired(self):
+        """Test valid JSON takes the fast path."""
+        assert parse_json('{"a": 1}') == ({"a": 1}, False, True)
+
+    def test_fenced_valid_json_is_not_repaired(self):
+        """Test stripping the code fence around valid JSON does not count as a repair."""
+        assert parse_json('```json\n{"a": "`x`"}\n```') == ({"a": "`x`"}, False, True)
+
+    def test_no_json(self):
+        """Test text without an object or array cannot be repaired."""
+        with pytest.raises(ValueError):
+            repair_json("I cannot structure this section.")
+
+
+class TestSectionStructureLLMJson:
+    """Tests for the structured-output mode of SectionStructureLLM."""
+
+    @pytest.mark.parametrize(
+        "llm, expected",
+        [
+            (OpenAI(model="gpt-4o", api_key="test"), {"response_format": {"type": "json_object"}}),
+            (Ollama(model="llama3"), {"format": "json"}),
+        ],
+    )
+    def test_json_mode_per_provider(self, llm, expected):
+        """Test each provider is asked for a JSON object, unless JSON mode is off."""
+        assert SectionStructureLLM(llm=llm)._chat_kwargs() == expected
+        assert SectionStructureLLM(llm=llm, json_mode=False)._chat_kwargs() == {}
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("truncated", ['{"Disposal": "Local regulations", "Packaging": "Recyc', '{"Disposal": tru', '{"Disposal"'])
+    async def test_truncated_output_is_retried(self, section, truncated):
+        """Test a cut-off JSON object counts as a parse failure instead of a shortened result."""
+        llm = MagicMock(model="gpt-4o")
+        llm.achat = AsyncMock(side_effect=[reply(truncated), reply('{"Disposal": "Local regulations"}')])
+        tracer = Tracer()
+
+        with tracer.span(Stage.SECTION_STRUCTURING) as span:
+            structured = await SectionStructureLLM(llm=llm).astructure_section(section)
+
+        assert structured.structured_content == {"Disposal": "Local regulations"}
+        assert llm.achat.call_count == 2
+        assert span.json_parses == {"invalid": 1, "valid": 1}
+
+    @pytest.mark.asyncio
+    async def test_repaired_output_is_not_cached(self, section):
+        """Test a repaired answer is used but not cached, while a valid one is."""
+        llm = MagicMock(model="gpt-4o")
+        llm.achat = AsyncMock(side_effect=[reply('```json\n{"Disposal": "Local regulations",}\n```'), reply('{"Disposal": "Incinerate"}')])
+        cache = MagicMock()
+        cache.get.return_value = None
+        structurer = SectionStructureLLM(llm=llm, cache=cache)
+
+        first = await structurer.astructure_section_json(section)
+        second = await structurer.astructure_section_json(section)
+
+        assert (first, second) == ({"Disposal": "Local regulations"}, {"Disposal": "Incinerate"})
+        cache.put.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_fenced_output_is_cached(self, section):
+        """Test a valid answer in a code fence is cached when JSON mode is off."""
+        llm = MagicMock(model="gpt-4o")
+        llm.achat = AsyncMock(return_value=reply('```json\n{"Disposal": "Local regulations"}\n```'))
+        cache = MagicMock()
+        cache.get.return_value = None
+
+        structured = await SectionStructureLLM(llm=llm, cache=cache, json_mode=False).astructure_section_json(section)
+
+        assert structured == {"Disposal": "Local regulations"}
+        cache.put.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_only_the_failing_section_is_retried(self, section):
+        """Test unparseable output is retried with the broken reply in context, and outcomes are traced."""
+        llm = MagicMock(model="gpt-4o")
+        llm.achat = AsyncMock(side_effect=[reply("I am unable to comply."), reply('{"Disposal": "Local regulations"}')])
+        tracer = Tracer()
+
+        with tracer.span(Stage.SECTION_STRUCTURING) as span:
+            structured = await SectionStructureLLM(llm=llm).astructure_section(section)
+
+        assert structured.structured_content == {"Disposal": "Local regulations"}
+        retry_messages = llm.achat.call_args_list[1].kwargs["messages"]
+        assert retry_messages[-2].content == "I am unable to comply."
+        assert "JSON" in retry_messages[-1].content
+        assert span.json_parses == {"invalid": 1, "valid": 1}
+
+    @pytest.mark.asyncio
+    async def test_raw_text_kept_after_retries(self, section):
+        """Test the raw output is kept once the retries are used up."""
+        llm = MagicMock(model="gpt-4o")
+        llm.achat = AsyncMock(return_value=reply("still not json"))
+
+        structured = await SectionStructureLLM(llm=llm, max_parse_retries=2).astructure_section(section)
+
+        assert structured.structured_content == {"section_content": "still not json"}
+        assert llm.achat.call_count == 3
+
+
+class TestSectionStructureLLMBatching:
+    """Tests for structuring several sections in one call."""
+
+    def test_batches_pack_consecutive_sections_up_to_the_budget(self):
+        """Test sections are packed in order and an oversized one gets its own batch."""
+        sections = [short_section(1, 200), short_section(2, 200), short_section(3, 800), short_section(4, 40)]
+        structurer = SectionStructureLLM(llm=MagicMock(model="gpt-4o"), batch_token_budget=100)
+
+        batches = structurer.batches(sections)
+
+        assert [[s.section_title[8:9] for s in batch] for batch in batches] == [["1", "2"], ["3"], ["4"]]
+        assert SectionStructureLLM(llm=MagicMock(model="gpt-4o")).batches(sections[:2]) == [[sections[0]], [sections[1]]]
+
+    @pytest.mark.asyncio
+    async def test_one_call_per_batch(self):
+        """Test a batch is answered with one keyed JSON object and mapped back in order."""
+        llm = MagicMock(model="gpt-4o")
+        llm.achat = AsyncMock(return_value=reply(json.dumps(
+            {"section_1": {"Stability": "Stable"}, "section_2": {"Toxicity": "Low"}, "section_3": {"Disposal": "Local"}}
+        )))
+        structurer = SectionStructureLLM(llm=llm, batch_token_budget=1000)
+
+        structured = await structurer.astructure_sections([short_section(10), short_section(11), short_section(13)])
+
+        assert [s.structured_content for s in structured] == [{"Stability": "Stable"}, {"Toxicity": "Low"}, {"Disposal": "Local"}]
+        assert [s.section_title for s in structured] == ["SECTION 10: Title 10", "SECTION 11: Title 11", "SECTION 13: Title 13"]
+        llm.achat.assert_called_once()
+        system_prompt = llm.achat.call_args.kwargs["messages"][0].content
+        assert '<section id="section_2" title="SECTION 11: Title 11">' in system_prompt
+
+    @pytest.mark.asyncio
+    async def test_missing_sections_fall_back_to_single_calls(self):
+        """Test sections missing from the batch answer are structured one by one."""
+        llm = MagicMock(model="gpt-4o")
+        llm.achat = AsyncMock(side_effect=[
+            reply(json.dumps({"section_1": {"Stability": "Stable"}, "section_2": "not an object"})),
+            reply(json.dumps({"Toxicity": "Low"})),
+        ])
+        structurer = SectionStructureLLM(llm=llm, batch_token_budget=1000)
+
+        structured = await structurer.astructure_sections([short_section(10), short_section(11)])
+
+        assert [s.structured_content for s in structured] == [{"Stability": "Stable"}, {"Toxicity": "Low"}]
+        single_prompt = llm.achat.call_args_list[1].kwargs["messages"][0].content
+        assert "Content of section 11" in single_prompt and "<section" not in single_prompt
+
+    @pytest.mark.asyncio
+    async def test_truncated_batch_redoes_its_last_section(self):
+        """Test the possibly incomplete last section of a cut-off answer is structured again."""
+        llm = MagicMock(model="gpt-4o")
+        llm.achat = AsyncMock(side_effect=[
+            reply('{"section_1": {"Stability": "Stable"}, "section_2": {"Toxicity": "Lo'),
+            reply(json.dumps({"Toxicity": "Low"})),
+        ])
+        structurer = SectionStructureLLM(llm=llm, batch_token_budget=1000)
+
+        structured = await structurer.astructure_sections([short_section(10), short_section(11)])
+
+        assert [s.structured_content for s in structured] == [{"Stability": "Stable"}, {"Toxicity": "Low"}]
+        assert llm.achat.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_cache_is_looked_up_once_per_section(self):
+        """Test each section is looked up once and the batch span records the hit and miss counts."""
+        llm = MagicMock(model="gpt-4o")
+        llm.achat = AsyncMock(side_effect=[
+            reply(json.dumps({"section_1": {"Toxicity": "Low"}})),
+            reply(json.dumps({"Disposal": "Local"})),
+        ])
+        cache = MagicMock()
+        cache.get.side_effect = [json.dumps({"Stability": "Stable"}), None, None]
+        structurer = SectionStructureLLM(llm=llm, cache=cache, batch_token_budget=1000)
+        tracer = Tracer()
+
+        with tracer.span(Stage.SECTION_STRUCTURING) as span:
+            structured = await structurer.astructure_sections([short_section(10), short_section(11), short_section(13)])
+
+        assert [s.structured_content for s in structured] == [{"Stability": "Stable"}, {"Toxicity": "Low"}, {"Disposal": "Local"}]
+        assert cache.get.call_count == 3
+        assert (span.cache_hits, span.cache_misses, span.cache_hit) == (1, 2, False)
+
+    @pytest.mark.asyncio
+    async def test_section_titles_are_escaped(self):
+        """Test a title cannot break out of its section tag's attribute."""
+        llm = MagicMock(model="gpt-4o")
+        llm.achat = AsyncMock(return_value=reply(json.dumps({"section_1": {"a": 1}, "section_2": {"b": 2}})))
+        sections = [short_section(10), short_section(11)]
+        sections[0].section_title = 'SECTION 10: "Stability" <and> reactivity'
+
+        await SectionStructureLLM(llm=llm, batch_token_budget=1000).astructure_sections(sections)
+
+        system_prompt = llm.achat.call_args.kwargs["messages"][0].content
+        assert 'title="SECTION 10: &quot;Stability&quot; &lt;and&gt; reactivity"' in system_prompt
@@ -0,0 +1,206 @@
+"""Tests for per-stage spans and their Prometheus metrics."""
+import pytest
+from unittest.mock import MagicMock
+
+from llama_index.core.llms import ChatMessage, ChatResponse
+
+from sds_digest.llms.fake_llm import FakeLLM, FakeLLMConfig
+from sds_digest.llms.scheduler import LLMScheduler, run_scheduled
+from sds_digest.llms.utils import PromptUsage
+from sds_digest.src.extraction.extractor import ExtractedPdf
+from sds_digest.src.perf_benchmark import synthetic_sds_markdown
+from sds_digest.src.processing.llm_processor import LLMSafetyDataSheetProcessor
+from sds_digest.src.telemetry import (
+    OpenTelemetrySpanHook,
+    Span,
+    StageMetrics,
+    Tracer,
+    current_span,
+    record_cache_hit,
+)
+
+
+class RecordingHook:
+    """Collect finished spans."""
+
+    def __init__(self):
+        self.spans: list[Span] = []
+
+    def on_start(self, span: Span) -> None:
+        pass
+
+    def on_end(self, span: Span) -> None:
+        self.spans.append(span)
+
+
+@pytest.fixture
+def hook(monkeypatch):
+    """Record the spans of the process-wide tracer."""
+    recording = RecordingHook()
+    monkeypatch.setattr("sds_digest.src.telemetry.TRACER.hooks", [recording])
+    return recording
+
+
+class TestTracer:
+    """Tests for Tracer."""
+
+    def test_nested_spans(self):
+        """Test spans nest, time their stage and restore the outer span."""
+        hook = RecordingHook()
+        tracer = Tracer(hooks=[hook])
+
+        with tracer.span("upload", sds_id="sds-1") as outer:
+            with tracer.span("extraction") as inner:
+                assert current_span() is inner
+                record_cache_hit()
+            assert current_span() is outer
+
+        assert current_span() is None
+        assert [span.name for span in hook.spans] == ["extraction", "upload"]
+        assert inner.parent is outer
+        assert inner.cache_hit is True
+        assert outer.attributes == {"sds_id": "sds-1"}
+        assert outer.duration_seconds >= inner.duration_seconds
+
+    def test_errors_are_recorded(self):
+        """Test a failing stage is marked and the error still propagates."""
+        hook = RecordingHook()
+        tracer = Tracer(hooks=[hook])
+
+        with pytest.raises(ValueError):
+            with tracer.span("summary"):
+                raise ValueError("boom")
+
+        assert hook.spans[0].error == "ValueError: boom"
+
+    def test_failing_hook_does_not_break_the_stage(self):
+        """Test an exporter error is swallowed."""
+        broken = MagicMock()
+        broken.on_end.side_effect = RuntimeError("exporter down")
+        tracer = Tracer(hooks=[broken])
+
+        with tracer.span("qa"):
+            pass
+
+    @pytest.mark.asyncio
+    async def test_llm_calls_record_queue_wait_and_tokens(self):
+        """Test scheduled calls add their slot wait and reported usage to the current span."""
+        tracer = Tracer()
+        response = ChatResponse(
+            message=ChatMessage(role="assistant", content="ok"),
+            raw={"usage": {"prompt_tokens": 100, "completion_tokens": 20, "prompt_tokens_details": {"cached_tokens": 64}}},
+        )
+
+        async def call():
+            return response
+
+        with tracer.span("qa") as span:
+            await run_scheduled(LLMScheduler(), "gpt-4o", call, [ChatMessage(role="user", content="hi")])
+            await run_scheduled(None, "gpt-4o", call, [ChatMessage(role="user", content="hi")])
+
+        assert span.input_tokens == 200
+        assert span.output_tokens == 40
+        assert span.cached_tokens == 128
+        assert span.queue_wait_seconds >= 0
+
+
+class TestProcessorSpans:
+    """Tests for the spans emitted while processing an SDS."""
+
+    @pytest.mark.asyncio
+    async def test_stages_are_traced(self, hook):
+        """Test splitting, every section and the summary get their own span."""
+        llm = FakeLLM(config=FakeLLMConfig(first_token_latency_ms=0, output_tokens_per_second=1e9))
+        processor = LLMSafetyDataSheetProcessor.from_llm(llm, section_splitter="rules")
+
+        await processor.aprocess(ExtractedPdf(content=synthetic_sds_markdown(seed=1), source_file_path="a.pdf"))
+
+        names = [span.name for span in hook.spans]
+        assert names.count("splitting") == 1
+        assert names.count("section_structuring") == 16
+        assert names.count("summary") == 1
+        structuring = [span for span in hook.spans if span.name == "section_structuring"]
+        # Sections are structured alongside splitting, not inside it
+        assert all(span.parent is None for span in structuring)
+        assert all(span.input_tokens > 0 for span in structuring)
+        assert hook.spans[names.index("splitting")].attributes["sections"] == 16
+
+
+class TestStageMetrics:
+    """Tests for the Prometheus exposition."""
+
+    def test_render(self):
+        """Test histograms are cumulative and counters are labelled by stage."""
+        metrics = StageMetrics(buckets=(0.1, 1.0))
+        fast = Span("qa")
+        fast.add_usage(PromptUsage(prompt_tokens=10, completion_tokens=5))
+        fast.cache_hit = True
+        fast.end()
+        fast.duration_seconds = 0.05
+        slow = Span("qa")
+        slow.error = "TimeoutError: "
+        slow.end()
+        slow.duration_seconds = 2.0
+
+        metrics.on_end(fast)
+        metrics.on_end(slow)
+        text = metrics.render()
+
+        assert 'sds_digest_stage_duration_seconds_bucket{stage="qa",le="0.1"} 1' in text
+        assert 'sds_digest_stage_duration_seconds_bucket{stage="qa",le="1.0"} 1' in text
+        assert 'sds_digest_stage_duration_seconds_bucket{stage="qa",le="+Inf"} 2' in text
+        assert 'sds_digest_stage_duration_seconds_count{stage="qa"} 2' in text
+        assert 'sds_digest_stage_spans_total{stage="qa",status="error"} 1' in text
+        assert 'sds_digest_stage_tokens_total{stage="qa",kind="input"} 10' in text
+        assert 'sds_digest_stage_cache_hits_total{stage="qa"} 1' in text
+
+    def test_render_json_parses(self):
+        """Test JSON parse outcomes are counted per stage, so the failure rate can be derived."""
+        metrics = StageMetrics()
+        span = Span("section_structuring")
+        span.add_json_parse("valid")
+        span.add_json_parse("invalid")
+        span.add_json_parse("valid")
+        span.end()
+
+        metrics.on_end(span)
+        text = metrics.render()
+
+        assert 'sds_digest_stage_json_parses_total{stage="section_structuring",outcome="valid"} 2' in text
+        assert 'sds_digest_stage_json_parses_total{stage="section_structuring",outcome="invalid"} 1' in text
+
+    def test_render_model_calls(self):
+        """Test LLM calls are counted per stage and model tier."""
+        metrics = StageMetrics()
+        span = Span("section_structuring")
+        span.add_model_call("small", "gpt-4o-mini")
+        span.add_model_call("large", "gpt-4o")
+        span.add_model_call("small", "gpt-4o-mini")
+        span.end()
+
+        metrics.on_end(span)
+        text = metrics.render()
+
+        assert 'sds_digest_stage_model_calls_total{stage="section_structuring",tier="small",model="gpt-4o-mini"} 2' in text
+        assert 'sds_digest_stage_model_calls_total{stage="section_structuring",tier="large",model="gpt-4o"} 1' in text
+
+
+class TestOpenTelemetrySpanHook:
+    """Tests for OpenTelemetrySpanHook."""
+
+    def test_exports_span_with_attributes(self):
+        """Test stage spans become OpenTelemetry spans carrying the recorded measurements."""
+        pytest.importorskip("opentelemetry")
+        tracer = MagicMock()
+        tracer_hook = OpenTelemetrySpanHook(tracer=tracer)
+
+        with Tracer(hooks=[tracer_hook]).span("section_structuring", section="1. Identification") as span:
+            span.add_usage(PromptUsage(prompt_tokens=10, completion_tokens=5))
+
+        tracer.start_span.assert_called_once()
+        assert tracer.start_span.call_args.args[0] == "section_structuring"
+        assert tracer.start_span.call_args.kwargs["attributes"] == {"section": "1. Identification"}
+        otel_span = tracer.start_span.return_value
+        otel_span.set_attribute.assert_any_call("gen_ai.usage.input_tokens", 10)
+        otel_span.set_attribute.assert_any_call("gen_ai.usage.output_tokens", 5)
+        otel_span.end.assert_called_once()